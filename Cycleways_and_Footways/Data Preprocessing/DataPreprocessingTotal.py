@@ -11,8 +11,11 @@ import osmnx as ox
 
 import Elaboration_on_cicleways, Elaboration_on_footways, Elaboration_on_footways_and_cicleways, \
     Elaboration_on_crossing_nodes, Elaboration_on_crossing_ways, Elaboration_crossing_nodes_and_cycleways, \
-    Elaboration_crossing_ways_and_cicleways, Elaboration_crossing_nodes_and_footways, Elaboration_crossing_ways_and_footways, \
-    Elaboration_street_nodes
+    Elaboration_crossing_nodes_and_footways, Elaboration_crossing_ways_and_footways, \
+    Elaboration_street_nodes, Spatial_tools
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
 
 """In this file we are going to make some data preprocessing on all the data of interest
 in order to discover some relationships between them 
@@ -22,7 +25,7 @@ in order to discover some relationships between them
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -90,12 +93,17 @@ def add_options():
     parser.add_argument('--nameFileFootways', '-ff', dest='file_name_footways', type=str,
                         help="""Insert the name of the .json file containing footways.""",
                         required=True)
+    parser.add_argument('--processes', '-j', dest='processes', type=int, default=1,
+                        help="""Insert the number of processes used to find the relationships, the area is split in tiles""")
+    parser.add_argument('--tileSize', dest='tile_size', type=float, default=1000.0,
+                        help="""Insert the size (in meters) of the tiles processed by each process""")
     return parser
 
 def main(args=None):
     """Parsing input parameters"""
     argParser = add_options()
     options = argParser.parse_args(args=args)
+    Spatial_tools.configure(processes=options.processes, tile_size=options.tile_size)
     greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
     path = greeter.get_path()[0][0] + '\\' + greeter.get_import_folder_name()[0][0] + '\\'
 
@@ -106,12 +114,6 @@ def main(args=None):
     gdf_crossing_ways = Elaboration_on_crossing_ways.read_file(path + options.file_name_crossing_ways)
     print("Reading files : done")
 
-    gdf_footways.to_crs(epsg=3035, inplace=True)
-    gdf_cycleways.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_ways.to_crs(epsg=3035, inplace=True)
-
-
     Elaboration_on_cicleways.preprocessing(gdf_cycleways)
     Elaboration_on_footways.preprocessing(gdf_footways)
     #Elaboration_on_crossing_nodes.preprocessing(gdf_crossing_nodes)
@@ -142,8 +144,5 @@ def main(args=None):
     #Elaboration_on_crossing_ways.save_gdf(gdf_crossing_ways, path + options.file_name_crossing_ways)
 
 
-main()
-
-
-
-
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+import Spatial_tools
 
 """In this file we are going to make some preprocessing in order to find
    relations between cycling paths and crossings mapped as nodes
@@ -15,7 +20,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -72,15 +77,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    json_file = json.load(f)
-    df = pd.DataFrame(json_file['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:4326')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def find_cycleways_close_to_crossing_ways(gdf_cycleways, gdf_crossing_nodes):
@@ -89,29 +88,17 @@ def find_cycleways_close_to_crossing_ways(gdf_cycleways, gdf_crossing_nodes):
     #gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
     #gdf_cycleways.to_crs(epsg=3035, inplace=True)
 
-    list_closest_lanes = []
-    for i in range(gdf_crossing_nodes.shape[0]):
-        list_closest_lanes.append([])
+    """cycleways within 10 meters from the crossing, without building a buffer around each node"""
+    gdf_crossing_nodes['closest_lanes'] = Spatial_tools.matching_values(gdf_crossing_nodes, gdf_cycleways, 'id',
+                                                                        ["dwithin"], distance=10)
 
-    gdf_crossing_nodes['closest_lanes'] = list_closest_lanes
-    s_cycleways = gdf_cycleways['geometry']
-    
-    for index, r in gdf_crossing_nodes.iterrows():    
-        polygon = r['geometry'].buffer(10)
-        l = list(s_cycleways.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_crossing_nodes[gdf_crossing_nodes['id'] == r.id]['closest_lanes'].iloc[0].append(gdf_cycleways.iloc[i].id)
-    
 
 
 
 def save_gdf(gdf, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path , orient='table')
+    geoFiles.save_gdf(gdf, path)
 
 
 
@@ -128,9 +115,6 @@ def main(args=None):
     gdf_cycleways = read_file(path + options.file_name_cycleways)
     gdf_crossing_nodes = read_file(path + options.file_name_crossings)
 
-    gdf_cycleways.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
-
     """Find relationships between cycleways and crossings mapped as nodes"""
     find_cycleways_close_to_crossing_ways(gdf_cycleways, gdf_crossing_nodes)
     print("Find crossing ways that are close or touching cycleways : done ")
@@ -140,4 +124,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
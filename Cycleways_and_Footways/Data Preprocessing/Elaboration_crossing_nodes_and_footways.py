@@ -7,6 +7,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+import Spatial_tools
 
 
 """In this file we are going to make some preprocessing in order to find
@@ -15,7 +20,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -70,15 +75,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    json_file = json.load(f)
-    df = pd.DataFrame(json_file['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:4326')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 
@@ -88,29 +87,15 @@ def find_footways_close_to_crossing_nodes(gdf_footways, gdf_crossing_nodes):
     #gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
     #gdf_footways.to_crs(epsg=3035, inplace=True)
 
-    list_closest_footways = []
-    for i in range(gdf_crossing_nodes.shape[0]):
-        list_closest_footways.append([])
-
-    gdf_crossing_nodes['closest_footways'] = list_closest_footways
-
-    s = gdf_footways['geometry']
-    for index, r in gdf_crossing_nodes.iterrows():
-        polygon = r['geometry'].buffer(10)
-        print(index)
-        l1 = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l1:
-            gdf_crossing_nodes[gdf_crossing_nodes['id'] == r.id]['closest_footways'].iloc[0].append(
-                gdf_footways.iloc[i].id)
+    """footways within 10 meters from the crossing, without building a buffer around each node"""
+    gdf_crossing_nodes['closest_footways'] = Spatial_tools.matching_values(gdf_crossing_nodes, gdf_footways, 'id',
+                                                                           ["dwithin"], distance=10)
 
 
 def save_gdf(gdf, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path , orient='table')
+    geoFiles.save_gdf(gdf, path)
 
 
 
@@ -127,9 +112,6 @@ def main(args=None):
     gdf_footways = read_file(path + options.file_name_footways)
     gdf_crossing_nodes = read_file(path + options.file_name_crossings)
 
-    gdf_footways.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
-
     """Find relationships between footways and crossings mapped as nodes"""
     find_footways_close_to_crossing_nodes(gdf_footways, gdf_crossing_nodes)
     print("Find crossing ways that are close or touching cycleways : done ")
@@ -139,4 +121,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -7,6 +7,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+import Spatial_tools
 
 
 """In this file we are going to make some preprocessing in order to find
@@ -16,7 +21,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -73,15 +78,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    json_file = json.load(f)
-    df = pd.DataFrame(json_file['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:4326')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def find_footways_close_to_crossing_ways(gdf_footways, gdf_crossing_ways):
@@ -89,38 +88,17 @@ def find_footways_close_to_crossing_ways(gdf_footways, gdf_crossing_ways):
 
     #gdf_crossing_ways.to_crs(epsg=3035, inplace=True)
 
-    list_closest_footways = []
-    for i in range(gdf_crossing_ways.shape[0]):
-        list_closest_footways.append([])
-
-    gdf_crossing_ways['closest_footways'] = list_closest_footways
-
-    s = gdf_footways['geometry']
-
-    for index, r in gdf_crossing_ways.iterrows(): 
-        print(index)
-        polygon = r['geometry']
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_crossing_ways[gdf_crossing_ways['id'] == r.id]['closest_footways'].iloc[0].append(
-                gdf_footways.iloc[i].id)
-
-        l1 = list(s.sindex.query(polygon, predicate="touches"))
-        for i in l1:
-            gdf_crossing_ways[gdf_crossing_ways['id'] == r.id]['closest_footways'].iloc[0].append(
-                gdf_footways.iloc[i].id)
+    gdf_crossing_ways['closest_footways'] = Spatial_tools.matching_values(gdf_crossing_ways, gdf_footways, 'id',
+                                                                          ["intersects", "touches"])
 
     return gdf_crossing_ways
 
 
 
 def save_gdf(gdf, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path , orient='table')
+    geoFiles.save_gdf(gdf, path)
 
 
 
@@ -137,9 +115,6 @@ def main(args=None):
     gdf_footways = read_file(path + options.file_name_footways)
     gdf_crossing_ways = read_file(path + options.file_name_crossings)
 
-    gdf_footways.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_ways.to_crs(epsg=3035, inplace=True)
-
     """Find relationships between footways and crossings mapped as ways"""
     gdf_crossing_ways = find_footways_close_to_crossing_ways(gdf_footways, gdf_crossing_ways)
     print("Find crossing ways that are close or touching cycleways : done ")
@@ -148,4 +123,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
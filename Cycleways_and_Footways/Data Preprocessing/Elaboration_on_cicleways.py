@@ -7,6 +7,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import safetyRules
+import geoFiles
+import Spatial_tools
 
 """In this file we are going to make some preprocessing in order to find
    relations between cycleways
@@ -16,7 +22,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -70,15 +76,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    cycleways = json.load(f)
-    df_cycleways = pd.DataFrame(cycleways['data'])
-    df_cycleways['geometry'] = df_cycleways['geometry'].apply(wkt.loads)
-    gdf_cycleways = gpd.GeoDataFrame(df_cycleways, crs='epsg:4326')
-    gdf_cycleways.drop('index', axis=1, inplace=True)
-    return gdf_cycleways
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def insert_id_num(gdf_cycleways):
@@ -96,104 +96,39 @@ def compute_length(gdf_cycleways):
 
 
 def compute_danger(gdf_cycleways):
-    """Convert in an integer value the classification attribute"""
+    """Convert in an integer value the classification attribute and set the default speed"""
 
-    d = {'lontano dal traffico' : 1, 'fisicamente protetto' : 2, 'fisicamente protetto in sede stradale' : 3, 'vicino al traffico (L)' : 4, 
-    'vicino al traffico (V)': 5}
-
-    gdf_cycleways['classifica'].fillna('fisicamente protetto in sede stradale', inplace=True)
-
-    list_danger = []
-    for _, r in gdf_cycleways.iterrows():
-        print(r['classifica'])
-        list_danger.append(d[r['classifica']])
-
-    gdf_cycleways['pericolosità'] = list_danger
+    safetyRules.cycleway_attributes(gdf_cycleways)
 
 
 def find_touched_lanes(gdf_cycleways):
     """Find cycleways that are touching or intersecting the current one"""
     #gdf_cycleways.to_crs(epsg=3035, inplace=True)
 
-    list_touched_lanes = []
-    for i in range(gdf_cycleways.shape[0]):
-        list_touched_lanes.append([])
-
-    gdf_cycleways['touched_lanes'] = list_touched_lanes
-
-    s = gdf_cycleways['geometry']
-
-    for index, r in gdf_cycleways.iterrows():    
-        polygon = r['geometry']
-        print(index)
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_cycleways[gdf_cycleways['id'] == r.id]['touched_lanes'].iloc[0].append(gdf_cycleways.iloc[i].id)
-        
-        l1 = list(s.sindex.query(polygon, predicate="touches"))
-        for i in l1:
-            gdf_cycleways[gdf_cycleways['id'] == r.id]['touched_lanes'].iloc[0].append(gdf_cycleways.iloc[i].id)
+    gdf_cycleways['touched_lanes'] = Spatial_tools.matching_values(gdf_cycleways, gdf_cycleways, 'id',
+                                                                   ["intersects", "touches"])
 
 
 def find_closest_lanes(gdf_cycleways):
     """Find cycleways that are reachable by crossing the road where the crossing is not signaled"""
     #gdf_cycleways.to_crs(epsg=3035, inplace=True)
 
-    list_closest_lanes = []
-    for i in range(gdf_cycleways.shape[0]):
-        list_closest_lanes.append([])
-
-    gdf_cycleways['closest_lanes'] = list_closest_lanes
-
-    s = gdf_cycleways['geometry']
-
-    for index, r in gdf_cycleways.iterrows():    
-        polygon = r['geometry']
-        l_dist = list(s.distance(polygon))
-    
-        for i in range(len(l_dist)):
-            if l_dist[i] <= 9 and l_dist[i] > 0:
-                gdf_cycleways[gdf_cycleways['id'] == r.id]['closest_lanes'].iloc[0].append(
-                                                                        (gdf_cycleways.iloc[i].id, l_dist[i]))
+    gdf_cycleways['closest_lanes'] = Spatial_tools.close_values(gdf_cycleways, gdf_cycleways, 'id', 9)
 
 
 def find_closest_lanes_spatial_index(gdf_cycleways):
-    """Find cycleways that are reachable by crossing the road where the crossing is not signaled"""
-    list_closest_lanes = []
-    for i in range(gdf_cycleways.shape[0]):
-        list_closest_lanes.append([])
-
-    gdf_cycleways['closest_lanes'] = list_closest_lanes
-    s = gdf_cycleways['geometry']
-
-    for index, r in gdf_cycleways.iterrows():
-        polygon = r['geometry']
-        print(index)
-
-        l = list(s.sindex.query(polygon.buffer(9), predicate="intersects"))
-
-        for i in l:
-            if i in r.touched_lanes:
-                continue
-            gdf_cycleways[gdf_cycleways['id'] == r.id]['closest_lanes'].iloc[0].append(
-                                                                        (gdf_cycleways.iloc[i].id, 7))
+    """Find cycleways that are reachable by crossing the road where the crossing is not signaled,
+       that is the cycleways within 9 meters that do not touch the current one, with their distance
+    """
 
-        l1 = list(s.sindex.query(polygon.buffer(9), predicate="touches"))
-        for i in l1:
-            if i in r.touched_lanes:
-                continue
-            gdf_cycleways[gdf_cycleways['id'] == r.id]['closest_lanes'].iloc[0].append(
-                (gdf_cycleways.iloc[i].id, 9))
+    gdf_cycleways['closest_lanes'] = Spatial_tools.close_values(gdf_cycleways, gdf_cycleways, 'id', 9)
 
 
 
 def save_gdf(gdf_cycleways, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf_cycleways.to_crs(epsg=4326, inplace=True)
-    df_cycleways = pd.DataFrame(gdf_cycleways)
-    df_cycleways['geometry'] = df_cycleways['geometry'].astype(str)
-    df_cycleways.to_json(path, orient='table')
+    geoFiles.save_gdf(gdf_cycleways, path)
 
 
 def preprocessing(gdf_cycleways):
@@ -225,7 +160,6 @@ def main(args=None):
 
     """Read the content of the json file, store it in a geodataframe and apply the preprocessing"""
     gdf_cycleways = read_file(path + options.file_name)
-    gdf_cycleways.to_crs(epsg=3035, inplace=True)
     preprocessing(gdf_cycleways)
     save_gdf(gdf_cycleways, path + options.file_name)
 
@@ -233,4 +167,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
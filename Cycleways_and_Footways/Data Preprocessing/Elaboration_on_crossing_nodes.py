@@ -7,6 +7,10 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
 
 
 """In this file we are going to make some preprocessing on crossing mapped as nodes"""
@@ -14,7 +18,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -68,15 +72,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    crossing_nodes = json.load(f)
-    df_crossing_nodes = pd.DataFrame(crossing_nodes['data'])
-    df_crossing_nodes['geometry'] = df_crossing_nodes['geometry'].apply(wkt.loads)
-    gdf_crossing_nodes = gpd.GeoDataFrame(df_crossing_nodes, crs='epsg:4326')
-    gdf_crossing_nodes.drop('index', axis=1, inplace=True)
-    return gdf_crossing_nodes
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def insert_id_num(gdf_crossing_nodes):
@@ -88,12 +86,9 @@ def insert_id_num(gdf_crossing_nodes):
 
 
 def save_gdf(gdf_crossing_nodes, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf_crossing_nodes.to_crs(epsg=4326, inplace=True)
-    df_crossing_nodes = pd.DataFrame(gdf_crossing_nodes)
-    df_crossing_nodes['geometry'] = df_crossing_nodes['geometry'].astype(str)
-    df_crossing_nodes.to_json(path, orient='table')
+    geoFiles.save_gdf(gdf_crossing_nodes, path)
 
 
 def preprocessing(gdf_crossing_nodes):
@@ -111,7 +106,6 @@ def main(args=None):
 
     """Read the content of the json file, store it in a geodataframe and apply the preprocessing"""
     gdf_crossing_nodes = read_file(path + options.file_name)
-    gdf_crossing_nodes.to_crs(epsg=3035, inplace=True)
 
     preprocessing(gdf_crossing_nodes)
     save_gdf(gdf_crossing_nodes, path + options.file_name)
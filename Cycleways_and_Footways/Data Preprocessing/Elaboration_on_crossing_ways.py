@@ -7,13 +7,17 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
 
 
 """In this file we are going to make some preprocessing on crossing mapped as nodes"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -67,15 +71,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    crossing_ways = json.load(f)
-    df_crossing_ways = pd.DataFrame(crossing_ways['data'])
-    df_crossing_ways['geometry'] = df_crossing_ways['geometry'].apply(wkt.loads)
-    gdf_crossing_ways = gpd.GeoDataFrame(df_crossing_ways, crs='epsg:4326')
-    gdf_crossing_ways.drop('index', axis=1, inplace=True)
-    return gdf_crossing_ways
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def insert_id_num(gdf_crossing_ways):
@@ -93,12 +91,9 @@ def compute_length(gdf_crossing_ways):
 
 
 def save_gdf(gdf_crossing_ways, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf_crossing_ways.to_crs(epsg=4326, inplace=True)
-    df_crossing_ways = pd.DataFrame(gdf_crossing_ways)
-    df_crossing_ways['geometry'] = df_crossing_ways['geometry'].astype(str)
-    df_crossing_ways.to_json(path, orient='table')
+    geoFiles.save_gdf(gdf_crossing_ways, path)
 
 
 def preprocessing(gdf_crossing_ways):
@@ -121,7 +116,6 @@ def main(args=None):
     """Read the content of the json file, store it in a geodataframe, and apply the preprocessing
     """
     gdf_crossing_ways = read_file(path + options.file_name)
-    gdf_crossing_ways.to_crs(epsg=3035, inplace=True)
     preprocessing(gdf_crossing_ways)
     save_gdf(gdf_crossing_ways, path + options.file_name)
 
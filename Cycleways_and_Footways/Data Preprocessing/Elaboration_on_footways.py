@@ -7,6 +7,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 from shapely import wkt
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import safetyRules
+import geoFiles
+import Spatial_tools
 
 
 """In this file we are going to make some preprocessing in order to find
@@ -16,7 +22,7 @@ from shapely import wkt
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -70,15 +76,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    footways = json.load(f)
-    df_footways = pd.DataFrame(footways['data'])
-    df_footways['geometry'] = df_footways['geometry'].apply(wkt.loads)
-    gdf_footways = gpd.GeoDataFrame(df_footways, crs='epsg:4326')
-    gdf_footways.drop('index', axis=1, inplace=True)
-    return gdf_footways
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def insert_id_num(gdf_footways):
@@ -95,94 +95,42 @@ def compute_length(gdf_footways):
     gdf_footways['length'] = gdf_footways['geometry'].length
 
 
+def compute_danger(gdf_footways):
+    """Set danger and default speed of the footways from their tags"""
+
+    safetyRules.footway_attributes(gdf_footways)
+
+
 def find_touched_footways(gdf_footways):
     """Find footways that are touching or intersecting the current one"""
     #gdf_footways.to_crs(epsg=3035, inplace=True)
     print(gdf_footways['geometry'].head())
 
-    list_touched_footways = []
-    for i in range(gdf_footways.shape[0]):
-        list_touched_footways.append([])
-
-    gdf_footways['touched_footways'] = list_touched_footways
+    gdf_footways['touched_footways'] = Spatial_tools.matching_values(gdf_footways, gdf_footways, 'id',
+                                                                     ["intersects", "touches"])
 
 
-    s = gdf_footways['geometry']
-
-    for index, r in gdf_footways.iterrows():    
-        polygon = r['geometry']
-        print(index)
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_footways[gdf_footways['id'] == r.id]['touched_footways'].iloc[0].append(gdf_footways.iloc[i].id)
-        
-        l1 = list(s.sindex.query(polygon, predicate="touches"))
-        for i in l1:
-            gdf_footways[gdf_footways['id'] == r.id]['touched_footways'].iloc[0].append(gdf_footways.iloc[i].id)
-    
-
 
 
 def find_closest_footways(gdf_footways):
     """Find footways that are reachable by crossing the road where the crossing is not signaled"""
     #gdf_footways.to_crs(epsg=3035, inplace=True)
-    #print(gdf_footways['geometry'].head())
-
-    s = gdf_footways['geometry']
 
-    list_closest_footways = []
-    for i in range(gdf_footways.shape[0]):
-        list_closest_footways.append([])
-
-    gdf_footways['closest_footways'] = list_closest_footways
-
-    for index, r in gdf_footways.iterrows():
-        print(index)
-        polygon = r['geometry']
-        l_dist = list(s.distance(polygon))
-    
-        for i in range(len(l_dist)):
-            if l_dist[i] <= 9 and l_dist[i] > 0:
-                gdf_footways[gdf_footways['id'] == r.id]['closest_footways'].iloc[0].append(
-                                                                        (gdf_footways.iloc[i].id, l_dist[i]))
+    gdf_footways['closest_footways'] = Spatial_tools.close_values(gdf_footways, gdf_footways, 'id', 9)
 
 
 def find_closest_footways_spatial_index(gdf_footways):
-    """Find cycleways that are reachable by crossing the road where the crossing is not signaled"""
-    list_closest_footways = []
-    for i in range(gdf_footways.shape[0]):
-        list_closest_footways.append([])
-
-    gdf_footways['closest_footways'] = list_closest_footways
-    s = gdf_footways['geometry']
-
-    for index, r in gdf_footways.iterrows():
-        polygon = r['geometry']
-        print(index)
+    """Find footways that are reachable by crossing the road where the crossing is not signaled,
+       that is the footways within 9 meters that do not touch the current one, with their distance
+    """
 
-        l = list(s.sindex.query(polygon.buffer(9), predicate="intersects"))
-
-        for i in l:
-            if i in r.touched_footways:
-                continue
-            gdf_footways[gdf_footways['id'] == r.id]['closest_footways'].iloc[0].append(
-                                                                        (gdf_footways.iloc[i].id, 7))
-
-        l1 = list(s.sindex.query(polygon, predicate="touches"))
-        for i in l1:
-            if i in r.touched_footways:
-                continue
-            gdf_footways[gdf_footways['id'] == r.id]['closest_footways'].iloc[0].append(
-                                                                            (gdf_footways.iloc[i].id, 9))
+    gdf_footways['closest_footways'] = Spatial_tools.close_values(gdf_footways, gdf_footways, 'id', 9)
 
 
 def save_gdf(gdf_footways, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf_footways.to_crs(epsg=4326, inplace=True)
-    df_footways = pd.DataFrame(gdf_footways)
-    df_footways['geometry'] = df_footways['geometry'].astype(str)
-    df_footways.to_json(path , orient='table')
+    geoFiles.save_gdf(gdf_footways, path)
 
 
 
@@ -193,6 +141,9 @@ def preprocessing(gdf_footways):
     compute_length(gdf_footways)
     print("Compute length of footways : done")
 
+    compute_danger(gdf_footways)
+    print("Compute danger of the footways : done")
+
     find_touched_footways(gdf_footways)
     print("Find footways that touch each other : done")
 
@@ -211,7 +162,6 @@ def main(args=None):
 
     """Read the content of the json file, store it in a geodataframe and apply the preprocessing"""
     gdf_footways = read_file(path + options.file_name)
-    gdf_footways.to_crs(epsg=3035, inplace=True)
     preprocessing(gdf_footways)
     save_gdf(gdf_footways, path + options.file_name)
 
@@ -219,4 +169,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -8,6 +8,11 @@ import numpy as np
 import json
 from shapely import wkt
 from shapely.ops import unary_union
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+import Spatial_tools
 
 
 """In this file we are going to make some preprocessing in order to find
@@ -16,7 +21,7 @@ from shapely.ops import unary_union
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -73,15 +78,9 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    json_file = json.load(f)
-    df = pd.DataFrame(json_file['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:4326')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def find_cycleways_touching_and_close_to_footways(gdf_footways, gdf_cycleways):
@@ -91,86 +90,25 @@ def find_cycleways_touching_and_close_to_footways(gdf_footways, gdf_cycleways):
     #gdf_footways.to_crs(epsg=3035, inplace=True)
     #gdf_cycleways.to_crs(epsg=3035, inplace=True)
 
-    s2 = gdf_cycleways['geometry']
-
-    list_lanes = []
-    for i in range(gdf_footways.shape[0]):
-        list_lanes.append([])
-
-    gdf_footways['closest_lanes'] = list_lanes
-    gdf_footways['touched_lanes'] = list_lanes
-
-
-    for index, r in gdf_footways.iterrows():
-        print(index)
-        polygon = r['geometry']
-        l_dist = list(s2.distance(polygon))
-        for i in range(len(l_dist)):
-            if l_dist[i] == 0:
-                gdf_footways[gdf_footways['id'] == r.id]['touched_lanes'].iloc[0].append(gdf_cycleways.iloc[i]['id'])
-            elif l_dist[i] <= 9 and l_dist[i] > 0:
-                gdf_footways[gdf_footways['id'] == r.id]['closest_lanes'].iloc[0].append((
-                                                                gdf_cycleways.iloc[i]['id'], l_dist[i]))
+    gdf_footways['touched_lanes'] = Spatial_tools.matching_values(gdf_footways, gdf_cycleways, 'id', ["intersects"])
+    gdf_footways['closest_lanes'] = Spatial_tools.close_values(gdf_footways, gdf_cycleways, 'id', 9)
 
 
 
 def find_cycleways_touching_footways_spatial_index(gdf_footways, gdf_cycleways):
     """Find cycleways that are reachable by crossing the road where the crossing is not signaled"""
 
-    s = gdf_cycleways['geometry']
-
-    list_lanes = []
-    for i in range(gdf_footways.shape[0]):
-        list_lanes.append([])
-
-    gdf_footways['touched_lanes'] = list_lanes
-
-    for index, r in gdf_footways.iterrows():
-        polygon = r['geometry']
-        print(index)
-
-        """ FIND CYCLEWAYS THAT TOUCH OR INTERSECT THE CURRENT FOOTWAY"""
-        l = list(s.sindex.query(polygon, predicate = "intersects"))
-        for i in l:
-            gdf_footways[gdf_footways['id'] == r.id]['touched_lanes'].iloc[0].append(
-                                                                                gdf_cycleways.iloc[i].id)
-
-        l1 = list(s.sindex.query(polygon, predicate = "touches"))
-        for i in l1:
-            gdf_footways[gdf_footways['id'] == r.id]['touched_lanes'].iloc[0].append(
-                                                                                gdf_cycleways.iloc[i].id)
+    """ FIND CYCLEWAYS THAT TOUCH OR INTERSECT THE FOOTWAYS"""
+    gdf_footways['touched_lanes'] = Spatial_tools.matching_values(gdf_footways, gdf_cycleways, 'id',
+                                                                  ["intersects", "touches"])
 
 
 
 def find_cycleways_close_to_footways_spatial_index(gdf_footways, gdf_cycleways):
     """Find cycleways that are reachable by crossing the road where the crossing is not signaled"""
 
-    s = gdf_cycleways['geometry']
-
-    list_lanes = []
-    for i in range(gdf_footways.shape[0]):
-        list_lanes.append([])
-
-    gdf_footways['closest_lanes'] = list_lanes
-
-
-    for index, r in gdf_footways.iterrows():
-        polygon = r['geometry']
-        print(index)
-
-        """ FIND CYCLEWAYS THAT ARE REACHABLE BY CROSSING THE ROAD WHERE THE CROSSING IS NOT SIGNALED"""
-        l3 = list(s.sindex.query(polygon.buffer(9), predicate="intersects"))
-        for i in l3:
-            if i in r.touched_lanes:
-                continue
-            gdf_footways[gdf_footways['id'] == r.id]['closest_lanes'].iloc[0].append(
-                                                                            (gdf_cycleways.iloc[i].id, 7))
-        l4 = list(s.sindex.query(polygon, predicate="touches"))
-        for i in l4:
-            if i in r.touched_lanes:
-                continue
-            gdf_footways[gdf_footways['id'] == r.id]['closest_lanes'].iloc[0].append(
-                                                                            (gdf_cycleways.iloc[i].id, 9))
+    """ FIND CYCLEWAYS WITHIN 9 METERS THAT DO NOT TOUCH THE FOOTWAY, WITH THEIR DISTANCE"""
+    gdf_footways['closest_lanes'] = Spatial_tools.close_values(gdf_footways, gdf_cycleways, 'id', 9)
 """
 def compute_distance(geom, footway, gdf_cycleways):
     dist = 0
@@ -242,12 +180,9 @@ def compute_footways_as_crossings(gdf_footways, gdf_cycleways):
 
 
 def save_gdf(gdf, path):
-    """save the geopandas DataFrame in a json file"""
+    """save the geopandas DataFrame in a json file and in a GeoParquet file"""
 
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path, orient='table')
+    geoFiles.save_gdf(gdf, path)
 
 
 
@@ -264,9 +199,6 @@ def main(args=None):
     gdf_footways = read_file(path + options.file_name_footways)
     gdf_cycleways = read_file(path + options.file_name_cycleways)
 
-    gdf_footways.to_crs(epsg=3035, inplace=True)
-    gdf_cycleways.to_crs(epsg=3035, inplace=True)
-
     find_cycleways_touching_footways_spatial_index(gdf_footways, gdf_cycleways)
     print("Find the cycleways that touch the footways : done")
 
@@ -279,4 +211,4 @@ def main(args=None):
     save_gdf(gdf_footways, path + options.file_name_footways)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
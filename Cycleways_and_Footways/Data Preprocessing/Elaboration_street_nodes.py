@@ -8,6 +8,11 @@ import numpy as np
 import json
 from shapely import wkt
 import osmnx as ox
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+import Spatial_tools
 
 
 """In this file we are going to make some preprocessing on street nodes in order to find 
@@ -16,7 +21,7 @@ relationships between them and cycleways, footways and crossings
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -84,39 +89,20 @@ def add_options():
 
 
 def read_file(path):
-    """read the file specified by the path"""
+    """read the file specified by the path, with the geometries in epsg:3035"""
 
-    f = open(path)
-    fjson = json.load(f)
-    df = pd.DataFrame(fjson['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:3035')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
 
 
 def bike_cross_cycleways(gdf_cycleways, nodes):
     """Find the street nodes within cycling paths"""
 
-    list_bike_cross = []
-
-    for i in range(gdf_cycleways.shape[0]):
-        list_bike_cross.append([])
-
-    gdf_cycleways['bike_cross'] = list_bike_cross
-
-
     nodes.to_crs(epsg=3035, inplace=True)
     gdf_cycleways.to_crs(epsg=3035, inplace=True)
 
-    s = nodes['geometry'].buffer(2)
-
-    for index, r in gdf_cycleways.iterrows():    
-        polygon = r['geometry']
-    
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_cycleways[gdf_cycleways['id_num'] == r.id_num]['bike_cross'].iloc[0].append(nodes.iloc[i].osmid)
+    """street nodes within 2 meters from the cycling path"""
+    gdf_cycleways['bike_cross'] = Spatial_tools.matching_values(gdf_cycleways, nodes, 'osmid', ["dwithin"],
+                                                                distance=2)
 
 
 
@@ -125,54 +111,23 @@ def foot_cross(gdf_footways, nodes):
     nodes.to_crs(epsg=3035, inplace=True)
     gdf_footways.to_crs(epsg=3035, inplace=True)
 
-    list_foot_cross = []
-
-    for i in range(gdf_footways.shape[0]):
-        list_foot_cross.append([])
-
-    gdf_footways['foot_cross'] = list_foot_cross
-
-
-    s = nodes['geometry'].buffer(2)
-
-    for index, r in gdf_footways.iterrows():    
-        polygon = r['geometry']
-    
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_footways[gdf_footways['id_num'] == r.id_num]['foot_cross'].iloc[0].append(nodes.iloc[i].osmid)
+    gdf_footways['foot_cross'] = Spatial_tools.matching_values(gdf_footways, nodes, 'osmid', ["dwithin"],
+                                                               distance=2)
 
 
 def junction_cross_crossing_ways(gdf_crossing_ways, nodes):
     """Find street nodes within crossing mapped as ways"""
 
-    list_junction_cross = []
-
-    for i in range(gdf_crossing_ways.shape[0]):
-        list_junction_cross.append([])
-
-    gdf_crossing_ways['junction_crosses'] = list_junction_cross
-
-    s = nodes['geometry'].buffer(2)
-
-    for index, r in gdf_crossing_ways.iterrows():
-        polygon = r['geometry']
-
-        l = list(s.sindex.query(polygon, predicate="intersects"))
-        for i in l:
-            gdf_crossing_ways[gdf_crossing_ways['id_num'] == r.id_num]['junction_crosses'].iloc[0].append(
-                nodes.iloc[i].osmid)
+    gdf_crossing_ways['junction_crosses'] = Spatial_tools.matching_values(gdf_crossing_ways, nodes, 'osmid',
+                                                                          ["dwithin"], distance=2)
 
 
 def save_gdf(gdf, path):
     """
-    save the geopandas DataFrame in a json file
+    save the geopandas DataFrame in a json file and in a GeoParquet file
     """
 
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path, orient='table')
+    geoFiles.save_gdf(gdf, path)
 
 
 def preprocessing(gdf_cycleways, gdf_footways, gdf_crossing_ways, options):
@@ -212,10 +167,6 @@ def main(args=None):
     gdf_crossing_ways = read_file(path + options.file_name_crossing_ways)
     gdf_footways = read_file(path + options.file_name_footways)
 
-    gdf_cycleways.to_crs(epsg=3035, inplace=True)
-    gdf_footways.to_crs(epsg=3035, inplace=True)
-    gdf_crossing_ways.to_crs(epsg=3035, inplace=True)
-
     preprocessing(gdf_cycleways, gdf_footways, gdf_crossing_ways, options)
 
     """Store the results in json files"""
@@ -226,4 +177,4 @@ def main(args=None):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import shapely
+
+"""In this file the queries of Spatial_tools are split in square tiles and run by a pool of processes.
+Every geometry belongs to the tile containing the center of its bounding box, so every pair is found
+only once, by the tile of its first geometry; the tile is given the geometries of the other layer that
+are within a halo around its own geometries, wider than the distance of the query, so the pairs found
+are the same of the query made on the whole layers.
+The geometries are shared with the processes through shared memory, as WKB.
+"""
+
+"""meters added to the distance of the query to obtain the halo of a tile"""
+HALO_MARGIN = 1.0
+
+_shared = {}
+
+
+class SharedGeometries:
+    """WKB of the geometries written in a block of shared memory, with the offsets of each geometry"""
+
+    def __init__(self, geometries):
+        wkb = shapely.to_wkb(geometries)
+        offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(g) for g in wkb])
+        self.size = len(wkb)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, int(offsets[-1]) + offsets.nbytes))
+        self.memory.buf[:offsets.nbytes] = offsets.tobytes()
+        self.memory.buf[offsets.nbytes:offsets.nbytes + int(offsets[-1])] = b''.join(wkb)
+
+    def descriptor(self):
+        return self.memory.name, self.size
+
+    def release(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _attach(descriptors):
+    """initializer of the processes of the pool"""
+
+    for key, (name, size) in descriptors.items():
+        _shared[key] = (shared_memory.SharedMemory(name=name), size)
+
+
+def _geometries(key, idx):
+    memory, size = _shared[key]
+    offsets = np.frombuffer(memory.buf, dtype=np.int64, count=size + 1)
+    data = memory.buf[offsets.nbytes:]
+    return shapely.from_wkb([bytes(data[offsets[i]:offsets[i + 1]]) for i in idx])
+
+
+def _tile_pairs(task):
+    """pairs of a tile, with the positions in the whole layers"""
+
+    own_idx, candidate_idx, predicates, distance = task
+    tree = shapely.STRtree(_geometries('tree', candidate_idx))
+    geometries = _geometries('input', own_idx)
+    pairs = []
+    for predicate in predicates:
+        if predicate == 'dwithin':
+            input_idx, tree_idx = tree.query(geometries, predicate=predicate, distance=distance)
+        else:
+            input_idx, tree_idx = tree.query(geometries, predicate=predicate)
+        pairs.append((own_idx[input_idx], candidate_idx[tree_idx]))
+    return pairs
+
+
+def tiles(geometries, tile_size):
+    """positions of the geometries grouped by tile"""
+
+    bounds = shapely.bounds(geometries)
+    centers_x = (bounds[:, 0] + bounds[:, 2]) / 2
+    centers_y = (bounds[:, 1] + bounds[:, 3]) / 2
+    columns = np.floor((centers_x - centers_x.min()) / tile_size).astype(np.int64)
+    rows = np.floor((centers_y - centers_y.min()) / tile_size).astype(np.int64)
+    keys = rows * (columns.max() + 1) + columns
+    order = np.argsort(keys, kind='stable')
+    bounds_keys = np.searchsorted(keys[order], np.unique(keys), side='right')
+    return np.split(order, bounds_keys[:-1])
+
+
+def query_pairs(tree_geometries, geometries, predicates, distance=None, processes=None, tile_size=1000.0):
+    """For each predicate, the positions of the geometries and of the tree geometries that satisfy it"""
+
+    geometries = np.asarray(geometries)
+    tree_geometries = np.asarray(tree_geometries)
+    if len(geometries) == 0 or len(tree_geometries) == 0:
+        return [(np.array([], dtype=np.int64), np.array([], dtype=np.int64)) for _ in predicates]
+
+    """geometries of the other layer close to the geometries of each tile"""
+    groups = tiles(geometries, tile_size)
+    halo = (distance or 0) + HALO_MARGIN
+    windows = []
+    for own_idx in groups:
+        minx, miny, maxx, maxy = shapely.total_bounds(geometries[own_idx])
+        windows.append(shapely.box(minx - halo, miny - halo, maxx + halo, maxy + halo))
+    window_idx, candidate_idx = shapely.STRtree(tree_geometries).query(np.array(windows), predicate='intersects')
+    candidates = np.split(candidate_idx[np.argsort(window_idx, kind='stable')],
+                          np.searchsorted(np.sort(window_idx), np.arange(1, len(groups))))
+
+    shared = {'input': SharedGeometries(geometries), 'tree': SharedGeometries(tree_geometries)}
+    try:
+        descriptors = {key: s.descriptor() for key, s in shared.items()}
+        tasks = [(own_idx, np.sort(c), predicates, distance) for own_idx, c in zip(groups, candidates) if len(c)]
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_attach,
+                                 initargs=(descriptors,)) as executor:
+            results = list(executor.map(_tile_pairs, tasks, chunksize=max(1, len(tasks) // (4 * (processes or 1)))))
+    finally:
+        for s in shared.values():
+            s.release()
+
+    pairs = []
+    for k in range(len(predicates)):
+        input_idx = [r[k][0] for r in results]
+        tree_idx = [r[k][1] for r in results]
+        pairs.append((np.concatenate(input_idx) if input_idx else np.array([], dtype=np.int64),
+                      np.concatenate(tree_idx) if tree_idx else np.array([], dtype=np.int64)))
+    return pairs
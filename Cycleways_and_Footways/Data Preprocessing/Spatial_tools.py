@@ -0,0 +1,77 @@
+import numpy as np
+import shapely
+
+"""This file contains some functions useful to the data preprocessing: the spatial index is queried once
+with all the geometries of a layer and the pairs found are grouped back in a list for each geometry
+"""
+
+_settings = {'processes': 1, 'tile_size': 1000.0, 'min_tiled_rows': 5000}
+
+
+def configure(**settings):
+    """set the number of processes and the size of the tiles (meters) used to split the queries, with
+       more than one process the layers with at least min_tiled_rows geometries are split in tiles"""
+
+    for name in settings:
+        if name not in _settings:
+            raise ValueError("Unknown setting " + name)
+    _settings.update(settings)
+
+
+def _sorted_pairs(input_idx, tree_idx):
+    order = np.lexsort((tree_idx, input_idx))
+    return input_idx[order], tree_idx[order]
+
+
+def query_pairs(gdf_tree, geometries, predicates, distance=None):
+    """Query the spatial index of gdf_tree with all the geometries at once, for each predicate.
+       Return the positions of the geometries and of the matching rows of gdf_tree, the pairs of the first
+       predicate come first as in the queries made row by row, then the pairs are ordered by position.
+    """
+
+    s = gdf_tree['geometry']
+    if _settings['processes'] > 1 and len(geometries) >= _settings['min_tiled_rows']:
+        import Spatial_tiles
+        pairs = Spatial_tiles.query_pairs(s.values, geometries, predicates, distance,
+                                          _settings['processes'], _settings['tile_size'])
+    else:
+        pairs = []
+        for predicate in predicates:
+            if predicate == 'dwithin':
+                pairs.append(s.sindex.query(geometries, predicate=predicate, distance=distance))
+            else:
+                pairs.append(s.sindex.query(geometries, predicate=predicate))
+    pairs = [_sorted_pairs(input_idx, tree_idx) for input_idx, tree_idx in pairs]
+    return np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs])
+
+
+def group_by_position(n, positions, values):
+    """Build n lists, the i-th one contains the values whose position is i"""
+
+    values = np.asarray(values, dtype=object)
+    order = np.argsort(positions, kind='stable')
+    bounds = np.searchsorted(positions[order], np.arange(1, n))
+    return [list(group) for group in np.split(values[order], bounds)]
+
+
+def matching_values(gdf, gdf_tree, column, predicates, distance=None):
+    """For each row of gdf, list the values of column of the rows of gdf_tree satisfying the predicates"""
+
+    input_idx, tree_idx = query_pairs(gdf_tree, gdf['geometry'].values, predicates, distance)
+    values = gdf_tree[column].to_numpy(dtype=object)[tree_idx]
+    return group_by_position(gdf.shape[0], input_idx, values)
+
+
+def close_values(gdf, gdf_tree, column, max_distance):
+    """For each row of gdf, list the value of column and the distance of the rows of gdf_tree that do not
+       touch it but are within max_distance meters
+    """
+
+    input_idx, tree_idx = query_pairs(gdf_tree, gdf['geometry'].values, ["dwithin"], max_distance)
+    distances = shapely.distance(np.asarray(gdf['geometry'].values)[input_idx],
+                                 np.asarray(gdf_tree['geometry'].values)[tree_idx])
+    close = distances > 0
+    values = gdf_tree[column].to_numpy(dtype=object)[tree_idx[close]]
+    pairs = np.empty(values.shape[0], dtype=object)
+    pairs[:] = list(zip(values, distances[close].tolist()))
+    return group_by_position(gdf.shape[0], input_idx[close], pairs)
@@ -6,13 +6,16 @@ import geopandas as gpd
 import pandas as pd
 import requests
 from Tools import *
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
 
 
 class App:
     """In this file we are going to extract from OSM crossings mapped as ways"""
 
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -10,13 +10,17 @@ import numpy as np
 import pandas as pd
 import requests
 from Tools import *
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import safetyRules
 
 """Extract cycleways and roads where bicycles are allowed from OSM"""
 
 class App:
 
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -77,24 +81,11 @@ def add_options():
     return parser
         
 
-def classification(row):
-    if(row['highway'] == 'track' or row['highway'] == 'path' or row['highway'] == 'footway' or row['highway'] == 'steps' or row['highway'] == 'pedestrian' ):
-        return 'lontano dal traffico'
-    if(row['highway'] == 'cycleway' or row['cycleway'] == 'track'):
-        return 'fisicamente protetto'
-    if(row['cycleway'] == 'lane'):
-        return 'fisicamente protetto in sede stradale'
-    if(row['maxspeed'] <= 30):
-        return 'vicino al traffico (L)'
-    else:
-        if(row['maxspeed'] > 30):
-            return 'vicino al traffico (V)'
-        else:
-            if(row['highway'] == 'residential' or row['highway'] == 'service' or row['highway'] == 'unclassified'):
-                return 'vicino al traffico (L)'
-            else:
-                return 'vicino al traffico (V)'
-        
+def classification(df):
+    """safety class of the cycleways, computed from the OSM tags with the rules of safetyRules"""
+
+    return safetyRules.cycleway_classes(df)
+
 
 def createQueryCycleways(dist, lat, lon):
     """Create the query to fetch the data of interest"""
@@ -133,7 +124,7 @@ def getDataCycleways(url, query, filename, path):
     df1 = gdf[['id','ID_E','highway','bicycle','foot','lanes','cycleway','segregated','maxspeed','geometry','nodes']]
     df1['maxspeed'] = df1['maxspeed'].astype(float)
     """performing classification based on the tag values of OSM data"""
-    df1['classifica'] = df1.apply(classification,axis = 1)
+    df1['classifica'] = classification(df1)
     """Save the GeoDataframe in a json file"""
     save_gdf(df1, path, filename)
     return query
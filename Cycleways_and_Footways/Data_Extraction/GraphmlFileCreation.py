@@ -2,13 +2,16 @@ import osmnx as ox
 import argparse
 from neo4j import GraphDatabase
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
 
 
 class App:
     """In this file we are going to extract street nodes from OSM"""
 
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
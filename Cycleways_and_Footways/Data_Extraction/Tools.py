@@ -1,16 +1,16 @@
+import os
+import sys
 import pandas as pd
 import geopandas as gpd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import geoFiles
 
 """This file contains some functions useful to the data extraction process"""
 
 def save_gdf(gdf, path, filename):
-    """save the GeoPandas Dataframe in a json file"""
+    """save the GeoPandas Dataframe in a json file and in a GeoParquet file"""
 
-
-    gdf.to_crs(epsg=4326, inplace=True)
-    df = pd.DataFrame(gdf)
-    df['geometry'] = df['geometry'].astype(str)
-    df.to_json(path + filename, orient='table')
+    geoFiles.save_gdf(gdf, path + filename)
 
 def elem_to_feature(elem, geomType):
     """Convert the element in a json format"""
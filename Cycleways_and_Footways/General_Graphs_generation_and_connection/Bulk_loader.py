@@ -0,0 +1,264 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import shapely
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+
+"""In this file we are going to load the nodes of the cycleways, footways and crossings general graphs and all
+the CONTINUE_ON_* relationships between cycleways and footways with batched UNWIND statements.
+Every preprocessed file is read once; the ids of the touched and closest lists are resolved to the internal ids
+of the nodes through a dictionary, so the relationships are created without matching the nodes by osm_id or
+comparing their geometries in Cypher. The relationships are the ones of Nodes_generation.BicycleLanes,
+Nodes_generation.Footways and Relationships_generation.Connect_bicyclelanes_to_footways, on an empty graph.
+"""
+
+BATCH_SIZE = 10000
+
+INDEXES = [
+    "create index cycleway_index if not exists for (b:BicycleLane) on (b.id_num)",
+    "create index cycleway_osm_index if not exists for (b:BicycleLane) on (b.osm_id)",
+    "create index footway_index if not exists for (n:Footway) on (n.osm_id)",
+    "create index crossnode_index if not exists for (n:CrossNode) on (n.id_num)",
+    "create index crossway_index if not exists for (n:CrossWay) on (n.id_num)",
+]
+
+IMPORT_BICYCLE_LANES = """
+        UNWIND $records as record
+        MERGE(b:BicycleLane {osm_id : record.id}) ON CREATE SET b.osm_id = record.id, b.ID_E = record.ID_E,
+        b.geometry = record.geometry, b.id_num = 'cycleway/' + apoc.convert.toString(record.id_num),
+        b.highway=record.highway, b.bicycle=record.bicycle, b.foot=record.foot,
+        b.lanes=record.lanes, b.cycleway=record.cycleway, b.segregated=record.segregated,
+        b.classifica=record.classifica, b.touched_lanes = record.touched_lanes,
+        b.length = record.length, b.speed = record.speed,
+        b.danger = record.pericolosità, b.bike_crosses = record.bike_cross, b.nodes = record.nodes, b.bike_road_junction = record.bike_road_junction,
+        b.road_junction = record.road_junction
+        RETURN record.id, id(b)
+"""
+
+MARK_LANES_AS_FOOTWAYS = """
+        UNWIND $records as record
+        MATCH (n:BicycleLane {osm_id : record.id})
+        SET n:Footway, n.touched_footways = record.touched_footways
+"""
+
+IMPORT_FOOTWAYS = """
+        UNWIND $records as record
+        MERGE (n:Footway {osm_id : record.id})
+        ON CREATE SET n.geometry = record.geometry, n.touched_lanes = record.touched_lanes,
+        n.touched_footways = record.touched_footways,
+        n.nodes = record.nodes,
+        n.bicycle=record.bicycle, n.bus=record.bus, n.crossing=record.crossing,
+        n.cycleway=record.cycleway, n.kerb=record.kerb, n.length = record.length, n.highway = record.highway,
+        n.danger = record.danger, n.speed = record.speed
+        RETURN record.id, id(n)
+"""
+
+IMPORT_CROSSNODES = """
+        UNWIND $records AS cross
+        MERGE (n:Crossing:CrossNode {id_num : "crossnode/" + cross.id_num})
+        ON CREATE SET n.osm_id = cross.id, n.geometry=cross.geometry,
+        n.crossing=cross.crossing, n.kerb=cross.kerb, n.bicycle=cross.bicycle,
+        n.button_operated=cross.button_operated, n.closest_footways = cross.closest_footways,
+        n.closest_lanes = cross.closest_lanes
+"""
+
+IMPORT_CROSSWAYS = """
+        UNWIND $records as record
+        MERGE(n:Crossing:CrossWay {id_num : "crossway/" + record.id_num}) ON CREATE SET
+        n.osm_id = record.id, n.geometry = record.geometry,
+        n.crossing=record.crossing, n.bicycle=record.bicycle, n.nodes = record.nodes, n.closest_lanes = record.closest_lanes,
+        n.closest_footways = record.closest_footways, n.length = record.length, n.junction_crosses = record.junction_cross
+"""
+
+"""the relationship type is formatted in the query, the rows are [start id, end id, length]"""
+CREATE_RELATIONSHIPS = """
+        UNWIND $rows as row
+        MATCH (a) WHERE id(a) = row[0]
+        MATCH (b) WHERE id(b) = row[1]
+        MERGE (a)-[r:{type}]->(b) ON CREATE SET r.length = row[2]
+"""
+
+
+def batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def records(gdf):
+    """rows of the GeoDataFrame as they are read by apoc.load.json: geometry as WKT and null in place of NaN"""
+
+    df = pd.DataFrame(gdf)
+    if 'geometry' in df.columns:
+        df['geometry'] = shapely.to_wkt(np.asarray(df['geometry'].values), rounding_precision=-1)
+    df = df.astype(object)
+    df = df.where(df.notna(), None)
+    return df.to_dict('records')
+
+
+class Relationships:
+    """relationships to be created, by type, with the length set when they are created the first time"""
+
+    def __init__(self):
+        self.relationships = {}
+
+    def add(self, relationship_type, start, end, length=None):
+        self.relationships.setdefault((relationship_type, start, end), length)
+
+    def exists(self, relationship_type, start, end):
+        return (relationship_type, start, end) in self.relationships
+
+    def length(self, relationship_type, start, end):
+        return self.relationships.get((relationship_type, start, end))
+
+    def rows(self):
+        """rows of each relationship type, in the order they were added"""
+
+        rows = {}
+        for (relationship_type, start, end), length in self.relationships.items():
+            rows.setdefault(relationship_type, []).append([start, end, length])
+        return rows
+
+
+def _values(record, column):
+    return record.get(column) or []
+
+
+def lane_relationships(relationships, lanes, lane_ids):
+    """CONTINUE_ON_LANE between touching cycleways and CONTINUE_ON_LANE_BY_CROSSING_ROAD between close ones"""
+
+    for record in lanes:
+        start = lane_ids[record['id']]
+        for lane in _values(record, 'touched_lanes'):
+            end = lane_ids.get(lane)
+            if end is not None and end != start:
+                relationships.add('CONTINUE_ON_LANE', start, end)
+                relationships.add('CONTINUE_ON_LANE', end, start)
+    for record in lanes:
+        start = lane_ids[record['id']]
+        for lane, length in _values(record, 'closest_lanes'):
+            end = lane_ids.get(lane)
+            if end is None or lane == record['id'] or relationships.exists('CONTINUE_ON_LANE', start, end):
+                continue
+            relationships.add('CONTINUE_ON_LANE_BY_CROSSING_ROAD', start, end, length)
+            relationships.add('CONTINUE_ON_LANE_BY_CROSSING_ROAD', end, start, length)
+
+
+def footway_relationships(relationships, footways, footway_ids, geometries):
+    """CONTINUE_ON_FOOTWAY between touching footways with different geometries and
+       CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD between close ones"""
+
+    for record in footways:
+        start = footway_ids[record['id']]
+        for footway in _values(record, 'touched_footways'):
+            end = footway_ids.get(footway)
+            if end is not None and geometries[start] != geometries[end]:
+                relationships.add('CONTINUE_ON_FOOTWAY', start, end)
+                relationships.add('CONTINUE_ON_FOOTWAY', end, start)
+    for record in footways:
+        start = footway_ids[record['id']]
+        for footway, length in _values(record, 'closest_footways'):
+            end = footway_ids.get(footway)
+            if end is not None and footway != record['id']:
+                relationships.add('CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD', start, end, length)
+                relationships.add('CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD', end, start, length)
+
+
+def footway_lane_relationships(relationships, footways, footway_ids, lane_ids):
+    """CONTINUE_ON_LANE/CONTINUE_ON_FOOTWAY between touching footways and cycleways and
+       CONTINUE_ON_CLOSE_*_BY_CROSSING_ROAD between close ones"""
+
+    for record in footways:
+        start = footway_ids[record['id']]
+        for lane in _values(record, 'touched_lanes'):
+            end = lane_ids.get(lane)
+            if end is not None and lane != record['id']:
+                relationships.add('CONTINUE_ON_LANE', start, end)
+                relationships.add('CONTINUE_ON_FOOTWAY', end, start)
+    for record in footways:
+        start = footway_ids[record['id']]
+        for lane, length in _values(record, 'closest_lanes'):
+            end = lane_ids.get(lane)
+            if end is None or lane == record['id'] or relationships.exists('CONTINUE_ON_FOOTWAY', end, start):
+                continue
+            relationships.add('CONTINUE_ON_CLOSE_FOOTWAY_BY_CROSSING_ROAD', end, start, length)
+            relationships.add('CONTINUE_ON_CLOSE_LANE_BY_CROSSING_ROAD', start, end,
+                              relationships.length('CONTINUE_ON_CLOSE_FOOTWAY_BY_CROSSING_ROAD', end, start))
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def get_path(self):
+        """gets the path of the neo4j instance"""
+
+        return self.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.neo4j_home' return value;
+                    """)
+
+    def get_import_folder_name(self):
+        """gets the path of the import folder of the neo4j instance"""
+
+        return self.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.import' return value;
+                    """)
+
+    def run(self, query, **parameters):
+        with self.driver.session() as session:
+            return session.write_transaction(self._run, query, parameters)
+
+    @staticmethod
+    def _run(tx, query, parameters):
+        result = tx.run(query, **parameters)
+        return result.values()
+
+    def write_batches(self, query, key, items, batch_size=BATCH_SIZE):
+        """run the query on each batch of items, one transaction per batch"""
+
+        values = []
+        for batch in batches(items, batch_size):
+            values.extend(self.run(query, **{key: batch}))
+        return values
+
+    def load(self, path, options, batch_size=BATCH_SIZE):
+        """Import cycleways, footways, crossing nodes and crossing ways and generate the CONTINUE_ON_*
+           relationships between cycleways and footways"""
+
+        for index in INDEXES:
+            self.run(index)
+
+        lanes = records(geoFiles.read_gdf(os.path.join(path, options.file_name_cycleways)))
+        lane_ids = dict(self.write_batches(IMPORT_BICYCLE_LANES, 'records', lanes, batch_size))
+        print("Cycleways nodes imported")
+
+        footways = records(geoFiles.read_gdf(os.path.join(path, options.file_name_footways)))
+        self.write_batches(MARK_LANES_AS_FOOTWAYS, 'records', footways, batch_size)
+        footway_ids = dict(self.write_batches(IMPORT_FOOTWAYS, 'records', footways, batch_size))
+        print("Footways nodes imported")
+
+        self.write_batches(IMPORT_CROSSNODES, 'records',
+                           records(geoFiles.read_gdf(os.path.join(path, options.file_name_crossing_nodes))),
+                           batch_size)
+        self.write_batches(IMPORT_CROSSWAYS, 'records',
+                           records(geoFiles.read_gdf(os.path.join(path, options.file_name_crossing_ways))),
+                           batch_size)
+        print("Crossing nodes and ways imported")
+
+        """the geometry of a node is the one of the first file that created it"""
+        geometries = {lane_ids[record['id']]: record['geometry'] for record in reversed(lanes)}
+        for record in reversed(footways):
+            geometries.setdefault(footway_ids[record['id']], record['geometry'])
+
+        relationships = Relationships()
+        lane_relationships(relationships, lanes, lane_ids)
+        footway_relationships(relationships, footways, footway_ids, geometries)
+        footway_lane_relationships(relationships, footways, footway_ids, lane_ids)
+        for relationship_type, rows in relationships.rows().items():
+            self.write_batches(CREATE_RELATIONSHIPS.format(type=relationship_type), 'rows', rows, batch_size)
+            print(relationship_type + " relationships generated: " + str(len(rows)))
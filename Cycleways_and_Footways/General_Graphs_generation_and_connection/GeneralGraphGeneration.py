@@ -5,6 +5,7 @@ import argparse
 import os
 import time
 
+import Bulk_loader
 import Nodes_generation.BicycleLanes
 import Nodes_generation.Footways
 import Nodes_generation.Crossnodes
@@ -19,6 +20,10 @@ import Relationships_generation.Connect_crossingways_to_footways
 import Relationships_generation.Connect_elements_to_neighborhoods
 import Relationships_generation.Connect_poi_to_closest_bicyclelanes
 import Relationships_generation.Connect_poi_to_the_closest_footways
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how to generate different layers' general graphs"""
 
@@ -51,20 +56,69 @@ def add_options():
     parser.add_argument('--nameFileNeighborhoods', '-fnb', dest='file_name_neighborhoods', type=str,
                         help="""Insert the name of the .csv file containing neighborhoods.""",
                         required=True)
+    parser.add_argument('--bulkLoad', dest='bulk_load', action='store_true',
+                        help="""Import cycleways, footways and crossings and generate the relationships between
+                        cycleways and footways reading each file once, with batched statements. The graph must
+                        not contain them yet.""")
+    parser.add_argument('--importDir', '-d', dest='import_dir', type=str, default=None,
+                        help="""Insert the path of the neo4j import directory, used with --bulkLoad. By default
+                        it is asked to neo4j.""")
+    parser.add_argument('--nativePoints', dest='native_points', action='store_true',
+                        help="""Set a native point (location) with a point index on the nodes, besides adding
+                        them to the Neo4j Spatial layer.""")
     return parser
 
 
 
-def main(args=None):
-    """Parsing parameters in input"""
-    argParser = add_options()
-    options = argParser.parse_args(args=args)
+def bulk_load_nodes(options):
+    """Generation of cycleways, footways and crossings nodes and of the relationships between cycleways and
+       footways with Bulk_loader, then their spatial layers"""
 
-    """The main function can be split in two section : 1) generation of nodes; 
-    2) generation of relationships between both nodes of the same layer and different layers"""
+    greeterBulk = Bulk_loader.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    path = options.import_dir
+    if path is None:
+        path = greeterBulk.get_path()[0][0] + '\\' + greeterBulk.get_import_folder_name()[0][0] + '\\'
+    greeterBulk.load(path, options)
+    greeterBulk.close()
+
+    greeterCycleways = Nodes_generation.BicycleLanes.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterCycleways.import_lanes_in_spatial_layer()
+    greeterCycleways.close()
+    print("Cycleways nodes imported in spatial layer")
+
+    greeterFootways = Nodes_generation.Footways.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterFootways.import_footways_in_spatial_layer()
+    greeterFootways.close()
+    print("Footways nodes imported in spatial layer")
+
+    greeterCrossnodes = Nodes_generation.Crossnodes.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterCrossnodes.compute_location()
+    greeterCrossnodes.import_crossnodes_in_spatial_layer()
+    greeterCrossnodes.close()
+
+    greeterCrossways = Nodes_generation.Crossways.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterCrossways.import_crossways_in_spatial_layer()
+    greeterCrossways.close()
 
+
+def generate_nodes(options):
     """SECTION 1: GENERATION OF NODES"""
 
+    if options.bulk_load:
+        bulk_load_nodes(options)
+    else:
+        generate_general_graphs_nodes(options)
+
+    """Generation of Neighborhood nodes"""
+    greeterNeighborhoods = Nodes_generation.Neighborhoods.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterNeighborhoods.import_neighborhood_node(options.file_name_neighborhoods)
+    greeterNeighborhoods.import_neighborhoods_in_spatial_layer()
+    greeterNeighborhoods.close()
+
+
+def generate_general_graphs_nodes(options):
+    """Generation of cycleways, footways and crossings nodes, one script for each layer"""
+
     """Generation of cycleways general graph nodes"""
     print("Generation cycleways nodes")
     greeterCycleways = Nodes_generation.BicycleLanes.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
@@ -111,23 +165,19 @@ def main(args=None):
     greeterCrossways.close()
 
 
-    """Generation of Neighborhood nodes"""
-    greeterNeighborhoods = Nodes_generation.Neighborhoods.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
-    greeterNeighborhoods.import_neighborhood_node(options.file_name_neighborhoods)
-    greeterNeighborhoods.import_neighborhoods_in_spatial_layer()
-
-
-
+def generate_relationships(options):
     """SECTION 2: GENERATION OF RELATIONSHIPS"""
 
-    """Generation of relationships between cycleways and footways general graphs nodes"""
-    print("Connection footways and cycleways layer")
-    greeterConnection_BL_FW = Relationships_generation.Connect_bicyclelanes_to_footways.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
-    greeterConnection_BL_FW.connect_footways_to_touched_bicycle_lanes()
-    print("Connection footways and cycleways that intersect or touch ")
-    greeterConnection_BL_FW.connect_footways_to_close_lanes(options.file_name_footways)
-    print("Connection footways and cycleways that are reachable by crossing the road")
-    greeterConnection_BL_FW.close()
+    """Generation of relationships between cycleways and footways general graphs nodes, already generated by
+    the bulk load"""
+    if not options.bulk_load:
+        print("Connection footways and cycleways layer")
+        greeterConnection_BL_FW = Relationships_generation.Connect_bicyclelanes_to_footways.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+        greeterConnection_BL_FW.connect_footways_to_touched_bicycle_lanes()
+        print("Connection footways and cycleways that intersect or touch ")
+        greeterConnection_BL_FW.connect_footways_to_close_lanes(options.file_name_footways)
+        print("Connection footways and cycleways that are reachable by crossing the road")
+        greeterConnection_BL_FW.close()
 
     """Generation relationships between crossnodes and footways nodes"""
     greeterConnection_CN_FW = Relationships_generation.Connect_crossingnodes_to_closest_footways.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
@@ -167,6 +217,22 @@ def main(args=None):
     greeterConnection_POI_FW.close()
 
 
+def main(args=None):
+    """Parsing parameters in input"""
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+    if options.native_points:
+        spatialIndex.configure(native_points=True)
+
+    """The main function can be split in two section : 1) generation of nodes; 
+    2) generation of relationships between both nodes of the same layer and different layers.
+    All the App objects of a section share the same driver and sessions"""
+
+    with driverRegistry.stage('general graphs nodes'):
+        generate_nodes(options)
+    with driverRegistry.stage('general graphs relationships'):
+        generate_relationships(options)
+
     return 0
 
 
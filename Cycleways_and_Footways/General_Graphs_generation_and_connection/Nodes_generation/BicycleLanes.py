@@ -4,12 +4,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how to generate nodes referring to cycling paths"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -35,7 +39,7 @@ class App:
                         b.highway=record.highway, b.bicycle=record.bicycle, b.foot=record.foot, 
                         b.lanes=record.lanes, b.cycleway=record.cycleway, b.segregated=record.segregated,
                         b.classifica=record.classifica, b.touched_lanes = record.touched_lanes, 
-                        b.length = record.length,
+                        b.length = record.length, b.speed = record.speed,
                         b.danger = record.pericolosità, b.bike_crosses = record.bike_cross, b.nodes = record.nodes, b.bike_road_junction = record.bike_road_junction,
                         b.road_junction = record.road_junction;
                     """, file=file)
@@ -46,20 +50,9 @@ class App:
     def import_lanes_in_spatial_layer(self):
         """Import BicycleLane nodes on a Neo4j spatial layer """
 
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_lanes_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_lanes_in_spatial_layer(tx):
-        tx.run("""
-                call spatial.addWKTLayer('spatial', 'geometry')
-                """)
-        result = tx.run("""
-                       match(b:BicycleLane) with collect(b) as lanes UNWIND lanes AS l CALL spatial.addNode('spatial', l) yield node return node
-        """)
-                        
-        return result.values()
+        if spatialIndex.settings()['spatial_layer']:
+            spatialIndex.create_layer(self.driver)
+        return spatialIndex.index_nodes(self.driver, 'BicycleLane')
 
 
     def add_index(self):
@@ -122,7 +115,7 @@ class App:
             call apoc.load.json($file) yield value as value with value.data as data 
             unwind data as record match (b:BicycleLane) where b.osm_id = record.id and NOT isEmpty(record.closest_lanes)
             UNWIND record.closest_lanes as lane with b, lane match (b1:BicycleLane) 
-            where b1.osm_id = lane[0] and and b.osm_id <> b1.osm_id and not exists((b)-[:CONTINUE_ON_LANE]->(bl))
+            where b1.osm_id = lane[0] and b.osm_id <> b1.osm_id and not exists((b)-[:CONTINUE_ON_LANE]->(b1))
             merge (b)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(b1) on create set r.length = lane[1]
             merge (b1)-[r1:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(b) on create set r1.length = lane[1];
         """, file = file)
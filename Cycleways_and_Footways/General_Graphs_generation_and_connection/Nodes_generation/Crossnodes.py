@@ -4,12 +4,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how to generate nodes referring to signaled crossings mapped on OSM as nodes"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -56,18 +60,7 @@ class App:
     def import_crossnodes_in_spatial_layer(self):
         """Import CrossNode nodes on a Neo4j Spatial layer"""
 
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_crossnodes_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_crossnodes_in_spatial_layer(tx):
-        result = tx.run("""
-                       match (n:CrossNode)  
-                       CALL spatial.addNode('spatial', n) yield node return node
-        """)
-                       
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'CrossNode')
 
 
 
@@ -4,12 +4,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going ti show how to generate nodes referring to signaled crossings mapped as ways on OSM"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -38,18 +42,7 @@ class App:
     def import_crossways_in_spatial_layer(self):
         """Import CrossWay nodes on a Neo4j Spatial Layer"""
 
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_crossways_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_crossways_in_spatial_layer(tx):
-        result = tx.run("""
-                       match(n:CrossWay)
-                       CALL spatial.addNode('spatial', n) yield node return node
-        """)
-                       
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'CrossWay')
 
 
 
@@ -4,12 +4,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how to generate nodes referring to footways"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -36,25 +40,15 @@ class App:
                         n.touched_footways = record.touched_footways,
                         n.nodes = record.nodes,
                         n.bicycle=record.bicycle, n.bus=record.bus, n.crossing=record.crossing, 
-                        n.cycleway=record.cycleway, n.kerb=record.kerb, n.length = record.length, n.highway = record.highway;
+                        n.cycleway=record.cycleway, n.kerb=record.kerb, n.length = record.length, n.highway = record.highway,
+                        n.danger = record.danger, n.speed = record.speed;
                 """, file=file)
 
         return result.values()
 
     def import_footways_in_spatial_layer(self):
         """import Footway nodes on a Neo4j Spatial Layer"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_footways_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_footways_in_spatial_layer(tx):
-        result = tx.run("""
-                       Match (n:Footway) where NOT "BicycleLane" in labels(n)
-                       CALL spatial.addNode('spatial', n) yield node return node
-        """)
-                        
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'Footway', 'NOT "BicycleLane" in labels(n)')
 
     def add_index(self):
         """Add an index on numeric id attribute"""
@@ -3,12 +3,16 @@ import overpy
 import json
 import argparse
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show hoe to generate nodes representing neighborhoods"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -32,18 +36,7 @@ class App:
     
     def import_neighborhoods_in_spatial_layer(self):
         """Import Neighborhood nodes on a Neo4j Spatial Layer"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_neighborhoods_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_neighborhoods_in_spatial_layer(tx):
-        result = tx.run("""
-                       match(n:Neighborhood) with collect(n) as neighborhoods UNWIND neighborhoods AS nb 
-                       CALL spatial.addNode('spatial', nb) yield node return node
-        """)
-                        
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'Neighborhood')
 
 
 
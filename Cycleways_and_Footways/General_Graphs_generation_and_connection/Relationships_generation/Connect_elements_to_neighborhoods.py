@@ -3,35 +3,100 @@ import overpy
 import json
 import argparse
 import os
+import sys
+import numpy as np
+import geopandas as gpd
+import shapely
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how to connect Neighborhood nodes with all the other kind of nodes we have
    within the Neo4j database instance
 """
 
+BATCH_SIZE = 10000
+
+"""labels of the elements of the general graph, their geometry is WKT in epsg:4326 (longitude latitude)"""
+ELEMENT_LABELS = ['BicycleLane', 'Footway', 'CrossNode', 'CrossWay']
+
+
+def neighborhoods_of(elements, neighborhoods):
+    """rows [element id, neighborhood id, neighborhood of the element] of the elements intersecting each
+       neighborhood. elements and neighborhoods are (id, WKT) in the same crs, the neighborhood of an element is
+       the one containing its middle point (spatialIndex.representative_points), otherwise the first one it intersects"""
+
+    if not elements or not neighborhoods:
+        return []
+    element_ids = [element[0] for element in elements]
+    neighborhood_ids = [neighborhood[0] for neighborhood in neighborhoods]
+    shapes = shapely.from_wkt(np.array([element[1] for element in elements], dtype=object), on_invalid='ignore')
+    polygons = shapely.from_wkt(np.array([neighborhood[1] for neighborhood in neighborhoods], dtype=object),
+                                on_invalid='ignore')
+    tree = shapely.STRtree(polygons)
+    e, n = tree.query(shapes, predicate='intersects')
+    order = np.lexsort((n, e))
+    e, n = e[order], n[order]
+
+    m, c = tree.query(spatialIndex.representative_points(shapes), predicate='within')
+    first = {}
+    for i, j in zip(m, c):
+        first.setdefault(i, j)
+    for i, j in zip(e, n):
+        first.setdefault(i, j)
+    return [[element_ids[i], neighborhood_ids[j], neighborhood_ids[first[i]]] for i, j in zip(e, n)]
+
+
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
 
-    def elements_within_neighborhoods(self):
-        """Look for all the nodes representing elements that lie within a neighborhood"""
+    def elements_within_neighborhoods(self, file=None):
+        """Connect the nodes of ELEMENT_LABELS to the neighborhoods they intersect and set their
+           neighborhood property. The neighborhoods are the Neighborhood nodes, or the ones of file (e.g.
+           QuartieriModena.geojson) when it is given"""
         with self.driver.session() as session:
-            result = session.write_transaction(self._elements_within_neighborhoods)
-            return result
+            elements = session.read_transaction(self._get_elements)
+            if file is None:
+                neighborhoods = session.read_transaction(self._get_neighborhoods)
+            else:
+                gdf = gpd.read_file(file).to_crs(4326)
+                neighborhoods = list(zip(gdf['id'].tolist(), gdf.geometry.to_wkt().tolist()))
+        rows = neighborhoods_of(elements, neighborhoods)
+        for start in range(0, len(rows), BATCH_SIZE):
+            with self.driver.session() as session:
+                session.write_transaction(self._create_within, rows[start:start + BATCH_SIZE])
+        return len(rows)
 
     @staticmethod
-    def _elements_within_neighborhoods(tx):
+    def _get_elements(tx):
+        elements = {}
+        for label in ELEMENT_LABELS:
+            result = tx.run("""
+                            match(p:""" + label + """) where p.geometry is not null return id(p), p.geometry
+            """)
+            elements.update(result.values())
+        return list(elements.items())
+
+    @staticmethod
+    def _get_neighborhoods(tx):
         result = tx.run("""
-                        match(n:Neighborhood) with n call spatial.intersects('spatial', n.geometry) 
-                        yield node UNWIND node as p match(n1:Neighborhood) 
-                        where n.id=n1.id AND NOT p:Neighborhood
-                        merge(p)-[:WITHIN]->(n1) return p, n1
+                        match(n:Neighborhood) return n.id, n.geometry
         """)
+        return result.values()
+
+    @staticmethod
+    def _create_within(tx, rows):
+        result = tx.run("""
+                        unwind $rows as row match(p) where id(p) = row[0] match(n1:Neighborhood {id: row[1]})
+                        merge(p)-[:WITHIN]->(n1) set p.neighborhood = row[2]
+        """, rows=rows)
                         #QUERY PER SAPERE I POI ALL'INTERNO DI UN QUARTIERE:
 
-                        #match(poi:PointOfInterest)-[:MEMBER]-(p)-[:WITHIN]-(n:Neighborhood) where n.id="1.0" return poi 
+                        #match(poi:PointOfInterest)-[:MEMBER]-(p) where p.neighborhood="1.0" return poi
         return result.values()
 
 
@@ -48,6 +113,9 @@ def add_options():
     parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
                         help="""Insert the password of the local neo4j instance.""",
                         required=True)
+    parser.add_argument('--file', '-f', dest='file_name', type=str, default=None,
+                        help="""Insert the path of the file containing the neighborhoods (e.g. QuartieriModena.geojson),
+                        by default the Neighborhood nodes are used.""")
     return parser
 
 
@@ -61,7 +129,7 @@ def main(args=None):
     """Find all the nodes representing elements that lie within a neighborhood and connect the with the corresponding
        Neighborhood node
     """
-    greeter.elements_within_neighborhoods()
+    greeter.elements_within_neighborhoods(options.file_name)
     print("Connect to the right neighborhood elements within it: done")
 
     
@@ -4,32 +4,60 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to connect PointOfInterest nodes with the Footway nodes representing the closest
    footways w.r.t the current POI
  """
 
+K = 3
+MAX_DISTANCE = 1000
+BATCH_SIZE = 10000
+
+
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
 
-    def connect_poi_to_closest_footways(self):
-        """Generate relationships between Footway and PointOfInterest nodes"""
+    def connect_poi_to_closest_footways(self, k=K, max_distance=MAX_DISTANCE):
+        """Generate relationships between each PointOfInterest (OSMWayNode) node and the k closest Footway nodes
+           within max_distance meters, the closest ones are found with an STRtree"""
         with self.driver.session() as session:
-            result = session.write_transaction(self._connect_poi_to_closest_footways)
-            return result
+            points = session.read_transaction(self._get_poi_locations)
+            geometries = session.read_transaction(self._get_footway_geometries)
+        rows = spatialIndex.nearest_pairs(points, geometries, k, max_distance)
+        for start in range(0, len(rows), BATCH_SIZE):
+            with self.driver.session() as session:
+                session.write_transaction(self._create_is_near_to, rows[start:start + BATCH_SIZE])
+        return len(rows)
 
+    @staticmethod
+    def _get_poi_locations(tx):
+        result = tx.run("""
+            match(n:OSMWayNode) where n.lat is not null and n.lon is not null return id(n), n.lon, n.lat
+        """)
+        return result.values()
 
     @staticmethod
-    def _connect_poi_to_closest_footways(tx):
+    def _get_footway_geometries(tx):
         result = tx.run("""
-            match(n:OSMWayNode) with n call spatial.withinDistance('spatial', n, 0.1) yield node 
-            unwind(node) as p match(n1) where n1.id_num=p.id_num and n1:Footway merge (n1)-[:IS_NEAR_TO]->(n)  
+            match(n:Footway) where n.geometry is not null return id(n), n.geometry
         """)
-        return result
+        return result.values()
+
+    @staticmethod
+    def _create_is_near_to(tx, rows):
+        result = tx.run("""
+            unwind $rows as row match(n1) where id(n1) = row[0] match(n) where id(n) = row[1]
+            merge (n1)-[r:IS_NEAR_TO]->(n) set r.distance = row[2]
+        """, rows=rows)
+        return result.values()
 
 
 
@@ -46,6 +74,10 @@ def add_options():
     parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
                         help="""Insert the password of the local neo4j instance.""",
                         required=True)
+    parser.add_argument('--k', '-k', dest='k', type=int, default=K,
+                        help="""Insert the number of closest footways connected to each POI.""")
+    parser.add_argument('--maxDistance', '-md', dest='max_distance', type=float, default=MAX_DISTANCE,
+                        help="""Insert the maximum distance in meters between a POI and the footways connected to it.""")
     return parser
 
 
@@ -58,7 +90,7 @@ def main(args=None):
 
     """Generate relationships between Footway and PointOfInterest nodes"""
     start_time = time.time()
-    greeter.connect_poi_to_closest_footways()
+    greeter.connect_poi_to_closest_footways(options.k, options.max_distance)
     print("Connect POI to the closest footways: done")
     print("Execution time : %s seconds" % (time.time() - start_time))
 
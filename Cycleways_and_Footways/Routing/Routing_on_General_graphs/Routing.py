@@ -8,13 +8,19 @@ import folium
 from shapely import wkt
 import pandas as pd
 import geopandas as gpd
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import geoFiles
+import edgeSnapping
+import poiIndex
 
 """In this file we are going to show how to perform routing on the layers' general graphs """
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -45,25 +51,50 @@ class App:
                     """)
         return result.values()
 
-    
+    def get_lanes(self):
+        """osm id and geometry of the bicycle lanes"""
+        with self.driver.session() as session:
+            result = session.read_transaction(self._get_lanes)
+            return result
+
+    @staticmethod
+    def _get_lanes(tx):
+        result = tx.run("""MATCH (bl:BicycleLane) WHERE bl.geometry IS NOT NULL RETURN bl.osm_id, bl.geometry""")
+        return result.values()
+
+    def snap_index(self):
+        """index of the bicycle lanes to snap the coordinates on, built once"""
+        if getattr(self, '_snap_index', None) is None:
+            self._snap_index = edgeSnapping.SnapIndex([(lane, None, None, 'BicycleLane', geometry)
+                                                       for lane, geometry in self.get_lanes()])
+        return self._snap_index
+
+    def get_destination(self, dest):
+        """longitude and latitude of the point of interest best matching the name dest, from the index of
+           poiIndex"""
+        return [(poi['lon'], poi['lat']) for poi in poiIndex.find(self.driver, dest) if poi['lon'] is not None]
+
     def routing_algorithm_dijkstra(self, lat, lon, dest, weight):
-        """Perform routing using dijkstra algorithm
+        """Perform routing using dijkstra algorithm, from the lane nearest to (lat, lon) to the lane nearest
+           to the destination
         """
+        destination = self.get_destination(dest)
+        if not destination:
+            raise RuntimeError("No point of interest named " + str(dest))
+        source, target = self.snap_index().snap([(float(lon), float(lat)), tuple(destination[0])])
+        if source is None or target is None:
+            raise RuntimeError("No bicycle lane near the source or the destination")
         with self.driver.session() as session:
             print(dest)
-            result = session.write_transaction(self._routing_algorithm_dijkstra, lat, lon, dest, weight)
+            result = session.write_transaction(self._routing_algorithm_dijkstra, source['key'], target['key'], weight)
             return result
 
     
     @staticmethod
-    def _routing_algorithm_dijkstra(tx, lat, lon, dest, weight):
+    def _routing_algorithm_dijkstra(tx, source, target, weight):
         result = tx.run("""
-                MATCH(t:Tag)<-[:TAGS]-(poi:PointOfInterest)-[:MEMBER]->(osm:OSMWayNode) 
-                where t.name =  $dest 
-                with osm CALL spatial.withinDistance('spatial', osm.location, 0.01) yield node unwind(node) as n 
-                match(bl:BicycleLane) where b.id_num = n.id_num and n:BicycleLane with collect(bl)[0] as target 
-                with target call spatial.withinDistance('spatial', point({latitude:$lat, longitude:$lon}), 0.01) 
-                yield node unwind(node) as n match(bl:BicycleLane) where bl.id = n.id and n:BicycleLane with collect(bl)[0] as source, target 
+                MATCH (source:BicycleLane {osm_id: $source})
+                MATCH (target:BicycleLane {osm_id: $target})
                 CALL gds.shortestPath.dijkstra.stream('routes_generic', {
                 sourceNode: source,
                 targetNode: target,
@@ -77,7 +108,7 @@ class App:
                     [nodeId IN nodeIds | gds.util.asNode(nodeId).id_num] AS nodeIDs,
                     costs,
                     nodes(path) as nodespath
-                """, lat=lat, lon=lon, dest=dest, weight=weight)
+                """, source=source, target=target, weight=weight)
 
         return result.values()
 
@@ -85,13 +116,7 @@ class App:
 
 def read_file(path):
     """Read the file specified by the path"""
-    f = open(path)
-    fjson = json.load(f)
-    df = pd.DataFrame(fjson['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:3035')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path)
 
 
 def creation_map(result_routing_cost, gdf_cycleways, gdf_footways, path, lat, lon, mapName):
@@ -205,10 +230,10 @@ def main(args=None):
     gdf_footways = read_file(path + options.file_name_footways)
 
     if options.weight == "both":
-        result_routing_cost = greeter._routing_algorithm_dijkstra(options.lat, options.lon, options.dest, "cost")
+        result_routing_cost = greeter.routing_algorithm_dijkstra(options.lat, options.lon, options.dest, "cost")
         print("Find the best path between your source location and the target location, considering the specified weight needed : done")
 
-        result_routing_travel_time = greeter._routing_algorithm_dijkstra(options.lat, options.lon, options.dest, "travel_time")
+        result_routing_travel_time = greeter.routing_algorithm_dijkstra(options.lat, options.lon, options.dest, "travel_time")
         print(
             "Find the best path between your source location and the target location, considering the specified weight needed : done")
 
@@ -218,7 +243,7 @@ def main(args=None):
                            options.mapName)
         print("Creation of the map with the two paths drawn on it : done ")
     else:
-        result_routing = greeter._routing_algorithm_dijkstra(options.lat, options.lon, options.dest, options.weight)
+        result_routing = greeter.routing_algorithm_dijkstra(options.lat, options.lon, options.dest, options.weight)
         print(
             "Find the best path between your source location and the target location, considering the specified weight needed : done")
 
@@ -5,85 +5,152 @@ import json
 import argparse
 import os
 import time
+import sys
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
 
 """In this file we are going to show how to set the weights on general graph relationships
-   in order to perform routing 
+   in order to perform routing.
+   The CONTINUE_ON_* and CROSS_THE_ROAD relationships are read once with the properties of their nodes,
+   distance, danger, travel times and cost are computed for all of them at once with pandas and written back
+   in batches, instead of running a statement that scans all the relationships for every weight.
 """
 
+BATCH_SIZE = 10000
+
+RELATIONSHIP_TYPES = ['CONTINUE_ON_LANE', 'CONTINUE_ON_FOOTWAY', 'CONTINUE_ON_LANE_BY_CROSSING_ROAD',
+                      'CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD', 'CROSS_THE_ROAD']
+
+COLUMNS = ['id', 'type', 'length', 'start_length', 'start_speed', 'start_danger', 'start_crossnode',
+           'start_crossway', 'end_length', 'end_speed', 'end_danger', 'end_crossnode', 'end_crossway']
+
+WEIGHTS = ['distance', 'danger', 'travel_time_1', 'travel_time_2', 'travel_time', 'cost']
+
+"""length (m) of a road crossed on a crossing node, danger of the crossings and walking speed (km/h) on them"""
+CROSSNODE_LENGTH = 5
+CROSSING_DANGER = 2.5
+CROSSING_ROAD_DANGER = 20
+WALKING_SPEED = 4
+
+
+def _numeric(df, column):
+    return pd.to_numeric(df[column], errors='coerce').astype(float)
+
+
+def _normalized(values):
+    """values scaled between 0 and 1, 0 when all of them are the same"""
+
+    low, high = values.min(), values.max()
+    if not high > low:
+        return pd.Series(0.0, index=values.index)
+    return (values - low) / (high - low)
+
+
+def compute_weights(relationships):
+    """Weights of the relationships, a DataFrame with the COLUMNS of _get_relationships (one row per relationship,
+       start and end node properties). Returns a DataFrame with id and the WEIGHTS, NaN where a weight does not
+       apply to the type of the relationship.
+       CONTINUE_ON_LANE and CONTINUE_ON_FOOTWAY take length, danger and speed of their start node,
+       *_BY_CROSSING_ROAD add half of the road crossed (r.length) walked at WALKING_SPEED,
+       CROSS_THE_ROAD add half of the crossing way, or CROSSNODE_LENGTH, to the cycleway or footway at one end.
+       The travel times are normalized by relationship type (and by kind of crossing)"""
+
+    df = relationships
+    weights = pd.DataFrame({'id': df['id']}, index=df.index)
+    for column in WEIGHTS:
+        weights[column] = np.nan
+    length = _numeric(df, 'length')
+    start_length, start_speed, start_danger = (_numeric(df, 'start_length'), _numeric(df, 'start_speed'),
+                                               _numeric(df, 'start_danger'))
+    start_crossing = df['start_crossnode'].astype(bool) | df['start_crossway'].astype(bool)
+
+    continue_on = df['type'].isin(['CONTINUE_ON_LANE', 'CONTINUE_ON_FOOTWAY'])
+    weights.loc[continue_on, 'distance'] = start_length
+    weights.loc[continue_on, 'danger'] = start_danger
+    weights.loc[continue_on, 'travel_time'] = start_length / (1000 * start_speed)
+
+    by_crossing_road = df['type'].isin(['CONTINUE_ON_LANE_BY_CROSSING_ROAD', 'CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD'])
+    weights.loc[by_crossing_road, 'distance'] = start_length + length / 2
+    weights.loc[by_crossing_road, 'danger'] = CROSSING_ROAD_DANGER
+    weights.loc[by_crossing_road, 'travel_time_1'] = start_length / (1000 * start_speed)
+    weights.loc[by_crossing_road, 'travel_time_2'] = (length / 2) / (1000 * WALKING_SPEED)
+
+    """the cycleway or footway and the crossing at the two ends of CROSS_THE_ROAD"""
+    cross = df['type'] == 'CROSS_THE_ROAD'
+    way_length = start_length.where(~start_crossing, _numeric(df, 'end_length'))
+    way_speed = start_speed.where(~start_crossing, _numeric(df, 'end_speed'))
+    way_danger = start_danger.where(~start_crossing, _numeric(df, 'end_danger'))
+    crossnode = df['start_crossnode'].astype(bool).where(start_crossing, df['end_crossnode'].astype(bool))
+    crossing_length = pd.Series(float(CROSSNODE_LENGTH), index=df.index).where(
+        crossnode, start_length.where(start_crossing, _numeric(df, 'end_length')) / 2)
+    weights.loc[cross, 'distance'] = way_length + crossing_length
+    weights.loc[cross, 'danger'] = CROSSING_DANGER
+    weights.loc[cross, 'travel_time_1'] = way_length / (1000 * way_speed)
+    weights.loc[cross, 'travel_time_2'] = crossing_length / (1000 * WALKING_SPEED)
+
+    weights['travel_time'] = weights['travel_time'].where(continue_on,
+                                                          weights['travel_time_1'] + weights['travel_time_2'])
+
+    for relationship_type in ['CONTINUE_ON_LANE', 'CONTINUE_ON_FOOTWAY']:
+        rows = df['type'] == relationship_type
+        weights.loc[rows, 'cost'] = (0.5 * _normalized(weights.loc[rows, 'travel_time']) +
+                                     0.5 * (weights.loc[rows, 'danger'] - 1) / 5)
+    """the time to cross on a crossing node is the same for all the relationships, it adds 0.5"""
+    groups = [df['type'] == 'CONTINUE_ON_LANE_BY_CROSSING_ROAD', df['type'] == 'CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD',
+              cross & crossnode, cross & ~crossnode]
+    for rows in groups:
+        crossing_time = 0 if (rows & crossnode).any() else _normalized(weights.loc[rows, 'travel_time_2'])
+        danger = way_danger if (rows & cross).any() else start_danger
+        weights.loc[rows, 'cost'] = (0.5 * _normalized(weights.loc[rows, 'travel_time_1']) +
+                                     0.5 * (danger[rows] - 1) / 4 + 0.5 * crossing_time + 0.5)
+    return weights
+
+
+def weight_records(weights):
+    """rows {id, weights} to be written, without the weights that do not apply to the relationship"""
+
+    records = []
+    for row in weights.to_dict('records'):
+        records.append({'id': int(row['id']),
+                        'weights': {column: float(row[column]) for column in WEIGHTS if pd.notna(row[column])}})
+    return records
+
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
 
 
-    def set_weights(self):
-        """set the weights on general graph relationships"""
+    def set_weights(self, batch_size=BATCH_SIZE):
+        """set the weights on general graph relationships: the relationships are read once, their weights
+           computed by compute_weights and written back in batches"""
         with self.driver.session() as session:
-            result = session.write_transaction(self._set_weights)
-            return result
+            relationships = pd.DataFrame(session.read_transaction(self._get_relationships), columns=COLUMNS)
+        weights = weight_records(compute_weights(relationships))
+        for start in range(0, len(weights), batch_size):
+            with self.driver.session() as session:
+                session.write_transaction(self._set_weights, weights[start:start + batch_size])
+        return len(weights)
 
-    
     @staticmethod
-    def _set_weights(tx):
-        tx.run("match(bl:BicycleLane)-[r:CROSS_THE_ROAD]->(cn:CrossNode) set r.distance = bl.length + 5;") 
-        tx.run("match(bl:BicycleLane)<-[r:CROSS_THE_ROAD]-(cn:CrossNode) set r.distance = bl.length + 5;") 
-        tx.run("match(bl:BicycleLane)-[r:CROSS_THE_ROAD]->(cn:CrossWay) set r.distance = bl.length + cn.length/2;") 
-        tx.run("match(bl:BicycleLane)<-[r:CROSS_THE_ROAD]-(cn:CrossWay) set r.distance = bl.length + cn.length/2;")
-        #set footway danger
-        tx.run("""match (f:Footway) where not "BicycleLane" in labels(f) and f.highway = 'footway' set f.danger = 1;""")
-        tx.run("""match (f:Footway) where not "BicycleLane" in labels(f) and f.highway = 'pedestrian' set f.danger = 1;""")
-        tx.run("match(f:Footway)-[r:CROSS_THE_ROAD]->(cn:CrossNode) set r.distance = f.length + 5;") 
-        tx.run("match(f:Footway)<-[r:CROSS_THE_ROAD]-(cn:CrossNode) set r.distance = f.length + 5;") 
-        tx.run("match(f:Footway)-[r:CROSS_THE_ROAD]->(cn:CrossWay) set r.distance = f.length + cn.length/2;") 
-        tx.run("match(bl:BicycleLane)<-[r:CROSS_THE_ROAD]-(cn:CrossWay) set r.distance = f.length + cn.length/2;")
-
-
-        tx.run("match(n)-[r:CONTINUE_ON_LANE]->(n1) set r.distance=n.length;")
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY]->(n1) set r.distance=n.length;") 
-        tx.run("match(n)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(n1) set r.distance=n.length+r.length/2;") 
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]->(n1) set r.distance=n.length+r.length/2;") 
-
-        tx.run("match(n)-[r:CONTINUE_ON_LANE]->(n1) set r.danger=n.danger;")
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY]->(n1) set r.danger=n.danger;") 
-        tx.run("match(n)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(n1) set r.danger=20;") 
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]->(n1) set r.danger=20; match(n)-[r:CROSS_THE_ROAD]->(n1) set r.danger=2.5;") 
-
-        tx.run("match(n)-[r:CONTINUE_ON_LANE]->(n1) set r.travel_time=r.distance/(1000*n.speed);")
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY]->(n1) set r.travel_time=r.distance/(1000*n.speed);") 
-        tx.run("match(n)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(n1) set r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (r.length/2)/(1000*4);") 
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]->(n1) set  r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (r.length/2)/(1000*4);") 
-        tx.run("match(n)-[r:CROSS_THE_ROAD]->(n1:CrossNode) set  r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (5)/(1000*4);")  
-        tx.run("match(n)-[r:CROSS_THE_ROAD]->(n1:CrossWay) set  r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (n1.length/2)/(1000*4);") 
-        tx.run("match(n)<-[r:CROSS_THE_ROAD]-(n1:CrossNode) set  r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (5)/(1000*4);")  
-        tx.run("match(n)<-[r:CROSS_THE_ROAD]-(n1:CrossWay) set  r.travel_time_1=n.length/(1000*n.speed), r.travel_time_2 = (n1.length/2)/(1000*4);") 
-
-
-        tx.run("match(n)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(n1) set r.travel_time = r.travel_time_1 + r.travel_time_2;") 
-        tx.run("match(n)-[r:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]->(n1) set  r.travel_time = r.travel_time_1 + r.travel_time_2;") 
-        tx.run("match(n)-[r:CROSS_THE_ROAD]->(n1:CrossNode) set  r.travel_time = r.travel_time_1 + r.travel_time_2;")  
-        tx.run("match(n)-[r:CROSS_THE_ROAD]->(n1:CrossWay) set  r.travel_time = r.travel_time_1 + r.travel_time_2;") 
-        tx.run("match(n)<-[r:CROSS_THE_ROAD]-(n1:CrossNode) set  r.travel_time = r.travel_time_1 + r.travel_time_2;")  
-        tx.run("match(n)<-[r:CROSS_THE_ROAD]-(n1:CrossWay) set  r.travel_time = r.travel_time_1 + r.travel_time_2;")
-
-
-        tx.run("MATCH(n1)-[r:CONTINUE_ON_LANE]-(n2) with max(r.travel_time) as max_travel_time, min(r.travel_time) as min_travel_time MATCH(n3)-[r1:CONTINUE_ON_LANE]-(n4) with max_travel_time, min_travel_time, r1 set r1.cost = 0.5*(r1.travel_time-min_travel_time)/(max_travel_time-min_travel_time) + 0.5*(r1.danger-1)/5")
-
-
-        tx.run("MATCH(n1)-[r:CONTINUE_ON_FOOTWAY]-(n2) with max(r.travel_time) as max_travel_time, min(r.travel_time) as min_travel_time MATCH(n3)-[r1:CONTINUE_ON_FOOTWAY]-(n4) with max_travel_time, min_travel_time, r1 set r1.cost = 0.5*(r1.travel_time-min_travel_time)/(max_travel_time-min_travel_time) + 0.5*(r1.danger-1)/5")
-
-        tx.run("MATCH(n1)-[r:CONTINUE_ON_LANE_BY_CROSSING_ROAD]-(n2) with max(r.travel_time_1) as max_travel_time_1, min(r.travel_time_1) as min_travel_time_1, max(r.travel_time_2) as max_travel_time_2, min(r.travel_time_2) as min_travel_time_2 MATCH(n3)-[r1:CONTINUE_ON_LANE_BY_CROSSING_ROAD]-(n4) with max_travel_time_1, min_travel_time_1,  max_travel_time_2, min_travel_time_2, r1, n3 set r1.cost = (0.5*(r1.travel_time_1-min_travel_time_1)/(max_travel_time_1-min_travel_time_1) + 0.5*(n3.danger-1)/4) + (0.5*(r1.travel_time_2-min_travel_time_2)/(max_travel_time_2-min_travel_time_2) + 0.5);")
-
-
-
-        tx.run("MATCH(n1)-[r:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]-(n2) with max(r.travel_time_1) as max_travel_time_1, min(r.travel_time_1) as min_travel_time_1, max(r.travel_time_2) as max_travel_time_2, min(r.travel_time_2) as min_travel_time_2 MATCH(n3)-[r1:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]-(n4) with max_travel_time_1, min_travel_time_1,  max_travel_time_2, min_travel_time_2, r1, n3 set r1.cost = (0.5*(r1.travel_time_1-min_travel_time_1)/(max_travel_time_1-min_travel_time_1) + 0.5*(n3.danger-1)/4) + (0.5*(r1.travel_time_2-min_travel_time_2)/(max_travel_time_2-min_travel_time_2) + 0.5);")
-
-
-        tx.run("MATCH(n1)-[r:CROSS_THE_ROAD]-(n2:CrossNode) with max(r.travel_time_1) as max_travel_time_1, min(r.travel_time_1) as min_travel_time_1, max(r.travel_time_2) as max_travel_time_2, min(r.travel_time_2) as min_travel_time_2 MATCH(n3)-[r1:CROSS_THE_ROAD]-(n4:CrossNode) with max_travel_time_1, min_travel_time_1,  max_travel_time_2, min_travel_time_2, r1, n3 set r1.cost = (0.5*(r1.travel_time_1-min_travel_time_1)/(max_travel_time_1-min_travel_time_1) + 0.5*(n3.danger-1)/4) + 0.5;")
-
-        result = tx.run("MATCH(n1)-[r:CROSS_THE_ROAD]-(n2:CrossWay) with max(r.travel_time_1) as max_travel_time_1, min(r.travel_time_1) as min_travel_time_1, max(r.travel_time_2) as max_travel_time_2, min(r.travel_time_2) as min_travel_time_2 MATCH(n3)-[r1:CROSS_THE_ROAD]-(n4:CrossWay) with max_travel_time_1, min_travel_time_1,  max_travel_time_2, min_travel_time_2, r1, n3 set r1.cost = (0.5*(r1.travel_time_1-min_travel_time_1)/(max_travel_time_1-min_travel_time_1) + 0.5*(n3.danger-1)/4) + (0.5*(r1.travel_time_2-min_travel_time_2)/(max_travel_time_2-min_travel_time_2) + 0.5);")
+    def _get_relationships(tx):
+        result = tx.run("""
+                MATCH (n)-[r]->(n1) WHERE type(r) IN $types
+                RETURN id(r), type(r), r.length, n.length, n.speed, n.danger,
+                'CrossNode' IN labels(n), 'CrossWay' IN labels(n),
+                n1.length, n1.speed, n1.danger, 'CrossNode' IN labels(n1), 'CrossWay' IN labels(n1);
+                """, types=RELATIONSHIP_TYPES)
+        return result.values()
 
+    @staticmethod
+    def _set_weights(tx, rows):
+        result = tx.run("""
+                UNWIND $rows AS row MATCH ()-[r]->() WHERE id(r) = row.id SET r += row.weights;
+                """, rows=rows)
         return result.values()
 
 
@@ -115,13 +182,16 @@ def add_options():
     parser = argparse.ArgumentParser(description='Insertion of POI in the graph.')
     parser.add_argument('--destination', '-d', dest='dest', type=str,
                         help="""Insert the name of your destination""",
-                        required=True)
+                        required=False)
     parser.add_argument('--neo4jURL', '-n', dest='neo4jURL', type=str,
                         help="""Insert the address of the local neo4j instance. For example: neo4j://localhost:7687""",
                         required=True)
     parser.add_argument('--neo4juser', '-u', dest='neo4juser', type=str,
                         help="""Insert the name of the user of the local neo4j instance.""",
                         required=True)
+    parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
+                        help="""Insert the password of the local neo4j instance.""",
+                        required=True)
    
     return parser
 
@@ -0,0 +1,269 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import edgeSnapping
+
+"""In this file the attributes of the subgraph nodes and routes used to decode the paths and to measure the
+routes are kept in memory, instead of asking the database for each hop of a path or running a query per metric
+and mapping every GDS node id with gds.util.asNode.
+The nodes are read once with their internal id, id, coordinates, labels and louvain community; the routes with
+the internal ids of their ends and their length, distance, danger, speed, travel time and cost. Between two
+nodes only the route with the lowest cost is kept. A path is decoded and measured
+with one vectorized lookup on these arrays:
+   - decode() maps the internal ids returned by GDS (nodeIds) to the ids and coordinates of the nodes
+   - path_metrics() gives length, distance, danger, travel time, cost, crossings and communities of a path
+The attributes are kept in a bounded cache by route types and graph version, the version being the number of
+nodes and routes of each type: the routes written again with the same number of routes (e.g. a new cost) are
+seen only after invalidate(). snap_index() gives the routes as straight segments between their nodes, to snap
+coordinates onto them with edgeSnapping.
+"""
+
+CACHE_SIZE = 4
+
+ROUTE_TYPES = ('BIKE_ROUTE', 'FOOT_ROUTE', 'IS_THE_SAME')
+
+CROSSING_LABELS = ('BikeCrossing', 'FootCrossing')
+
+NODE_COLUMNS = ['internal_id', 'id', 'lat', 'lon', 'labels', 'louvain']
+
+EDGE_COLUMNS = ['source', 'target', 'type', 'length', 'distance', 'danger', 'speed', 'travel_time', 'cost']
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+
+class GraphAttributes:
+    """Attributes of the nodes sorted by internal id and of the routes sorted by the positions of their ends"""
+
+    def __init__(self, nodes, edges, version=None):
+        nodes = pd.DataFrame(list(nodes), columns=NODE_COLUMNS).drop_duplicates('internal_id')
+        nodes = nodes.sort_values('internal_id', kind='stable').reset_index(drop=True)
+        self.version = version
+        self.internal_ids = nodes['internal_id'].to_numpy(dtype=np.int64)
+        self.ids = nodes['id'].to_numpy(dtype=object)
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        self.lat = _numeric(nodes['lat'])
+        self.lon = _numeric(nodes['lon'])
+        self.louvain = _numeric(nodes['louvain'])
+        self.crossing = np.array([any(label in CROSSING_LABELS for label in labels or ())
+                                  for labels in nodes['labels']], dtype=bool)
+
+        edges = pd.DataFrame(list(edges), columns=EDGE_COLUMNS)
+        sources = self.positions(edges['source'].to_numpy(dtype=np.int64))
+        targets = self.positions(edges['target'].to_numpy(dtype=np.int64))
+        known = (sources >= 0) & (targets >= 0)
+        keys = sources[known] * len(self.ids) + targets[known]
+        columns = {column: _numeric(edges[column])[known] for column in EDGE_COLUMNS[3:]}
+        order = np.lexsort((np.nan_to_num(columns['cost'], nan=np.inf), keys))
+        self.keys, first = np.unique(keys[order], return_index=True)
+        rows = order[first]
+        self.type = edges['type'].to_numpy(dtype=object)[known][rows]
+        for column, values in columns.items():
+            setattr(self, column, values[rows])
+        self._snap_index = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def positions(self, internal_ids):
+        """positions of the nodes with the given internal ids, -1 for the unknown ones"""
+
+        internal_ids = np.asarray(internal_ids, dtype=np.int64)
+        if not len(self.internal_ids):
+            return np.full(len(internal_ids), -1)
+        result = np.searchsorted(self.internal_ids, internal_ids)
+        result[result >= len(self.internal_ids)] = 0
+        return np.where(self.internal_ids[result] == internal_ids, result, -1)
+
+    def node_positions(self, ids):
+        """positions of the nodes with the given ids, -1 for the unknown ones"""
+
+        return np.array([self.index.get(node, -1) for node in ids], dtype=np.int64)
+
+    def decode(self, internal_ids):
+        """ids of the nodes with the given internal ids and their coordinates (latitude, longitude)"""
+
+        positions = self.positions(internal_ids)
+        if (positions < 0).any():
+            raise KeyError("Unknown nodes " + str(np.asarray(internal_ids)[positions < 0].tolist()))
+        return self.ids[positions].tolist(), self.coordinates(positions)
+
+    def coordinates(self, positions):
+        """(latitude, longitude) of the nodes at the given positions"""
+
+        return list(zip(self.lat[positions].tolist(), self.lon[positions].tolist()))
+
+    def path_coordinates(self, ids):
+        """(latitude, longitude) of the nodes with the given ids, the unknown ones are skipped"""
+
+        positions = self.node_positions(ids)
+        return self.coordinates(positions[positions >= 0])
+
+    def edges(self, positions):
+        """positions of the routes between the consecutive nodes at the given positions, -1 where there is none"""
+
+        positions = np.asarray(positions, dtype=np.int64)
+        sources, targets = positions[:-1], positions[1:]
+        keys = sources * len(self.ids) + targets
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        result = np.searchsorted(self.keys, keys)
+        result[result >= len(self.keys)] = 0
+        found = (sources >= 0) & (targets >= 0) & (self.keys[result] == keys)
+        return np.where(found, result, -1)
+
+    def snap_index(self):
+        """edgeSnapping.SnapIndex of the routes with the coordinates of both their nodes, built once"""
+
+        if self._snap_index is None:
+            sources, targets = np.divmod(self.keys, max(len(self.ids), 1))
+            located = ~np.isnan(self.lat[sources] + self.lon[sources] + self.lat[targets] + self.lon[targets])
+            self._snap_routes = np.flatnonzero(located)
+            self._snap_index = edgeSnapping.SnapIndex.from_segments(zip(
+                self.ids[sources[located]], self.ids[targets[located]], self.type[located],
+                self.lon[sources[located]], self.lat[sources[located]],
+                self.lon[targets[located]], self.lat[targets[located]]))
+        return self._snap_index
+
+    def partial_route(self, snap):
+        """junction, distance (m), travel time (s) and danger exposure of the partial route between a point snapped
+           with snap_index and the end of its route closest along it: to the route and then along it, at the
+           speed and with the danger of the route"""
+
+        distance, junction = edgeSnapping.closest_end(snap)
+        route = self._snap_routes[snap['key']]
+        speed, danger = self.speed[route], self.danger[route]
+        if speed > 0:
+            travel_time = distance * 3.6 / speed
+        else:
+            travel_time = np.nan_to_num(self.travel_time[route]) * distance / max(snap['length'], 1.0)
+        return {'junction': junction, 'distance': float(distance), 'travel_time': float(travel_time),
+                'exposure': float(np.nan_to_num(danger * distance))}
+
+    def path_metrics(self, ids):
+        """length, distance (m), average danger, danger exposure (danger times distance), travel time (s), cost,
+           number of crossings (routes between two crossing nodes) and of communities (routes between two louvain
+           communities) of the path through the nodes with the given ids. missing is the number of hops without
+           a route"""
+
+        positions = self.node_positions(ids)
+        edges = self.edges(positions)
+        found = edges >= 0
+        hops = edges[found]
+        sources, targets = positions[:-1][found], positions[1:][found]
+        danger = self.danger[hops]
+        length, speed = self.length[hops], self.speed[hops]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            travel_time = np.where((speed > 0) & ~np.isnan(length), length * 3.6 / speed, self.travel_time[hops])
+        communities = ((self.louvain[sources] != self.louvain[targets]) &
+                       ~np.isnan(self.louvain[sources]) & ~np.isnan(self.louvain[targets]))
+        return {'hops': len(ids),
+                'length': float(np.nansum(length)),
+                'distance': float(np.nansum(self.distance[hops])),
+                'danger': float(np.nansum(danger) / len(hops)) if len(hops) else 0.0,
+                'exposure': float(np.nansum(danger * self.distance[hops])),
+                'travel_time': float(np.nansum(travel_time)),
+                'cost': float(np.nansum(self.cost[hops])),
+                'crossings': int((self.crossing[sources] & self.crossing[targets]).sum()),
+                'communities': int(communities.sum()),
+                'missing': int((~found).sum())}
+
+
+class AttributeCache:
+    """GraphAttributes by route types and graph version, at most size of them: the least recently used is
+       dropped"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._attributes = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, loader, route_types, version):
+        """attributes of the routes of the given types at the given version, loaded with loader(route_types)
+           -> (nodes, edges) if not in the cache"""
+
+        with self._lock:
+            key = (tuple(route_types), version, self._generation)
+            if key in self._attributes:
+                self._attributes.move_to_end(key)
+                return self._attributes[key]
+        nodes, edges = loader(list(route_types))
+        result = GraphAttributes(nodes, edges, version)
+        with self._lock:
+            self._attributes[key] = result
+            while len(self._attributes) > self.size:
+                self._attributes.popitem(last=False)
+        return result
+
+    def invalidate(self):
+        """drop the attributes in the cache, to be called after writing the routes or the communities"""
+
+        with self._lock:
+            self._attributes.clear()
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._attributes)
+
+
+CACHE = AttributeCache()
+
+
+def read_attributes(driver, route_types):
+    """nodes and routes of the given types with the attributes of GraphAttributes"""
+
+    with driver.session() as session:
+        nodes = session.read_transaction(App._get_nodes, list(route_types))
+        edges = session.read_transaction(App._get_edges, list(route_types))
+        return nodes, edges
+
+
+def attributes(driver, route_types=ROUTE_TYPES, cache=CACHE):
+    """GraphAttributes of the routes of the given types, from the cache if the graph did not change"""
+
+    with driver.session() as session:
+        version = session.read_transaction(App._get_version, list(route_types))
+    return cache.get(lambda types: read_attributes(driver, types), route_types, version)
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def attributes(self, route_types=ROUTE_TYPES, cache=CACHE):
+        """GraphAttributes of the routes of the given types, from the cache if the graph did not change"""
+        return attributes(self.driver, route_types, cache)
+
+    @staticmethod
+    def _get_version(tx, route_types):
+        result = [tx.run("MATCH (n) RETURN count(n)").values()[0][0]]
+        for route_type in route_types:
+            result.append(tx.run("MATCH ()-[r:" + route_type + "]->() RETURN count(r)").values()[0][0])
+        return tuple(result)
+
+    @staticmethod
+    def _get_nodes(tx, route_types):
+        result = tx.run("""
+                MATCH (a)-[r]->(b) WHERE type(r) IN $types
+                UNWIND [a, b] AS n WITH DISTINCT n
+                RETURN id(n), n.id, n.lat, n.lon, labels(n), n.louvain
+                """, types=route_types)
+        return result.values()
+
+    @staticmethod
+    def _get_edges(tx, route_types):
+        result = tx.run("""
+                MATCH (a)-[r]->(b) WHERE type(r) IN $types
+                RETURN id(a), id(b), type(r), r.length, r.distance, r.danger, r.speed, r.travel_time, r.cost
+                """, types=route_types)
+        return result.values()
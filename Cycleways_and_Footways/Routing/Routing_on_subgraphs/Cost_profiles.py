@@ -0,0 +1,270 @@
+import os
+import sys
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import safetyRules
+
+"""In this file the cost of the subgraph routes is computed at query time for a routing profile, instead of
+rewriting r.cost on every BIKE_ROUTE and FOOT_ROUTE and rebuilding the projections each time beta changes.
+The routes are read once with their raw distance, speed, travel_time and danger and kept in memory in
+compressed sparse row form (RouteTable). A profile is a small spec, e.g.
+   {'routes': ('FOOT_ROUTE',), 'beta': 0.3, 'walking_speed': 3, 'crossing_penalty': 30}
+   - routes: the relationship types that can be used
+   - beta: importance of the travel time on the cost, 1 - beta is the importance of the danger
+   - speed, walking_speed: km/h overriding the speed of the routes ridden and walked (None keeps it)
+   - max_danger: the routes more dangerous than this cannot be used (None for no limit)
+   - crossing_penalty: seconds added to the travel time of the routes between two crossing nodes
+   - steps: whether the routes along steps can be used
+The cost of a route is beta * travel time + (1 - beta) * danger, both normalized between 0 and 1 on the routes
+of the same type. The weights of a profile are computed for all the routes at once
+and kept in a bounded cache, so that users with different profiles can route at the same time on the same
+table without writing in the database.
+"""
+
+CACHE_SIZE = 16
+
+DEFAULT_PROFILE = {'routes': ('BIKE_ROUTE', 'FOOT_ROUTE', 'IS_THE_SAME'), 'beta': 0.5, 'speed': None,
+                   'walking_speed': None, 'max_danger': None, 'crossing_penalty': 0, 'steps': True}
+
+PROFILES = {
+    'bike': {},
+    'fast_bike': {'beta': 0.9},
+    'safe_bike': {'beta': 0.1},
+    'ebike': {'speed': 25},
+    'foot': {'routes': ('FOOT_ROUTE',)},
+    'wheelchair': {'routes': ('FOOT_ROUTE',), 'beta': 0.3, 'walking_speed': 3, 'crossing_penalty': 30,
+                   'steps': False},
+}
+
+COLUMNS = ['source', 'target', 'type', 'distance', 'speed', 'travel_time', 'danger', 'crossing', 'steps']
+
+_versions = itertools.count()
+
+
+def profile(name=None, **parameters):
+    """spec of the profile name (the default profile if None) with the given parameters changed"""
+
+    if name is not None and name not in PROFILES:
+        raise ValueError("Unknown profile " + name)
+    for parameter in parameters:
+        if parameter not in DEFAULT_PROFILE:
+            raise ValueError("Unknown profile parameter " + parameter)
+    spec = dict(DEFAULT_PROFILE)
+    spec.update(PROFILES.get(name, {}))
+    spec.update({parameter: value for parameter, value in parameters.items() if value is not None})
+    spec['routes'] = tuple(spec['routes'])
+    if not 0 <= spec['beta'] <= 1:
+        raise ValueError("beta must be between 0 and 1")
+    return spec
+
+
+class RouteTable:
+    """Routes in compressed sparse row form: the routes leaving the node i are the positions
+       indptr[i]:indptr[i+1] of targets and of the route columns"""
+
+    def __init__(self, rows):
+        df = pd.DataFrame(list(rows), columns=COLUMNS)
+        self.ids = list(pd.unique(pd.concat([df['source'], df['target']], ignore_index=True)))
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        sources = df['source'].map(self.index).to_numpy(dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        df = df.iloc[order].reset_index(drop=True)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(self.ids)))])
+        self.targets = df['target'].map(self.index).to_numpy(dtype=np.int64)
+        self.type = df['type'].to_numpy(dtype=object)
+        for column in ['distance', 'speed', 'travel_time', 'danger']:
+            setattr(self, column, pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float))
+        self.crossing = df['crossing'].fillna(False).to_numpy(dtype=bool)
+        self.steps = df['steps'].fillna(False).to_numpy(dtype=bool)
+        self.version = next(_versions)
+
+    def __len__(self):
+        return len(self.targets)
+
+
+def _normalized(values):
+    """values scaled between 0 and 1, 0 for the missing ones and when all of them are the same"""
+
+    result = np.zeros(len(values))
+    present = ~np.isnan(values)
+    if present.any():
+        low, high = values[present].min(), values[present].max()
+        if high > low:
+            result[present] = (values[present] - low) / (high - low)
+    return result
+
+
+def travel_times(table, spec):
+    """travel time (s) of the routes with the speeds of the profile, the walked routes are the ones at the
+       walking speed of safetyRules. Plus the crossing penalty on the routes between crossings"""
+
+    speed = table.speed.copy()
+    with np.errstate(invalid='ignore'):
+        walked = speed <= safetyRules.FOOTWAY_SPEED
+        ridden = speed > safetyRules.FOOTWAY_SPEED
+    if spec['speed'] is not None:
+        speed[ridden] = spec['speed']
+    if spec['walking_speed'] is not None:
+        speed[walked] = spec['walking_speed']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(speed > 0, table.distance * 3.6 / speed, table.travel_time)
+    result = np.nan_to_num(result, nan=0.0)
+    return result + spec['crossing_penalty'] * table.crossing
+
+
+def weights(table, spec):
+    """cost of the routes for the profile, inf for the routes it cannot use"""
+
+    travel_time = travel_times(table, spec)
+    result = np.full(len(table), np.inf)
+    for route_type in spec['routes']:
+        rows = table.type == route_type
+        result[rows] = (spec['beta'] * _normalized(travel_time[rows]) +
+                        (1 - spec['beta']) * _normalized(table.danger[rows]))
+    if spec['max_danger'] is not None:
+        with np.errstate(invalid='ignore'):
+            result[table.danger > spec['max_danger']] = np.inf
+    if not spec['steps']:
+        result[table.steps] = np.inf
+    return result
+
+
+def _key(spec):
+    return tuple(sorted(spec.items()))
+
+
+class WeightCache:
+    """weights of the routes by table and profile, at most size of them: the least recently used is dropped"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._weights = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table, spec):
+        key = (table.version, _key(spec))
+        with self._lock:
+            if key in self._weights:
+                self._weights.move_to_end(key)
+                return self._weights[key]
+        result = weights(table, spec)
+        result.flags.writeable = False
+        with self._lock:
+            self._weights[key] = result
+            while len(self._weights) > self.size:
+                self._weights.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self._weights)
+
+
+CACHE = WeightCache()
+
+
+def node_index(table, node):
+    """position of the node id in the table, ValueError if no route starts or ends there"""
+
+    if node not in table.index:
+        raise ValueError("Unknown node " + str(node))
+    return table.index[node]
+
+
+def shortest_path(table, weights, source, target):
+    """Dijkstra from the node source to the node target (table ids) on the routes with finite weight.
+       Returns the cost and the positions of the routes of the path, (inf, None) if target is not reached"""
+
+    source, target = node_index(table, source), node_index(table, target)
+    indptr, targets = table.indptr, table.targets
+    costs = {source: 0.0}
+    previous = {}
+    visited = set()
+    queue = [(0.0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if node in visited:
+            continue
+        if node == target:
+            edges = []
+            while node != source:
+                edges.append(previous[node])
+                node = previous_node(table, previous[node])
+            return cost, edges[::-1]
+        visited.add(node)
+        for edge in range(indptr[node], indptr[node + 1]):
+            weight = weights[edge]
+            if weight == np.inf:
+                continue
+            other = targets[edge]
+            if cost + weight < costs.get(other, np.inf):
+                costs[other] = cost + weight
+                previous[other] = edge
+                heapq.heappush(queue, (cost + weight, other))
+    return np.inf, None
+
+
+def previous_node(table, edge):
+    """source node of the route at position edge"""
+
+    return int(np.searchsorted(table.indptr, edge, side='right')) - 1
+
+
+def path_metrics(table, travel_time, edges):
+    """travel time (s), distance (m), average danger, danger exposure (danger times distance) and number of
+       crossings of the routes of a path"""
+
+    edges = np.asarray(edges, dtype=np.int64)
+    danger = table.danger[edges]
+    return {'travel_time': float(travel_time[edges].sum()),
+            'distance': float(np.nansum(table.distance[edges])),
+            'danger': float(np.nanmean(danger)) if (~np.isnan(danger)).any() else 0.0,
+            'exposure': float(np.nansum(danger * table.distance[edges])),
+            'crossings': int(table.crossing[edges].sum())}
+
+
+def route(table, spec, source, target, cache=CACHE):
+    """best path from source to target for the profile: the ids of its nodes, its cost and its metrics.
+       None if the target cannot be reached, ValueError if source or target is not in the table"""
+
+    spec = profile(spec) if spec is None or isinstance(spec, str) else spec
+    cost, edges = shortest_path(table, cache.get(table, spec), source, target)
+    if edges is None:
+        return None
+    nodes = [table.ids[table.index[source]]] + [table.ids[table.targets[edge]] for edge in edges]
+    return dict(path_metrics(table, travel_times(table, spec), edges), nodes=nodes, cost=float(cost))
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def get_routes(self, route_types=DEFAULT_PROFILE['routes']):
+        """routes of the given types with the raw weights, whether they are between two crossing nodes and whether
+           they are along steps"""
+        with self.driver.session() as session:
+            result = session.read_transaction(self._get_routes, list(route_types))
+            return result
+
+    @staticmethod
+    def _get_routes(tx, route_types):
+        result = tx.run("""
+                MATCH (a)-[r]->(b) WHERE type(r) IN $types
+                RETURN a.id, b.id, type(r), r.distance, r.speed, r.travel_time, r.danger,
+                (a:BikeCrossing OR a:FootCrossing) AND (b:BikeCrossing OR b:FootCrossing),
+                exists((a)<-[:CONTAINS]-(:Footway {highway: 'steps'})-[:CONTAINS]->(b))
+                """, types=route_types)
+        return result.values()
+
+    def route_table(self, route_types=DEFAULT_PROFILE['routes']):
+        """RouteTable of the routes of the given types"""
+
+        return RouteTable(self.get_routes(route_types))
@@ -0,0 +1,219 @@
+import json
+import heapq
+import threading
+from collections import OrderedDict
+import numpy as np
+import Cost_profiles
+
+"""In this file the communities of the subgraph are used as the cells of a multi-level overlay for routing.
+The topology is computed once: the cell of every node, the cut routes (between two cells) and the border nodes
+(ends of the cut routes). The customization computes, for a routing profile, a matrix per cell with the cost of
+the best path inside the cell between each pair of its border nodes; the matrices of the last profiles are kept
+in a bounded cache. A query searches the routes of the source and target cells and, for the other cells, only
+their border matrices and the cut routes, then unpacks the paths through the matrices with a search inside
+their cell. The matrices replace the per community projections and the merges of the border candidates.
+The matrices of a profile can also be filled with the costs between the border nodes written by Partitioner
+(stored_customization), so that a query does not compute them again.
+"""
+
+CACHE_SIZE = 4
+
+
+def profile_key(spec):
+    """the profile as a string, stored with the costs between the border nodes computed for it"""
+
+    return json.dumps(Cost_profiles._key(spec))
+
+
+def search(overlay, weights, starts, cell, target=None):
+    """Dijkstra from the starts (node position -> cost) on the routes inside cell, up to target if given.
+       Returns the costs of the nodes settled and the route used to reach each node"""
+
+    indptr, heads = overlay.table.indptr, overlay.table.targets
+    cells = overlay.cells
+    costs = dict(starts)
+    previous = {}
+    visited = set()
+    queue = [(cost, node) for node, cost in starts.items()]
+    heapq.heapify(queue)
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if node in visited:
+            continue
+        visited.add(node)
+        if node == target:
+            break
+        for route in range(indptr[node], indptr[node + 1]):
+            head = heads[route]
+            weight = weights[route]
+            if weight == np.inf or cells[head] != cell:
+                continue
+            if cost + weight < costs.get(head, np.inf):
+                costs[head] = cost + weight
+                previous[head] = route
+                heapq.heappush(queue, (cost + weight, head))
+    return {node: costs[node] for node in visited}, previous
+
+
+def clique(overlay, weights, cell):
+    """cost of the best path inside cell between each pair of its border nodes, inf if there is none"""
+
+    borders = overlay.borders[cell]
+    matrix = np.full((len(borders), len(borders)), np.inf)
+    for i, border in enumerate(borders):
+        costs, _ = search(overlay, weights, {border: 0.0}, cell)
+        for j, other in enumerate(borders):
+            matrix[i, j] = costs.get(other, np.inf)
+    return matrix
+
+
+class Overlay:
+    """Cells, border nodes and cut routes of a Cost_profiles.RouteTable, with the customizations of the
+       last profiles"""
+
+    def __init__(self, table, cells, cache_size=CACHE_SIZE):
+        """cells maps the id of the nodes to their cell, the nodes without a cell are in the cell None"""
+
+        self.table = table
+        self.cells = np.empty(len(table.ids), dtype=object)
+        self.cells[:] = [cells.get(node) for node in table.ids]
+        self.sources = np.repeat(np.arange(len(table.ids)), np.diff(table.indptr))
+        self.cut = self.cells[self.sources] != self.cells[table.targets]
+        border = np.zeros(len(table.ids), dtype=bool)
+        border[self.sources[self.cut]] = True
+        border[table.targets[self.cut]] = True
+        self.borders = {}
+        self.border_index = {}
+        for node in np.flatnonzero(border):
+            borders = self.borders.setdefault(self.cells[node], [])
+            self.border_index[node] = len(borders)
+            borders.append(node)
+        """the routes of each node as lists, faster to scan in the queries than the arrays"""
+        self._routes = [list(zip(table.targets[table.indptr[node]:table.indptr[node + 1]].tolist(),
+                                 range(table.indptr[node], table.indptr[node + 1]),
+                                 self.cut[table.indptr[node]:table.indptr[node + 1]].tolist()))
+                        for node in range(len(table.ids))]
+        self.cache_size = cache_size
+        self._customizations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def customize(self, weights):
+        """border matrices of all the cells with the given weights of the routes"""
+
+        return {cell: clique(self, weights, cell) for cell in self.borders}
+
+    def shortcuts(self, matrices):
+        """finite entries of the border matrices, by border node: (other border node, cost)"""
+
+        shortcuts = {}
+        for cell, borders in self.borders.items():
+            for i, node in enumerate(borders):
+                row = matrices[cell][i]
+                shortcuts[node] = [(borders[j], float(row[j])) for j in np.flatnonzero(np.isfinite(row)) if j != i]
+        return shortcuts
+
+    def customization(self, spec, cache=Cost_profiles.CACHE):
+        """weights of the routes (as array and list), border matrices and their shortcuts for the profile,
+           from the cache if customized recently"""
+
+        key = Cost_profiles._key(spec)
+        with self._lock:
+            if key in self._customizations:
+                self._customizations.move_to_end(key)
+                return self._customizations[key]
+        weights = cache.get(self.table, spec)
+        return self._store(key, weights, self.customize(weights))
+
+    def stored_customization(self, spec, costs, cache=Cost_profiles.CACHE):
+        """customization of the profile with the border matrices filled with the given costs (from id, to id,
+           cost) between the border nodes of each cell, as written by Partitioner. None if the costs do not
+           match the borders of the overlay"""
+
+        matrices = {}
+        for cell, borders in self.borders.items():
+            matrices[cell] = np.full((len(borders), len(borders)), np.inf)
+            np.fill_diagonal(matrices[cell], 0.0)
+        index = self.table.index
+        for a, b, cost in costs:
+            a, b = index.get(a), index.get(b)
+            if a not in self.border_index or b not in self.border_index or self.cells[a] != self.cells[b]:
+                return None
+            matrices[self.cells[a]][self.border_index[a], self.border_index[b]] = cost
+        return self._store(Cost_profiles._key(spec), cache.get(self.table, spec), matrices)
+
+    def _store(self, key, weights, matrices):
+        customization = (weights, matrices, self.shortcuts(matrices), weights.tolist())
+        with self._lock:
+            self._customizations[key] = customization
+            while len(self._customizations) > self.cache_size:
+                self._customizations.popitem(last=False)
+        return customization
+
+    def _unpack(self, weights, start, end):
+        """routes of the best path from start to end inside their cell"""
+
+        _, previous = search(self, weights, {start: 0.0}, self.cells[start], target=end)
+        routes = []
+        while end != start:
+            routes.append(previous[end])
+            end = self.sources[previous[end]]
+        return routes[::-1]
+
+    def shortest_path(self, spec, source, target, cache=Cost_profiles.CACHE):
+        """cost and routes of the best path from source to target (ids of the nodes) for the profile,
+           (inf, None) if target is not reached"""
+
+        weights, _, shortcuts, cost_of = self.customization(spec, cache)
+        table = self.table
+        source, target = Cost_profiles.node_index(table, source), Cost_profiles.node_index(table, target)
+        local = {self.cells[source], self.cells[target]}
+        cells = self.cells
+        costs = {source: 0.0}
+        previous = {}
+        visited = set()
+        queue = [(0.0, source)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            if node == target:
+                break
+            inside = cells[node] in local
+            for other, route, cut in self._routes[node]:
+                if not (inside or cut):
+                    continue
+                weight = cost + cost_of[route]
+                if weight < costs.get(other, np.inf):
+                    costs[other] = weight
+                    previous[other] = (node, route)
+                    heapq.heappush(queue, (weight, other))
+            if not inside:
+                for other, shortcut in shortcuts[node]:
+                    weight = cost + shortcut
+                    if weight < costs.get(other, np.inf):
+                        costs[other] = weight
+                        previous[other] = (node, None)
+                        heapq.heappush(queue, (weight, other))
+        if target not in visited:
+            return np.inf, None
+        routes = []
+        node = target
+        while node != source:
+            start, route = previous[node]
+            routes.extend(reversed([route] if route is not None else self._unpack(weights, start, node)))
+            node = start
+        return costs[target], routes[::-1]
+
+    def route(self, spec, source, target, cache=Cost_profiles.CACHE):
+        """best path from source to target for the profile as given by Cost_profiles.route, with the number of
+           cells crossed. None if the target cannot be reached"""
+
+        spec = Cost_profiles.profile(spec) if spec is None or isinstance(spec, str) else spec
+        cost, routes = self.shortest_path(spec, source, target, cache)
+        if routes is None:
+            return None
+        table = self.table
+        nodes = [table.ids[table.index[source]]] + [table.ids[table.targets[route]] for route in routes]
+        return dict(Cost_profiles.path_metrics(table, Cost_profiles.travel_times(table, spec), routes),
+                    nodes=nodes, cost=float(cost), communities=int(self.cut[routes].sum()))
@@ -0,0 +1,82 @@
+import heapq
+import numpy as np
+import Cost_profiles
+
+"""In this file the Pareto-optimal routes over travel time and danger are found with one bi-criteria
+label-setting search on the routes of a Cost_profiles.RouteTable, instead of running the routing once per beta.
+A label is a path to a node with its travel time and its danger exposure (danger times the meters of each
+route, so that it adds up along the path). The labels are extended in lexicographic order; a label dominated
+by a label already settled at its node, or by one at the target, is dropped. With epsilon > 0 also the labels
+within a factor 1 + epsilon of a settled one on both criteria are dropped, which thins the front.
+"""
+
+
+def _dominated(labels, travel_time, exposure, epsilon):
+    factor = 1 + epsilon
+    for other_time, other_exposure in labels:
+        if other_time <= travel_time * factor and other_exposure <= exposure * factor:
+            return True
+    return False
+
+
+def pareto_labels(table, usable, travel_time, exposure, source, target, epsilon=0.0, max_labels=None):
+    """Settled labels at the target: (travel time, exposure, positions of the routes of the path)"""
+
+    source, target = Cost_profiles.node_index(table, source), Cost_profiles.node_index(table, target)
+    indptr, targets = table.indptr, table.targets
+    settled = {}
+    parents = []
+    queue = [(0.0, 0.0, source, -1, -1)]
+    front = []
+    while queue:
+        time, danger, node, edge, parent = heapq.heappop(queue)
+        if _dominated(settled.get(node, ()), time, danger, epsilon):
+            continue
+        if node != target and _dominated(settled.get(target, ()), time, danger, epsilon):
+            continue
+        settled.setdefault(node, []).append((time, danger))
+        parents.append((edge, parent))
+        label = len(parents) - 1
+        if node == target:
+            edges = []
+            while parents[label][0] != -1:
+                edges.append(parents[label][0])
+                label = parents[label][1]
+            front.append((time, danger, edges[::-1]))
+            if max_labels is not None and len(front) >= max_labels:
+                break
+            continue
+        for route in range(indptr[node], indptr[node + 1]):
+            if not usable[route]:
+                continue
+            next_time, next_danger = time + travel_time[route], danger + exposure[route]
+            other = targets[route]
+            if not _dominated(settled.get(other, ()), next_time, next_danger, epsilon):
+                heapq.heappush(queue, (next_time, next_danger, other, route, label))
+    return front
+
+
+def exposures(table):
+    """danger exposure of the routes: danger times distance, 0 where one of them is missing"""
+
+    return np.nan_to_num(table.danger * table.distance, nan=0.0)
+
+
+def pareto_routes(table, spec, source, target, epsilon=0.0, max_labels=None, cache=Cost_profiles.CACHE):
+    """Pareto front of the routes from source to target over travel time and danger, for the routes and speeds
+       of the profile: for each route the ids of its nodes, travel time (s), distance (m), danger weighted by
+       the length of the routes (exposure / distance, the criterion of the front), number of crossings and danger
+       exposure, the fastest first"""
+
+    spec = Cost_profiles.profile(spec) if spec is None or isinstance(spec, str) else spec
+    usable = np.isfinite(cache.get(table, spec))
+    travel_time = Cost_profiles.travel_times(table, spec)
+    routes = []
+    for _, exposure, edges in pareto_labels(table, usable, travel_time, exposures(table), source, target,
+                                            epsilon, max_labels):
+        nodes = [table.ids[table.index[source]]] + [table.ids[table.targets[edge]] for edge in edges]
+        metrics = Cost_profiles.path_metrics(table, travel_time, edges)
+        if metrics['distance'] > 0:
+            metrics['danger'] = exposure / metrics['distance']
+        routes.append(dict(metrics, nodes=nodes, exposure=exposure))
+    return routes
@@ -0,0 +1,387 @@
+import os
+import sys
+import heapq
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import networkx as nx
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import Cost_profiles
+import Overlay
+
+"""In this file the nodes of the bike (or foot) subgraph are partitioned in the cells used by the community
+routing (Routing.routing_with_communities and Overlay) and the structures it expects are written:
+   - the louvain property (the cell) and the border_louvain property (whether the node has a route to another
+     cell) of the nodes
+   - a Community node for each cell, with the profile and the number of routes the partition was computed for,
+     and the INTRA_COMMUNITY relationships between the cells connected by a route, with the cost of the
+     cheapest one
+   - the BORDER_LOUVAIN_ROUTE relationships between the border nodes of the same cell, with the cost of the
+     best path inside the cell and its nodes (path_cost)
+The cells are the Louvain communities of the subgraph, the communities larger than max_size are partitioned again
+until they are small enough; or they are found with size constrained label propagation: every node starts in its
+own cell and joins the cell of most of its neighbours, if that cell has room for it. Then the cells that are not
+connected are split and the cells smaller than min_size are merged with the neighbouring cell they are most
+connected to. The paths between the border nodes are computed for the cells in parallel, by a pool of processes.
+"""
+
+BATCH_SIZE = 10000
+MAX_SIZE = 200
+ROUNDS = 20
+
+METHODS = ['louvain', 'label_propagation']
+
+LAYERS = {'bike': {'label': 'BikeNode', 'route': 'BIKE_ROUTE'},
+          'foot': {'label': 'FootNode', 'route': 'FOOT_ROUTE'}}
+
+
+def neighbours(table):
+    """the nodes connected to each node (table positions) by a route in either direction, with the number of
+       routes between them"""
+
+    sources = np.repeat(np.arange(len(table.ids)), np.diff(table.indptr))
+    result = [{} for _ in table.ids]
+    for a, b in zip(sources.tolist(), table.targets.tolist()):
+        if a != b:
+            result[a][b] = result[a].get(b, 0) + 1
+            result[b][a] = result[b].get(a, 0) + 1
+    return [list(links.items()) for links in result]
+
+
+def label_propagation(links, max_size, rounds=ROUNDS, seed=42):
+    """cell of each node: a node joins the cell it has most links to, among its cell and the cells with less
+       than max_size nodes"""
+
+    labels = list(range(len(links)))
+    sizes = [1] * len(links)
+    order = list(range(len(links)))
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        rng.shuffle(order)
+        moved = 0
+        for node in order:
+            current = labels[node]
+            weights = {}
+            for other, weight in links[node]:
+                weights[labels[other]] = weights.get(labels[other], 0) + weight
+            best, best_weight = current, weights.get(current, 0)
+            for label, weight in weights.items():
+                if label != current and weight > best_weight and sizes[label] < max_size:
+                    best, best_weight = label, weight
+            if best != current:
+                sizes[current] -= 1
+                sizes[best] += 1
+                labels[node] = best
+                moved += 1
+        if not moved:
+            break
+    return labels
+
+
+def louvain(links, max_size, seed=42):
+    """cell of each node: the Louvain communities, the ones larger than max_size partitioned again. A community
+       that Louvain does not split is cut in pieces of max_size nodes in breadth first order"""
+
+    G = nx.Graph()
+    G.add_nodes_from(range(len(links)))
+    G.add_weighted_edges_from((a, b, weight) for a, others in enumerate(links) for b, weight in others if a < b)
+    labels = [0] * len(links)
+    pending = [set(range(len(links)))]
+    count = 0
+    while pending:
+        nodes = pending.pop()
+        if len(nodes) > max_size:
+            parts = nx.community.louvain_communities(G.subgraph(nodes), weight='weight', seed=seed)
+            if len(parts) > 1:
+                pending.extend(parts)
+                continue
+            order = [node for component in nx.connected_components(G.subgraph(nodes))
+                     for node in nx.bfs_tree(G.subgraph(nodes), min(component))]
+            parts = [order[start:start + max_size] for start in range(0, len(order), max_size)]
+        else:
+            parts = [nodes]
+        for part in parts:
+            for node in part:
+                labels[node] = count
+            count += 1
+    return labels
+
+
+def connected_cells(links, labels):
+    """cells numbered from 0, a cell that is not connected becomes one cell per component"""
+
+    cells = [-1] * len(links)
+    count = 0
+    for start in range(len(links)):
+        if cells[start] != -1:
+            continue
+        cells[start] = count
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other, _ in links[node]:
+                if cells[other] == -1 and labels[other] == labels[start]:
+                    cells[other] = count
+                    stack.append(other)
+        count += 1
+    return cells
+
+
+def merge_small_cells(links, cells, min_size, max_size):
+    """cells smaller than min_size merged, the smallest first, with the neighbouring cell they have most links
+       to if the merged cell is not larger than max_size. The cells are numbered again from 0"""
+
+    members = {}
+    for node, cell in enumerate(cells):
+        members.setdefault(cell, []).append(node)
+    for cell in sorted(members, key=lambda c: len(members[c])):
+        if cell not in members or len(members[cell]) >= min_size:
+            continue
+        weights = {}
+        for node in members[cell]:
+            for other, weight in links[node]:
+                if cells[other] != cell:
+                    weights[cells[other]] = weights.get(cells[other], 0) + weight
+        candidates = [(weight, -other) for other, weight in weights.items()
+                      if len(members[other]) + len(members[cell]) <= max_size]
+        if not candidates:
+            continue
+        target = -max(candidates)[1]
+        for node in members.pop(cell):
+            cells[node] = target
+            members[target].append(node)
+    numbers = {}
+    return [numbers.setdefault(cell, len(numbers)) for cell in cells]
+
+
+def partition(table, max_size=MAX_SIZE, min_size=None, method='louvain', rounds=ROUNDS, seed=42):
+    """cell of the nodes of the RouteTable (id -> cell), with at most max_size nodes per cell"""
+
+    if method not in METHODS:
+        raise ValueError("Unknown partition method " + method)
+    links = neighbours(table)
+    if method == 'louvain':
+        labels = louvain(links, max_size, seed)
+    else:
+        labels = label_propagation(links, max_size, rounds, seed)
+    cells = connected_cells(links, labels)
+    cells = merge_small_cells(links, cells, max_size // 4 if min_size is None else min_size, max_size)
+    return dict(zip(table.ids, cells))
+
+
+def _border_paths(task):
+    """best paths inside a cell from each of its border nodes to the others: (from, to, cost, nodes of the
+       path) with the positions of the nodes in the cell"""
+
+    size, routes, borders = task
+    adjacency = [[] for _ in range(size)]
+    for source, target, weight in routes:
+        adjacency[source].append((target, weight))
+    paths = []
+    for border in borders:
+        costs = {border: 0.0}
+        previous = {}
+        visited = set()
+        queue = [(0.0, border)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            for other, weight in adjacency[node]:
+                if cost + weight < costs.get(other, np.inf):
+                    costs[other] = cost + weight
+                    previous[other] = node
+                    heapq.heappush(queue, (cost + weight, other))
+        for other in borders:
+            if other != border and other in visited:
+                path = [other]
+                while path[-1] != border:
+                    path.append(previous[path[-1]])
+                paths.append((border, other, costs[other], path[::-1]))
+    return paths
+
+
+def border_paths(overlay, weights, processes=None):
+    """best paths inside each cell between its border nodes: (from id, to id, cost, ids of the nodes of the
+       path). The cells are given to a pool of processes, run here if processes is 1"""
+
+    table = overlay.table
+    members = {}
+    for node, cell in enumerate(overlay.cells.tolist()):
+        members.setdefault(cell, []).append(node)
+    routes = {}
+    for route in np.flatnonzero(~overlay.cut & np.isfinite(weights)).tolist():
+        routes.setdefault(overlay.cells[overlay.sources[route]], []).append(route)
+    tasks = []
+    cells = []
+    for cell, borders in overlay.borders.items():
+        local = {node: i for i, node in enumerate(members[cell])}
+        inside = [(local[overlay.sources[route]], local[table.targets[route]], float(weights[route]))
+                  for route in routes.get(cell, [])]
+        tasks.append((len(local), inside, [local[border] for border in borders]))
+        cells.append(members[cell])
+    if processes == 1:
+        results = list(map(_border_paths, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+            results = list(executor.map(_border_paths, tasks))
+    paths = []
+    for nodes, result in zip(cells, results):
+        for a, b, cost, path in result:
+            paths.append((table.ids[nodes[a]], table.ids[nodes[b]], cost, [table.ids[nodes[i]] for i in path]))
+    return paths
+
+
+def community_routes(overlay, weights):
+    """(cell, other cell, cost of the cheapest route between them) of the cells connected by a route"""
+
+    cheapest = {}
+    for route in np.flatnonzero(overlay.cut & np.isfinite(weights)).tolist():
+        key = (overlay.cells[overlay.sources[route]], overlay.cells[overlay.table.targets[route]])
+        cheapest[key] = min(cheapest.get(key, np.inf), float(weights[route]))
+    return [[a, b, cost] for (a, b), cost in cheapest.items()]
+
+
+def statistics(overlay):
+    """number of cells, size of the largest and of the smallest, border nodes and routes between cells"""
+
+    sizes = np.unique(overlay.cells.astype(np.int64), return_counts=True)[1]
+    return {'cells': len(sizes), 'max_size': int(sizes.max()), 'min_size': int(sizes.min()),
+            'border_nodes': sum(len(borders) for borders in overlay.borders.values()),
+            'cut_routes': int(overlay.cut.sum())}
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def run(self, query, **parameters):
+        with self.driver.session() as session:
+            return session.write_transaction(self._run, query, parameters)
+
+    @staticmethod
+    def _run(tx, query, parameters):
+        result = tx.run(query, **parameters)
+        return result.values()
+
+    def write_batches(self, query, rows, batch_size=BATCH_SIZE, **parameters):
+        """run the query on each batch of rows, one transaction per batch"""
+
+        for start in range(0, len(rows), batch_size):
+            self.run(query, rows=rows[start:start + batch_size], **parameters)
+
+    def route_table(self, layer):
+        """RouteTable of the routes of the layer"""
+
+        with self.driver.session() as session:
+            return Cost_profiles.RouteTable(session.read_transaction(Cost_profiles.App._get_routes, [layer['route']]))
+
+    def delete_communities(self, layer):
+        """delete the structures of a previous partition of the layer"""
+
+        self.run("MATCH (:" + layer['label'] + ")-[r:BORDER_LOUVAIN_ROUTE]->() DELETE r")
+        self.run("MATCH (c:Community {label: $label}) DETACH DELETE c", label=layer['label'])
+
+    def write_communities(self, layer, overlay, weights, paths, spec):
+        """louvain and border_louvain of the nodes, Community nodes, INTRA_COMMUNITY and BORDER_LOUVAIN_ROUTE.
+           The Community nodes keep the profile of the costs and the number of routes, so that the routing
+           uses the costs only for that profile and graph"""
+
+        label = layer['label']
+        borders = set(overlay.border_index)
+        self.write_batches("""
+                UNWIND $rows AS row MATCH (n:""" + label + """ {id: row[0]})
+                SET n.louvain = row[1], n.border_louvain = row[2]
+                """, [[node, int(cell), i in borders] for i, (node, cell) in
+                      enumerate(zip(overlay.table.ids, overlay.cells.tolist()))])
+        sizes = np.bincount(overlay.cells.astype(np.int64))
+        self.write_batches("""
+                UNWIND $rows AS row CREATE (c:Community {id: row[0], label: $label, size: row[1], borders: row[2],
+                                                          profile: $profile, routes: $routes})
+                """, [[cell, int(size), len(overlay.borders.get(cell, []))] for cell, size in enumerate(sizes)],
+                           label=label, profile=Overlay.profile_key(spec), routes=len(overlay.table.targets))
+        self.write_batches("""
+                UNWIND $rows AS row
+                MATCH (a:Community {id: row[0], label: $label}) MATCH (b:Community {id: row[1], label: $label})
+                MERGE (a)-[r:INTRA_COMMUNITY]->(b) SET r.cost = row[2]
+                """, community_routes(overlay, weights), label=label)
+        self.write_batches("""
+                UNWIND $rows AS row MATCH (a:""" + label + """ {id: row[0]}) MATCH (b:""" + label + """ {id: row[1]})
+                MERGE (a)-[r:BORDER_LOUVAIN_ROUTE]->(b) SET r.cost = row[2], r.path_cost = row[3]
+                """, [list(path) for path in paths])
+
+    def partition(self, layer, spec, max_size=MAX_SIZE, min_size=None, method='louvain', seed=42, processes=None):
+        """partition the subgraph of the layer and write the structures of the community routing"""
+
+        table = self.route_table(layer)
+        overlay = Overlay.Overlay(table, partition(table, max_size, min_size, method, seed=seed))
+        weights = Cost_profiles.CACHE.get(table, spec)
+        paths = border_paths(overlay, weights, processes)
+        self.delete_communities(layer)
+        self.write_communities(layer, overlay, weights, paths, spec)
+        return statistics(overlay)
+
+
+def add_options():
+    """Parameters needed to run the script"""
+    parser = argparse.ArgumentParser(description='Partition of the subgraph in the cells of the community routing.')
+    parser.add_argument('--neo4jURL', '-n', dest='neo4jURL', type=str,
+                        help="""Insert the address of the local neo4j instance. For example: neo4j://localhost:7687""",
+                        required=True)
+    parser.add_argument('--neo4juser', '-u', dest='neo4juser', type=str,
+                        help="""Insert the name of the user of the local neo4j instance.""",
+                        required=True)
+    parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
+                        help="""Insert the password of the local neo4j instance.""",
+                        required=True)
+    parser.add_argument('--layer', '-l', dest='layer', type=str, choices=sorted(LAYERS),
+                        help="""Insert the subgraph to partition: bike or foot.""",
+                        required=False, default='bike')
+    parser.add_argument('--maxSize', '-ms', dest='max_size', type=int,
+                        help="""Insert the maximum number of nodes of a cell.""",
+                        required=False, default=MAX_SIZE)
+    parser.add_argument('--minSize', '-mn', dest='min_size', type=int,
+                        help="""Insert the number of nodes under which a cell is merged with a neighbour
+                        (a quarter of the maximum by default).""",
+                        required=False)
+    parser.add_argument('--method', '-m', dest='method', type=str, choices=METHODS,
+                        help="""Insert the partition method: louvain or label_propagation.""",
+                        required=False, default='louvain')
+    parser.add_argument('--profile', '-pr', dest='profile', type=str, choices=sorted(Cost_profiles.PROFILES),
+                        help="""Insert the profile giving the cost of the paths between the border nodes.""",
+                        required=False)
+    parser.add_argument('--processes', '-j', dest='processes', type=int,
+                        help="""Insert the number of processes computing the paths between the border nodes.""",
+                        required=False)
+    parser.add_argument('--seed', '-s', dest='seed', type=int,
+                        help="""Insert the seed of the order in which the nodes are visited.""",
+                        required=False, default=42)
+    return parser
+
+
+def main(args=None):
+    """Parsing input parameters"""
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+    greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    layer = LAYERS[options.layer]
+
+    """Partition the subgraph and write cells, border nodes and paths between them"""
+    spec = Cost_profiles.profile(options.profile or options.layer, routes=(layer['route'],))
+    result = greeter.partition(layer, spec, options.max_size, options.min_size, options.method, options.seed,
+                               options.processes)
+    print("Partition of the subgraph : done")
+    print(result)
+    greeter.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    main()
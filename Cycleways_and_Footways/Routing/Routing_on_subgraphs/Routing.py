@@ -10,12 +10,23 @@ from shapely import wkt
 import pandas as pd
 import geopandas as gpd
 import numpy as np
-from ast import literal_eval
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import geoFiles
+import Cost_profiles
+import Pareto
+import Overlay
+import Attribute_cache
+import safetyRules
 """In this file we perform routing on projections using A*"""
 
+"""route types of the projections, the paths found on them are decoded and measured with Attribute_cache"""
+PROJECTION_ROUTES = {'bike_routes': ('BIKE_ROUTE', 'FOOT_ROUTE', 'IS_THE_SAME'), 'foot_routes': ('FOOT_ROUTE',)}
+
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -95,25 +106,6 @@ class App:
                         """,name = name)
         return result
     
-    def update_cost(tx,beta=0.5):
-        with self.driver.session() as session:
-            path = session.read_transaction(self._update_cost,beta)
-            
-    @staticmethod
-    def _update_cost(tx,beta):
-        tx.run("""
-                MATCH(n1)-[r:BIKE_ROUTE]-(n2) with max(r.travel_time) as max_travel_time,max(r.danger) as max_danger, min(r.travel_time) as min_travel_time, min(r.danger) as min_danger 
-                MATCH(n3)-[r1:BIKE_ROUTE]-(n4) with max_travel_time, min_travel_time,max_danger,min_danger, r1 
-                set r1.cost = $beta *(r1.travel_time-min_travel_time)/(max_travel_time-min_travel_time) + (1-$beta2) *(r1.danger-min_danger)/(max_danger-min_danger)
-                """,beta = beta, beta2 = beta)
-
-        tx.run("""
-                MATCH(n1)-[r:FOOT_ROUTE]-(n2) with max(r.travel_time) as max_travel_time,max(r.danger) as max_danger, min(r.travel_time) as min_travel_time, min(r.danger) as min_danger
-                MATCH(n3)-[r1:FOOT_ROUTE]-(n4) with max_travel_time, min_travel_time,max_danger,min_danger, r1 
-                set r1.cost = $beta *(r1.travel_time-min_travel_time)/(max_travel_time-min_travel_time) + (1-$beta2) *(r1.danger-min_danger)/(max_danger-min_danger)
-                """,beta = beta, beta2 = beta)
-        return
-
     def get_import_folder_name(self):
         """gets the path of the import folder of the neo4j instance"""
         with self.driver.session() as session:
@@ -132,7 +124,6 @@ class App:
            the safety of the path
         """
         with self.driver.session() as session:
-            print(dest)
             result = session.write_transaction(self._get_the_nearest_junction_to_POI, osmid, foot)
             return result
 
@@ -156,39 +147,35 @@ class App:
         return result.values()
         
     def get_the_nearest_junction_to_coordinates(self, lat, lon, foot = False):
-        """Routing considering as weight the cost, which is a tradeoff between the travel time and
-           the safety of the path
+        """The junction at the end of the nearest route closest to the coordinates, with the meters to reach it
+           (to the route and then along it) and the partial route of Attribute_cache.GraphAttributes.partial_route
         """
-        with self.driver.session() as session:
-            result = session.write_transaction(self._get_the_nearest_junction_to_coordinates, lat, lon, foot)
-            return result
-
-    @staticmethod
-    def _get_the_nearest_junction_to_coordinates(tx, lat, lon, foot):
-        if foot:
-            print(lat)
-            print(lon)
-            query = """CALL spatial.withinDistance('spatial', {latitude:"""+str(lat) +""", longitude:"""+str(lon)+"""}, 0.1) 
-            yield node,distance 
-            where node:FootCross or node:JunctionFootCross or node:RoadFootJunction
-            return distance,node.id as osmid order by distance limit 1"""
-            result = tx.run(query)
-        else:
-            print(lat)
-            print(lon)
-            query = """CALL spatial.withinDistance('spatial', {latitude:"""+str(lat) +""", longitude:"""+str(lon)+"""}, 0.1) 
-            yield node,distance 
-            where node:Junction
-            return distance,node.id as osmid order by distance limit 1"""
-            result = tx.run(query)
-        return result.values()
+        route_types = PROJECTION_ROUTES['foot_routes' if foot else 'bike_routes']
+        snap = self.snap_to_routes([(float(lon), float(lat))], foot)[0]
+        if snap is None:
+            return []
+        partial = self.attributes(route_types).partial_route(snap)
+        return [[partial['distance'], partial['junction'], partial]]
+
+    def snap_to_routes(self, points, foot = False):
+        """snap the points (longitude, latitude) onto the nearest route usable by bike or on foot, see
+           edgeSnapping.SnapIndex.snap
+        """
+        route_types = PROJECTION_ROUTES['foot_routes' if foot else 'bike_routes']
+        return self.attributes(route_types).snap_index().snap(points, route_types)
 
 
     def routing_algorithm(self, source, target, projection, mode,alg = 'd'):
         """Routing considering as weight just the travel time"""
         with self.driver.session() as session:
             result = session.write_transaction(self._routing_algorithm, source, target, projection, mode,alg)
-            return result
+        attributes = self.attributes(PROJECTION_ROUTES['foot_routes' if projection.startswith('foot') else 'bike_routes'])
+        decoded = []
+        for path, nodeIds, totalCost in result:
+            nodeIDs, coordinates = attributes.decode(nodeIds)
+            nodeCord = [{'latitude': lat, 'longitude': lon} for lat, lon in coordinates]
+            decoded.append([path, nodeCord, totalCost, nodeIDs])
+        return decoded
 
     
     @staticmethod
@@ -205,12 +192,8 @@ class App:
                     relationshipWeightProperty: $mode
                     })
                     YIELD index, sourceNode, targetNode, totalCost, nodeIds, costs, path
-                    with index,
-                        totalCost,
-                        [nodeId IN nodeIds | {latitude:gds.util.asNode(nodeId).lat,longitude:gds.util.asNode(nodeId).lon}] AS nodeCord,
-                        [nodeId IN nodeIds | gds.util.asNode(nodeId).id] AS nodeIDs
-                    match (n)-[:CONTAINS]->(j:Junction) where j.id in nodeIDs with collect(distinct(n.id_num)) as path, nodeIDs, totalCost, nodeCord 
-                    return path, nodeCord, totalCost, nodeIDs
+                    match (n)-[:CONTAINS]->(j:Junction) where id(j) in nodeIds with collect(distinct(n.id_num)) as path, nodeIds, totalCost
+                    return path, nodeIds, totalCost
                     """, source=source, target=target, projection=projection, mode=mode)
         else:
             print('algorithm is:-----------------------------------')
@@ -226,222 +209,64 @@ class App:
                     relationshipWeightProperty: $mode
                     })
                     YIELD index, sourceNode, targetNode, totalCost, nodeIds, costs, path
-                    with index,
-                        totalCost,
-                        [nodeId IN nodeIds | {latitude:gds.util.asNode(nodeId).lat,longitude:gds.util.asNode(nodeId).lon}] AS nodeCord,
-                        [nodeId IN nodeIds | gds.util.asNode(nodeId).id] AS nodeIDs
-                    match(n)-[:CONTAINS]->(j:Junction) where j.id in nodeIDs with collect(distinct(n.id_num)) as path, nodeIDs, totalCost, nodeCord 
-                    return path, nodeCord, totalCost, nodeIDs
+                    match (n)-[:CONTAINS]->(j:Junction) where id(j) in nodeIds with collect(distinct(n.id_num)) as path, nodeIds, totalCost
+                    return path, nodeIds, totalCost
                     """, source=source, target=target, projection=projection, mode=mode)
         return result.values()
         
-    def evaluate_path(self, start, end):
-        """getting information about the trip"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._evaluate_path, start, end)
-            return result
-        
-    @staticmethod
-    def _evaluate_path(tx, start, end):
-        result = tx.run("""match (n {id: $start})-[r]->(m {id: $end}) return r.length,r.danger,r.speed
-        """,start = start, end = end)
-        return result.values()
-    
-    def generate_inter_community_graph(self):
-        """evaluate the best route between the source and the target
-        """
-        with self.driver.session() as session:
-            result = session.execute_write(self._generate_inter_community_graph)
-            return result
-    @staticmethod
-    def _generate_inter_community_graph(tx):
-        query = """
-        call gds.graph.project('community_graph', ['Community'], 
-                ['INTRA_COMMUNITY'], 
-                { relationshipProperties: ['cost']});"""
-        result = tx.run(query)
-        return result.values()
-        
-    def generate_inter_community_path(self,source,target):
-        """evaluate the best route between the source and the target
-        """
-        with self.driver.session() as session:
-            result = session.execute_write(self._generate_inter_community_path,source,target)
-            return result
-    @staticmethod
-    def _generate_inter_community_path(tx,source,target): 
-        #query = """
-        #match (bks:BikeNode{id:'%s'})
-        #match (bkt:BikeNode{id:'%s'})
-        #match (source:Community{id:bks.louvain})
-        #match (target:Community{id:bkt.louvain})
-        #with source as s, target as t
-        #match p = shortestPath((s)-[:INTRA_COMMUNITY*]->(t)) unwind relationships(p) as n with startNode(n).id as start_node,endNode(n).id as end_node
-        #match (bk:BikeNode{louvain:start_node,border_lmatch (bks:BikeNode{id:'%ouvain:True})-[r:BORDER_LOUVAIN_ROUTE]->(bk2:BikeNode{louvain:start_node,border_louvain:True})-[r2:BIKE_ROUTE]->(bk3:BikeNode{louvain:end_node,border_louvain:True})
-        #return bk.id,r.cost,r.path_cost,bk2.id,r2.cost,bk3.id,start_node,end_node"""%(source,target)
-        query = """
-        match (bks:BikeNode{id:'%s'})
-        match (bkt:BikeNode{id:'%s'})
-        match (source:Community{id:bks.louvain})
-        match (target:Community{id:bkt.louvain})
-        with source as s, target as t
-        CALL gds.shortestPath.dijkstra.stream('community_graph', {
-                                            sourceNode: s,
-                                            targetNode: t,
-                                            relationshipWeightProperty: 'cost'
-                                            })
-                                            YIELD index, sourceNode, targetNode, totalCost, nodeIds, path as p
-        unwind relationships(p) as n with startNode(n).id as start_node,endNode(n).id as end_node
-        match (bk:BikeNode{louvain:start_node,border_louvain:True})-[r:BORDER_LOUVAIN_ROUTE]->(bk2:BikeNode{louvain:start_node,border_louvain:True})-[r2:BIKE_ROUTE]->(bk3:BikeNode{louvain:end_node,border_louvain:True})
-        return bk.id,r.cost,r.path_cost,bk2.id,r2.cost,bk3.id,start_node,end_node"""%(source,target)
-        #print(query)
-        result = tx.run(query)
-        return result.values()
-        
-    def evaluate_path_metrics(self,pairs):
-        """evaluate path metrics
-        """
-        with self.driver.session() as session:
-            result = session.execute_write(self._evaluate_path_metrics,pairs)
-            return result
-    @staticmethod
-    def _evaluate_path_metrics(tx,pairs):
-        query = """unwind %s as pairs
-                match (n:BikeNode{id: pairs[0]})-[r:BIKE_ROUTE]->(m:BikeNode{id:pairs[1]})
-                with min(r.cost) as min_cost, pairs
-                match (n:BikeNode{id: pairs[0]})-[r:BIKE_ROUTE]->(m:BikeNode{id:pairs[1]})
-                where r.cost = min_cost
-                return sum(r.cost) as cost,avg(r.danger) as danger,sum(r.distance) as distance"""%(pairs)
-        result = tx.run(query)
-        return result.values()
-        
-    def count_crossings(self,pairs):
-        """evaluate path metrics
-        """
-        with self.driver.session() as session:
-            result = session.execute_write(self._count_crossings,pairs)
-            return result
-    @staticmethod
-    def _count_crossings(tx,pairs):
-        query = """unwind %s as pairs
-                match (n:BikeCrossing{id: pairs[0]})-[r:BIKE_ROUTE]->(m:BikeCrossing{id:pairs[1]})
-                return count(n)"""%(pairs)
-        result = tx.run(query)
-        return result.values()
-        
-    def count_communities(self,pairs):
-        """evaluate path metrics
-        """
+    def drop_all_projections(self):
         with self.driver.session() as session:
-            result = session.execute_write(self._count_communities,pairs)
+            result = session.execute_write(self._drop_all_projections)
             return result
-    @staticmethod
-    def _count_communities(tx,pairs):
-        query = """unwind %s as pairs
-                match (n:BikeNode{id: pairs[0]})-[r:BIKE_ROUTE]->(m:BikeNode{id:pairs[1]})
-                where n.louvain <> m.louvain
-                return count(r)"""%(pairs)
-        result = tx.run(query)
+    @staticmethod    
+    def _drop_all_projections(tx):
+        result = tx.run("""CALL gds.graph.list() YIELD graphName
+                    CALL gds.graph.drop(graphName)
+                    YIELD database
+                    RETURN 'dropped ' + graphName""")
         return result.values()
-        
-    def generate_louvain_community_graph(self, id_community):
-        """generate the graph projection for the given community"""
 
+    def attributes(self, route_types=Attribute_cache.ROUTE_TYPES):
+        """attributes of the nodes and routes to decode and measure the paths, read again only if the graph changed"""
+        return Attribute_cache.attributes(self.driver, route_types)
+
+    def get_routes(self, route_types):
+        """routes of the given types with their raw weights, as read by Cost_profiles"""
         with self.driver.session() as session:
-            result = session.execute_write(self._generate_louvain_community_graph, id_community)
-            return result
-    @staticmethod
-    def _generate_louvain_community_graph(tx, id_community):
-        query ="""call gds.graph.project.cypher('subgraph_community_lp_""" + str(id_community) + """','MATCH (n:BikeNode {louvain:"""
-        query = query + str(id_community) + """}) RETURN id(n) AS id','MATCH (n:BikeNode{louvain:"""+ str(id_community) 
-        query = query + """})-[r:BIKE_ROUTE]->(m:BikeNode{louvain: """ + str(id_community) + """}) RETURN id(n) AS source, id(m) AS target, r.travel_time as travel_time, r.danger as danger, r.cost as cost')
-                        YIELD
-                          graphName AS graph, nodeQuery, nodeCount AS nodes, relationshipQuery, relationshipCount AS rels"""
-        result = tx.run(query)
-        return result.values()
-        
-    def routing_source_targets(self,source,targets):
-        """evaluate the best route between the source and the target
-        """
-        with self.driver.session() as session:
-            result = session.execute_write(self._routing_source_targets,source,targets)
+            result = session.read_transaction(Cost_profiles.App._get_routes, list(route_types))
             return result
-    @staticmethod
-    def _routing_source_targets(tx,source,targets):
-        query = """
-        match (s:BikeNode {id: '%s'})
-        unwind %s as t_id
-        match (t:BikeNode {id: t_id}) 
-        with s,t
-        CALL gds.shortestPath.dijkstra.stream('subgraph_community_lp_' + toString(s.louvain), {
-                                            sourceNode: s,
-                                            targetNode: t,
-                                            relationshipWeightProperty: 'cost'
-                                            })
-                                            YIELD index, sourceNode, targetNode, totalCost, nodeIds
-        with  gds.util.asNode(sourceNode).id as sourceNode,gds.util.asNode(targetNode).id as targetNode,[nodeId IN nodeIds | gds.util.asNode(nodeId).id] AS nodes_path, totalCost as weight
-        return sourceNode,targetNode,nodes_path,weight"""%(source,targets)
-        result = tx.run(query)
-        return result.values()
-        
-    def routing_sources_target(self,sources,target):
-        """evaluate the best route between the source and the target
-        """
+
+    def get_communities(self):
+        """id and louvain community of the BikeNode nodes"""
         with self.driver.session() as session:
-            result = session.execute_write(self._routing_sources_target,sources,target)
+            result = session.read_transaction(self._get_communities)
             return result
     @staticmethod
-    def _routing_sources_target(tx,sources,target):
-        query = """
-        match (t:BikeNode {id: '%s'})
-        unwind %s as s_id
-        match (s:BikeNode {id: s_id}) 
-        with s,t
-        CALL gds.shortestPath.dijkstra.stream('subgraph_community_lp_' + toString(s.louvain), {
-                                            sourceNode: s,
-                                            targetNode: t,
-                                            relationshipWeightProperty: 'cost'
-                                            })
-                                            YIELD index, sourceNode, targetNode, totalCost, nodeIds
-        with  gds.util.asNode(sourceNode).id as sourceNode,gds.util.asNode(targetNode).id as targetNode,[nodeId IN nodeIds | gds.util.asNode(nodeId).id] AS nodes_path, totalCost as weight
-        return sourceNode,targetNode,nodes_path,weight"""%(target, sources)
-        #print(query)
-        result = tx.run(query)
+    def _get_communities(tx):
+        result = tx.run("""match (n:BikeNode) where n.louvain is not null return n.id, n.louvain""")
         return result.values()
-        
-    def get_coordinates(self,final_path):
-        """evaluate the best route between the source and the target
-        """
+
+    def get_border_costs(self, profile, routes):
+        """costs of the paths between the border nodes of the communities (BORDER_LOUVAIN_ROUTE), if they were
+           written by Partitioner for the profile on a subgraph with that number of routes, else None"""
         with self.driver.session() as session:
-            result = session.execute_write(self._get_coordinates,final_path)
+            result = session.read_transaction(self._get_border_costs, profile, routes)
             return result
     @staticmethod
-    def _get_coordinates(tx,final_path): 
-        query = """
-        unwind %s as p
-        match (n:BikeNode{id: p}) return collect([n.lat,n.lon])"""%(final_path)
-        #print(query)
-        result = tx.run(query)
-        return result.values()
-        
-    def drop_all_projections(self):
-        with self.driver.session() as session:
-            result = session.execute_write(self._drop_all_projections)
-            return result
-    @staticmethod    
-    def _drop_all_projections(tx):
-        result = tx.run("""CALL gds.graph.list() YIELD graphName
-                    CALL gds.graph.drop(graphName)
-                    YIELD database
-                    RETURN 'dropped ' + graphName""")
+    def _get_border_costs(tx, profile, routes):
+        stamp = tx.run("""match (c:Community {label: 'BikeNode'}) return c.profile, c.routes limit 1""").values()
+        if not stamp or stamp[0] != [profile, routes]:
+            return None
+        result = tx.run("""match (a:BikeNode)-[r:BORDER_LOUVAIN_ROUTE]->(b:BikeNode) return a.id, b.id, r.cost""")
         return result.values()
 
     def routing_old_style(self,source,target):
         """evaluate the best route between the source and the target
         """
         with self.driver.session() as session:
-            result = session.execute_write(self._routing_old_style,source,target)
-            return result
+            nodeIds, weight = session.execute_write(self._routing_old_style,source,target)
+        nodes_path, _ = self.attributes(('BIKE_ROUTE',)).decode(nodeIds)
+        return [nodes_path, weight]
     @staticmethod
     def _routing_old_style(tx,source,target):
         tx.run("""call gds.graph.project('subgraph_routing', ['BikeJunction','BikeCrossing'], 
@@ -457,120 +282,82 @@ class App:
                                             relationshipWeightProperty: 'cost'
                                             })
                                             YIELD index, sourceNode, targetNode, totalCost, nodeIds, path
-        with  [nodeId IN nodeIds | gds.util.asNode(nodeId).id] AS nodes_path, totalCost as weight,path as p
-        unwind relationships(p) as n with startNode(n).id as start_node,endNode(n).id as end_node,nodes_path,weight
-        match (bk:BikeNode{id:start_node})-[r:BIKE_ROUTE]->(bk2:BikeNode{id:end_node})
-        return nodes_path,weight, sum(r.danger) as total_danger, sum(r.distance) as total_distance"""%(source,target)
+        return nodeIds, totalCost"""%(source,target)
         result = tx.run(query)
         tx.run("""call gds.graph.drop('subgraph_routing')""")
         return result.values()[0]
         
         
         
-def routing_with_communities(greeter,source,target,boolMap=False,file=''):
-    greeter.generate_inter_community_graph()
-    #find all the shortest path between communities and then find all the possible border nodes path
+def community_overlay(greeter, spec):
+    """Overlay of the routes of the profile with the louvain communities of the BikeNode nodes as cells,
+       customized with the costs between the border nodes written by Partitioner if they are for this profile
+       and graph, else computed here"""
+    table = Cost_profiles.RouteTable(greeter.get_routes(spec['routes']))
+    overlay = Overlay.Overlay(table, dict(greeter.get_communities()))
+    costs = greeter.get_border_costs(Overlay.profile_key(spec), len(table.targets))
+    stored = costs is not None and overlay.stored_customization(spec, costs) is not None
+    if not stored:
+        overlay.customization(spec)
+    return overlay, stored
+
+
+def routing_with_communities(greeter,source,target,boolMap=False,file='',spec=None,overlay=None):
+    """Routing on the community overlay: the source and target communities are searched with their routes,
+       the other communities only through the costs between their border nodes"""
+    spec = Cost_profiles.profile('bike', routes=('BIKE_ROUTE',)) if spec is None else spec
+    total_start_time = time.time()
+    stored = True
+    if overlay is None:
+        overlay, stored = community_overlay(greeter, spec)
+    preparation_time = time.time() - total_start_time
     start_time = time.time()
-    result = greeter.generate_inter_community_path(source,target)
-    percorso = pd.DataFrame(result, columns = ['bk.id', 'r.cost', 'r.path_cost', 'bk2.id', 'r2.cost', 'bk3.id',
-       'start_node', 'end_node'])
-    percorso['r.path_cost'] = percorso['r.path_cost'].apply(str)
-    #get the sequence of communities
-    sequence = percorso['start_node'].unique()
-    sequence = np.append(sequence,percorso['end_node'].iloc[-1])
-    #find all the possible paths and their costs
-    choice=pd.DataFrame()
-    for i in range(0,len(sequence)-1):
-        if i==0:
-            if len(sequence)>2:
-                choice = pd.merge(percorso[(percorso['start_node']==sequence[i]) & (percorso['end_node']==sequence[i+1])], percorso[(percorso['start_node']==sequence[i+1]) & (percorso['end_node']==sequence[i+2])], 
-                                  left_on=  ['bk3.id'],
-                           right_on= ['bk.id'], 
-                           how = 'outer',
-                            suffixes = ['_' + str(i),'_' + str(i+1)]).dropna()
-            else:
-                choice = percorso[(percorso['start_node']==sequence[i])].rename(
-                                  columns ={'bk.id': 'bk.id_'+ str(i),'r.cost':'r.cost_'+ str(i),'r.path_cost':'r.path_cost_'+ str(i),'bk2.id':'bk2.id_'+ str(i),'r2.cost':'r2.cost_'+ str(i),'bk3.id':'bk3.id_'+ str(i),'start_node':'start_node_'+ str(i),'end_node':'end_node_'+ str(i)})
-        elif i == len(sequence)-2:
-            choice = pd.merge(choice,
-                              percorso[(percorso['start_node']==sequence[i])].rename(
-                                  columns ={'bk.id': 'bk.id_'+ str(i),'r.cost':'r.cost_'+ str(i),'r.path_cost':'r.path_cost_'+ str(i),'bk2.id':'bk2.id_'+ str(i),'r2.cost':'r2.cost_'+ str(i),'bk3.id':'bk3.id_'+ str(i),'start_node':'start_node_'+ str(i),'end_node':'end_node_'+ str(i)}),
-                              on = ['bk.id_' + str(i),'r.cost_' + str(i),'r.path_cost_' + str(i),'bk2.id_' + str(i),'r2.cost_' + str(i),'bk3.id_' + str(i),'start_node_' + str(i),'end_node_' + str(i)])
-        else:
-            choice = pd.merge(choice,
-                            pd.merge(percorso[percorso['start_node']==sequence[i]], 
-                                         percorso[percorso['start_node']==sequence[i+1]],
-                                         left_on=  ['bk3.id'],right_on= ['bk.id'],
-                                         how = 'outer',
-                                    suffixes = ['_' + str(i),'_' + str(i+1)]).dropna(),
-                              on = ['bk.id_' + str(i),'r.cost_' + str(i),'r.path_cost_' + str(i),'bk2.id_' + str(i),'r2.cost_' + str(i),'bk3.id_' + str(i),'start_node_' + str(i),'end_node_' + str(i)]
-                             )
-            choice['min_cost'] = choice['r.cost_' + str(i)] + choice['r2.cost_' + str(i)] + choice['r.cost_' + str(i+1)] + + choice['r2.cost_' + str(i+1)]
-            choice = choice.loc[choice.groupby(by=['bk.id_' + str(i),'bk3.id_' + str(i+1)]).min_cost.idxmin()]
-            choice = choice.drop(['min_cost'], axis=1)
-    #get the total cost of the path between the communities
-    choice['total_cost'] = 0
-    for i in range(0,len(sequence)-1):
-        if i != 0:
-            choice['total_cost'] = choice['r.cost_' + str(i)] + choice['r2.cost_' + str(i)] + choice['total_cost']
-        else:
-            choice['total_cost'] = choice['r2.cost_' + str(i)] + choice['total_cost']
-    #generate the graph of the source community
-    greeter.generate_louvain_community_graph(sequence[0])   
-    #generate all the possible path between the soruce node and the border nodes that point to the next community
-    str_target = '[' + ",".join('"'  + str(x) + '"' for x in choice['bk2.id_0'].unique()) + ']'
-    df_source = pd.DataFrame(greeter.routing_source_targets(source,str_target), columns = ['source', 'border', 'r.path_cost_s', 'cost'])
-    df_source['r.path_cost_s'] = df_source['r.path_cost_s'].apply(str)
-    choice = pd.merge(df_source,choice,left_on=  ['border'],right_on= ['bk2.id_0'],how='outer')
-    #generate the graph of the target community
-    greeter.generate_louvain_community_graph(sequence[-1])
-    #generate all the possible path between the target node and the border nodes that comes from the previous community
-    str_source = '[' + ",".join('"'  + str(x) + '"' for x in choice['bk3.id_'+ str(len(sequence)-2)].unique()) + ']'
-    df_target = pd.DataFrame(greeter.routing_sources_target(str_source,target), columns = ['border', 'target', 'r.path_cost_t', 'cost_t']) 
-    choice = pd.merge(df_target,choice,left_on=  ['border'],right_on= ['bk3.id_'+ str(len(sequence)-2)],how='outer',
-                      suffixes = ['_target',''])
-    #find the total cost of the path
-    choice['total_cost'] = choice['total_cost'] + choice['cost'] + choice['cost_t']
-    path = []
-    for x in literal_eval(choice.sort_values(by=['total_cost']).iloc[0,:]['r.path_cost_s']):
-            path.append(x)
-    for i in range(1,len(sequence)-1):
-        for x in literal_eval(choice.sort_values(by=['total_cost']).iloc[0,:]['r.path_cost_' + str(i)]):
-            if x != path[-1:]:
-                path.append(x)
-        if i == len(sequence)-2:
-            path.append(choice.sort_values(by=['total_cost']).iloc[0,:]['bk3.id_'+str(i)].replace('"',''))
-    for x in choice.sort_values(by=['total_cost']).iloc[0,:]['r.path_cost_t']:
-        if x != path[-1:]:
-            path.append(x)
+    result = overlay.route(spec, source, target)
+    if result is None:
+        raise RuntimeError("The target cannot be reached from the source")
+    path = result['nodes']
     dic= {}
     dic['exec_time']=time.time() - start_time
+    dic['preparation_time']=preparation_time
+    dic['total_time']=time.time() - total_start_time
+    dic['stored_border_costs']=stored
     dic['hops']=len(path)
     #visualization of the path
     if (boolMap):
-        coordinates = greeter.get_coordinates(final_path = str(path))
-        k = fo.Map(location=[coordinates[0][0][0][0], coordinates[0][0][0][1]], zoom_start=13)
-        if len(coordinates[0][0]) == 0:
-                print('\nNo result for query')
+        coordinates = greeter.attributes(spec['routes']).path_coordinates(path)
+        if len(coordinates) == 0:
+            print('\nNo result for query')
         else:
-            fo.PolyLine(coordinates[0][0], color="red", weight=5).add_to(k)
+            k = fo.Map(location=list(coordinates[0]), zoom_start=13)
+            fo.PolyLine(coordinates, color="red", weight=5).add_to(k)
             k.save(file +'.html')
-    #evaluation of the path
-    pairs = []
-    for i in range(0,len(path)-1):
-        pairs.append([path[i],path[i+1]])
-    ev = greeter.evaluate_path_metrics(pairs = str(pairs))
     dic['source'] = source
     dic['target'] = target
-    dic['cost'] = ev[0][0]
-    dic['danger']= ev[0][1]
-    dic['distance']= ev[0][2]
-    dic['#crossings']= greeter.count_crossings(pairs = str(pairs))[0][0]
-    dic['#communities']= greeter.count_communities(pairs = str(pairs))[0][0]
-    #dic['pairs'] = pairs
-    greeter.drop_all_projections()
+    dic['cost'] = result['cost']
+    dic['danger']= result['danger']
+    dic['distance']= result['distance']
+    dic['#crossings']= result['crossings']
+    dic['#communities']= result['communities']
     return dic
 
+def poi_partial_route(distance, foot = False):
+    """partial route between a point of interest and its nearest junction, at the speed of safetyRules: the
+       danger of the way to the point of interest is not known, so its exposure is 0"""
+    speed = safetyRules.FOOTWAY_SPEED if foot else safetyRules.CYCLEWAY_SPEED
+    return {'distance': float(distance), 'travel_time': float(distance) * 3.6 / speed, 'exposure': 0.0}
+
+
+def add_partial_routes(metrics, *partials):
+    """metrics of a path between two junctions with the partial routes from the source to the first junction and
+       from the last one to the destination added to its distance, length, travel time and exposure"""
+    result = dict(metrics)
+    for partial in partials:
+        for key, partial_key in [('distance', 'distance'), ('length', 'distance'), ('travel_time', 'travel_time'),
+                                 ('exposure', 'exposure')]:
+            if key in result:
+                result[key] += partial[partial_key]
+    return result
+
 def routing_old_way(greeter,source,target,boolMap=False,file=''):
     start_time = time.time()
     result = greeter.routing_old_style(source,target)
@@ -587,39 +374,31 @@ def routing_old_way(greeter,source,target,boolMap=False,file=''):
     dic= {}
     dic['exec_time']=time.time() - start_time
     dic['hops']=len(final_path)
+    attributes = greeter.attributes(('BIKE_ROUTE',))
     if (boolMap):
         #visualization of the path
-        coordinates = greeter.get_coordinates(final_path = str(final_path))
-        m = fo.Map(location=[coordinates[0][0][0][0], coordinates[0][0][0][1]], zoom_start=13)
-        if len(coordinates[0][0]) == 0:
+        coordinates = attributes.path_coordinates(final_path)
+        if len(coordinates) == 0:
                 print('\nNo result for query')
         else:
-            fo.PolyLine(coordinates[0][0], color="green", weight=5).add_to(m)
+            m = fo.Map(location=list(coordinates[0]), zoom_start=13)
+            fo.PolyLine(coordinates, color="green", weight=5).add_to(m)
             m.save(file + '.html')
     #evaluation of the path
-    pairs = []
-    for i in range(0,len(final_path)-1):
-        pairs.append([final_path[i],final_path[i+1]])
-    ev = greeter.evaluate_path_metrics(pairs = str(pairs))
+    ev = attributes.path_metrics(final_path)
     dic['source'] = source
     dic['target'] = target
-    dic['cost'] = ev[0][0]
-    dic['danger']= ev[0][1]
-    dic['distance']= ev[0][2]
-    dic['#crossings']= greeter.count_crossings(pairs = str(pairs))[0][0]
-    dic['#communities']= greeter.count_communities(pairs = str(pairs))[0][0]
+    dic['cost'] = ev['cost']
+    dic['danger']= ev['danger']
+    dic['distance']= ev['distance']
+    dic['#crossings']= ev['crossings']
+    dic['#communities']= ev['communities']
     greeter.drop_all_projections()
     return dic
 
 def read_file(path):
     """Read the file at the specified path"""
-    f = open(path)
-    fjson = json.load(f)
-    df = pd.DataFrame(fjson['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:3035')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path)
 
 
 def replace_ids(l):
@@ -747,6 +526,17 @@ def add_options():
     parser.add_argument('--mapName', '-mn', dest='mapName', type=str,
                         help="""Insert the name of the file containing the map with the computed path.""",
                         required=True)
+    parser.add_argument('--profile', '-pr', dest='profile', type=str, choices=sorted(Cost_profiles.PROFILES),
+                        help="""Route in memory with the costs of a profile (see Cost_profiles), without projections.""",
+                        required=False)
+    parser.add_argument('--beta', '-b', dest='beta', type=float,
+                        help="""Insert the importance of the travel time on the cost of the profile, between 0 and 1.""",
+                        required=False)
+    parser.add_argument('--pareto', dest='pareto', action='store_true',
+                        help="""Give all the Pareto-optimal routes over travel time and danger instead of the best one.""")
+    parser.add_argument('--epsilon', '-e', dest='epsilon', type=float,
+                        help="""Insert the relative difference under which two Pareto-optimal routes are the same.""",
+                        required=False, default=0.0)
     return parser
 
 
@@ -771,8 +561,15 @@ def main(args=None):
         graph_projection = "foot_routes"
         foot = True
     elif options.mode == 'community':
-        result = routing_with_communities(greeter,options.source,options.dest,True,options.mapName)
+        spec = None
+        if options.profile:
+            spec = Cost_profiles.profile(options.profile, routes=('BIKE_ROUTE',), beta=options.beta)
+        result = routing_with_communities(greeter,options.source,options.dest,True,options.mapName,spec)
+        if not result['stored_border_costs']:
+            print("the costs between the border nodes were computed, run Partitioner.py with this profile to store them")
+        print("preparation time:" + str(result['preparation_time']))
         print("execution time:" + str(result['exec_time']))
+        print("total time:" + str(result['total_time']))
         print("number of hops:" + str(result['hops']))
         print("total cost:" + str(result['cost']))
         print("average danger:" + str(result['danger']))
@@ -795,7 +592,7 @@ def main(args=None):
         if options.source != '':
             result = greeter.get_the_nearest_junction_to_POI(options.source,foot)
             print(result)
-            distance_source = result[0][0]
+            partial_source = poi_partial_route(result[0][0], foot)
             source_osmid = result[0][1]
         else:
             print("SOURCE INFORMATION ARE REQUIRED")
@@ -804,7 +601,7 @@ def main(args=None):
         if options.lon != '':
             result = greeter.get_the_nearest_junction_to_coordinates(options.lat, options.lon, foot)
             print(result)
-            distance_source = result[0][0]
+            partial_source = result[0][2]
             source_osmid = result[0][1]
         else:
             print("SOURCE INFORMATION ARE REQUIRED")
@@ -815,7 +612,7 @@ def main(args=None):
         if options.dest != '':
             result = greeter.get_the_nearest_junction_to_POI(options.dest,foot)
             print(result)
-            distance_dest = result[0][0]
+            partial_dest = poi_partial_route(result[0][0], foot)
             dest_osmid = result[0][1]
         else:
             print("DESTINATION INFORMATION ARE REQUIRED")
@@ -824,36 +621,60 @@ def main(args=None):
         if options.lon_dest != '':
             result = greeter.get_the_nearest_junction_to_coordinates(options.lat_dest, options.lon_dest, foot)
             print(result)
-            distance_dest = result[0][0]
+            partial_dest = result[0][2]
             dest_osmid = result[0][1]
         else:
             print("DESTINATION INFORMATION ARE REQUIRED")
             raise RuntimeError("Wrong parameter value")
-    print(distance_source,source_osmid,distance_dest,dest_osmid)
+    print(partial_source['distance'],source_osmid,partial_dest['distance'],dest_osmid)
+    if options.profile or options.pareto:
+        """Routing with the costs of the profile computed at query time, nothing is written in the database"""
+        profile_name = options.profile or ('foot' if foot else 'bike')
+        spec = Cost_profiles.profile(profile_name, beta=options.beta)
+        profiles = Cost_profiles.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+        table = profiles.route_table(spec['routes'])
+        profiles.close()
+        if options.pareto:
+            """All the tradeoffs between travel time and danger with one search"""
+            for result in Pareto.pareto_routes(table, spec, source_osmid, dest_osmid, options.epsilon):
+                result = add_partial_routes(result, partial_source, partial_dest)
+                print('Travel time in minutes: ' + str(result['travel_time']/60) + ', danger by meter: ' +
+                      str(result['danger']) + ', crossings: ' + str(result['crossings']) + ', length in meters: ' +
+                      str(result['distance']) + ', danger exposure: ' + str(result['exposure']))
+            return 0
+        result = Cost_profiles.route(table, spec, source_osmid, dest_osmid)
+        if result is None:
+            raise RuntimeError("The destination cannot be reached with the profile " + profile_name)
+        result = add_partial_routes(result, partial_source, partial_dest)
+        print('cost:')
+        print(result['cost'])
+        print('number of hops:')
+        print(len(result['nodes']))
+        print('Length in meters:')
+        print(result['distance'])
+        print('Average danger:')
+        print(result['danger'])
+        print('Total travel time in minutes:')
+        print(result['travel_time']/60)
+        print('Number of crossings:')
+        print(result['crossings'])
+        print('Danger exposure:')
+        print(result['exposure'])
+        return 0
     #create graph projections
     graph_name = greeter.create_projections(options.mode, options.weight)
+    route_types = PROJECTION_ROUTES['foot_routes' if foot else 'bike_routes']
     if options.weight == "cost" or options.weight == "travel_time":
         """Routing considering as weight the cost"""
         result_routing_cost = greeter.routing_algorithm(source_osmid, dest_osmid, graph_projection+"_"+options.weight,options.weight, options.alg )
         print("Find the best path between your source location and the target location, considering the travel time needed and the level of security of the paths used : done")
         print(result_routing_cost[0][1])
         listNodes = result_routing_cost[0][3]
-        rels= []
-        for l in range(0,len(listNodes)-1):
-            rels.append((listNodes[l],listNodes[l+1]))
-        length = 0
-        danger = 0
-        time = 0
-        for r in rels:
-            result = greeter.evaluate_path(r[0],r[1])
-            if result[0][0]:
-                length = length + float(result[0][0])
-            if result[0][1]:
-                danger = danger + result[0][1]
-            if result[0][2]:
-                speed = result[0][2]/3.6
-            time = length/speed
-        danger = danger / len(rels)
+        metrics = add_partial_routes(greeter.attributes(route_types).path_metrics(listNodes), partial_source,
+                                     partial_dest)
+        length = metrics['length']
+        danger = metrics['danger']
+        time = metrics['travel_time']
         """Generation of the map with the obtained paths displayed"""
         creation_map(result_routing_cost, options.mapName)
         print("Creation of the map with the two paths drawn on it : done ")
@@ -875,22 +696,11 @@ def main(args=None):
             """Find the best path between your source location and the target location,
             considering the travel time needed and the level of security of the paths used : done""")
         listNodes = result_routing_cost[0][3]
-        rels= []
-        for l in range(0,len(listNodes)-1):
-            rels.append((listNodes[l],listNodes[l+1]))
-        length = 0
-        danger = 0
-        time = 0
-        for r in rels:
-            result = greeter.evaluate_path(r[0],r[1])
-            if result[0][0]:
-                length = length + float(result[0][0])
-            if result[0][1]:
-                danger = danger + result[0][1]
-            if result[0][2]:
-                speed = result[0][2]/3.6
-            time = length/speed
-        danger = danger / len(rels)
+        metrics = add_partial_routes(greeter.attributes(route_types).path_metrics(listNodes), partial_source,
+                                     partial_dest)
+        length = metrics['length']
+        danger = metrics['danger']
+        time = metrics['travel_time']
         print('cost:')
         print(result_routing_cost[0][2])
         print('number of hops:')
@@ -906,22 +716,11 @@ def main(args=None):
         print(
             "Find the best path between your source location and the target location, considering only the travel time needed : done")
         listNodes = result_routing_travel_time[0][3]
-        rels= []
-        for l in range(0,len(listNodes)-1):
-            rels.append((listNodes[l],listNodes[l+1]))
-        length = 0
-        danger = 0
-        time = 0
-        for r in rels:
-            result = greeter.evaluate_path(r[0],r[1])
-            if result[0][0]:
-                length = length + float(result[0][0])
-            if result[0][1]:
-                danger = danger + result[0][1]
-            if result[0][2]:
-                speed = result[0][2]/3.6
-            time = length/speed
-        danger = danger / len(rels)
+        metrics = add_partial_routes(greeter.attributes(route_types).path_metrics(listNodes), partial_source,
+                                     partial_dest)
+        length = metrics['length']
+        danger = metrics['danger']
+        time = metrics['travel_time']
         print('cost:')
         print(result_routing_travel_time[0][2])
         print('number of hops:')
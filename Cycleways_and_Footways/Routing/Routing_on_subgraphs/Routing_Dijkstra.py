@@ -9,13 +9,18 @@ import osmnx as ox
 from shapely import wkt
 import pandas as pd
 import geopandas as gpd
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import geoFiles
+import poiIndex
 
 """In this file we perform routing on projections using Dijkstra"""
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -48,21 +53,27 @@ class App:
 
     
     
+    def find_destination(self, dest):
+        """osm id of the point of interest best matching the name dest, from the index of poiIndex"""
+        result = poiIndex.find(self.driver, dest)
+        if not result:
+            raise RuntimeError("No point of interest named " + str(dest))
+        return result[0]['id']
+
     def routing_algorithm_based_on_cost(self, lat, lon, dest, projection):
         """Routing considering as weight the cost, which is a tradeoff between the travel time and
            the safety of the path
         """
         with self.driver.session() as session:
             print(dest)
-            result = session.write_transaction(self._routing_algorithm_based_on_cost, lat, lon, dest, projection)
+            result = session.write_transaction(self._routing_algorithm_based_on_cost, lat, lon, self.find_destination(dest), projection)
             return result
 
     
     @staticmethod
     def _routing_algorithm_based_on_cost(tx, lat, lon, dest, projection):
         result = tx.run("""
-                MATCH(t:Tag)<-[:TAGS]-(poi:PointOfInterest)-[:MEMBER]->(osm:OSMWayNode) 
-                where t.name =  $dest 
+                MATCH (poi:PointOfInterest {osm_id: $dest})-[:MEMBER]->(osm:OSMWayNode)
                 with osm CALL spatial.withinDistance('spatial', osm, 0.01) yield node unwind(node) as n 
                 match(j:Junction) where j.id = n.id and n:Junction  with collect(j)[0] as target 
                 with target call spatial.withinDistance('spatial', point({latitude:$lat, longitude:$lon}), 0.01) 
@@ -90,15 +101,14 @@ class App:
     def routing_algorithm_based_on_travel_time(self, lat, lon, dest, projection):
         """Routing considering as weight just the travel time"""
         with self.driver.session() as session:
-            result = session.write_transaction(self._routing_algorithm_based_on_travel_time, lat, lon, dest, projection)
+            result = session.write_transaction(self._routing_algorithm_based_on_travel_time, lat, lon, self.find_destination(dest), projection)
             return result
 
     
     @staticmethod
     def _routing_algorithm_based_on_travel_time(tx, lat, lon, dest, projection):
         result = tx.run("""
-                MATCH(t:Tag)<-[:TAGS]-(poi:PointOfInterest)-[:MEMBER]->(osm:OSMWayNode) 
-                where t.name =  $dest 
+                MATCH (poi:PointOfInterest {osm_id: $dest})-[:MEMBER]->(osm:OSMWayNode)
                 with osm CALL spatial.withinDistance('spatial', osm, 0.01) yield node unwind(node) as n 
                 match(j:Junction) where j.id = n.id and n:Junction  with collect(j)[0] as target 
                 with target call spatial.withinDistance('spatial', point({latitude:$lat, longitude:$lon}), 0.01) 
@@ -125,13 +135,7 @@ class App:
 
 def read_file(path):
     """Read the file at the specified path"""
-    f = open(path)
-    fjson = json.load(f)
-    df = pd.DataFrame(fjson['data'])
-    df['geometry'] = df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(df, crs='epsg:3035')
-    gdf.drop('index', axis=1, inplace=True)
-    return gdf
+    return geoFiles.read_gdf(path)
 
 
 def replace_ids(l):
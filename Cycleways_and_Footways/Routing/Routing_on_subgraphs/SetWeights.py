@@ -5,12 +5,18 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import safetyRules
 
-"""In this file we are going to show how to set weights on subgraphs' relationships"""
+"""In this file we are going to show how to set weights on subgraphs' relationships.
+   The routes keep their raw travel_time and danger, the cost is computed at query time for a routing
+   profile by Cost_profiles"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -22,7 +28,7 @@ class App:
             return result
 
     @staticmethod
-    def _set_relations_weights(tx, beta):    
+    def _set_relations_weights(tx):
         tx.run("""
                 match (b:BikeJunction)-[r:BIKE_ROUTE]-(b2:BikeJunction) 
                 match (b)<-[:CONTAINS]-(bl:BicycleLane)-[:CONTAINS]->(b2)
@@ -47,14 +53,6 @@ class App:
         tx.run("""MATCH (bl:BicycleLane)-[:CONTAINS]->(bk:BikeJunction)-[r:BIKE_ROUTE]-(bk1:BikeJunction)<-[:CONTAINS]-(bl1:BicycleLane)
                 where not exists(r.danger) set r.danger = round((bl.danger + bl1.danger)/2,0,'UP')""")
         """---------------------------Footways-------------------------------"""
-        tx.run("""match (f:Footway) 
-                  where not  f.highway in ['path','pedestrian','footway','track','steps'] 
-                   and not "BicycleLane" in labels(f) 
-                   set f.danger = 3""")
-        tx.run("""match (f:Footway) 
-                  where f.highway in ['path','pedestrian','footway','track','steps']
-                  and not "BicycleLane" in labels(f)
-                  set f.danger = 1""")
         tx.run("""
                 match (b:FootJunction)-[r:FOOT_ROUTE]-(b2:FootJunction) 
                 match (b)<-[:CONTAINS]-(bl:Footway)-[:CONTAINS]->(b2)
@@ -70,7 +68,7 @@ class App:
         #        match (b)<-[:CONTAINS]-(bl:Footway)-[:CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD]-(bl2:Footway)-[:CONTAINS]->(b2)
         #        where bl.osm_id <> bl2.osm_id
         #        set r.danger = round(toFloat(bl.danger + bl2.danger)/2,0,'UP') + 15 """)
-		"""relazioni tra footway e bicyclelane in termini di sicurezza da rivedere"""
+        """relazioni tra footway e bicyclelane in termini di sicurezza da rivedere"""
         #tx.run("""
         #        match (b:FootJunction)-[r:FOOT_ROUTE]->(b2:BikeJunction) 
         #        set r.danger = 3 """)
@@ -85,25 +83,25 @@ class App:
         #          set r.danger = round(toFloat(bl1.danger+bl.danger)/2.0,0,'UP')""")
 
         tx.run("""
-                match(n)-[r:BIKE_ROUTE]-(n1) set r.speed = 15;
-                """)
+                match(n)-[r:BIKE_ROUTE]-(n1) set r.speed = $speed;
+                """, speed=safetyRules.CYCLEWAY_SPEED)
     
         tx.run("""
-                MATCH(n)-[r:FOOT_ROUTE]->(n1) set r.speed = 4;
-                """)
+                MATCH(n)-[r:FOOT_ROUTE]->(n1) set r.speed = $speed;
+                """, speed=safetyRules.FOOTWAY_SPEED)
     
   
         tx.run("""
                 MATCH(bl:BicycleLane)-[:CONTINUE_ON_LANE_BY_CROSSING_ROAD]->(bl1:BicycleLane) with bl, bl1 
                 MATCH(bl)-[:CONTAINS]-(bk)-[r:BIKE_ROUTE]->(bk1)<-[:CONTAINS]-(bl1) 
-                set r.speed = 4;
-                """)
+                set r.speed = $speed;
+                """, speed=safetyRules.FOOTWAY_SPEED)
     
         tx.run("""
                 MATCH(n1)-[r:BIKE_ROUTE]->(n2) set r.travel_time = (r.distance * 3.6) /r.speed;
                 """)
 
-        tx.run("""
+        result = tx.run("""
                 MATCH(n1)-[r:FOOT_ROUTE]->(n2) set r.travel_time = (r.distance * 3.6) /r.speed;                
                 """)
         return result.values()
@@ -123,9 +121,6 @@ def add_options():
     parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
                         help="""Insert the password of the local neo4j instance.""",
                         required=True)
-    parser.add_argument('--beta', '-b', dest='beta', type=float,
-                        help="""Insert the beta parameter between 0 and 1. The value represent the importance of travel time on the final cost.""",
-                        required=False, default = 0.5)
    
     return parser
 
@@ -135,12 +130,9 @@ def main(args=None):
     argParser = add_options()
     options = argParser.parse_args(args=args)
     greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
-    if(oprions.beta > 1 or options.beta < 0):
-        print("The beta parameter value is not valid, 0.5 will be used")
-        options.beta = 0.5
 
     """Set weights on subgraphs' relationshps"""
-    greeter.set_relations_weights(options.beta)
+    greeter.set_relations_weights()
     print("Setting the relationships weight for the routing : done")
 
 
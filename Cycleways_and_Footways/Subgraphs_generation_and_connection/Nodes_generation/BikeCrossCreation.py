@@ -4,12 +4,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how subgraph cycleways layer nodes are generated"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -167,29 +171,7 @@ class App:
 
     def import_bikecrosses_into_spatial_layer(self):
         """Import subgraph cycleways layer nodes in a Neo4j Spatial Layer"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_bikecrosses_into_spatial_layer)
-            return result
-
-    
-    @staticmethod
-    def _import_bikecrosses_into_spatial_layer(tx):
-        tx.run("""
-                match (n:BikeCross)
-                CALL spatial.addNode('spatial', n) yield node return node;
-                """)
-
-        tx.run("""
-                match (n:BikeJunction)
-                CALL spatial.addNode('spatial', n) yield node return node; 
-                """)
-
-        result = tx.run("""
-                match (n:BikeRoad)
-                CALL spatial.addNode('spatial', n) yield node return node;
-                """)
-
-        return result.values()        
+        return sum(spatialIndex.index_nodes(self.driver, label) for label in ['BikeCross', 'BikeJunction', 'BikeRoad'])
 
 
 
@@ -5,12 +5,16 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
 """In this file we are going to show how subgraph footways layer nodes are generated"""
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -173,29 +177,8 @@ class App:
 
     def import_footcrosses_into_spatial_layer(self):
         """Import subgraph footways layer nodes in a Neo4j Spatial Layer"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_footcrosses_into_spatial_layer)
-            return result
-
-    
-    @staticmethod
-    def _import_footcrosses_into_spatial_layer(tx):
-        tx.run("""
-                match(n:FootCross) where not "BikeNode" in labels(n)
-                CALL spatial.addNode('spatial', n) yield node return node; 
-                """)
-
-        tx.run("""
-                match(n:FootJunction) where not "BikeNode" in labels(n) 
-                CALL spatial.addNode('spatial', n) yield node return node; 
-                """)
-
-        result = tx.run("""
-                match(n:FootRoad) where not "BikeNode" in labels(n)  
-                CALL spatial.addNode('spatial', n) yield node return node;
-                """)
-
-        return        
+        return sum(spatialIndex.index_nodes(self.driver, label, 'NOT "BikeNode" in labels(n)')
+                   for label in ['FootCross', 'FootJunction', 'FootRoad'])
 
 
 
@@ -2,6 +2,9 @@ import osmnx as ox
 import argparse
 from neo4j import GraphDatabase
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
 
 """In this file we are going to show how to generate nodes representing the street nodes within 
    cycleways and crossings
@@ -9,7 +12,7 @@ import os
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -5,94 +5,121 @@ import json
 import argparse
 import os
 import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+import driverRegistry
+import spatialIndex
 
-"""In this file we are going to show how to connect the cycleways layer with the footways layer"""
+"""In this file we are going to show how to connect the cycleways layer with the footways layer.
+   The nodes of different layers at the same location are found in Python with a hash join on their coordinates
+   (spatialIndex.same_location_pairs) instead of comparing the locations of all the pairs of nodes in Cypher
+"""
+
+BATCH_SIZE = 10000
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
 
-    def connect_junctions_of_different_layers(self):
-        """Connect different layers subgraph nodes"""
+    def get_locations(self, label, where=None):
+        """(internal id, longitude, latitude) of the nodes of label with a location"""
         with self.driver.session() as session:
-            result = session.write_transaction(self._connect_junctions_of_different_layers)
+            result = session.read_transaction(self._get_locations, label, where)
             return result
 
     @staticmethod
-    def _connect_junctions_of_different_layers(tx):
-        tx.run("""
-                MATCH (bk:BikeCross), (fc:FootCross) WHERE bk.location = fc.location
-                with bk, fc
-                MERGE (bk)-[r:IS_THE_SAME]->(fc) ON CREATE SET r.distance=0;
-                """)
-
-        tx.run("""
-                MATCH(bk:BikeCross)-[:IS_THE_SAME]->(fc:FootCross) with bk, fc
-                MERGE (fc)-[r:IS_THE_SAME]->(bk) ON CREATE SET r.distance=0;
-                """)
-
-        tx.run("""
-                MATCH (bk:BikeCross), (fc:JunctionFootCross) WHERE bk.location = fc.location
-                with bk, fc
-                MERGE (bk)-[r:IS_THE_SAME]->(fc) ON CREATE SET r.distance=0;
+    def _get_locations(tx, label, where):
+        result = tx.run("""
+                MATCH (n:""" + label + """) WHERE n.location IS NOT NULL""" + ("" if where is None else " AND " + where) + """
+                RETURN id(n), n.location.longitude, n.location.latitude
                 """)
+        return result.values()
 
-        tx.run("""
-                MATCH(bk:BikeCross)-[r:IS_THE_SAME]->(fc:JunctionFootCross) with bk, fc
-                MERGE (fc)-[r:IS_THE_SAME]->(bk) ON CREATE SET r.distance=0;
-                """)
+    def write_batches(self, function, rows):
+        """run the transaction function on each batch of rows"""
+        for start in range(0, len(rows), BATCH_SIZE):
+            with self.driver.session() as session:
+                session.write_transaction(function, rows[start:start + BATCH_SIZE])
 
-        tx.run("""
-                MATCH(bk:BikeCross)-[r:IS_THE_SAME]->(fc:JunctionFootCross) remove bk:BikeCross
-                set bk:JunctionBikeCross;
-                """)
+    @staticmethod
+    def _create_is_the_same(tx, rows):
+        result = tx.run("""
+                UNWIND $rows AS row MATCH (a) WHERE id(a) = row[0] MATCH (b) WHERE id(b) = row[1]
+                MERGE (a)-[r:IS_THE_SAME]->(b) ON CREATE SET r.distance=0
+                MERGE (b)-[r1:IS_THE_SAME]->(a) ON CREATE SET r1.distance=0;
+                """, rows=rows)
+        return result.values()
 
-        tx.run("""
-                MATCH (bk:JunctionBikeCross), (fc:JunctionFootCross) WHERE bk.location = fc.location
-                with bk, fc
-                MERGE (bk)-[r:IS_THE_SAME]->(fc) ON CREATE SET r.distance=0;
-                """)
+    @staticmethod
+    def _bikecross_to_junctionbikecross(tx, rows):
+        result = tx.run("""
+                UNWIND $rows AS i MATCH (bk:BikeCross) WHERE id(bk) = i remove bk:BikeCross set bk:JunctionBikeCross;
+                """, rows=rows)
+        return result.values()
 
+    @staticmethod
+    def _footcross_to_junctionfootcross(tx, rows):
         result = tx.run("""
-                MATCH(bk:JunctionBikeCross)-[:IS_THE_SAME]->(fc:JunctionFootCross) with bk, fc
-                MERGE (fc)-[r:IS_THE_SAME]->(bk) ON CREATE SET r.distance=0;
-                """)
+                UNWIND $rows AS i MATCH (fc:FootCross) WHERE id(fc) = i remove fc:FootCross set fc:JunctionFootCross;
+                """, rows=rows)
+        return result.values()
 
+    @staticmethod
+    def _delete_nodes(tx, rows):
+        result = tx.run("""
+                UNWIND $rows AS i MATCH (n) WHERE id(n) = i detach delete n;
+                """, rows=rows)
         return result.values()
 
+    def connect_junctions_of_different_layers(self, tolerance=spatialIndex.SAME_LOCATION_TOLERANCE):
+        """Connect different layers subgraph nodes at the same location (within tolerance meters), the nodes
+           are matched with spatialIndex.same_location_pairs"""
+        bike_crosses = self.get_locations('BikeCross')
+        foot_crosses = self.get_locations('FootCross')
+        junction_foot_crosses = self.get_locations('JunctionFootCross')
+        junction_bike_crosses = self.get_locations('JunctionBikeCross')
+
+        pairs = spatialIndex.same_location_pairs(bike_crosses, foot_crosses, tolerance)
+        junction_pairs = spatialIndex.same_location_pairs(bike_crosses, junction_foot_crosses, tolerance)
+        self.write_batches(self._create_is_the_same, pairs + junction_pairs)
+
+        """BikeCross nodes at the same location of a JunctionFootCross become JunctionBikeCross"""
+        relabelled = sorted({bk for bk, _ in junction_pairs})
+        self.write_batches(self._bikecross_to_junctionbikecross, relabelled)
+        relabelled = set(relabelled)
+        junction_bike_crosses = junction_bike_crosses + [bk for bk in bike_crosses if bk[0] in relabelled]
+
+        pairs = spatialIndex.same_location_pairs(junction_bike_crosses, junction_foot_crosses, tolerance)
+        self.write_batches(self._create_is_the_same, pairs)
+        return len(pairs)
 
 
-    def delete_roadjunctions_with_same_location_of_footcrosses(self):
+    def delete_roadjunctions_with_same_location_of_footcrosses(self, tolerance=spatialIndex.SAME_LOCATION_TOLERANCE):
         """Delete RoadBikeJunction nodes that are mapped as the same elements of FootCross and JunctionFootCross nodes"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._delete_roadjunctions_with_same_location_of_footcrosses)
-            return result
+        road_junctions = self.get_locations('RoadBikeJunction')
 
+        foot_crosses = self.get_locations('FootCross', "exists((n)-[:IS_CONTAINED]->(:Footway))")
+        relabelled = sorted({fc for fc, _ in spatialIndex.same_location_pairs(foot_crosses, road_junctions, tolerance)})
+        self.write_batches(self._footcross_to_junctionfootcross, relabelled)
 
-    @staticmethod
-    def _delete_roadjunctions_with_same_location_of_footcrosses(tx):
+        junction_foot_crosses = self.get_locations('JunctionFootCross', "exists((n)-[:IS_CONTAINED]->())")
+        deleted = sorted({rj for _, rj in spatialIndex.same_location_pairs(junction_foot_crosses, road_junctions,
+                                                                          tolerance)})
+        self.write_batches(self._delete_nodes, deleted)
 
-        tx.run("""
-                MATCH(fc:FootCross)-[:IS_CONTAINED]->(f:Footway) with fc MATCH(rj:RoadBikeJunction) 
-                where rj.location = fc.location remove fc:FootCross set fc:JunctionFootCross;
-                """)
+        with self.driver.session() as session:
+            session.write_transaction(self._delete_junctionbikecrosses_not_contained)
 
-                
-        tx.run("""
-                MATCH(jfc:JunctionFootCross)-[:IS_CONTAINED]->(n) with jfc MATCH(rj:RoadBikeJunction) 
-                where rj.location = jfc.location detach delete rj;
-                """)
-                
+    @staticmethod
+    def _delete_junctionbikecrosses_not_contained(tx):
         tx.run("""
                 MATCH(jbc:JunctionBikeCross)-[:IS_THE_SAME]->(jfc:JunctionFootCross) where not
                 exists((jbc)-[:IS_CONTAINED]-()) detach delete jbc;
                 """)
 
-                
-
 
 
     def change_labels(self):
@@ -151,6 +178,9 @@ def add_options():
     parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
                         help="""Insert the password of the local neo4j instance.""",
                         required=True)
+    parser.add_argument('--tolerance', '-t', dest='tolerance', type=float,
+                        help="""Insert the distance in meters under which two junctions are at the same location.""",
+                        required=False, default=spatialIndex.SAME_LOCATION_TOLERANCE)
     return parser
 
 
@@ -161,11 +191,11 @@ def main(args=None):
     greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
 
     """Connect different layers through their subgraphs"""
-    greeter.connect_junctions_of_different_layers()
+    greeter.connect_junctions_of_different_layers(options.tolerance)
     print("Connect junctions of different layers : done")
 
     """Delete RoadBikeJunction nodes that are mapped as the same elements of FootCross and JunctionFootCross nodes"""
-    greeter.delete_roadjunctions_with_same_location_of_footcrosses()
+    greeter.delete_roadjunctions_with_same_location_of_footcrosses(options.tolerance)
     print("Delete the road junctions that have the same location of footways that are not linked to cycleways : done")
 
     """Add the label Junction to all the subgraph nodes"""
@@ -11,11 +11,14 @@ import Nodes_generation.JunctionFootCrossCreation
 import Nodes_generation.FootCrossCreation
 
 import Relationships_generation.ConnectDifferentLayersJunctions
+import Subgraph_builder
 import sys
 
 sys.path.insert(1, '../routing')
 import Routing_on_subgraphs.GraphProjections
 import Routing_on_subgraphs.SetWeights
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
 
 """In this file we are going to show how to generate different layers' subgraphs"""
 
@@ -52,22 +55,45 @@ def add_options():
     parser.add_argument('--nameFileFootways', '-ff', dest='file_name_footways', type=str,
                         help="""Insert the name of the .json file containing the footways.""",
                         required=True)
+    parser.add_argument('--bulkLoad', dest='bulk_load', action='store_true',
+                        help="""Build the subgraphs in memory from the .graphml file and the .json files and load them
+                        with batched statements. The graph must not contain the subgraphs yet.""")
+    parser.add_argument('--importDir', '-i', dest='import_dir', type=str, default=None,
+                        help="""Insert the path of the neo4j import directory, used with --bulkLoad. By default
+                        it is asked to neo4j.""")
 
     return parser
 
 
 
 
-def main(args=None):
-    """Parsing parameters in input"""
-    argParser = add_options()
-    options = argParser.parse_args(args=args)
+def bulk_load_subgraphs(options):
+    """Generation of cycleways and footways subgraphs with Subgraph_builder, then their spatial layers"""
 
-    """The main function can be split in two section : 1) generation of nodes and relationships; 
-    2) generation of relationships between layers"""
+    print("Generation of cycleways and footways subgraphs nodes and relationships")
+    greeterBuilder = Subgraph_builder.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    path = options.import_dir
+    if path is None:
+        path = greeterBuilder.get_path()[0][0] + '\\' + greeterBuilder.get_import_folder_name()[0][0] + '\\'
+    greeterBuilder.build(path, options)
+    greeterBuilder.close()
+
+    greeterBK = Nodes_generation.BikeCrossCreation.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterBK.import_bikecrosses_into_spatial_layer()
+    greeterBK.close()
+    greeterFC = Nodes_generation.FootCrossCreation.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+    greeterFC.import_footcrosses_into_spatial_layer()
+    greeterFC.close()
+    print("junctions imported in the spatial layer")
 
+
+def generate_subgraphs(options):
     """SECTION 1: GENERATION OF NODES"""
 
+    if options.bulk_load:
+        bulk_load_subgraphs(options)
+        return
+
     """Generation of cycleways subgraph nodes and relationships"""
 
     print("Generation of cycleways subgraph nodes and relationships")
@@ -119,6 +145,8 @@ def main(args=None):
     greeterFC.close()
     print("Generation of cycleways subgraph nodes and relationships : done")
 
+
+def connect_subgraphs(options):
     """SECTION 2: CONNECTION OF SUBGRAPHS LAYERS"""
     greeterConnectionLayers = Relationships_generation.ConnectDifferentLayersJunctions.App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
     greeterConnectionLayers.connect_junctions_of_different_layers()
@@ -136,6 +164,21 @@ def main(args=None):
     greeterProj.create_projections()
     greeterProj.close()
 
+
+def main(args=None):
+    """Parsing parameters in input"""
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+
+    """The main function can be split in two section : 1) generation of nodes and relationships; 
+    2) generation of relationships between layers.
+    All the App objects of a section share the same driver and sessions"""
+
+    with driverRegistry.stage('subgraphs generation'):
+        generate_subgraphs(options)
+    with driverRegistry.stage('subgraphs connection'):
+        connect_subgraphs(options)
+
     return 0
 
 main()
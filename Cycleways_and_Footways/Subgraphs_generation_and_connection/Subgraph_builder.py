@@ -0,0 +1,302 @@
+import os
+import sys
+from collections import deque
+import networkx as nx
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import driverRegistry
+import geoFiles
+
+"""In this file we are going to build the cycleways and footways subgraphs in memory and load them in Neo4j
+with batched statements, instead of importing the street graph and joining it with Cypher.
+The street nodes and routes come from the graphml file, the elements containing them from the preprocessed
+datasets (cycleways or footways and crossing ways) and from the CrossNode nodes; the lists of street nodes
+of the elements are resolved through dictionaries.
+For each layer the subgraph has:
+   - the street nodes, with label <Prefix>Node and <Prefix>Crossing (in a crossing), <Prefix>Junction (in a
+     cycleway or footway) or <Prefix>Road (in none of them)
+   - the <PREFIX>_ROUTE relationships between them, in both directions
+   - the CONTAINS relationships from the elements to their street nodes
+   - the street nodes in no element that are road junctions are replaced by the RoadJunction node, their
+     routes become ROUTE relationships to and from it
+   - a CONTINUE_ON_*_BY_CROSSING_ROAD relationship between two elements whose street nodes are at most
+     DEPTH routes away, unless the elements are already at most DEPTH relationships away (CONTAINS, routes
+     and the CONTINUE_ON_* relationships of the general graph). The search is a bounded BFS.
+"""
+
+BATCH_SIZE = 10000
+DEPTH = 3
+
+BIKE = {'prefix': 'Bike', 'route': 'BIKE_ROUTE', 'element': 'BicycleLane',
+        'continue': 'CONTINUE_ON_LANE_BY_CROSSING_ROAD'}
+FOOT = {'prefix': 'Foot', 'route': 'FOOT_ROUTE', 'element': 'Footway',
+        'continue': 'CONTINUE_ON_FOOTWAY_BY_CROSSING_ROAD'}
+
+
+def read_street_graph(path):
+    """street nodes (id -> properties) and routes ((id, id) -> properties) of the graphml file. The routes are
+       in both directions, between two nodes only the shortest one is kept"""
+
+    G = nx.read_graphml(path)
+    nodes = {str(n): dict(data) for n, data in G.nodes(data=True)}
+    routes = {}
+    for u, v, data in G.edges(data=True):
+        distance = float(data.get('length') or 0)
+        key = (str(u), str(v))
+        if key not in routes or distance < routes[key]['distance']:
+            routes[key] = dict({k: v for k, v in data.items() if k != 'id'}, distance=distance, status='active')
+    for (u, v), data in list(routes.items()):
+        routes.setdefault((v, u), data)
+    return nodes, routes
+
+
+def _street_ids(values):
+    if not isinstance(values, (list, tuple)):
+        return []
+    return [str(int(v)) if isinstance(v, float) else str(v) for v in values]
+
+
+def element_nodes(records, label, key, value=lambda record: record['id']):
+    """(label, key property, value) of each element -> ids of its street nodes"""
+
+    return {(label, key, value(record)): _street_ids(record.get('nodes')) for record in records}
+
+
+def crossing_way_nodes(records):
+    return element_nodes(records, 'CrossWay', 'id_num', lambda record: 'crossway/' + str(record['id_num']))
+
+
+def crossing_node_nodes(rows):
+    """rows are (id_num, osm_id) of the CrossNode nodes, the street node is the OSM node of the crossing"""
+
+    return {('CrossNode', 'id_num', id_num): [osm_id.replace('node/', '')]
+            for id_num, osm_id in rows if isinstance(osm_id, str) and osm_id.startswith('node/')}
+
+
+def bounded_bfs(sources, neighbours, depth):
+    """nodes reached from sources with at most depth steps -> number of steps"""
+
+    reached = {source: 0 for source in sources}
+    queue = deque(sources)
+    while queue:
+        node = queue.popleft()
+        if reached[node] == depth:
+            continue
+        for other in neighbours(node):
+            if other not in reached:
+                reached[other] = reached[node] + 1
+                queue.append(other)
+    return reached
+
+
+def _adjacency(pairs):
+    adjacency = {}
+    for u, v in pairs:
+        adjacency.setdefault(u, set()).add(v)
+        adjacency.setdefault(v, set()).add(u)
+    return adjacency
+
+
+def crossing_road_pairs(elements, streets, element_links=(), depth=DEPTH):
+    """pairs of elements whose street nodes are from 1 to depth routes away (streets is the adjacency of the
+       street nodes) and that are not already at most depth relationships away, the pairs are sorted"""
+
+    node_elements = {}
+    for element, nodes in elements.items():
+        for node in nodes:
+            node_elements.setdefault(node, set()).add(element)
+    links = _adjacency(element_links)
+
+    def street(node):
+        return streets.get(node, ())
+
+    def relationships(item):
+        kind, value = item
+        if kind == 'node':
+            return [('node', n) for n in streets.get(value, ())] + \
+                [('element', e) for e in node_elements.get(value, ())]
+        return [('node', n) for n in elements.get(value, ())] + [('element', e) for e in links.get(value, ())]
+
+    pairs = set()
+    for element, nodes in elements.items():
+        reached = bounded_bfs([n for n in nodes if n in streets], street, depth)
+        candidates = {other for node in reached for other in node_elements.get(node, ())} - {element}
+        if not candidates:
+            continue
+        close = bounded_bfs([('element', element)], relationships, depth)
+        for other in candidates:
+            if ('element', other) not in close:
+                pairs.add(tuple(sorted([element, other])))
+    return sorted(pairs)
+
+
+def build_subgraph(layer, nodes, routes, elements, crossings, road_junctions=(), road_routes=(),
+                   element_links=(), depth=DEPTH):
+    """Subgraph of the layer (BIKE or FOOT).
+       nodes and routes are given by read_street_graph, elements and crossings map (label, key property, value)
+       to the ids of their street nodes, road_junctions are the ids of the RoadJunction nodes and road_routes
+       the (id, id) of the routes between them, element_links the pairs of elements already connected"""
+
+    prefix = layer['prefix']
+    contained = {}
+    contains = []
+    for kind, containers in (('element', elements), ('crossing', crossings)):
+        for container, street_nodes in containers.items():
+            for node in street_nodes:
+                if node in nodes:
+                    contains.append((container, node))
+                    contained.setdefault(node, set()).add(kind)
+
+    road_junctions = set(road_junctions)
+    subgraph_nodes = {}
+    for node, properties in nodes.items():
+        kinds = contained.get(node, set())
+        if not kinds and node in road_junctions:
+            continue
+        label = 'Crossing' if 'crossing' in kinds else 'Junction' if kinds else 'Road'
+        properties = dict(properties)
+        properties.update({'id': node, 'geometry': "POINT(" + str(properties.get('x')) + " " +
+                           str(properties.get('y')) + ")",
+                           'lat': float(properties['y']), 'lon': float(properties['x'])})
+        subgraph_nodes[node] = ([prefix + 'Node', prefix + label], properties)
+
+    subgraph_routes = []
+    to_road = []
+    for (u, v), properties in routes.items():
+        if u in subgraph_nodes and v in subgraph_nodes:
+            subgraph_routes.append((u, v, properties))
+        elif u in subgraph_nodes or v in subgraph_nodes:
+            to_road.append((u, v, properties['distance']))
+
+    streets = _adjacency(list(routes) + list(road_routes))
+    continue_pairs = crossing_road_pairs({e: [n for n in street_nodes if n in nodes]
+                                          for e, street_nodes in elements.items()},
+                                         streets, element_links, depth)
+    return {'nodes': subgraph_nodes, 'routes': subgraph_routes, 'road_routes': to_road, 'contains': contains,
+            'continue': continue_pairs}
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _group(rows, key):
+    groups = {}
+    for row in rows:
+        groups.setdefault(key(row), []).append(row)
+    return groups
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def run(self, query, **parameters):
+        with self.driver.session() as session:
+            return session.write_transaction(self._run, query, parameters)
+
+    @staticmethod
+    def _run(tx, query, parameters):
+        result = tx.run(query, **parameters)
+        return result.values()
+
+    def write_batches(self, query, rows, batch_size=BATCH_SIZE):
+        values = []
+        for batch in _batches(rows, batch_size):
+            values.extend(self.run(query, rows=batch))
+        return values
+
+    def get_path(self):
+        """gets the path of the neo4j instance"""
+
+        return self.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.neo4j_home' return value;
+                    """)
+
+    def get_import_folder_name(self):
+        """gets the path of the import folder of the neo4j instance"""
+
+        return self.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.import' return value;
+                    """)
+
+    def get_road_junctions(self):
+        """id -> internal id of the RoadJunction nodes and the (id, id) of the ROUTE relationships between them"""
+
+        junctions = {str(rj): node for rj, node in self.run("MATCH (rj:RoadJunction) RETURN rj.id, id(rj)")}
+        routes = [(str(a), str(b)) for a, b in self.run("""
+                        MATCH (a:RoadJunction)-[:ROUTE]->(b:RoadJunction) RETURN a.id, b.id
+                    """)]
+        return junctions, routes
+
+    def get_crossnodes(self):
+        return self.run("MATCH (cn:CrossNode) RETURN cn.id_num, cn.osm_id")
+
+    def get_element_links(self, label):
+        """pairs of elements of label connected by a CONTINUE_ON_* relationship"""
+
+        return [((label, 'osm_id', a), (label, 'osm_id', b)) for a, b in self.run("""
+                        MATCH (a:""" + label + """)-[r]->(b:""" + label + """) WHERE type(r) STARTS WITH 'CONTINUE_ON'
+                        RETURN DISTINCT a.osm_id, b.osm_id
+                    """)]
+
+    def load(self, layer, subgraph, road_junctions, batch_size=BATCH_SIZE):
+        """write the subgraph built by build_subgraph"""
+
+        ids = {}
+        rows = [[node, labels, properties] for node, (labels, properties) in subgraph['nodes'].items()]
+        for labels, group in _group(rows, lambda row: tuple(row[1])).items():
+            ids.update(self.write_batches("""
+                        UNWIND $rows AS row CREATE (n:""" + ':'.join(labels) + """) SET n = row[2],
+                        n.location = point({latitude: row[2].lat, longitude: row[2].lon})
+                        RETURN row[0], id(n)
+                    """, group, batch_size))
+        print(layer['prefix'] + " nodes created: " + str(len(ids)))
+
+        self.write_batches("""
+                        UNWIND $rows AS row MATCH (a) WHERE id(a) = row[0] MATCH (b) WHERE id(b) = row[1]
+                        CREATE (a)-[r:""" + layer['route'] + """]->(b) SET r = row[2]
+                    """, [[ids[u], ids[v], properties] for u, v, properties in subgraph['routes']], batch_size)
+
+        self.write_batches("""
+                        UNWIND $rows AS row MATCH (a) WHERE id(a) = row[0] MATCH (b) WHERE id(b) = row[1]
+                        MERGE (a)-[r:ROUTE]->(b) ON CREATE SET r.distance = row[2]
+                    """, [[ids.get(u, road_junctions.get(u)), ids.get(v, road_junctions.get(v)), distance]
+                          for u, v, distance in subgraph['road_routes']], batch_size)
+
+        contains = [[container, ids[node]] for container, node in subgraph['contains']]
+        for (label, key), group in _group(contains, lambda row: row[0][:2]).items():
+            self.write_batches("""
+                        UNWIND $rows AS row MATCH (e:""" + label + " {" + key + """: row[0][2]})
+                        MATCH (n) WHERE id(n) = row[1] MERGE (e)-[:CONTAINS]->(n)
+                    """, group, batch_size)
+
+        self.write_batches("""
+                        UNWIND $rows AS row MATCH (a:""" + layer['element'] + """ {osm_id: row[0][2]})
+                        MATCH (b:""" + layer['element'] + """ {osm_id: row[1][2]})
+                        MERGE (a)-[:""" + layer['continue'] + """]-(b)
+                    """, [list(pair) for pair in subgraph['continue']], batch_size)
+        print(layer['continue'] + " relationships generated: " + str(len(subgraph['continue'])))
+
+        for label in ['Crossing', 'Junction', 'Road']:
+            self.run("create index " + (layer['prefix'] + label).lower() + "_index if not exists for (n:" +
+                     layer['prefix'] + label + ") on (n.id)")
+
+    def build(self, path, options, batch_size=BATCH_SIZE):
+        """build and load the cycleways and footways subgraphs"""
+
+        nodes, routes = read_street_graph(os.path.join(path, options.file_name))
+        road_junctions, road_routes = self.get_road_junctions()
+        crossings = crossing_way_nodes(geoFiles.read_gdf(os.path.join(path, options.file_name_crossing_ways),
+                                                         columns=['id_num', 'nodes']).to_dict('records'))
+        crossings.update(crossing_node_nodes(self.get_crossnodes()))
+
+        for layer, file_name in [(BIKE, options.file_name_cycleways), (FOOT, options.file_name_footways)]:
+            records = geoFiles.read_gdf(os.path.join(path, file_name), columns=['id', 'nodes']).to_dict('records')
+            elements = element_nodes(records, layer['element'], 'osm_id')
+            subgraph = build_subgraph(layer, nodes, routes, elements, crossings, road_junctions, road_routes,
+                                      self.get_element_links(layer['element']))
+            self.load(layer, subgraph, road_junctions, batch_size)
@@ -3,12 +3,27 @@ import json
 import shutil
 import argparse
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import driverRegistry
+
+"""constraints and indexes of the graph, each one is created in its own transaction"""
+SCHEMA = ["create constraint for (a:Agency) require a.id is unique;",
+          "create constraint for (r:Route) require r.id is unique;",
+          "create constraint for (t:Trip) require t.id is unique;",
+          "create index for (t:Trip) on (t.service_id);",
+          "create constraint for (s:Stop) require s.id is unique;",
+          "create index for (s:Stoptime) on (s.stop_sequence);",
+          "create index for (s:Stop) on (s.name);",
+          "create constraint for (s:Service) require s.service_id is unique;",
+          "create constraint for (d:Day) require d.day is unique;"]
+
 
 class App:
     """In this file we are going to extract from OSM crossings mapped as nodes"""
 
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -41,77 +56,109 @@ class App:
                     """)
         return result.values()
     def generate_GTFS_based_graph(self):
-        """gets the path of the neo4j instance"""
+        """generates the trips-expanded graph from the GTFS files in the import folder"""
 
         with self.driver.session() as session:
             print("constraint creation")
-            session.run("create constraint for (a:Agency) require a.id is unique;")
-            session.run("create constraint for (r:Route) require r.id is unique;")
-            session.run("create constraint for (t:Trip) require t.id is unique;")
-            session.run("create index for (t:Trip) on (t.service_id);")
-            session.run("create constraint for (s:Stop) require s.id is unique;") 
-            session.run("create index for (s:Stoptime) on (s.stop_sequence);")
-            session.run("create index for (s:Stop) on (s.name);")
-            session.run("create constraint for (s:Service) require s.service_id is unique;")
-            session.run("create constraint for (d:Day) require d.day is unique;")
+            for query in SCHEMA:
+                session.write_transaction(self._create_constraint, query)
             print('Constraint e indici creati...')
-      
-        print("Inserting Agencies")
-        query = """load csv with headers from  
+
+            print("Inserting Agencies")
+            session.write_transaction(self._insert_agencies)
+
+            print("Inserting Routes")
+            session.write_transaction(self._insert_routes)
+
+            print("Insering Trips")
+            session.write_transaction(self._insert_trips)
+
+            print("Inserimenting Stops")
+            session.write_transaction(self._insert_stops)
+
+            print("Inserting StopTimes")
+            session.write_transaction(self._insert_stoptimes)
+
+            print("Inserting StopTimes relationships")
+            session.write_transaction(self._connect_stoptimes)
+
+            print("creation of Service nodes")
+            session.write_transaction(self._create_services)
+
+            print("Connection of Sevice nodes and Trip nodes")
+            session.write_transaction(self._connect_services)
+
+            print("Generate the Date nodes")
+            session.write_transaction(self._insert_days)
+
+    @staticmethod
+    def _create_constraint(tx, query):
+        result = tx.run(query)
+        return result.values()
+
+    @staticmethod
+    def _insert_agencies(tx):
+        result = tx.run("""load csv with headers from  
               'file:///agency.txt' as csv  
-              create (:Agency {name: csv.agency_name, url: csv.agency_url, timezone: csv.agency_timezone});"""
-        session.run(query)
+              create (:Agency {name: csv.agency_name, url: csv.agency_url, timezone: csv.agency_timezone});""")
+        return result.values()
 
-        print("Inserting Routes")
-        query = """load csv with headers from  
+    @staticmethod
+    def _insert_routes(tx):
+        result = tx.run("""load csv with headers from  
               'file:///routes.txt' as csv  
               match (a:Agency {name: 'aMo Modena'})  
-              create (a)-[:OPERATES]->(:Route {id: csv.route_id, short_name: csv.short_name, long_name: csv.route_long_name, type: toInteger(csv.route_type)});"""
-        session.run(query)
+              create (a)-[:OPERATES]->(:Route {id: csv.route_id, short_name: csv.short_name, long_name: csv.route_long_name, type: toInteger(csv.route_type)});""")
+        return result.values()
 
-        print("Insering Trips")
-        query = """load csv with headers from 
+    @staticmethod
+    def _insert_trips(tx):
+        result = tx.run("""load csv with headers from 
               'file:///trips.txt' as csv
               match (r:Route {id: csv.route_id})
-              create (r)<-[:USES]-(:Trip {service_id: csv.service_id, id: csv.trip_id, direction_id: csv.direction_id, shape_id: csv.shape_id, headsign: csv.trip_headsign});"""
-        session.run(query)
+              create (r)<-[:USES]-(:Trip {service_id: csv.service_id, id: csv.trip_id, direction_id: csv.direction_id, shape_id: csv.shape_id, headsign: csv.trip_headsign});""")
+        return result.values()
 
-        print("Inserimenting Stops")
-        query = """load csv with headers from 
+    @staticmethod
+    def _insert_stops(tx):
+        result = tx.run("""load csv with headers from 
               'file:///stops.txt' as csv  
-              create (:Stop {id: csv.stop_id, name: csv.stop_name, lat: toFloat(csv.stop_lat), lon: toFloat(csv.stop_lon)});"""
-        session.run(query)
+              create (:Stop {id: csv.stop_id, name: csv.stop_name, lat: toFloat(csv.stop_lat), lon: toFloat(csv.stop_lon)});""")
+        return result.values()
 
-        print("Inserting StopTimes")
-        query = """CALL apoc.periodic.iterate(
+    @staticmethod
+    def _insert_stoptimes(tx):
+        result = tx.run("""CALL apoc.periodic.iterate(
               "load csv with headers from 'file:///stop_times.txt' as csv return csv",
               "match (t:Trip {id: csv.trip_id}), (s:Stop {id: csv.stop_id}) create (t)<-[:PART_OF_TRIP]-(st:Stoptime {arrival_time: time(csv.arrival_time), departure_time: time(csv.departure_time), stop_sequence: toInteger(csv.stop_sequence)})-[:LOCATED_AT]->(s)",
-              {batchSize:1000, parallel:true})"""
-        session.run(query)
+              {batchSize:1000, parallel:true})""")
+        return result.values()
 
-        print("Inserting StopTimes relationships")
-        query = """match (s1:Stoptime)-[:PART_OF_TRIP]->(t:Trip),  
+    @staticmethod
+    def _connect_stoptimes(tx):
+        result = tx.run("""match (s1:Stoptime)-[:PART_OF_TRIP]->(t:Trip),  
               (s2:Stoptime)-[:PART_OF_TRIP]->(t)  
               where s2.stop_sequence=s1.stop_sequence+1  
-              create (s1)-[p:PRECEDES]->(s2) set p.waiting_time = duration.inSeconds(s1.departure_time,s2.departure_time).seconds;"""
-        session.run(query)
-        
-        print("creation of Service nodes")
-        query = """match (t:Trip) with distinct t.service_id as service merge (s:Service{id:service})"""
-        session.run(query)
-        
-        print("Connection of Sevice nodes and Trip nodes")
-        query = """match (t:Trip)  match  (s:Service{id:t.service_id}) merge (t)-[:SERVICE_TYPE]->(s)"""
-        session.run(query)
-        
-        print("Generate the Date nodes")
-        query = """CALL apoc.periodic.iterate(
+              create (s1)-[p:PRECEDES]->(s2) set p.waiting_time = duration.inSeconds(s1.departure_time,s2.departure_time).seconds;""")
+        return result.values()
+
+    @staticmethod
+    def _create_services(tx):
+        result = tx.run("""match (t:Trip) with distinct t.service_id as service merge (s:Service{id:service})""")
+        return result.values()
+
+    @staticmethod
+    def _connect_services(tx):
+        result = tx.run("""match (t:Trip)  match  (s:Service{id:t.service_id}) merge (t)-[:SERVICE_TYPE]->(s)""")
+        return result.values()
+
+    @staticmethod
+    def _insert_days(tx):
+        result = tx.run("""CALL apoc.periodic.iterate(
             "load csv with headers from 'file:///calendar_dates.txt' as csv return csv",
             "match (s:Service {id: csv.service_id}) merge (d:Day {day:date({year: toInteger(left(csv.date,4)), month: toInteger(substring(csv.date, 4, 2)), day: toInteger(right(csv.date,2))})}) merge (s)-[:VALID_IN]->(d) SET d.exception_type = csv.exception_type",
-            {batchSize:500})"""
-        session.run(query)
-        
-        
+            {batchSize:500})""")
+        return result.values()
 
 
 def add_options():
@@ -171,5 +218,7 @@ def main(args=None):
         print('missing stop_times.txt file in directory')
         exit()
     greeter.generate_GTFS_based_graph()
-    
-main()
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,354 @@
+import os
+import sys
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+import shapely
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import geoFiles
+import safetyRules
+
+"""In this file the journeys on public transport are planned in memory with RAPTOR (Round-bAsed Public Transit
+Optimized Router), reading the GTFS feed directly instead of traversing the Stoptime nodes loaded in neo4j by
+GTFS-basedTripExpandedGraph.py.
+The trips running on the date (calendar_dates.txt, and calendar.txt if the feed has it) are grouped in routes:
+the trips stopping at the same sequence of stops. Each route keeps its stops and two arrays, trips x stops, with
+the arrival and departure times in seconds from midnight, the trips sorted by departure. The stops closer than
+a walking distance are connected by footpaths.
+Round k of RAPTOR finds the earliest arrival at each stop with at most k trips: it scans once the routes serving
+the stops improved in round k - 1, boarding at each stop the earliest trip that can be caught (a binary search
+on the departures), and then the footpaths. The rounds stop after max_transfers + 1 trips, so every journey
+found is the fastest with its number of transfers.
+"""
+
+"""meters of the footpaths between stops and walking speed (km/h)"""
+WALK_DISTANCE = 300
+WALKING_SPEED = safetyRules.FOOTWAY_SPEED
+
+MAX_TRANSFERS = 3
+
+INFINITY = np.iinfo(np.int64).max
+
+FILES = ['stops.txt', 'trips.txt', 'stop_times.txt', 'calendar_dates.txt']
+
+
+def parse_time(value):
+    """seconds from midnight of a GTFS time HH:MM:SS, the hours can be more than 24"""
+
+    hours, minutes, seconds = str(value).strip().split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def format_time(seconds):
+    return '%02d:%02d:%02d' % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def parse_date(value):
+    """datetime.date of a date given as YYYYMMDD, YYYY-MM-DD or date"""
+
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value).replace('-', ''), '%Y%m%d').date()
+
+
+def read_feed(path):
+    """tables of the GTFS feed in the folder path, calendar.txt only if present"""
+
+    feed = {}
+    for name in FILES + ['calendar.txt']:
+        file = os.path.join(path, name)
+        if os.path.isfile(file):
+            feed[name[:-4]] = pd.read_csv(file, dtype=str, skipinitialspace=True)
+        elif name in FILES:
+            raise FileNotFoundError('missing ' + name + ' file in directory')
+    return feed
+
+
+def active_services(feed, date):
+    """service ids running on the date: the ones of calendar.txt for its weekday and period, plus the ones added
+       and minus the ones removed in calendar_dates.txt"""
+
+    date = parse_date(date)
+    key = date.strftime('%Y%m%d')
+    services = set()
+    calendar = feed.get('calendar')
+    if calendar is not None:
+        weekday = date.strftime('%A').lower()
+        running = (calendar[weekday] == '1') & (calendar['start_date'] <= key) & (calendar['end_date'] >= key)
+        services.update(calendar.loc[running, 'service_id'])
+    exceptions = feed['calendar_dates']
+    exceptions = exceptions[exceptions['date'] == key]
+    services.update(exceptions.loc[exceptions['exception_type'] == '1', 'service_id'])
+    services.difference_update(exceptions.loc[exceptions['exception_type'] == '2', 'service_id'])
+    return services
+
+
+class Route:
+    """trips with the same sequence of stops (positions in Timetable.stop_ids), sorted by departure"""
+
+    def __init__(self, stops, trip_ids, route_ids, arrivals, departures):
+        order = np.lexsort(departures.T[::-1])
+        self.stops = stops
+        self.trip_ids = [trip_ids[i] for i in order]
+        self.route_ids = [route_ids[i] for i in order]
+        self.arrivals = arrivals[order]
+        self.departures = departures[order]
+        """departures of the trips at each stop, searched to board the earliest trip"""
+        self.columns = [np.ascontiguousarray(self.departures[:, i]) for i in range(len(stops))]
+        self.fifo = all((np.diff(column) >= 0).all() for column in self.columns)
+
+    def earliest_trip(self, position, time):
+        """first trip leaving the stop at position at time or later, None if there is none"""
+
+        column = self.columns[position]
+        if self.fifo:
+            trip = int(np.searchsorted(column, time))
+            return trip if trip < len(column) else None
+        later = np.flatnonzero(column >= time)
+        return int(later[np.argmin(column[later])]) if len(later) else None
+
+
+class Timetable:
+    """stops, routes and footpaths of the trips of the feed running on the date (all the trips if None)"""
+
+    def __init__(self, feed, date=None, walk_distance=WALK_DISTANCE, walking_speed=WALKING_SPEED):
+        stops = feed['stops']
+        self.stop_ids = list(stops['stop_id'])
+        self.index = {stop: i for i, stop in enumerate(self.stop_ids)}
+        self.names = list(stops['stop_name']) if 'stop_name' in stops else list(self.stop_ids)
+        self.coordinates = np.column_stack([pd.to_numeric(stops['stop_lon']), pd.to_numeric(stops['stop_lat'])])
+
+        trips = feed['trips']
+        if date is not None:
+            trips = trips[trips['service_id'].isin(active_services(feed, date))]
+        route_of_trip = dict(zip(trips['trip_id'], trips['route_id']))
+        stop_times = feed['stop_times']
+        stop_times = stop_times[stop_times['trip_id'].isin(route_of_trip) & stop_times['stop_id'].isin(self.index)]
+        stop_times = stop_times.assign(sequence=pd.to_numeric(stop_times['stop_sequence']))
+        stop_times = stop_times.sort_values(['trip_id', 'sequence'], kind='stable')
+
+        patterns = {}
+        for trip, times in stop_times.groupby('trip_id', sort=False):
+            stops = tuple(times['stop_id'].map(self.index))
+            arrivals = [parse_time(t) for t in times['arrival_time'].fillna(times['departure_time'])]
+            departures = [parse_time(t) for t in times['departure_time'].fillna(times['arrival_time'])]
+            patterns.setdefault(stops, []).append((trip, arrivals, departures))
+        self.routes = []
+        self.serving = [[] for _ in self.stop_ids]
+        for stops, trips_of_pattern in patterns.items():
+            route = Route(np.array(stops, dtype=np.int64), [trip for trip, _, _ in trips_of_pattern],
+                          [route_of_trip[trip] for trip, _, _ in trips_of_pattern],
+                          np.array([arrivals for _, arrivals, _ in trips_of_pattern], dtype=np.int64),
+                          np.array([departures for _, _, departures in trips_of_pattern], dtype=np.int64))
+            for position, stop in enumerate(stops):
+                self.serving[stop].append((len(self.routes), position))
+            self.routes.append(route)
+        self.walking_speed = walking_speed
+        self.footpaths = self.walks(self.coordinates, walk_distance, between_stops=True)
+
+    def walking_time(self, meters):
+        return int(np.ceil(meters * 3.6 / self.walking_speed))
+
+    def walks(self, points, max_distance, between_stops=False):
+        """for each point (longitude, latitude) the stops within max_distance meters, with the walking time
+           (seconds) to reach them. If the points are the stops, between_stops leaves out the stop itself"""
+
+        stops = geoFiles.project(shapely.points(self.coordinates), geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS)
+        projected = geoFiles.project(shapely.points(np.asarray(points, dtype=float).reshape(-1, 2)),
+                                     geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS)
+        result = [[] for _ in projected]
+        if not len(stops):
+            return result
+        p, s = shapely.STRtree(stops).query(projected, predicate='dwithin', distance=max_distance)
+        for i, stop, distance in zip(p, s, shapely.distance(projected[p], stops[s])):
+            if not (between_stops and i == stop):
+                result[i].append((int(stop), self.walking_time(distance)))
+        return result
+
+    def stop_times(self, place, max_distance=WALK_DISTANCE):
+        """stops (positions) and seconds of walk to reach them from place, a stop id or (longitude, latitude)"""
+
+        if isinstance(place, str):
+            return {self.index[place]: 0}
+        return dict(self.walks([place], max_distance)[0])
+
+
+def raptor(timetable, sources, targets, departure, max_transfers=MAX_TRANSFERS):
+    """RAPTOR from the sources to the targets, both {stop position: seconds of walk}, leaving at departure
+       (seconds from midnight). Returns the arrival times of each round (round k: at most k trips) and the
+       parents of the improved labels: ('walk', stop, seconds) or ('ride', route, trip, boarding position,
+       alighting position)"""
+
+    n = len(timetable.stop_ids)
+    labels = [np.full(n, INFINITY, dtype=np.int64)]
+    parents = [{}]
+    best = np.full(n, INFINITY, dtype=np.int64)
+    for stop, walk in sources.items():
+        labels[0][stop] = best[stop] = departure + walk
+        parents[0][stop] = ('walk', None, walk)
+    marked = set(sources)
+
+    def target_bound():
+        return min((best[stop] + walk for stop, walk in targets.items() if best[stop] < INFINITY),
+                   default=INFINITY)
+
+    def footpaths(k, improved):
+        for stop in list(improved):
+            for other, walk in timetable.footpaths[stop]:
+                arrival = labels[k][stop] + walk
+                if arrival < labels[k][other] and arrival < best[other]:
+                    labels[k][other] = best[other] = arrival
+                    parents[k][other] = ('walk', stop, walk)
+                    improved.add(other)
+
+    footpaths(0, marked)
+    for k in range(1, max_transfers + 2):
+        labels.append(labels[k - 1].copy())
+        parents.append({})
+        queue = {}
+        for stop in marked:
+            for route, position in timetable.serving[stop]:
+                if position < queue.get(route, INFINITY):
+                    queue[route] = position
+        marked = set()
+        bound = target_bound()
+        for r, start in queue.items():
+            route = timetable.routes[r]
+            trip, boarding = None, None
+            for position in range(start, len(route.stops)):
+                stop = route.stops[position]
+                if trip is not None:
+                    arrival = route.arrivals[trip, position]
+                    if arrival < best[stop] and arrival < bound:
+                        labels[k][stop] = best[stop] = arrival
+                        parents[k][stop] = ('ride', r, trip, boarding, position)
+                        marked.add(stop)
+                previous = labels[k - 1][stop]
+                if previous < INFINITY and (trip is None or previous <= route.departures[trip, position]):
+                    earlier = route.earliest_trip(position, previous)
+                    if earlier is not None and (trip is None or
+                                                route.departures[earlier, position] < route.departures[trip, position]):
+                        trip, boarding = earlier, position
+        footpaths(k, marked)
+        if not marked:
+            break
+    return labels, parents
+
+
+def _legs(timetable, labels, parents, k, stop):
+    """legs of the journey reaching stop in round k"""
+
+    legs = []
+    while True:
+        while stop not in parents[k]:
+            k -= 1
+        parent = parents[k][stop]
+        if parent[0] == 'walk':
+            origin, walk = parent[1], parent[2]
+            legs.append({'mode': 'walk', 'from': None if origin is None else timetable.stop_ids[origin],
+                         'to': timetable.stop_ids[stop], 'departure': int(labels[k][stop] - walk),
+                         'arrival': int(labels[k][stop])})
+            if origin is None:
+                break
+            stop = origin
+        else:
+            _, r, trip, boarding, alighting = parent
+            route = timetable.routes[r]
+            legs.append({'mode': 'ride', 'from': timetable.stop_ids[route.stops[boarding]],
+                         'to': timetable.stop_ids[stop], 'departure': int(route.departures[trip, boarding]),
+                         'arrival': int(route.arrivals[trip, alighting]), 'trip': route.trip_ids[trip],
+                         'route': route.route_ids[trip]})
+            stop = route.stops[boarding]
+            k -= 1
+    legs.reverse()
+    if legs[0]['from'] is None and legs[0]['departure'] == legs[0]['arrival']:
+        legs.pop(0)
+    return legs
+
+
+def journeys(timetable, origin, destination, departure, max_transfers=MAX_TRANSFERS, walk_distance=WALK_DISTANCE):
+    """fastest journeys from origin to destination (stop ids or (longitude, latitude)) leaving at departure
+       (HH:MM:SS or seconds), one for each number of trips that arrives earlier than with fewer trips: arrival,
+       number of transfers and legs"""
+
+    departure = parse_time(departure) if isinstance(departure, str) else int(departure)
+    sources = timetable.stop_times(origin, walk_distance)
+    targets = timetable.stop_times(destination, walk_distance)
+    labels, parents = raptor(timetable, sources, targets, departure, max_transfers)
+    result = []
+    arrival_before = INFINITY
+    for k in range(len(labels)):
+        arrival, stop = min(((labels[k][stop] + walk, stop) for stop, walk in targets.items()
+                             if labels[k][stop] < INFINITY), default=(INFINITY, None))
+        if arrival >= arrival_before:
+            continue
+        arrival_before = arrival
+        legs = _legs(timetable, labels, parents, k, stop)
+        if targets[stop] > 0:
+            legs.append({'mode': 'walk', 'from': timetable.stop_ids[stop], 'to': None,
+                         'departure': int(labels[k][stop]), 'arrival': int(arrival)})
+        rides = sum(leg['mode'] == 'ride' for leg in legs)
+        result.append({'arrival': int(arrival), 'transfers': max(rides - 1, 0), 'legs': legs})
+    return result
+
+
+def add_options():
+    """parameters to be used in order to run the script"""
+
+    parser = argparse.ArgumentParser(description='Journey planning on the GTFS feed with RAPTOR.')
+    parser.add_argument('--GTFSpath', '-GTFS', dest='GTFS_path', type=str,
+                        help="""Insert the path where the GTFS files are located""",
+                        required=True)
+    parser.add_argument('--source', '-s', dest='source', type=str,
+                        help="""Insert the id of the departure stop, or its longitude and latitude separated
+                        by a comma""",
+                        required=True)
+    parser.add_argument('--destination', '-d', dest='destination', type=str,
+                        help="""Insert the id of the arrival stop, or its longitude and latitude separated
+                        by a comma""",
+                        required=True)
+    parser.add_argument('--time', '-t', dest='time', type=str,
+                        help="""Insert the departure time, HH:MM:SS""",
+                        required=True)
+    parser.add_argument('--date', '-dt', dest='date', type=str,
+                        help="""Insert the date of the journey, YYYYMMDD. All the trips are used if missing""",
+                        required=False, default=None)
+    parser.add_argument('--maxTransfers', '-mt', dest='max_transfers', type=int,
+                        help="""Insert the maximum number of transfers""",
+                        required=False, default=MAX_TRANSFERS)
+    parser.add_argument('--walkDistance', '-w', dest='walk_distance', type=float,
+                        help="""Insert the maximum meters walked to a stop or between two stops""",
+                        required=False, default=WALK_DISTANCE)
+    return parser
+
+
+def _place(value):
+    if ',' in value:
+        lon, lat = value.split(',')
+        return float(lon), float(lat)
+    return value
+
+
+def main(args=None):
+    """Parsing of input parameters"""
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+
+    """Timetable of the trips on the date and journeys between the two places"""
+    timetable = Timetable(read_feed(options.GTFS_path), options.date, options.walk_distance)
+    result = journeys(timetable, _place(options.source), _place(options.destination), options.time,
+                      options.max_transfers, options.walk_distance)
+    if not result:
+        print('No journey found')
+    for journey in result:
+        print('arrival ' + format_time(journey['arrival']) + ' with ' + str(journey['transfers']) + ' transfers')
+        for leg in journey['legs']:
+            print('   ' + leg['mode'] + ' from ' + str(leg['from']) + ' at ' + format_time(leg['departure']) +
+                  ' to ' + str(leg['to']) + ' at ' + format_time(leg['arrival']) +
+                  (' on trip ' + str(leg['trip']) + ' of route ' + str(leg['route']) if leg['mode'] == 'ride' else ''))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,12 @@ import pandas as pd
 import os
 import webbrowser
 import argparse
+import driverRegistry
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
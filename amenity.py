@@ -4,11 +4,14 @@ from neo4j import GraphDatabase
 import argparse
 import os
 import time
+import driverRegistry
+import spatialIndex
+import poiIndex
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -102,17 +105,7 @@ class App:
         return result.values()
 
     def import_nodes_into_spatial_layer(self):
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_nodes_into_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_nodes_into_spatial_layer(tx):
-        tx.run("""
-            MATCH (n:OSMNode)
-            CALL spatial.addNode('spatial', n) yield node return node;
-        """)
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'OSMNode')
 
     def set_location(self):
         """Insert the location in the POI, OSMNode, and RoadJunction nodes."""
@@ -250,6 +243,8 @@ def add_options():
     parser.add_argument('--longitude', '-y', dest='lon', type=float, required=True)
     parser.add_argument('--distance', '-d', dest='dist', type=float, required=True)
     parser.add_argument('--spatial', '-s', dest='spatial', type=str, required=False, default='False')
+    parser.add_argument('--importDir', '-i', dest='import_dir', type=str, default=None,
+                        help="""Insert the path of the neo4j import directory. By default it is asked to neo4j.""")
     return parser
 
 def main(args=None):
@@ -261,7 +256,9 @@ def main(args=None):
     lon = options.lon
     lat = options.lat
     greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
-    path = greeter.get_path()[0][0] + '\\' + greeter.get_import_folder_name()[0][0] + "\\"
+    path = options.import_dir
+    if path is None:
+        path = os.path.dirname(poiIndex.index_path(greeter.driver))
     result = api.query(f"""(   
                            way(around:{dist},{lat},{lon})["amenity"];
                        );(._;>;);
@@ -284,7 +281,7 @@ def main(args=None):
     print("nodes to import:")
     print(res)
     print("-----------------------------------------------------------------------")
-    with open(path + 'nodeway.json', "w") as f:
+    with open(os.path.join(path, 'nodeway.json'), "w") as f:
         json.dump(res, f)
         print("file generated in import directory")
     # import the nodes in the graph as OSMNodes
@@ -302,7 +299,7 @@ def main(args=None):
     print("ways to import:")
     print(res)
     print("-----------------------------------------------------------------------")
-    with open(path + "wayfile.json", "w") as f:
+    with open(os.path.join(path, 'wayfile.json'), "w") as f:
         json.dump(res, f)
         print("file generated in import directory")
     # import the ways in the graph as POI nodes
@@ -327,7 +324,7 @@ def main(args=None):
     print("nodes to import:")
     print(res)
     print("-----------------------------------------------------------------------")
-    with open(path + 'nodefile.json', "w") as f:
+    with open(os.path.join(path, 'nodefile.json'), "w") as f:
         json.dump(res, f)
     print("file generated in import directory")
     greeter.import_way()
@@ -337,6 +334,9 @@ def main(args=None):
     greeter.set_location()
     greeter.mark_driveable_roadjunctions()
     greeter.connect_amenity()
+    # index of the names of the points of interest, used by the routing to find the destination
+    poiIndex.build_index(greeter.driver, os.path.join(path, poiIndex.INDEX_FILE))
+    print("generation of " + poiIndex.INDEX_FILE + ": done")
     greeter.close()
     print(f"Total execution time: {time.time() - start_time:.2f} seconds")
     return 0
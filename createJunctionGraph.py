@@ -2,11 +2,13 @@ import osmnx as ox
 import argparse
 from neo4j import GraphDatabase
 import os
+import driverRegistry
+import spatialIndex
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -124,17 +126,7 @@ class App:
 
     def import_nodes_in_spatial_layer(self):
         """insert the road junctions in the spatial layer of the project"""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._import_nodes_in_spatial_layer)
-            return result
-
-    @staticmethod
-    def _import_nodes_in_spatial_layer(tx):
-        result = tx.run("""
-        match (n:RoadJunction)
-        CALL spatial.addNode('spatial', n) yield node return node;
-        """)
-        return result.values()
+        return spatialIndex.index_nodes(self.driver, 'RoadJunction')
 
 
 def add_options():
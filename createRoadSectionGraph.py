@@ -2,11 +2,12 @@ import osmnx as ox
 import argparse
 from neo4j import GraphDatabase
 import os
+import driverRegistry
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
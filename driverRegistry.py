@@ -0,0 +1,173 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from neo4j import GraphDatabase
+import queryProfiling
+
+"""In this file we keep a single neo4j driver per database and user for the whole process, so that
+all the App classes share the same connection pool instead of opening their own. The drivers are
+closed when the process ends; App.close() only releases the reference of the App.
+
+Inside a stage (see stage()) the sessions are reused too, so the consecutive App objects of a stage
+run their transactions on the same session.
+
+The pool can be configured with configure() or with the environment variables
+   NEO4J_MAX_CONNECTION_POOL_SIZE, NEO4J_MAX_CONNECTION_LIFETIME (seconds),
+   NEO4J_CONNECTION_ACQUISITION_TIMEOUT (seconds), NEO4J_FETCH_SIZE (records per batch)
+"""
+
+DRIVER_SETTINGS = {
+    'max_connection_pool_size': ('NEO4J_MAX_CONNECTION_POOL_SIZE', int),
+    'max_connection_lifetime': ('NEO4J_MAX_CONNECTION_LIFETIME', float),
+    'connection_acquisition_timeout': ('NEO4J_CONNECTION_ACQUISITION_TIMEOUT', float),
+}
+SESSION_SETTINGS = {
+    'fetch_size': ('NEO4J_FETCH_SIZE', int),
+}
+
+_settings = {}
+_drivers = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _read_environment():
+    settings = {}
+    for name, (variable, cast) in list(DRIVER_SETTINGS.items()) + list(SESSION_SETTINGS.items()):
+        if os.environ.get(variable):
+            settings[name] = cast(os.environ[variable])
+    return settings
+
+
+def configure(**settings):
+    """set the pool size, the connection lifetime, the acquisition timeout and the fetch size.
+    The settings apply to the drivers created afterwards and override the environment variables"""
+
+    for name in settings:
+        if name not in DRIVER_SETTINGS and name not in SESSION_SETTINGS:
+            raise ValueError("Unknown setting " + name)
+    with _lock:
+        _settings.update(settings)
+
+
+def settings():
+    """settings used for the next drivers"""
+
+    s = _read_environment()
+    s.update(_settings)
+    return s
+
+
+class _ReusedSession:
+    """session kept open for the whole stage: leaving the with block does not close it"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.sessions = {}
+
+    def session(self, driver, config):
+        key = (id(driver), tuple(sorted(config.items())))
+        if key not in self.sessions:
+            self.sessions[key] = _ReusedSession(driver.session(**config))
+        return self.sessions[key]
+
+    def close(self):
+        for session in self.sessions.values():
+            session._session.close()
+        self.sessions.clear()
+
+
+def _current_stage():
+    stages = getattr(_local, 'stages', None)
+    return stages[-1] if stages else None
+
+
+@contextmanager
+def stage(name):
+    """reuse the sessions opened in the current thread until the end of the block"""
+
+    s = _Stage(name)
+    _local.stages = getattr(_local, 'stages', []) + [s]
+    try:
+        yield s
+    finally:
+        _local.stages = _local.stages[:-1]
+        s.close()
+
+
+class SharedDriver:
+    """driver shared by all the App objects connected to the same database with the same user"""
+
+    def __init__(self, driver, session_settings):
+        self._driver = driver
+        self._session_settings = session_settings
+        self.references = 0
+
+    def session(self, **config):
+        for name, value in self._session_settings.items():
+            config.setdefault(name, value)
+        current = _current_stage()
+        if current is None:
+            return self._driver.session(**config)
+        return current.session(self._driver, config)
+
+    def close(self):
+        """release the reference of the App, the driver is closed by close_all"""
+
+        with _lock:
+            self.references = max(0, self.references - 1)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def get_driver(uri, user, password):
+    """return the shared (and profiled) driver for the database and the user"""
+
+    key = (uri, user, password)
+    with _lock:
+        if key not in _drivers:
+            s = settings()
+            driver_settings = {k: v for k, v in s.items() if k in DRIVER_SETTINGS}
+            session_settings = {k: v for k, v in s.items() if k in SESSION_SETTINGS}
+            _drivers[key] = SharedDriver(GraphDatabase.driver(uri, auth=(user, password), **driver_settings),
+                                         session_settings)
+        shared = _drivers[key]
+        shared.references += 1
+    return queryProfiling.profiled(shared)
+
+
+def close_all():
+    """close the sessions of the open stages and all the drivers"""
+
+    current = _current_stage()
+    while current is not None:
+        current.close()
+        _local.stages = _local.stages[:-1]
+        current = _current_stage()
+    with _lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for shared in drivers:
+        shared._driver.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,134 @@
+import threading
+import numpy as np
+import shapely
+import geoFiles
+
+"""In this file the coordinates given for a route are snapped onto the nearest edge of the graph, instead of
+picking the closest junction with spatial.withinDistance and a radius in degrees.
+The edges (a route between two junctions, or a lane of the general graph) are kept as lines in epsg:3035 in a
+shapely STRtree, one tree for each set of edge types that can be used by a mode. snap() gives for each point
+the nearest eligible edge within max_distance meters, the point projected on it, the two junctions at its ends
+and the meters from the projection to each of them, so that the cost of the first and last part of a route can
+be computed. Many points are snapped with one query on the tree.
+"""
+
+"""meters within which the points are snapped"""
+MAX_DISTANCE = 200
+
+"""edge types that can be used by each mode"""
+MODES = {'bike': ('BIKE_ROUTE',), 'foot': ('FOOT_ROUTE',), 'drive': ('ROUTE',)}
+
+
+def _types(mode):
+    if mode is None:
+        return None
+    if not isinstance(mode, str):
+        return tuple(mode)
+    if mode not in MODES:
+        raise ValueError("Unknown mode " + mode)
+    return MODES[mode]
+
+
+def _geometries(values):
+    """shapely geometries of the WKT strings and geometries given"""
+
+    values = np.asarray(values, dtype=object)
+    text = np.array([isinstance(value, str) for value in values], dtype=bool)
+    result = values.copy()
+    if text.any():
+        result[text] = shapely.from_wkt(values[text].astype(str), on_invalid='ignore')
+    return result
+
+
+class SnapIndex:
+    """Edges in epsg:3035 with a STRtree for each set of edge types. The edges are rows
+       (key, source junction, target junction, type, geometry in epsg:4326 as WKT or shapely geometry)"""
+
+    def __init__(self, edges):
+        edges = list(edges)
+        self.keys = [edge[0] for edge in edges]
+        self.sources = [edge[1] for edge in edges]
+        self.targets = [edge[2] for edge in edges]
+        self.types = np.array([edge[3] for edge in edges], dtype=object)
+        lines = _geometries([edge[4] for edge in edges])
+        self.lines = geoFiles.project(lines, geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS) if edges else lines
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_segments(cls, segments):
+        """index of straight edges, the segments are (source, target, type, lon1, lat1, lon2, lat2); the key of
+           an edge is its position"""
+
+        segments = list(segments)
+        coordinates = np.array([segment[3:7] for segment in segments], dtype=float).reshape(-1, 2, 2)
+        lines = shapely.linestrings(coordinates) if segments else []
+        return cls([(i, segment[0], segment[1], segment[2], line)
+                    for i, (segment, line) in enumerate(zip(segments, lines))])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def tree(self, mode=None):
+        """STRtree of the edges usable by the mode (a name of MODES or the edge types, None for all the edges)
+           and the positions of those edges"""
+
+        types = _types(mode)
+        with self._lock:
+            if types not in self._trees:
+                eligible = np.zeros(len(self), dtype=bool)
+                if len(self):
+                    eligible = ~shapely.is_missing(self.lines) & ~shapely.is_empty(self.lines)
+                if types is not None:
+                    eligible &= np.isin(self.types, types)
+                positions = np.flatnonzero(eligible)
+                self._trees[types] = (shapely.STRtree(self.lines[positions]), positions)
+            return self._trees[types]
+
+    def snap(self, points, mode=None, max_distance=MAX_DISTANCE):
+        """for each point (longitude, latitude) the nearest edge usable by the mode within max_distance meters,
+           None if there is none: its key, source and target junctions, type, the projected point
+           (longitude, latitude), the meters from the point to the edge, from the source junction to the
+           projection (offset) and from the projection to the target junction (remaining), the length of the
+           edge and the fraction of it before the projection"""
+
+        points = list(points)
+        result = [None] * len(points)
+        tree, positions = self.tree(mode)
+        if not points or not len(positions):
+            return result
+        xy = np.array(points, dtype=float).reshape(-1, 2)
+        projected = geoFiles.project(shapely.points(xy), geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS)
+        (found, nearest), distances = tree.query_nearest(projected, max_distance=max_distance,
+                                                         return_distance=True, all_matches=False)
+        edges = positions[nearest]
+        lines = self.lines[edges]
+        lengths = shapely.length(lines)
+        offsets = shapely.line_locate_point(lines, projected[found])
+        snapped = geoFiles.project(shapely.line_interpolate_point(lines, offsets), geoFiles.PROJECTED_CRS,
+                                   geoFiles.GEOGRAPHIC_CRS)
+        coordinates = shapely.get_coordinates(snapped)
+        for i, edge, distance, offset, length, (lon, lat) in zip(found, edges, distances, offsets, lengths,
+                                                                 coordinates):
+            result[i] = {'key': self.keys[edge], 'source': self.sources[edge], 'target': self.targets[edge],
+                         'type': self.types[edge], 'lon': float(lon), 'lat': float(lat), 'distance': float(distance),
+                         'offset': float(offset), 'remaining': float(length - offset), 'length': float(length),
+                         'fraction': float(offset / length) if length > 0 else 0.0}
+        return result
+
+    def nearest_junction(self, point, mode=None, max_distance=MAX_DISTANCE):
+        """(meters, junction) of the end of the nearest edge closest to the point along the edge, None if no edge
+           is within max_distance"""
+
+        snap = self.snap([point], mode, max_distance)[0]
+        if snap is None:
+            return None
+        return closest_end(snap)
+
+
+def closest_end(snap):
+    """(meters, junction) of the end of the snapped edge closest to the point along the edge"""
+
+    if snap['offset'] <= snap['remaining'] or snap['target'] is None:
+        return snap['distance'] + snap['offset'], snap['source']
+    return snap['distance'] + snap['remaining'], snap['target']
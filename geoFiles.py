@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import CRS, Transformer
+
+"""In this file the GeoDataFrames exchanged by the scripts are saved and read.
+The json file (table orient, geometry as WKT) is still written because neo4j loads it with apoc.load.json;
+next to it a GeoParquet file with the same name is written, with the geometry as WKB and typed columns,
+so the python scripts read only the columns they need from a memory mapped file and do not parse the WKT.
+The lists of (id, distance) pairs are stored as lists of structs {id, distance} and read back as lists.
+
+The files hold the geometries in epsg:4326 and, in the GeoParquet file, also in epsg:3035 (the crs used
+to measure distances in meters), so a ProjectedDataset read from it does not reproject anything. When
+a reprojection is needed it is made once, with a transformer built once per thread.
+"""
+
+GEOGRAPHIC_CRS = 'epsg:4326'
+PROJECTED_CRS = 'epsg:3035'
+
+"""column of the GeoParquet file with the geometries in PROJECTED_CRS"""
+PROJECTED_COLUMN = 'geometry_3035'
+
+_local = threading.local()
+
+
+def parquet_path(path):
+    """path of the GeoParquet file written next to the json file"""
+
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def _is_pair_column(values):
+    for value in values:
+        if isinstance(value, (list, np.ndarray)) and len(value) > 0:
+            return isinstance(value[0], tuple)
+    return False
+
+
+def _encode_pairs(values):
+    return [[{'id': p[0], 'distance': float(p[1])} for p in value] if isinstance(value, (list, np.ndarray))
+            else value for value in values]
+
+
+def _decode_pairs(values):
+    """the pairs are given back as lists, as they are read from the json file; the list columns are
+       read by pyarrow as arrays"""
+
+    return [[[p['id'], p['distance']] for p in value] if isinstance(value, (list, np.ndarray))
+            else value for value in values]
+
+
+def transformer(source, target):
+    """transformer from the source to the target crs, the pyproj transformers are not thread safe so they
+       are built once per thread"""
+
+    transformers = _local.__dict__.setdefault('transformers', {})
+    key = (CRS(source).to_string(), CRS(target).to_string())
+    if key not in transformers:
+        transformers[key] = Transformer.from_crs(source, target, always_xy=True)
+    return transformers[key]
+
+
+def project(geometries, source, target):
+    """the geometries reprojected from the source to the target crs"""
+
+    t = transformer(source, target)
+    return shapely.transform(np.asarray(geometries), lambda coords: np.column_stack(t.transform(coords[:, 0],
+                                                                                                 coords[:, 1])))
+
+
+def _crs_name(crs):
+    for name in [GEOGRAPHIC_CRS, PROJECTED_CRS]:
+        if CRS(crs).equals(CRS(name)):
+            return name
+    return None
+
+
+class ProjectedDataset:
+    """A layer with its geometries in GEOGRAPHIC_CRS and in PROJECTED_CRS, each one computed at most once"""
+
+    def __init__(self, data, geographic=None, projected=None):
+        self.data = pd.DataFrame(data)
+        self.geometries = {GEOGRAPHIC_CRS: geographic, PROJECTED_CRS: projected}
+
+    @classmethod
+    def from_gdf(cls, gdf):
+        """dataset of the GeoDataFrame, a GeoDataFrame without crs is taken as GEOGRAPHIC_CRS"""
+
+        geometries = np.asarray(gdf.geometry.values)
+        name = _crs_name(gdf.crs) if gdf.crs is not None else GEOGRAPHIC_CRS
+        if name is None:
+            return cls(gdf, geographic=project(geometries, gdf.crs, GEOGRAPHIC_CRS))
+        return cls(gdf, **{'geographic' if name == GEOGRAPHIC_CRS else 'projected': geometries})
+
+    @classmethod
+    def read(cls, path, columns=None):
+        """read the dataset saved in path, from the GeoParquet file next to the json file when it is not
+           older than it, otherwise from the json file"""
+
+        if not path.endswith('.parquet'):
+            parquet = parquet_path(path)
+            if not os.path.exists(parquet) or os.path.getmtime(parquet) < os.path.getmtime(path):
+                gdf = read_json(path, columns)
+                return cls(gdf, geographic=np.asarray(gdf.geometry.values))
+            path = parquet
+        gdf = read_parquet(path, columns)
+        projected = None
+        if PROJECTED_COLUMN in gdf.columns:
+            projected = np.asarray(gdf[PROJECTED_COLUMN].values)
+            gdf = gdf.drop(columns=PROJECTED_COLUMN)
+        return cls(gdf, geographic=np.asarray(gdf.geometry.values), projected=projected)
+
+    def geometry(self, crs):
+        """the geometries in crs (GEOGRAPHIC_CRS or PROJECTED_CRS), reprojected the first time they are asked"""
+
+        if self.geometries[crs] is None:
+            other = PROJECTED_CRS if crs == GEOGRAPHIC_CRS else GEOGRAPHIC_CRS
+            self.geometries[crs] = project(self.geometries[other], other, crs)
+        return self.geometries[crs]
+
+    def frame(self, crs=GEOGRAPHIC_CRS):
+        """GeoDataFrame of the dataset with the geometries in crs"""
+
+        df = self.data.copy()
+        df['geometry'] = self.geometry(crs)
+        return gpd.GeoDataFrame(df, geometry='geometry', crs=crs)
+
+    def save(self, path, parquet=True):
+        """save the dataset in a json file, in GEOGRAPHIC_CRS, and in a GeoParquet file next to it with the
+           geometries in both crs. If the GeoParquet file can not be written (e.g. a column with mixed types)
+           only the json file is kept
+        """
+
+        gdf = self.frame(GEOGRAPHIC_CRS)
+        df = pd.DataFrame(gdf)
+        df['geometry'] = df['geometry'].astype(str)
+        df.to_json(path, orient='table')
+        if not parquet:
+            return
+        gdf[PROJECTED_COLUMN] = gpd.GeoSeries(self.geometry(PROJECTED_CRS), index=gdf.index, crs=PROJECTED_CRS)
+        try:
+            save_parquet(gdf, parquet_path(path))
+        except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+            print("GeoParquet file not written for " + path + ": " + str(e))
+            if os.path.exists(parquet_path(path)):
+                os.remove(parquet_path(path))
+
+
+def save_parquet(gdf, path):
+    """save the GeoDataFrame in a GeoParquet file, the pairs columns are stored as lists of structs"""
+
+    df = gdf.reset_index(drop=True)
+    pair_columns = [c for c in df.columns if df[c].dtype == object and _is_pair_column(df[c])]
+    if pair_columns:
+        df = df.copy()
+        for column in pair_columns:
+            df[column] = _encode_pairs(df[column])
+    df.to_parquet(path, index=False)
+
+
+def save_gdf(gdf, path, parquet=True):
+    """save the GeoDataFrame with ProjectedDataset.save, the GeoDataFrame is reprojected in GEOGRAPHIC_CRS
+       in place"""
+
+    dataset = ProjectedDataset.from_gdf(gdf)
+    dataset.save(path, parquet)
+    gdf.set_geometry(gpd.GeoSeries(dataset.geometry(GEOGRAPHIC_CRS), index=gdf.index, name=gdf.geometry.name),
+                     inplace=True, crs=GEOGRAPHIC_CRS)
+
+
+def _pair_columns(schema):
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if pa.types.is_list(field.type) and pa.types.is_struct(field.type.value_type):
+            names = [field.type.value_type.field(i).name for i in range(field.type.value_type.num_fields)]
+            if names == ['id', 'distance']:
+                columns.append(field.name)
+    return columns
+
+
+def read_parquet(path, columns=None):
+    """read the GeoParquet file, only the columns given (and the geometries) if columns is not None"""
+
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    if columns is not None:
+        columns = list(columns) + [c for c in ['geometry', PROJECTED_COLUMN]
+                                   if c in schema.names and c not in columns]
+    gdf = gpd.read_parquet(path, columns=columns, memory_map=True)
+    pair_columns = _pair_columns(schema)
+    for column in gdf.columns:
+        if column in pair_columns:
+            gdf[column] = _decode_pairs(gdf[column])
+        elif gdf[column].dtype == object:
+            gdf[column] = [value.tolist() if isinstance(value, np.ndarray) else value for value in gdf[column]]
+    return gdf
+
+
+def read_json(path, columns=None):
+    """read the json file written by save_gdf, the geometries are parsed all at once"""
+
+    with open(path) as f:
+        data = json.load(f)['data']
+    df = pd.DataFrame(data)
+    df.drop('index', axis=1, inplace=True)
+    if columns is not None:
+        df = df[[c for c in df.columns if c in columns or c == 'geometry']].copy()
+    df['geometry'] = shapely.from_wkt(df['geometry'].to_numpy())
+    return gpd.GeoDataFrame(df, crs=GEOGRAPHIC_CRS)
+
+
+def read_gdf(path, columns=None, crs=GEOGRAPHIC_CRS):
+    """read the GeoDataFrame saved in path by save_gdf with the geometries in crs (GEOGRAPHIC_CRS or
+       PROJECTED_CRS)"""
+
+    return ProjectedDataset.read(path, columns).frame(crs)
@@ -0,0 +1,626 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import driverRegistry
+
+"""In this file we describe the whole workflow, from the extraction of the data from OSM to the routable
+graph, as a graph of stages. Every stage declares the artifacts it reads and writes:
+   file:<name>    a file in the import folder of the neo4j instance (or an absolute path)
+   mem:<name>     a GeoDataFrame kept in memory and handed to the next stages of this process
+   neo4j:<name>   the part of the database written by the stage
+
+The stages whose inputs are ready run concurrently, within the limits of the shared resources (only
+one stage at a time writes in the database, at most two query overpass). Every stage has a fingerprint
+computed from its definition, from its code and from its inputs; when the fingerprint is the one
+recorded in the manifest by the last successful run and the output files are unchanged, the stage is
+skipped. The stages producing GeoDataFrames are run only when a stage consuming them has to run.
+"""
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CYCLEWAYS = os.path.join(ROOT, 'Cycleways_and_Footways')
+EXTRACTION = os.path.join(CYCLEWAYS, 'Data_Extraction')
+PREPROCESSING = os.path.join(CYCLEWAYS, 'Data Preprocessing')
+GENERAL_GRAPHS = os.path.join(CYCLEWAYS, 'General_Graphs_generation_and_connection')
+SUBGRAPHS = os.path.join(CYCLEWAYS, 'Subgraphs_generation_and_connection')
+ROUTING = os.path.join(CYCLEWAYS, 'Routing')
+
+"""number of stages that can use a resource at the same time"""
+RESOURCES = {'neo4j': 1, 'overpass': 2}
+
+MANIFEST = 'pipeline_manifest.json'
+
+NEO4J = ['-n', '{neo4jURL}', '-u', '{neo4juser}', '-p', '{neo4jpwd}']
+AREA = ['-x', '{lat}', '-y', '{lon}', '-d', '{dist}']
+
+
+class StageError(Exception):
+    pass
+
+
+class Script:
+    """stage action running a script of the repository in its own folder"""
+
+    def __init__(self, path, *args):
+        self.path = path
+        self.args = args
+
+    def arguments(self, options):
+        return [str(a).format(**vars(options)) for a in self.args]
+
+    def describe(self, options):
+        """description used in the fingerprint, without the password"""
+
+        public = argparse.Namespace(**vars(options))
+        public.neo4jpwd = ''
+        return [os.path.relpath(self.path, ROOT)] + self.arguments(public)
+
+    def code(self):
+        return [self.path]
+
+    def __call__(self, ctx):
+        log_path = os.path.join(ctx.options.state_dir, ctx.stage.name + '.log')
+        with open(log_path, 'w') as log:
+            completed = subprocess.run([sys.executable, self.path] + self.arguments(ctx.options),
+                                       cwd=os.path.dirname(self.path), stdout=log, stderr=subprocess.STDOUT)
+        if completed.returncode != 0:
+            raise StageError("%s exited with code %d, see %s" % (os.path.basename(self.path),
+                                                                 completed.returncode, log_path))
+        return {}
+
+
+class Function:
+    """stage action calling function(ctx) in this process, the function returns the mem outputs"""
+
+    def __init__(self, function, *modules):
+        self.function = function
+        self.modules = modules
+
+    def describe(self, options):
+        return [self.function.__module__ + '.' + self.function.__qualname__]
+
+    def code(self):
+        return [os.path.abspath(__file__)] + list(self.modules)
+
+    def __call__(self, ctx):
+        return self.function(ctx) or {}
+
+
+class Stage:
+    def __init__(self, name, action, inputs=(), outputs=(), after=(), resources=(), code=()):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.resources = list(resources)
+        self.code = list(code)
+
+    def memory_outputs(self):
+        return [a for a in self.outputs if a.startswith('mem:')]
+
+    def file_outputs(self):
+        return [a for a in self.outputs if a.startswith('file:')]
+
+
+class Context:
+    """what the actions of the stages can use"""
+
+    def __init__(self, options, stage, memory):
+        self.options = options
+        self.stage = stage
+        self.memory = memory
+
+    def path(self, artifact):
+        return artifact_path(self.options, artifact)
+
+
+def artifact_path(options, artifact):
+    name = artifact.split(':', 1)[1]
+    return name if os.path.isabs(name) else os.path.join(options.import_dir, name)
+
+
+def _code_files(paths):
+    """the python files of the given files and folders"""
+
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for folder, _, names in sorted(os.walk(p)):
+                files += [os.path.join(folder, n) for n in sorted(names) if n.endswith('.py')]
+        else:
+            files.append(p)
+    return files
+
+
+"""SECTION 1: STAGES"""
+
+
+def _preprocessing_modules(options):
+    """the preprocessing modules, the relationships are found by options.processes processes"""
+
+    if PREPROCESSING not in sys.path:
+        sys.path.insert(1, PREPROCESSING)
+    import Spatial_tools
+    Spatial_tools.configure(processes=options.processes)
+    import Elaboration_on_cicleways, Elaboration_on_footways, Elaboration_on_crossing_ways, \
+        Elaboration_on_footways_and_cicleways, Elaboration_street_nodes
+    return Elaboration_on_cicleways, Elaboration_on_footways, Elaboration_on_crossing_ways, \
+        Elaboration_on_footways_and_cicleways, Elaboration_street_nodes
+
+
+def save_neighborhoods(ctx):
+    import geopandas as gpd
+    import geoFiles
+    geoFiles.save_gdf(gpd.read_file(ctx.path(ctx.stage.inputs[0])), ctx.path(ctx.stage.outputs[0]))
+
+
+def prepare_cycleways(ctx):
+    cicleways = _preprocessing_modules(ctx.options)[0]
+    gdf_cycleways = cicleways.read_file(ctx.path('file:cycleways.json'))
+    cicleways.preprocessing(gdf_cycleways)
+    return {'cycleways': gdf_cycleways}
+
+
+def prepare_footways(ctx):
+    footways = _preprocessing_modules(ctx.options)[1]
+    gdf_footways = footways.read_file(ctx.path('file:footways.json'))
+    footways.preprocessing(gdf_footways)
+    return {'footways': gdf_footways}
+
+
+def prepare_crossing_ways(ctx):
+    crossing_ways = _preprocessing_modules(ctx.options)[2]
+    gdf_crossing_ways = crossing_ways.read_file(ctx.path('file:crossing_ways.json'))
+    return {'crossing_ways': gdf_crossing_ways}
+
+
+def link_layers(ctx):
+    """relationships between cycleways and footways, on copies of the GeoDataFrames of the previous stages"""
+
+    footways_and_cicleways = _preprocessing_modules(ctx.options)[3]
+    gdf_cycleways = ctx.memory['cycleways'].copy()
+    gdf_footways = ctx.memory['footways'].copy()
+    footways_and_cicleways.find_cycleways_touching_footways_spatial_index(gdf_footways, gdf_cycleways)
+    footways_and_cicleways.find_cycleways_close_to_footways_spatial_index(gdf_footways, gdf_cycleways)
+    return {'cycleways_linked': gdf_cycleways, 'footways_linked': gdf_footways}
+
+
+def find_street_nodes(ctx):
+    street_nodes = _preprocessing_modules(ctx.options)[4]
+    gdf_cycleways = ctx.memory['cycleways_linked'].copy()
+    gdf_footways = ctx.memory['footways_linked'].copy()
+    gdf_crossing_ways = ctx.memory['crossing_ways'].copy()
+    street_nodes.preprocessing(gdf_cycleways, gdf_footways, gdf_crossing_ways, ctx.options)
+    return {'cycleways_junctions': gdf_cycleways, 'footways_junctions': gdf_footways,
+            'crossing_ways_junctions': gdf_crossing_ways}
+
+
+def save_preprocessed(ctx):
+    """save_gdf projects the GeoDataFrame back to epsg:4326 in place, so it is given a copy"""
+
+    cicleways, footways, crossing_ways = _preprocessing_modules(ctx.options)[:3]
+    cicleways.save_gdf(ctx.memory['cycleways_junctions'].copy(), ctx.path('file:cycleways_preprocessed.json'))
+    footways.save_gdf(ctx.memory['footways_junctions'].copy(), ctx.path('file:footways_preprocessed.json'))
+    crossing_ways.save_gdf(ctx.memory['crossing_ways_junctions'].copy(),
+                           ctx.path('file:crossing_ways_preprocessed.json'))
+
+
+def stages(options):
+    """the stages of the workflow"""
+
+    preprocessing_code = [os.path.join(PREPROCESSING, f) for f in [
+        'Elaboration_on_cicleways.py', 'Elaboration_on_footways.py', 'Elaboration_on_crossing_ways.py',
+        'Elaboration_on_footways_and_cicleways.py', 'Elaboration_street_nodes.py', 'Spatial_tools.py',
+        'Spatial_tiles.py']] + [os.path.join(ROOT, 'geoFiles.py'), os.path.join(ROOT, 'safetyRules.py')]
+    extraction_code = [os.path.join(EXTRACTION, 'Tools.py'), os.path.join(ROOT, 'geoFiles.py'),
+                       os.path.join(ROOT, 'safetyRules.py')]
+    return [
+        # road network
+        Stage('junction_graph', Script(os.path.join(ROOT, 'createJunctionGraph.py'), *AREA + NEO4J +
+                                       ['-f', 'junctions.graphml']),
+              outputs=['file:junctions.graphml', 'neo4j:junctions'], resources=['neo4j', 'overpass'],
+              code=[os.path.join(ROOT, 'spatialIndex.py')]),
+        Stage('amenity', Script(os.path.join(ROOT, 'amenity.py'), *NEO4J + AREA +
+                                ['--importDir', '{import_dir}']),
+              inputs=['neo4j:junctions'], outputs=['neo4j:poi', 'file:poi_index.json'],
+              resources=['neo4j', 'overpass'],
+              code=[os.path.join(ROOT, 'spatialIndex.py'), os.path.join(ROOT, 'poiIndex.py')]),
+        Stage('traffic', Script(os.path.join(ROOT, 'traffic.py'), *NEO4J + ['-f', '{traffic}']),
+              inputs=['file:' + os.path.abspath(options.traffic), 'neo4j:junctions'], outputs=['neo4j:traffic'],
+              resources=['neo4j']),
+        Stage('road_section_graph', Script(os.path.join(ROOT, 'createRoadSectionGraph.py'), *NEO4J),
+              inputs=['neo4j:traffic'], outputs=['neo4j:road_sections'], resources=['neo4j']),
+
+        # extraction of cycleways and footways
+        Stage('extract_cycleways', Script(os.path.join(EXTRACTION, 'Get_cycleway_from_OSM.py'), *NEO4J + AREA +
+                                          ['-f', 'cycleways.json']),
+              outputs=['file:cycleways.json'], resources=['overpass'],
+              code=extraction_code),
+        Stage('extract_footways', Script(os.path.join(EXTRACTION, 'Get_footways_from_OSM.py'), *NEO4J + AREA),
+              outputs=['file:footways.json'], resources=['overpass'], code=extraction_code),
+        Stage('extract_crossing_nodes', Script(os.path.join(EXTRACTION, 'Get_crossing_nodes_from_OSM.py'),
+                                               *NEO4J + AREA),
+              outputs=['file:crossing_nodes.json'], resources=['overpass'],
+              code=extraction_code),
+        Stage('extract_crossing_ways', Script(os.path.join(EXTRACTION, 'Get_crossing_ways_from_OSM.py'),
+                                              *NEO4J + AREA),
+              outputs=['file:crossing_ways.json'], resources=['overpass'],
+              code=extraction_code),
+        Stage('extract_street_graphs', Script(os.path.join(EXTRACTION, 'GraphmlFileCreation.py'), *AREA + NEO4J +
+                                              ['-f', 'streets']),
+              outputs=['file:streets_bike.graphml', 'file:streets_foot.graphml'], resources=['overpass']),
+        Stage('neighborhoods', Function(save_neighborhoods, os.path.join(ROOT, 'geoFiles.py')),
+              inputs=['file:' + os.path.join(EXTRACTION, 'QuartieriModena.geojson')],
+              outputs=['file:neighborhoods.json']),
+
+        # preprocessing, the GeoDataFrames stay in memory until they are saved
+        Stage('prepare_cycleways', Function(prepare_cycleways, *preprocessing_code),
+              inputs=['file:cycleways.json'], outputs=['mem:cycleways']),
+        Stage('prepare_footways', Function(prepare_footways, *preprocessing_code),
+              inputs=['file:footways.json'], outputs=['mem:footways']),
+        Stage('prepare_crossing_ways', Function(prepare_crossing_ways, *preprocessing_code),
+              inputs=['file:crossing_ways.json'], outputs=['mem:crossing_ways']),
+        Stage('link_layers', Function(link_layers, *preprocessing_code),
+              inputs=['mem:cycleways', 'mem:footways'], outputs=['mem:cycleways_linked', 'mem:footways_linked']),
+        Stage('street_nodes', Function(find_street_nodes, *preprocessing_code),
+              inputs=['mem:cycleways_linked', 'mem:footways_linked', 'mem:crossing_ways'],
+              outputs=['mem:cycleways_junctions', 'mem:footways_junctions', 'mem:crossing_ways_junctions'],
+              resources=['overpass']),
+        Stage('save_preprocessed', Function(save_preprocessed, *preprocessing_code),
+              inputs=['mem:cycleways_junctions', 'mem:footways_junctions', 'mem:crossing_ways_junctions'],
+              outputs=['file:cycleways_preprocessed.json', 'file:footways_preprocessed.json',
+                       'file:crossing_ways_preprocessed.json']),
+
+        # graphs of cycleways and footways
+        Stage('general_graph', Script(os.path.join(GENERAL_GRAPHS, 'GeneralGraphGeneration.py'), *NEO4J + [
+            '-fc', 'cycleways_preprocessed.json', '-fcn', 'crossing_nodes.json',
+            '-fcw', 'crossing_ways_preprocessed.json', '-ff', 'footways_preprocessed.json',
+            '-fnb', 'neighborhoods.json', '--bulkLoad', '--importDir', '{import_dir}']),
+              inputs=['file:cycleways_preprocessed.json', 'file:footways_preprocessed.json',
+                      'file:crossing_ways_preprocessed.json', 'file:crossing_nodes.json',
+                      'file:neighborhoods.json', 'neo4j:poi'],
+              outputs=['neo4j:general_graph'], resources=['neo4j'],
+              code=[GENERAL_GRAPHS, os.path.join(ROOT, 'geoFiles.py'), os.path.join(ROOT, 'spatialIndex.py')]),
+        Stage('general_weights', Script(os.path.join(ROUTING, 'Routing_on_General_graphs', 'SetWeights.py'),
+                                        *NEO4J),
+              inputs=['neo4j:general_graph'], outputs=['neo4j:general_weights'], resources=['neo4j']),
+        Stage('subgraphs', Script(os.path.join(SUBGRAPHS, 'SubgraphGeneration.py'), *AREA + NEO4J + [
+            '-f', 'streets_bike.graphml', '-fc', 'cycleways_preprocessed.json',
+            '-fcw', 'crossing_ways_preprocessed.json', '-ff', 'footways_preprocessed.json',
+            '--bulkLoad', '--importDir', '{import_dir}']),
+              inputs=['file:streets_bike.graphml', 'file:cycleways_preprocessed.json',
+                      'file:footways_preprocessed.json', 'file:crossing_ways_preprocessed.json',
+                      'neo4j:junctions', 'neo4j:general_graph'],
+              outputs=['neo4j:subgraphs'], after=['general_weights'], resources=['neo4j'],
+              code=[SUBGRAPHS, os.path.join(ROUTING, 'Routing_on_subgraphs'), os.path.join(ROOT, 'spatialIndex.py'),
+                    os.path.join(ROOT, 'geoFiles.py')]),
+        Stage('partition', Script(os.path.join(ROUTING, 'Routing_on_subgraphs', 'Partitioner.py'), *NEO4J),
+              inputs=['neo4j:subgraphs'], outputs=['neo4j:partition'], resources=['neo4j'],
+              code=[os.path.join(ROUTING, 'Routing_on_subgraphs')]),
+    ]
+
+
+"""SECTION 2: RUNNER"""
+
+
+class Pipeline:
+    """runs the stages in the order given by their inputs and outputs"""
+
+    def __init__(self, stage_list, options, resources=None):
+        self.stages = {s.name: s for s in stage_list}
+        self.order = [s.name for s in stage_list]
+        self.options = options
+        capacities = dict(RESOURCES, **(resources or {}))
+        self.resources = {r: threading.Semaphore(c) for r, c in capacities.items()}
+        self.producers = {}
+        for s in stage_list:
+            for a in s.outputs:
+                if a in self.producers:
+                    raise ValueError("%s is written by both %s and %s" % (a, self.producers[a], s.name))
+                self.producers[a] = s.name
+        for s in stage_list:
+            for d in self.dependencies(s.name):
+                if d not in self.stages:
+                    raise ValueError("Unknown stage %s after %s" % (d, s.name))
+        self.memory = {}
+        self.fingerprints = {}
+        self.status = {}
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._stage_locks = {name: threading.Lock() for name in self.stages}
+        os.makedirs(options.state_dir, exist_ok=True)
+        self.manifest_path = os.path.join(options.state_dir, MANIFEST)
+        self.manifest = {'stages': {}, 'files': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def dependencies(self, name):
+        s = self.stages[name]
+        deps = [self.producers[a] for a in s.inputs if a in self.producers] + s.after
+        return list(dict.fromkeys(deps))
+
+    def select(self, targets=None):
+        """the targets and all the stages they depend on, in the order of definition"""
+
+        if not targets:
+            return list(self.order)
+        selected = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise ValueError("Unknown stage " + name)
+            if name not in selected:
+                selected.add(name)
+                todo += self.dependencies(name)
+        return [n for n in self.order if n in selected]
+
+    """fingerprints"""
+
+    def file_hash(self, path):
+        """sha256 of the file, reused from the manifest while size and modification time do not change"""
+
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        with self._lock:
+            cached = self.manifest['files'].get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        with self._lock:
+            self.manifest['files'][path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def fingerprint(self, name):
+        s = self.stages[name]
+        code = _code_files(list(s.action.code()) + s.code)
+        description = {
+            'stage': name,
+            'action': s.action.describe(self.options),
+            'outputs': s.outputs,
+            'code': {os.path.relpath(p, ROOT): self.file_hash(p) for p in code},
+            'inputs': {},
+            'after': {d: self.fingerprints.get(d) for d in s.after},
+        }
+        for a in s.inputs:
+            if a in self.producers:
+                description['inputs'][a] = self.fingerprints.get(self.producers[a])
+            if a.startswith('file:'):
+                description['inputs'][a + '#sha256'] = self.file_hash(artifact_path(self.options, a))
+        encoded = json.dumps(description, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def is_current(self, name, fingerprint):
+        recorded = self.manifest['stages'].get(name)
+        if not recorded or recorded['fingerprint'] != fingerprint:
+            return False
+        for a in self.stages[name].file_outputs():
+            if self.file_hash(artifact_path(self.options, a)) != recorded['outputs'].get(a):
+                return False
+        return True
+
+    def forced(self, name):
+        force = self.options.force
+        return force is not None and (not force or name in force)
+
+    def save_manifest(self):
+        tmp = self.manifest_path + '.tmp'
+        with self._manifest_lock:
+            with self._lock:
+                encoded = json.dumps(self.manifest, indent=1, sort_keys=True)
+            with open(tmp, 'w') as f:
+                f.write(encoded)
+            os.replace(tmp, self.manifest_path)
+
+    """execution"""
+
+    def _execute(self, name):
+        """run the action of the stage and record the outputs in the manifest"""
+
+        s = self.stages[name]
+        for a in s.inputs:
+            if a.startswith('mem:'):
+                self.materialize(self.producers[a])
+        for r in sorted(s.resources):
+            self.resources[r].acquire()
+        start = time.time()
+        try:
+            print("Stage %s : started" % name)
+            values = s.action(Context(self.options, s, self.memory))
+        finally:
+            for r in sorted(s.resources, reverse=True):
+                self.resources[r].release()
+        missing = [a for a in s.memory_outputs() if a[4:] not in values]
+        if missing:
+            raise StageError("Stage %s did not return %s" % (name, ', '.join(missing)))
+        with self._lock:
+            for a in s.memory_outputs():
+                self.memory[a[4:]] = values[a[4:]]
+        outputs = {a: self.file_hash(artifact_path(self.options, a)) for a in s.file_outputs()}
+        absent = [a for a, h in outputs.items() if h is None]
+        if absent:
+            raise StageError("Stage %s did not write %s" % (name, ', '.join(absent)))
+        with self._lock:
+            self.manifest['stages'][name] = {'fingerprint': self.fingerprints[name], 'outputs': outputs,
+                                             'finished_at': time.time(), 'seconds': time.time() - start}
+        self.save_manifest()
+        print("Stage %s : done in %.1f s" % (name, time.time() - start))
+
+    def materialize(self, name):
+        """run a skipped stage whose GeoDataFrames are needed by a stage that has to run"""
+
+        with self._stage_locks[name]:
+            if self.status.get(name) == 'deferred':
+                self._execute(name)
+                self.status[name] = 'ran'
+
+    def run_stage(self, name):
+        fingerprint = self.fingerprint(name)
+        self.fingerprints[name] = fingerprint
+        upstream = any(self.status.get(d) == 'ran' for d in self.dependencies(name))
+        if not upstream and not self.forced(name) and self.is_current(name, fingerprint):
+            self.status[name] = 'deferred' if self.stages[name].memory_outputs() else 'current'
+            print("Stage %s : up to date" % name)
+            return
+        with self._stage_locks[name]:
+            self._execute(name)
+            self.status[name] = 'ran'
+
+    def run(self, targets=None, jobs=4):
+        """run the selected stages, a failed stage stops the stages depending on it"""
+
+        selected = self.select(targets)
+        pending = list(selected)
+        running = {}
+        failures = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = [d for d in self.dependencies(name) if d in selected]
+                    if any(self.status.get(d) in ('failed', 'blocked') for d in deps):
+                        self.status[name] = 'blocked'
+                        pending.remove(name)
+                        print("Stage %s : skipped, an earlier stage failed" % name)
+                    elif all(d in self.status for d in deps):
+                        pending.remove(name)
+                        running[executor.submit(self.run_stage, name)] = name
+                if not running:
+                    if not pending:
+                        break
+                    raise StageError("The stages %s depend on each other" % ', '.join(pending))
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        self.status[name] = 'failed'
+                        failures[name] = error
+                        print("Stage %s : failed, %s" % (name, error))
+        self.save_manifest()
+        return failures
+
+    def plan(self, targets=None):
+        """what run() would do with the files as they are now"""
+
+        plan = []
+        for name in self.select(targets):
+            self.fingerprints[name] = self.fingerprint(name)
+            upstream = any(self.status.get(d) == 'ran' for d in self.dependencies(name))
+            if upstream or self.forced(name) or not self.is_current(name, self.fingerprints[name]):
+                self.status[name] = 'ran'
+            else:
+                self.status[name] = 'current'
+            plan.append((name, 'run' if self.status[name] == 'ran' else 'up to date'))
+        return plan
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def get_path(self):
+        """gets the path of the neo4j instance"""
+
+        with self.driver.session() as session:
+            result = session.write_transaction(self._get_path)
+            return result
+
+    @staticmethod
+    def _get_path(tx):
+        result = tx.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.neo4j_home' return value;
+                    """)
+        return result.values()
+
+    def get_import_folder_name(self):
+        """gets the path of the import folder of the neo4j instance"""
+
+        with self.driver.session() as session:
+            result = session.write_transaction(self._get_import_folder_name)
+            return result
+
+    @staticmethod
+    def _get_import_folder_name(tx):
+        result = tx.run("""
+                        Call dbms.listConfig() yield name,value where name = 'dbms.directories.import' return value;
+                    """)
+        return result.values()
+
+
+def add_options():
+    """parameters to be used in order to run the script"""
+
+    parser = argparse.ArgumentParser(description='Creation of the routing graph, from the OSM data to the projections.')
+    parser.add_argument('--latitude', '-x', dest='lat', type=float,
+                        help="""Insert latitude of city center""",
+                        required=True)
+    parser.add_argument('--longitude', '-y', dest='lon', type=float,
+                        help="""Insert longitude of city center""",
+                        required=True)
+    parser.add_argument('--distance', '-d', dest='dist', type=float,
+                        help="""Insert distance (in meters) of the area to be cover""",
+                        required=True)
+    parser.add_argument('--neo4jURL', '-n', dest='neo4jURL', type=str,
+                        help="""Insert the address of the local neo4j instance. For example: neo4j://localhost:7687""",
+                        required=True)
+    parser.add_argument('--neo4juser', '-u', dest='neo4juser', type=str,
+                        help="""Insert the name of the user of the local neo4j instance.""",
+                        required=True)
+    parser.add_argument('--neo4jpwd', '-p', dest='neo4jpwd', type=str,
+                        help="""Insert the password of the local neo4j instance.""",
+                        required=True)
+    parser.add_argument('--importDir', dest='import_dir', type=str,
+                        help="""Insert the import folder of the neo4j instance, by default it is asked to the instance""")
+    parser.add_argument('--traffic', '-f', dest='traffic', type=str, default=os.path.join(ROOT, 'traffic.csv'),
+                        help="""Insert the name of the .csv file containing the traffic data""")
+    parser.add_argument('--stateDir', dest='state_dir', type=str, default=os.path.join(ROOT, '.pipeline'),
+                        help="""Insert the folder where to keep the manifest and the logs of the stages""")
+    parser.add_argument('--jobs', '-j', dest='jobs', type=int, default=4,
+                        help="""Insert the number of stages that can run at the same time""")
+    parser.add_argument('--target', '-t', dest='targets', action='append',
+                        help="""Insert the stage to reach, can be repeated. All the stages are run by default""")
+    parser.add_argument('--force', dest='force', nargs='*',
+                        help="""Run the given stages (all the stages if none is given) even if they are up to date""")
+    parser.add_argument('--processes', dest='processes', type=int, default=1,
+                        help="""Insert the number of processes used by the preprocessing to find the relationships""")
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help="""Show the stages that would run without running them""")
+    return parser
+
+
+def main(args=None):
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+    options.traffic = os.path.abspath(options.traffic)
+    options.state_dir = os.path.abspath(options.state_dir)
+    if not options.import_dir:
+        greeter = App(options.neo4jURL, options.neo4juser, options.neo4jpwd)
+        options.import_dir = os.path.join(greeter.get_path()[0][0], greeter.get_import_folder_name()[0][0])
+        greeter.close()
+
+    pipeline = Pipeline(stages(options), options)
+    if options.dry_run:
+        for name, action in pipeline.plan(options.targets):
+            print("%-24s %s" % (name, action))
+        return 0
+
+    failures = pipeline.run(options.targets, options.jobs)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+import driverRegistry
+
+"""In this file the points of interest are indexed by name, so that the destination of a route is found in memory
+instead of scanning all the Tag nodes with MATCH (t:Tag) WHERE t.name = $dest.
+The names are normalized (lowercase, without accents and punctuation) and split in tokens. A token of the query
+matches the tokens of the names that are equal to it, that start with it (found walking a trie of the tokens)
+or, if it is long enough, that share most of their trigrams with it, so that a typo still finds the point of
+interest. A point of interest matches the query when all its tokens match, the best matches first; the results
+can be restricted to a category (the amenity tag).
+The index is built from the points of interest imported by amenity.py and saved as a json file in the import
+folder of neo4j, the routing scripts load it once with get_index() and rebuild it only if the file changes. The
+path of the import folder is asked to neo4j once for each driver.
+"""
+
+INDEX_FILE = 'poi_index.json'
+
+"""score of a token of the query equal to a token of the name, prefix of it or similar to it"""
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.75
+FUZZY_SCORE = 0.7
+
+"""least share of trigrams of two similar tokens, and least length of the tokens searched by similarity"""
+MIN_SIMILARITY = 0.4
+MIN_FUZZY_LENGTH = 4
+
+_cache = {}
+_paths = {}
+_lock = threading.Lock()
+
+
+def normalize(text):
+    """tokens of the text: lowercase words and numbers without accents"""
+
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.findall(r'[a-z0-9]+', text)
+
+
+def trigrams(token):
+    """trigrams of the token, with the start and the end marked by spaces"""
+
+    padded = '  ' + token + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PoiIndex:
+    """Points of interest (id, name, category, longitude, latitude) indexed by the tokens of their names"""
+
+    def __init__(self, pois):
+        self.pois = [list(poi) for poi in pois if normalize(poi[1])]
+        self.postings = {}
+        for position, poi in enumerate(self.pois):
+            for token in set(normalize(poi[1])):
+                self.postings.setdefault(token, []).append(position)
+        self.trie = {}
+        for token, positions in self.postings.items():
+            node = self.trie
+            for c in token:
+                node = node.setdefault(c, {})
+                node.setdefault(None, set()).update(positions)
+        self.trigrams = {}
+        self.sizes = {}
+        for token in self.postings:
+            grams = trigrams(token)
+            self.sizes[token] = len(grams)
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(token)
+
+    def __len__(self):
+        return len(self.pois)
+
+    def prefixed(self, prefix):
+        """positions of the points of interest with a token starting with prefix"""
+
+        node = self.trie
+        for c in prefix:
+            node = node.get(c)
+            if node is None:
+                return set()
+        return node.get(None, set())
+
+    def similar(self, token):
+        """tokens of the names sharing at least MIN_SIMILARITY of their trigrams with token, with the share"""
+
+        grams = trigrams(token)
+        shared = {}
+        for gram in grams:
+            for other in self.trigrams.get(gram, ()):
+                shared[other] = shared.get(other, 0) + 1
+        result = {}
+        for other, count in shared.items():
+            similarity = count / (len(grams) + self.sizes[other] - count)
+            if similarity >= MIN_SIMILARITY:
+                result[other] = similarity
+        return result
+
+    def matches(self, token, fuzzy=True):
+        """score of the points of interest matching a token of the query"""
+
+        result = dict.fromkeys(self.prefixed(token), PREFIX_SCORE)
+        result.update(dict.fromkeys(self.postings.get(token, ()), EXACT_SCORE))
+        if fuzzy and len(token) >= MIN_FUZZY_LENGTH:
+            for other, similarity in self.similar(token).items():
+                for position in self.postings[other]:
+                    if result.get(position, 0) < FUZZY_SCORE * similarity:
+                        result[position] = FUZZY_SCORE * similarity
+        return result
+
+    def search(self, query, category=None, limit=10, fuzzy=True):
+        """the points of interest (of the category, if given) matching all the tokens of the query, the best
+           first: id, name, category, longitude, latitude and score"""
+
+        scores = None
+        for token in normalize(query):
+            matches = self.matches(token, fuzzy)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {position: score + matches[position] for position, score in scores.items()
+                          if position in matches}
+            if not scores:
+                return []
+        if scores is None:
+            return []
+        if category is not None:
+            scores = {position: score for position, score in scores.items() if self.pois[position][2] == category}
+        best = sorted(scores, key=lambda position: (-scores[position], len(self.pois[position][1]),
+                                                    self.pois[position][1]))[:limit]
+        return [{'id': self.pois[position][0], 'name': self.pois[position][1], 'category': self.pois[position][2],
+                 'lon': self.pois[position][3], 'lat': self.pois[position][4], 'score': scores[position]}
+                for position in best]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'pois': self.pois}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['pois'])
+
+
+def get_index(path):
+    """index saved in path, loaded once and again only if the file changes. None if there is no file"""
+
+    if not os.path.exists(path):
+        return None
+    modified = os.path.getmtime(path)
+    with _lock:
+        if path in _cache and _cache[path][0] == modified:
+            return _cache[path][1]
+    index = PoiIndex.load(path)
+    with _lock:
+        _cache[path] = (modified, index)
+    return index
+
+
+def access_point(longitudes, latitudes):
+    """(longitude, latitude) of a point of interest: the mean of the coordinates of its nodes"""
+
+    located = [(float(lon), float(lat)) for lon, lat in zip(longitudes, latitudes)
+               if lon is not None and lat is not None]
+    if not located:
+        return None, None
+    return (sum(lon for lon, _ in located) / len(located), sum(lat for _, lat in located) / len(located))
+
+
+def _values(tx, query):
+    return tx.run(query).values()
+
+
+def read_pois(driver):
+    """osm id, name, category and coordinates of the nodes of the points of interest in the graph"""
+
+    with driver.session() as session:
+        return session.read_transaction(_values, """
+                MATCH (poi:PointOfInterest)
+                OPTIONAL MATCH (poi)-[:TAGS]->(t:Tag)
+                OPTIONAL MATCH (o:OSMNode)-[:PART_OF]->(poi)
+                WITH poi, t, collect(o) AS nodes
+                OPTIONAL MATCH (poi)-[:MEMBER]->(w:OSMWayNode)
+                WITH poi, t, nodes + collect(w) AS nodes
+                RETURN poi.osm_id, coalesce(t.name, poi.name), t.amenity,
+                [n IN nodes | tofloat(n.lon)], [n IN nodes | tofloat(n.lat)]
+                """)
+
+
+def index_path(driver):
+    """path of the index file in the import folder of the neo4j instance, asked once for each driver"""
+
+    with _lock:
+        if driver in _paths:
+            return _paths[driver]
+    with driver.session() as session:
+        folders = dict(session.read_transaction(_values, """
+                CALL dbms.listConfig() YIELD name, value
+                WHERE name IN ['dbms.directories.neo4j_home', 'dbms.directories.import']
+                RETURN name, value
+                """))
+    path = os.path.join(folders['dbms.directories.neo4j_home'], folders['dbms.directories.import'], INDEX_FILE)
+    with _lock:
+        _paths[driver] = path
+    return path
+
+
+def build_index(driver, path=None):
+    """build the index of the points of interest in the graph and save it in path (the import folder by
+       default)"""
+
+    rows = [[osm_id, name, category, *access_point(longitudes, latitudes)]
+            for osm_id, name, category, longitudes, latitudes in read_pois(driver)]
+    index = PoiIndex(rows)
+    index.save(path or index_path(driver))
+    return index
+
+
+def find(driver, name, category=None, limit=1):
+    """the points of interest matching name, from the saved index (built if there is none)"""
+
+    path = index_path(driver)
+    index = get_index(path)
+    if index is None:
+        index = build_index(driver, path)
+    return index.search(name, category, limit)
+
+
+class App:
+    def __init__(self, uri, user, password):
+        self.driver = driverRegistry.get_driver(uri, user, password)
+
+    def close(self):
+        self.driver.close()
+
+    def build_index(self, path=None):
+        return build_index(self.driver, path)
+
+    def find(self, name, category=None, limit=1):
+        return find(self.driver, name, category, limit)
@@ -0,0 +1,321 @@
+import argparse
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+"""In this file we define a thin instrumentation layer around the neo4j driver. Every transaction
+function run through a profiled driver is recorded with its name, its wall time, the time needed by
+the server to make the results available and to consume them, the update counters and, when
+requested, the db hits of the PROFILE plan. The records can be exported as json lines or in the
+Prometheus text format.
+
+The behaviour can be driven by environment variables:
+   NEO4J_PROFILE=1                    prefix the statements with PROFILE to collect the db hits
+   NEO4J_PROFILE_JSONL=<path>         append the records to the file when the process ends
+   NEO4J_PROFILE_PROMETHEUS=<path>    write the aggregated metrics to the file when the process ends
+"""
+
+COUNTERS = ['nodes_created', 'nodes_deleted', 'relationships_created', 'relationships_deleted',
+            'properties_set', 'labels_added', 'labels_removed', 'indexes_added', 'indexes_removed',
+            'constraints_added', 'constraints_removed']
+
+"""statements that cannot be profiled"""
+NOT_PROFILABLE = re.compile(r'^\s*(PROFILE|EXPLAIN|CREATE\s+(INDEX|CONSTRAINT)|DROP|SHOW|:)', re.IGNORECASE)
+
+_records = []
+_lock = threading.Lock()
+
+
+def profile_enabled():
+    return os.environ.get('NEO4J_PROFILE', '0').lower() in ('1', 'true', 'yes')
+
+
+def _db_hits(plan):
+    """sum the db hits of a PROFILE plan and of all its children"""
+
+    if not plan:
+        return 0
+    hits = plan.get('dbHits', plan.get('db_hits', 0)) or 0
+    for child in plan.get('children', []):
+        hits += _db_hits(child)
+    return hits
+
+
+class _RecordingTransaction:
+    """transaction proxy that keeps the results of the statements in order to read their summaries"""
+
+    def __init__(self, tx, profile):
+        self._tx = tx
+        self._profile = profile
+        self.results = []
+
+    def run(self, query, parameters=None, **kwparameters):
+        if self._profile and not NOT_PROFILABLE.match(query):
+            query = 'PROFILE ' + query
+        result = self._tx.run(query, parameters, **kwparameters)
+        self.results.append((query, result))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
+
+
+def _statement_summary(query, result):
+    summary = result.consume()
+    statement = {
+        'query': ' '.join(query.split())[:200],
+        'result_available_after_ms': summary.result_available_after or 0,
+        'result_consumed_after_ms': summary.result_consumed_after or 0,
+        'counters': {c: getattr(summary.counters, c) for c in COUNTERS if getattr(summary.counters, c)},
+    }
+    if summary.profile:
+        statement['db_hits'] = _db_hits(summary.profile)
+    return statement
+
+
+def _profiled_function(transaction_function, profile, record):
+    """wrap the transaction function so that the summaries are read before the transaction is closed"""
+
+    def run(tx, *args, **kwargs):
+        recording = _RecordingTransaction(tx, profile)
+        value = transaction_function(recording, *args, **kwargs)
+        record['statements'] = [_statement_summary(query, result) for query, result in recording.results]
+        return value
+
+    return run
+
+
+def _transaction_name(transaction_function):
+    return getattr(transaction_function, '__qualname__', getattr(transaction_function, '__name__', 'anonymous'))
+
+
+def _module_name(transaction_function):
+    """name of the script defining the transaction function, also when it is run as __main__"""
+
+    module = sys.modules.get(getattr(transaction_function, '__module__', None))
+    path = getattr(module, '__file__', None)
+    if path:
+        return os.path.splitext(os.path.basename(path))[0]
+    return getattr(transaction_function, '__module__', None)
+
+
+def _run_profiled(method, transaction_function, kind, args, kwargs):
+    record = OrderedDict([('transaction', _transaction_name(transaction_function)),
+                          ('module', _module_name(transaction_function)),
+                          ('kind', kind), ('started_at', time.time())])
+    start = time.perf_counter()
+    try:
+        return method(_profiled_function(transaction_function, profile_enabled(), record), *args, **kwargs)
+    except Exception as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['wall_time_s'] = time.perf_counter() - start
+        statements = record.setdefault('statements', [])
+        record['result_available_after_ms'] = sum(s['result_available_after_ms'] for s in statements)
+        record['result_consumed_after_ms'] = sum(s['result_consumed_after_ms'] for s in statements)
+        counters = {}
+        for s in statements:
+            for c, v in s['counters'].items():
+                counters[c] = counters.get(c, 0) + v
+        record['counters'] = counters
+        if any('db_hits' in s for s in statements):
+            record['db_hits'] = sum(s.get('db_hits', 0) for s in statements)
+        with _lock:
+            _records.append(record)
+
+
+class ProfiledSession:
+    """session proxy recording every transaction function it runs"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def _transaction(self, kind, transaction_function, args, kwargs):
+        method = getattr(self._session, 'execute_' + kind, None)
+        if method is None:
+            method = getattr(self._session, kind + '_transaction')
+        return _run_profiled(method, transaction_function, kind, args, kwargs)
+
+    def write_transaction(self, transaction_function, *args, **kwargs):
+        return self._transaction('write', transaction_function, args, kwargs)
+
+    def read_transaction(self, transaction_function, *args, **kwargs):
+        return self._transaction('read', transaction_function, args, kwargs)
+
+    execute_write = write_transaction
+    execute_read = read_transaction
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __enter__(self):
+        self._session.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._session.__exit__(exc_type, exc_value, traceback)
+
+
+class ProfiledDriver:
+    """driver proxy whose sessions are profiled"""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def session(self, **config):
+        return ProfiledSession(self._driver.session(**config))
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def profiled(driver):
+    """return the driver wrapped so that all its transaction functions are recorded"""
+
+    if isinstance(driver, ProfiledDriver):
+        return driver
+    return ProfiledDriver(driver)
+
+
+def records():
+    """copy of the records collected so far by this process"""
+
+    with _lock:
+        return list(_records)
+
+
+def reset():
+    with _lock:
+        del _records[:]
+
+
+def export_jsonl(path, recs=None):
+    """append the records to path, one json object per line"""
+
+    recs = records() if recs is None else recs
+    with open(path, 'a') as f:
+        for r in recs:
+            f.write(json.dumps(r) + '\n')
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def aggregate(recs):
+    """totals of the records grouped by module and transaction function"""
+
+    totals = OrderedDict()
+    for r in recs:
+        key = (r.get('module') or '', r['transaction'])
+        t = totals.setdefault(key, {'calls': 0, 'errors': 0, 'wall_time_s': 0.0, 'result_available_after_ms': 0,
+                                    'result_consumed_after_ms': 0, 'db_hits': 0, 'counters': {}})
+        t['calls'] += 1
+        t['errors'] += 1 if 'error' in r else 0
+        for field in ['wall_time_s', 'result_available_after_ms', 'result_consumed_after_ms', 'db_hits']:
+            t[field] += r.get(field, 0)
+        for c, v in r.get('counters', {}).items():
+            t['counters'][c] = t['counters'].get(c, 0) + v
+    return totals
+
+
+def _labels(module, transaction, **extra):
+    labels = OrderedDict([('module', module), ('transaction', transaction)])
+    labels.update(extra)
+    return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k, v in labels.items()) + '}'
+
+
+def prometheus_text(recs=None):
+    """metrics of the records in the Prometheus text exposition format"""
+
+    totals = aggregate(records() if recs is None else recs)
+    metrics = [
+        ('neo4j_transaction_calls_total', 'Number of runs of the transaction function', 'calls'),
+        ('neo4j_transaction_errors_total', 'Number of failed runs of the transaction function', 'errors'),
+        ('neo4j_transaction_seconds_total', 'Wall time spent in the transaction function', 'wall_time_s'),
+        ('neo4j_transaction_result_available_after_ms_total',
+         'Time for the server to make the first result available', 'result_available_after_ms'),
+        ('neo4j_transaction_result_consumed_after_ms_total',
+         'Time for the server to consume the results', 'result_consumed_after_ms'),
+        ('neo4j_transaction_db_hits_total', 'Database hits of the PROFILE plans', 'db_hits'),
+    ]
+    lines = []
+    for name, description, field in metrics:
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s counter' % name)
+        for (module, transaction), t in totals.items():
+            lines.append('%s%s %s' % (name, _labels(module, transaction), t[field]))
+    lines.append('# HELP neo4j_transaction_updates_total Updates made by the transaction function')
+    lines.append('# TYPE neo4j_transaction_updates_total counter')
+    for (module, transaction), t in totals.items():
+        for c, v in t['counters'].items():
+            lines.append('neo4j_transaction_updates_total%s %s' % (_labels(module, transaction, counter=c), v))
+    return '\n'.join(lines) + '\n'
+
+
+def export_prometheus(path, recs=None):
+    with open(path, 'w') as f:
+        f.write(prometheus_text(recs))
+
+
+def _export_at_exit():
+    recs = records()
+    if not recs:
+        return
+    if os.environ.get('NEO4J_PROFILE_JSONL'):
+        export_jsonl(os.environ['NEO4J_PROFILE_JSONL'], recs)
+    if os.environ.get('NEO4J_PROFILE_PROMETHEUS'):
+        export_prometheus(os.environ['NEO4J_PROFILE_PROMETHEUS'], recs)
+
+
+atexit.register(_export_at_exit)
+
+
+def add_options():
+    """parameters to be used in order to run the script"""
+
+    parser = argparse.ArgumentParser(description='Report of the profiled transaction functions.')
+    parser.add_argument('files', nargs='+',
+                        help="""Insert the .jsonl files written by the profiled scripts""")
+    parser.add_argument('--prometheus', '-o', dest='prometheus', type=str,
+                        help="""Insert the name of the file where to write the metrics in the Prometheus format""")
+    parser.add_argument('--top', '-t', dest='top', type=int, default=20,
+                        help="""Insert the number of transaction functions and statements to show""")
+    return parser
+
+
+def main(args=None):
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+    recs = [r for path in options.files for r in read_jsonl(path)]
+
+    """slowest transaction functions"""
+    totals = sorted(aggregate(recs).items(), key=lambda kv: kv[1]['wall_time_s'], reverse=True)
+    print("%10s %6s %12s %s" % ('seconds', 'calls', 'db hits', 'transaction'))
+    for (module, transaction), t in totals[:options.top]:
+        print("%10.3f %6d %12d %s" % (t['wall_time_s'], t['calls'], t['db_hits'], module + '.' + transaction))
+
+    """slowest statements"""
+    statements = sorted(((s, r) for r in recs for s in r.get('statements', [])),
+                        key=lambda sr: sr[0]['result_available_after_ms'] + sr[0]['result_consumed_after_ms'],
+                        reverse=True)
+    print()
+    print("%10s %12s %s" % ('ms', 'db hits', 'statement'))
+    for s, r in statements[:options.top]:
+        print("%10d %12s %s: %s" % (s['result_available_after_ms'] + s['result_consumed_after_ms'],
+                                    s.get('db_hits', '-'), r['transaction'], s['query'][:100]))
+
+    if options.prometheus:
+        export_prometheus(options.prometheus, recs)
+
+
+if __name__ == "__main__":
+    main()
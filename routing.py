@@ -2,11 +2,12 @@ from neo4j import GraphDatabase
 import folium as fo
 import argparse
 import pandas as pd
+import driverRegistry
 
 
 class App:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driverRegistry.get_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -0,0 +1,99 @@
+import operator
+import numpy as np
+import pandas as pd
+
+"""In this file the safety class, the danger and the speed of cycleways and footways are derived
+from their OSM tags, for all the features at once, before they are imported in neo4j.
+The values are given by tables of rules: the first rule whose conditions all hold gives the value, a
+condition is either the list of the accepted values of a tag or a comparison with a number, e.g.
+   ('vicino al traffico (L)', {'maxspeed': ('<=', 30)})
+"""
+
+CYCLEWAY_CLASSES = [
+    ('lontano dal traffico', {'highway': ['track', 'path', 'footway', 'steps', 'pedestrian']}),
+    ('fisicamente protetto', {'highway': ['cycleway']}),
+    ('fisicamente protetto', {'cycleway': ['track']}),
+    ('fisicamente protetto in sede stradale', {'cycleway': ['lane']}),
+    ('vicino al traffico (L)', {'maxspeed': ('<=', 30)}),
+    ('vicino al traffico (V)', {'maxspeed': ('>', 30)}),
+    ('vicino al traffico (L)', {'highway': ['residential', 'service', 'unclassified']}),
+]
+DEFAULT_CYCLEWAY_CLASS = 'vicino al traffico (V)'
+
+"""class given to the cycleways without one, e.g. the ones of the ER geoportal"""
+MISSING_CYCLEWAY_CLASS = 'fisicamente protetto in sede stradale'
+
+CYCLEWAY_DANGER = {'lontano dal traffico': 1, 'fisicamente protetto': 2, 'fisicamente protetto in sede stradale': 3,
+                   'vicino al traffico (L)': 4, 'vicino al traffico (V)': 5}
+
+FOOTWAY_DANGER = [
+    (1, {'highway': ['path', 'pedestrian', 'footway', 'track', 'steps']}),
+]
+DEFAULT_FOOTWAY_DANGER = 3
+
+"""default speed (km/h) on cycleways and footways: the speed of the cycleways of a class missing in
+CYCLEWAY_SPEEDS, of the footways satisfying no rule of FOOTWAY_SPEEDS and of the routes of the subgraphs"""
+CYCLEWAY_SPEED = 15
+FOOTWAY_SPEED = 4
+
+CYCLEWAY_SPEEDS = {'lontano dal traffico': 15, 'fisicamente protetto': 15, 'fisicamente protetto in sede stradale': 15,
+                   'vicino al traffico (L)': 15, 'vicino al traffico (V)': 15}
+
+FOOTWAY_SPEEDS = [
+    (4, {'highway': ['path', 'pedestrian', 'footway', 'track', 'steps']}),
+]
+
+COMPARISONS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq}
+
+
+def condition_mask(df, column, condition):
+    """rows of df satisfying the condition on column, a missing column satisfies no condition"""
+
+    if column not in df.columns:
+        return np.zeros(df.shape[0], dtype=bool)
+    if isinstance(condition, tuple):
+        comparison, value = condition
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        with np.errstate(invalid='ignore'):
+            return COMPARISONS[comparison](values, value)
+    return df[column].isin(condition).to_numpy()
+
+
+def select(df, rules, default):
+    """value of the first rule satisfied by each row of df, default for the rows satisfying none"""
+
+    masks = []
+    for _, conditions in rules:
+        mask = np.ones(df.shape[0], dtype=bool)
+        for column, condition in conditions.items():
+            mask &= condition_mask(df, column, condition)
+        masks.append(mask)
+    if not masks:
+        return np.full(df.shape[0], default)
+    return np.select(masks, [value for value, _ in rules], default)
+
+
+def cycleway_classes(df, rules=None):
+    """safety class (classifica) of the cycleways"""
+
+    return select(df, CYCLEWAY_CLASSES if rules is None else rules, DEFAULT_CYCLEWAY_CLASS)
+
+
+def cycleway_attributes(gdf_cycleways, danger=None, speed=None):
+    """Set danger (pericolosità) and speed of the cycleways from their class, the cycleways without a
+       class get MISSING_CYCLEWAY_CLASS"""
+
+    classes = gdf_cycleways['classifica'].astype(object).where(gdf_cycleways['classifica'].notna(),
+                                                                MISSING_CYCLEWAY_CLASS)
+    gdf_cycleways['classifica'] = classes
+    gdf_cycleways['pericolosità'] = classes.map(CYCLEWAY_DANGER if danger is None else danger)
+    gdf_cycleways['speed'] = classes.map(CYCLEWAY_SPEEDS if speed is None else speed).fillna(CYCLEWAY_SPEED)
+
+
+def footway_attributes(gdf_footways, rules=None, speed_rules=None):
+    """Set danger and speed of the footways from their tags"""
+
+    gdf_footways['danger'] = select(gdf_footways, FOOTWAY_DANGER if rules is None else rules,
+                                    DEFAULT_FOOTWAY_DANGER).astype(int)
+    gdf_footways['speed'] = select(gdf_footways, FOOTWAY_SPEEDS if speed_rules is None else speed_rules,
+                                   FOOTWAY_SPEED)
@@ -0,0 +1,226 @@
+import os
+import threading
+import numpy as np
+import shapely
+import geoFiles
+
+"""In this file the nodes of a label are indexed for the spatial queries.
+With the Neo4j Spatial plugin the nodes are added to the 'spatial' layer in batches, each batch with
+spatial.addNodes in its own transaction, instead of calling spatial.addNode for every node of the label
+in a single transaction.
+With native points the nodes get a location property (a WGS-84 point: the point itself, the middle of
+a line, a point inside a polygon) computed from their WKT geometry and a point index on it.
+nearest_geometries() and nearest_pairs() find the k closest geometries of the points offline, with a
+shapely STRtree in epsg:3035, so that relationships between the closest nodes can be written in batches.
+same_location_pairs() matches the nodes of two labels at the same location with a hash join on the
+coordinates in epsg:3035 rounded to a grid of cells as large as the tolerance.
+
+The settings can be given with configure() or with the environment variables
+   NEO4J_SPATIAL_LAYER (0 to skip the Neo4j Spatial layer), NEO4J_NATIVE_POINTS (1 to set the native points),
+   NEO4J_SPATIAL_BATCH_SIZE (nodes per transaction)
+The layer is kept by default since the routing queries still use spatial.withinDistance.
+"""
+
+LAYER = 'spatial'
+BATCH_SIZE = 1000
+
+SETTINGS = {
+    'spatial_layer': ('NEO4J_SPATIAL_LAYER', lambda value: value not in ('0', 'false', 'False'), True),
+    'native_points': ('NEO4J_NATIVE_POINTS', lambda value: value not in ('0', 'false', 'False'), False),
+    'batch_size': ('NEO4J_SPATIAL_BATCH_SIZE', int, BATCH_SIZE),
+}
+
+_settings = {}
+_lock = threading.Lock()
+
+
+def configure(**settings):
+    """set whether the nodes are added to the Neo4j Spatial layer and get native points, and the batch size"""
+
+    for name in settings:
+        if name not in SETTINGS:
+            raise ValueError("Unknown setting " + name)
+    with _lock:
+        _settings.update(settings)
+
+
+def settings():
+    """settings used to index the nodes"""
+
+    s = {}
+    for name, (variable, cast, default) in SETTINGS.items():
+        s[name] = cast(os.environ[variable]) if os.environ.get(variable) else default
+    s.update(_settings)
+    return s
+
+
+def _values(tx, query, parameters):
+    return tx.run(query, **parameters).values()
+
+
+def _write(driver, query, **parameters):
+    with driver.session() as session:
+        return session.write_transaction(_values, query, parameters)
+
+
+def _read(driver, query, **parameters):
+    with driver.session() as session:
+        return session.read_transaction(_values, query, parameters)
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def representative_points(geometries):
+    """the point representing each geometry: the middle of the lines, a point inside the polygons"""
+
+    geometries = np.asarray(geometries, dtype=object)
+    lines = shapely.get_type_id(geometries) == shapely.GeometryType.LINESTRING
+    points = shapely.point_on_surface(geometries)
+    points[lines] = shapely.line_interpolate_point(geometries[lines], 0.5, normalized=True)
+    return points
+
+
+def locations(geometries):
+    """(longitude, latitude) of the point representing each WKT geometry (see representative_points).
+       None for the missing or invalid geometries"""
+
+    points = representative_points(shapely.from_wkt(np.asarray(geometries, dtype=object), on_invalid='ignore'))
+    coordinates = shapely.get_coordinates(points, include_z=False)
+    valid = ~shapely.is_missing(points) & ~shapely.is_empty(points)
+    result = [None] * len(points)
+    for i, (lon, lat) in zip(np.flatnonzero(valid), coordinates):
+        result[i] = (float(lon), float(lat))
+    return result
+
+
+def _match(label, where=None):
+    return "MATCH (n:" + label + ")" + ("" if where is None else " WHERE " + where)
+
+
+def create_layer(driver):
+    """create the WKT layer of the project if it does not exist yet"""
+
+    if not _read(driver, "CALL spatial.layers() YIELD name WHERE name = $layer RETURN name", layer=LAYER):
+        _write(driver, "CALL spatial.addWKTLayer($layer, 'geometry')", layer=LAYER)
+
+
+def add_to_layer(driver, label, where=None, batch_size=None):
+    """add the nodes of label (satisfying the where condition on n) to the Neo4j Spatial layer, batch_size
+       nodes per transaction"""
+
+    batch_size = batch_size or settings()['batch_size']
+    ids = [row[0] for row in _read(driver, _match(label, where) + " RETURN id(n)")]
+    for batch in _batches(ids, batch_size):
+        _write(driver, """
+                UNWIND $ids AS i MATCH (n) WHERE id(n) = i
+                WITH collect(n) AS nodes CALL spatial.addNodes($layer, nodes) YIELD count RETURN count
+                """, ids=batch, layer=LAYER)
+    return len(ids)
+
+
+def create_point_index(driver, label, property='location'):
+    """index on the point property of the nodes of label"""
+
+    _write(driver, "CREATE INDEX " + label.lower() + "_" + property + "_index IF NOT EXISTS FOR (n:" + label +
+           ") ON (n." + property + ")")
+
+
+def set_locations(driver, label, where=None, batch_size=None, overwrite=False):
+    """set the location of the nodes of label (satisfying the where condition on n) from their geometry,
+       batch_size nodes per transaction. The nodes that already have a location keep it unless overwrite is True"""
+
+    batch_size = batch_size or settings()['batch_size']
+    conditions = ["n.geometry IS NOT NULL"] + ([] if overwrite else ["n.location IS NULL"])
+    if where is not None:
+        conditions.append("(" + where + ")")
+    rows = _read(driver, _match(label, " AND ".join(conditions)) + " RETURN id(n), n.geometry")
+    points = locations([geometry for _, geometry in rows])
+    rows = [[node, point[0], point[1]] for (node, _), point in zip(rows, points) if point is not None]
+    for batch in _batches(rows, batch_size):
+        _write(driver, """
+                UNWIND $rows AS row MATCH (n) WHERE id(n) = row[0]
+                SET n.location = point({longitude: row[1], latitude: row[2]})
+                """, rows=batch)
+    return len(rows)
+
+
+def index_nodes(driver, label, where=None):
+    """index the nodes of label (satisfying the where condition on n) as given by the settings: in the Neo4j
+       Spatial layer and/or with native points. Returns the number of nodes added to the layer"""
+
+    s = settings()
+    added = 0
+    if s['spatial_layer']:
+        added = add_to_layer(driver, label, where, s['batch_size'])
+    if s['native_points']:
+        set_locations(driver, label, where, s['batch_size'])
+        create_point_index(driver, label)
+    return added
+
+
+def nearest_geometries(points, geometries, k=1, max_distance=100):
+    """the k geometries closest to each point within max_distance, points and geometries in the same projected
+       crs. Arrays of point indexes, geometry indexes and distances, sorted by point and distance"""
+
+    points = np.asarray(points, dtype=object)
+    geometries = np.asarray(geometries, dtype=object)
+    tree = shapely.STRtree(geometries)
+    p, g = tree.query(points, predicate='dwithin', distance=max_distance)
+    d = shapely.distance(points[p], geometries[g])
+    order = np.lexsort((d, p))
+    p, g, d = p[order], g[order], d[order]
+    rank = np.arange(len(p)) - np.searchsorted(p, p)
+    keep = rank < k
+    return p[keep], g[keep], d[keep]
+
+
+def nearest_pairs(points, geometries, k=1, max_distance=100):
+    """rows [geometry id, point id, distance in meters] of the k geometries closest to each point within
+       max_distance meters. points are (id, longitude, latitude), geometries are (id, WKT) in epsg:4326"""
+
+    if not points or not geometries:
+        return []
+    point_ids = [point[0] for point in points]
+    xy = np.array([[float(point[1]), float(point[2])] for point in points])
+    geometry_ids = [geometry[0] for geometry in geometries]
+    shapes = shapely.from_wkt(np.array([geometry[1] for geometry in geometries], dtype=object),
+                              on_invalid='ignore')
+    p, g, d = nearest_geometries(geoFiles.project(shapely.points(xy), geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS),
+                                 geoFiles.project(shapes, geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS),
+                                 k, max_distance)
+    return [[geometry_ids[j], point_ids[i], float(distance)] for i, j, distance in zip(p, g, d)]
+
+
+"""tolerance (meters) of two locations considered the same"""
+SAME_LOCATION_TOLERANCE = 0.05
+
+
+def _projected_coordinates(points):
+    xy = np.array([[float(point[1]), float(point[2])] for point in points]).reshape(-1, 2)
+    x, y = geoFiles.transformer(geoFiles.GEOGRAPHIC_CRS, geoFiles.PROJECTED_CRS).transform(xy[:, 0], xy[:, 1])
+    return np.column_stack([x, y])
+
+
+def same_location_pairs(points, others, tolerance=SAME_LOCATION_TOLERANCE):
+    """pairs (point id, other id) of the points and others at most tolerance meters away, points and others are
+       (id, longitude, latitude). The others are hashed by the cell of the grid containing them, each point
+       is compared only with the others of its cell and of the cells around it"""
+
+    if not points or not others:
+        return []
+    xy = _projected_coordinates(points)
+    other_xy = _projected_coordinates(others)
+    cells = {}
+    for j, cell in enumerate(map(tuple, np.floor(other_xy / tolerance).astype(np.int64))):
+        cells.setdefault(cell, []).append(j)
+    pairs = []
+    for i, (cx, cy) in enumerate(np.floor(xy / tolerance).astype(np.int64)):
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    if np.hypot(*(xy[i] - other_xy[j])) <= tolerance:
+                        pairs.append((points[i][0], others[j][0]))
+    return pairs
@@ -0,0 +1,75 @@
+import os
+import sys
+import pytest
+
+"""Configuration of the benchmark suite: the folders of the scripts are added to the path, since the
+scripts import each other by name, and the synthetic cities are shared by all the benchmarks.
+Results are saved as json in tests/.benchmarks, compare runs with pytest-benchmark compare"""
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS)
+SCRIPT_FOLDERS = [
+    ROOT,
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'Data_Extraction'),
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'Data Preprocessing'),
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'General_Graphs_generation_and_connection'),
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'Subgraphs_generation_and_connection'),
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'Routing'),
+    os.path.join(ROOT, 'Cycleways_and_Footways', 'Routing', 'Routing_on_subgraphs'),
+    os.path.join(ROOT, 'PublicTransport'),
+]
+for folder in SCRIPT_FOLDERS:
+    if folder not in sys.path:
+        sys.path.insert(1, folder)
+
+import synthetic_city
+
+try:
+    from pytest_benchmark.utils import get_tag
+except ImportError:
+    collect_ignore_glob = ['test_bench_*.py']
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('synthetic city')
+    group.addoption('--city-size', dest='city_size', default=os.environ.get('BENCH_CITY_SIZE', 'small'),
+                    help="""Size of the synthetic city: small, medium, large or the number of blocks per side""")
+    group.addoption('--city-layout', dest='city_layout', action='append',
+                    help="""Layout of the synthetic city (grid, radial, perturbed), can be repeated.
+                    All the layouts are used by default""")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """store the results as json in tests/.benchmarks unless another storage is given"""
+
+    if not hasattr(config.option, 'benchmark_storage'):
+        return
+    if config.option.benchmark_storage == 'file://./.benchmarks':
+        config.option.benchmark_storage = 'file://' + os.path.join(TESTS, '.benchmarks')
+    if not config.option.benchmark_save and not config.option.benchmark_disable:
+        config.option.benchmark_autosave = get_tag()
+
+
+def pytest_generate_tests(metafunc):
+    if 'city' in metafunc.fixturenames:
+        layouts = metafunc.config.getoption('city_layout')
+        if not layouts:
+            layouts = os.environ.get('BENCH_CITY_LAYOUTS', ','.join(synthetic_city.LAYOUTS)).split(',')
+        metafunc.parametrize('city', layouts, indirect=True, scope='session')
+
+
+@pytest.fixture(scope='session')
+def city(request):
+    """layers of the synthetic city for the requested layout, in epsg:3035"""
+
+    size = request.config.getoption('city_size')
+    size = synthetic_city.SIZES[size] if size in synthetic_city.SIZES else int(size)
+    return synthetic_city.generate_city(request.param, size)
+
+
+@pytest.fixture(scope='session')
+def city_files(city, tmp_path_factory):
+    """the synthetic city written on disk with the format of the data extraction"""
+
+    return synthetic_city.save_city(city, str(tmp_path_factory.mktemp('city')))
@@ -0,0 +1,27 @@
+import random
+import Cost_profiles
+
+"""In this file we build the Cost_profiles.RouteTable rows used by the tests of the in-memory routing"""
+
+
+def route(source, target, distance, danger=1, crossing=False, speed=15, route_type='BIKE_ROUTE', steps=False):
+    """row of a route with the travel time at the given speed, in the columns of Cost_profiles.COLUMNS"""
+
+    return [source, target, route_type, distance, speed, distance * 3.6 / speed, danger, crossing, steps]
+
+
+def grid(size, seed, dangers=None):
+    """grid of size x size nodes with random distances, routes in both directions. dangers is the range of the
+       random dangers of the routes, None for danger 1 on all of them"""
+
+    rng = random.Random(seed)
+    rows = []
+    for x in range(size):
+        for y in range(size):
+            for other in [(x + 1, y), (x, y + 1)]:
+                if other[0] < size and other[1] < size:
+                    distance = rng.uniform(10, 100)
+                    danger = 1 if dangers is None else rng.randint(*dangers)
+                    for a, b in [((x, y), other), (other, (x, y))]:
+                        rows.append(route(a, b, distance, danger))
+    return Cost_profiles.RouteTable(rows)
@@ -0,0 +1,292 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import networkx as nx
+import osmnx as ox
+from shapely.geometry import LineString, Point
+from pyproj import Transformer
+
+"""In this file we generate deterministic synthetic cities (street network, cycleways, footways,
+crossings, POIs and traffic) shaped like the data extracted from OSM, so that the preprocessing,
+the graph builders and the routing can be benchmarked without Neo4j or network access
+"""
+
+
+"""Layouts and sizes understood by generate_city; the size is the number of blocks per side
+(grid and perturbed) or the number of rings (radial)"""
+LAYOUTS = ('grid', 'radial', 'perturbed')
+SIZES = {'small': 6, 'medium': 15, 'large': 40}
+
+"""Centre of the synthetic city (Modena) and offsets, in meters, of the derived layers from the
+centerline of the street"""
+CENTER = (44.6471, 10.9252)
+SIDEWALK_OFFSET = 4.0
+CYCLE_TRACK_OFFSET = 2.5
+CROSSING_HALF_LENGTH = 5.0
+
+AMENITIES = ['bar', 'cafe', 'restaurant', 'school', 'pharmacy', 'bank', 'library', 'fast_food',
+             'post_office', 'hospital', 'parking', 'bicycle_parking', 'theatre', 'cinema']
+
+
+def _grid(size, spacing, rng):
+    """nodes and edges of a regular grid, arterials every four blocks"""
+
+    n = size + 1
+    ii, jj = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    coords = np.column_stack([jj.ravel() * spacing, ii.ravel() * spacing]).astype(float)
+    coords -= coords.mean(axis=0)
+    edges = []
+    for i in range(n):
+        for j in range(n):
+            k = i * n + j
+            if j + 1 < n:
+                edges.append((k, k + 1, i % 4 == 0))
+            if i + 1 < n:
+                edges.append((k, k + n, j % 4 == 0))
+    return coords, edges
+
+
+def _radial(size, spacing, rng):
+    """nodes and edges of concentric rings connected by spokes, arterials on every third spoke"""
+
+    spokes = max(6, size)
+    coords = [(0.0, 0.0)]
+    for ring in range(1, size + 1):
+        for s in range(spokes):
+            angle = 2 * np.pi * s / spokes
+            coords.append((ring * spacing * np.cos(angle), ring * spacing * np.sin(angle)))
+    edges = []
+    for ring in range(1, size + 1):
+        first = 1 + (ring - 1) * spokes
+        for s in range(spokes):
+            k = first + s
+            edges.append((k, first + (s + 1) % spokes, ring == size))
+            edges.append((0 if ring == 1 else k - spokes, k, s % 3 == 0))
+    return np.array(coords), edges
+
+
+def _perturbed(size, spacing, rng):
+    """grid with jittered junctions, missing streets and a few diagonals, closer to a real OSM network"""
+
+    coords, edges = _grid(size, spacing, rng)
+    coords = coords + rng.normal(0, 0.12 * spacing, coords.shape)
+    kept = [e for e in edges if e[2] or rng.random() > 0.12]
+    n = size + 1
+    for i in range(size):
+        for j in range(size):
+            if rng.random() < 0.05:
+                kept.append((i * n + j, (i + 1) * n + j + 1, False))
+    return coords, kept
+
+
+def _offset(a, b, distance):
+    """segment a-b shifted by distance meters on its left side"""
+
+    d = b - a
+    normal = np.array([-d[1], d[0]]) / np.hypot(d[0], d[1])
+    return a + normal * distance, b + normal * distance
+
+
+def generate_city(layout='grid', size=SIZES['small'], spacing=100.0, seed=42):
+    """generate the layers of a synthetic city as GeoDataFrames in epsg:3035 plus the traffic DataFrame"""
+
+    if layout not in LAYOUTS:
+        raise ValueError("layout must be one of " + ", ".join(LAYOUTS))
+
+    rng = np.random.default_rng(seed)
+    coords, edges = {'grid': _grid, 'radial': _radial, 'perturbed': _perturbed}[layout](size, spacing, rng)
+    to_3035 = Transformer.from_crs(4326, 3035, always_xy=True)
+    cx, cy = to_3035.transform(CENTER[1], CENTER[0])
+    coords = coords + np.array([cx, cy])
+
+    """street nodes: the junctions plus a node in the middle of every street, as in OSM ways"""
+    node_ids = [1000000 + k for k in range(len(coords))]
+    node_xy = {node_ids[k]: coords[k] for k in range(len(coords))}
+    next_node = [1000000 + len(coords)]
+
+    def new_node(xy=None):
+        osmid = next_node[0]
+        next_node[0] += 1
+        if xy is not None:
+            node_xy[osmid] = xy
+        return osmid
+
+    streets, cycleways, footways, crossing_nodes, crossing_ways, traffic = [], [], [], [], [], []
+    way_id = 200000000
+    for e, (u, v, arterial) in enumerate(edges):
+        a, b = coords[u], coords[v]
+        mid = new_node((a + b) / 2)
+        nodes = [node_ids[u], mid, node_ids[v]]
+        highway = 'secondary' if arterial else rng.choice(['residential', 'residential', 'residential', 'service'])
+        maxspeed = 50.0 if arterial else float(rng.choice([30, 30, 50]))
+        way_id += 1
+        streets.append({'id': 'way/' + str(way_id), 'osmid': way_id, 'highway': highway, 'maxspeed': maxspeed,
+                        'name': 'Via ' + str(e), 'nodes': nodes,
+                        'geometry': LineString([a, node_xy[mid], b])})
+        volume = rng.lognormal(7.5 if arterial else 5.5, 0.5)
+        for start, end in ((nodes[0], nodes[1]), (nodes[1], nodes[2])):
+            traffic.append({'node_start': start, 'node_end': end, 'id_road_section': way_id,
+                            'traffic_volume': int(volume), 'year': 2022})
+
+        """streets open to bicycles are extracted as cycleways too, arterials may have a separate track"""
+        if highway != 'secondary' or rng.random() < 0.5:
+            cycleways.append({'id': 'way/' + str(way_id), 'highway': highway, 'bicycle': None, 'foot': None,
+                              'lanes': '2' if arterial else '1',
+                              'cycleway': 'lane' if highway == 'secondary' else None,
+                              'segregated': None, 'maxspeed': maxspeed, 'nodes': nodes,
+                              'geometry': LineString([a, node_xy[mid], b])})
+        if arterial:
+            p, q = _offset(a, b, CYCLE_TRACK_OFFSET)
+            way_id += 1
+            cycleways.append({'id': 'way/' + str(way_id), 'highway': 'cycleway', 'bicycle': 'designated',
+                              'foot': 'no', 'lanes': None, 'cycleway': 'track', 'segregated': 'yes',
+                              'maxspeed': np.nan, 'nodes': [new_node(p), new_node(q)],
+                              'geometry': LineString([p, q])})
+
+        """a sidewalk on both sides of the street"""
+        for side in (SIDEWALK_OFFSET, -SIDEWALK_OFFSET):
+            p, q = _offset(a, b, side)
+            way_id += 1
+            footways.append({'id': 'way/' + str(way_id), 'highway': 'footway', 'footway': 'sidewalk',
+                             'foot': 'designated', 'nodes': [new_node(p), new_node(q)],
+                             'geometry': LineString([p, q])})
+
+        """crossings sit on the middle node of the street, either mapped as ways or as nodes"""
+        draw = rng.random()
+        if draw < 0.3:
+            p, q = _offset(node_xy[mid], node_xy[mid] + (b - a), CROSSING_HALF_LENGTH)
+            r, s = _offset(node_xy[mid], node_xy[mid] + (b - a), -CROSSING_HALF_LENGTH)
+            way_id += 1
+            crossing_ways.append({'id': 'way/' + str(way_id), 'highway': 'footway', 'footway': 'crossing',
+                                  'crossing': rng.choice(['zebra', 'traffic_signals', 'marked']),
+                                  'bicycle': rng.choice(['yes', 'no']),
+                                  'nodes': [new_node(p), mid, new_node(r)],
+                                  'geometry': LineString([p, node_xy[mid], r])})
+        elif draw < 0.6:
+            crossing_nodes.append({'id': 'node/' + str(mid), 'highway': 'crossing',
+                                   'crossing': rng.choice(['uncontrolled', 'zebra', 'unmarked']),
+                                   'geometry': Point(node_xy[mid])})
+
+    """a few pedestrian paths cutting through the blocks"""
+    for _ in range(max(1, len(edges) // 10)):
+        u, v = rng.choice(len(coords), 2, replace=False)
+        a, b = coords[u], coords[v]
+        if np.hypot(*(b - a)) > 3 * spacing:
+            continue
+        way_id += 1
+        highway = rng.choice(['path', 'pedestrian'])
+        footways.append({'id': 'way/' + str(way_id), 'highway': highway, 'footway': None, 'foot': 'yes',
+                         'nodes': [new_node(a), new_node(b)], 'geometry': LineString([a, b])})
+        cycleways.append({'id': 'way/' + str(way_id), 'highway': highway, 'bicycle': 'yes', 'foot': 'yes',
+                          'lanes': None, 'cycleway': None, 'segregated': 'no', 'maxspeed': np.nan,
+                          'nodes': footways[-1]['nodes'], 'geometry': LineString([a, b])})
+
+    """points of interest set back from a random street"""
+    pois = []
+    for k in range(max(4, len(edges) // 2)):
+        u, v, _ = edges[rng.integers(len(edges))]
+        a, b = coords[u], coords[v]
+        t = rng.random()
+        p, _ = _offset(a, b, rng.choice([-1, 1]) * rng.uniform(8, 20))
+        pois.append({'id': 'node/' + str(5000000 + k), 'name': 'Poi ' + str(k),
+                     'amenity': rng.choice(AMENITIES),
+                     'geometry': Point(p + t * (b - a))})
+
+    street_nodes = pd.DataFrame({'osmid': list(node_xy.keys()),
+                                 'geometry': [Point(xy) for xy in node_xy.values()]})
+    street_nodes = street_nodes[street_nodes['osmid'].isin({n for s in streets for n in s['nodes']})]
+    street_nodes = gpd.GeoDataFrame(street_nodes.reset_index(drop=True), crs='epsg:3035')
+    lonlat = street_nodes.to_crs(epsg=4326).geometry
+    street_nodes['x'] = lonlat.x
+    street_nodes['y'] = lonlat.y
+
+    gdf_cycleways = gpd.GeoDataFrame(cycleways, crs='epsg:3035')
+    gdf_cycleways.insert(1, 'ID_E', np.nan)
+    return {
+        'streets': gpd.GeoDataFrame(streets, crs='epsg:3035'),
+        'street_nodes': street_nodes,
+        'cycleways': gdf_cycleways,
+        'footways': gpd.GeoDataFrame(footways, crs='epsg:3035'),
+        'crossing_nodes': gpd.GeoDataFrame(crossing_nodes, columns=['id', 'highway', 'crossing', 'geometry'],
+                                           geometry='geometry', crs='epsg:3035'),
+        'crossing_ways': gpd.GeoDataFrame(crossing_ways,
+                                          columns=['id', 'highway', 'footway', 'crossing', 'bicycle', 'nodes',
+                                                   'geometry'],
+                                          geometry='geometry', crs='epsg:3035'),
+        'pois': gpd.GeoDataFrame(pois, crs='epsg:3035'),
+        'traffic': pd.DataFrame(traffic, columns=['node_start', 'node_end', 'id_road_section',
+                                                  'traffic_volume', 'year'])
+    }
+
+
+def city_graph(city):
+    """street graph of the city in the osmnx format (MultiDiGraph with x/y in epsg:4326)"""
+
+    G = nx.MultiDiGraph(crs='epsg:4326')
+    nodes = city['street_nodes']
+    for osmid, x, y in zip(nodes['osmid'], nodes['x'], nodes['y']):
+        G.add_node(osmid, x=x, y=y, street_count=0)
+    xy = dict(zip(nodes['osmid'], nodes.geometry))
+    for s in city['streets'].itertuples():
+        for u, v in zip(s.nodes[:-1], s.nodes[1:]):
+            length = xy[u].distance(xy[v])
+            for a, b, rev in ((u, v, False), (v, u, True)):
+                G.add_edge(a, b, osmid=s.osmid, highway=s.highway, maxspeed=s.maxspeed, name=s.name,
+                           oneway=False, reversed=rev, length=length)
+    for n in G.nodes:
+        G.nodes[n]['street_count'] = len(set(G.successors(n)))
+    return G
+
+
+def save_gdf(gdf, path):
+    """save the GeoDataFrame in a json file with the same format of the data extraction"""
+
+    df = pd.DataFrame(gdf.to_crs(epsg=4326))
+    df['geometry'] = df['geometry'].astype(str)
+    df.to_json(path, orient='table')
+
+
+def save_city(city, directory, graphml=True):
+    """write the layers of the city in directory with the file names used by the scripts"""
+
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for layer in ['cycleways', 'footways', 'crossing_nodes', 'crossing_ways', 'pois']:
+        files[layer] = os.path.join(directory, layer + '.json')
+        save_gdf(city[layer], files[layer])
+    files['traffic'] = os.path.join(directory, 'traffic.csv')
+    city['traffic'].to_csv(files['traffic'], index=False)
+    if graphml:
+        files['graphml'] = os.path.join(directory, 'city.graphml')
+        ox.io.save_graphml(city_graph(city), files['graphml'])
+    return files
+
+
+def add_options():
+    """parameters to be used in order to run the script"""
+
+    parser = argparse.ArgumentParser(description='Generation of a synthetic city.')
+    parser.add_argument('--layout', '-l', dest='layout', type=str, choices=LAYOUTS, default='grid',
+                        help="""Insert the layout of the street network""")
+    parser.add_argument('--size', '-s', dest='size', type=str, default='small',
+                        help="""Insert the size of the city: small, medium, large or the number of blocks""")
+    parser.add_argument('--seed', '-r', dest='seed', type=int, default=42,
+                        help="""Insert the seed of the random generator""")
+    parser.add_argument('--output', '-o', dest='output', type=str, required=True,
+                        help="""Insert the directory where the files will be written""")
+    return parser
+
+
+def main(args=None):
+    argParser = add_options()
+    options = argParser.parse_args(args=args)
+    size = SIZES[options.size] if options.size in SIZES else int(options.size)
+    city = generate_city(options.layout, size, seed=options.seed)
+    for layer, path in save_city(city, options.output).items():
+        print(layer + " : " + path)
+
+
+if __name__ == "__main__":
+    main()
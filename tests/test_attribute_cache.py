@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import Attribute_cache
+
+"""Tests of the in-memory attributes used to decode and measure the paths"""
+
+
+def nodes():
+    """a-b-c-d, b and c are crossings, c and d in another community; e has no coordinates"""
+
+    return [[10, 'a', 44.1, 10.1, ['BikeNode', 'BikeJunction'], 0],
+            [12, 'b', 44.2, 10.2, ['BikeNode', 'BikeCrossing'], 0],
+            [11, 'c', 44.3, 10.3, ['BikeNode', 'BikeCrossing'], 1],
+            [30, 'd', 44.4, 10.4, ['BikeNode', 'BikeJunction'], 1],
+            [20, 'e', None, None, ['FootNode'], None]]
+
+
+def edges():
+    """two routes from a to b, the cheapest one is used"""
+
+    return [[10, 12, 'BIKE_ROUTE', 100, 100, 2, 18, 20, 0.5],
+            [10, 12, 'BIKE_ROUTE', 100, 100, 8, 18, 20, 0.2],
+            [12, 11, 'BIKE_ROUTE', 50, 50, 4, 9, 20, 0.1],
+            [11, 30, 'BIKE_ROUTE', 40, 40, None, None, 7, 0.3],
+            [30, 20, 'FOOT_ROUTE', 10, 10, 1, 4, 9, 0.1]]
+
+
+def test_decode_internal_ids():
+    attributes = Attribute_cache.GraphAttributes(nodes(), edges())
+    ids, coordinates = attributes.decode([10, 12, 11, 30])
+    assert ids == ['a', 'b', 'c', 'd']
+    assert coordinates[2] == (44.3, 10.3)
+    assert attributes.path_coordinates(['d', 'x', 'a']) == [(44.4, 10.4), (44.1, 10.1)]
+    with pytest.raises(KeyError):
+        attributes.decode([10, 99])
+
+
+def test_path_metrics():
+    attributes = Attribute_cache.GraphAttributes(nodes(), edges())
+    assert len(attributes) == 4
+    metrics = attributes.path_metrics(['a', 'b', 'c', 'd'])
+    assert metrics['length'] == 190 and metrics['distance'] == 190
+    assert metrics['cost'] == pytest.approx(0.6)
+    assert metrics['danger'] == pytest.approx(12 / 3) and metrics['exposure'] == 8 * 100 + 4 * 50
+    assert metrics['travel_time'] == pytest.approx(100 * 3.6 / 18 + 50 * 3.6 / 9 + 7)
+    assert metrics['crossings'] == 1 and metrics['communities'] == 1 and metrics['missing'] == 0
+    assert attributes.path_metrics(['a', 'c', 'd'])['missing'] == 1
+    assert attributes.path_metrics(['d', 'e'])['communities'] == 0
+
+
+def test_snap_index_of_the_routes():
+    attributes = Attribute_cache.GraphAttributes(nodes(), edges())
+    index = attributes.snap_index()
+    assert len(index) == 3 and attributes.snap_index() is index
+    snap = index.snap([(10.25, 44.26)], ('BIKE_ROUTE',), max_distance=10000)[0]
+    assert (snap['source'], snap['target']) == ('b', 'c')
+
+
+def test_partial_route_of_a_snapped_point():
+    """the point is snapped near b on the route b-c, walked at speed 9 with danger 4"""
+
+    attributes = Attribute_cache.GraphAttributes(nodes(), edges())
+    snap = attributes.snap_index().snap([(10.21, 44.215)], ('BIKE_ROUTE',), max_distance=10000)[0]
+    partial = attributes.partial_route(snap)
+    assert partial['junction'] == 'b'
+    assert partial['distance'] == pytest.approx(snap['distance'] + snap['offset'])
+    assert partial['travel_time'] == pytest.approx(partial['distance'] * 3.6 / 9)
+    assert partial['exposure'] == pytest.approx(partial['distance'] * 4)
+
+
+def test_cache_by_version():
+    cache = Attribute_cache.AttributeCache(size=2)
+    loads = []
+
+    def loader(route_types):
+        loads.append(route_types)
+        return nodes(), edges()
+
+    first = cache.get(loader, ('BIKE_ROUTE',), (5, 4))
+    assert cache.get(loader, ('BIKE_ROUTE',), (5, 4)) is first
+    assert cache.get(loader, ('BIKE_ROUTE',), (5, 5)) is not first
+    cache.invalidate()
+    assert len(cache) == 0
+    cache.get(loader, ('BIKE_ROUTE',), (5, 4))
+    assert len(loads) == 3
+    assert np.array_equal(first.positions([30, 5]), [4, -1])
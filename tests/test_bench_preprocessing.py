@@ -0,0 +1,123 @@
+import pytest
+
+import Get_cycleway_from_OSM
+import Elaboration_on_cicleways
+import Elaboration_on_footways
+import Elaboration_on_footways_and_cicleways
+import Elaboration_crossing_nodes_and_cycleways
+import Elaboration_crossing_nodes_and_footways
+import Elaboration_crossing_ways_and_footways
+import Elaboration_street_nodes
+
+"""Benchmarks of the data extraction and preprocessing steps on the synthetic cities"""
+
+ROUNDS = 3
+
+
+@pytest.fixture(scope='session')
+def layers(city):
+    """layers of the city as they are after the data extraction and the single-layer preprocessing"""
+
+    cycleways = city['cycleways'].copy()
+    cycleways['classifica'] = Get_cycleway_from_OSM.classification(cycleways)
+    Elaboration_on_cicleways.insert_id_num(cycleways)
+    Elaboration_on_cicleways.find_touched_lanes(cycleways)
+    footways = city['footways'].copy()
+    Elaboration_on_footways.insert_id_num(footways)
+    Elaboration_on_footways.find_touched_footways(footways)
+    Elaboration_on_footways_and_cicleways.find_cycleways_touching_footways_spatial_index(footways, cycleways)
+    crossing_ways = city['crossing_ways'].copy()
+    crossing_ways.insert(1, 'id_num', range(crossing_ways.shape[0]))
+    return {'cycleways': cycleways, 'footways': footways, 'crossing_ways': crossing_ways,
+            'crossing_nodes': city['crossing_nodes'], 'street_nodes': city['street_nodes']}
+
+
+def run(benchmark, function, *gdfs):
+    """benchmark function on fresh copies of the GeoDataFrames, since the preprocessing works in place,
+    and return the copies of the last round"""
+
+    copies = []
+
+    def setup():
+        copies[:] = [gdf.copy() for gdf in gdfs]
+        return tuple(copies), {}
+
+    benchmark.pedantic(function, setup=setup, rounds=ROUNDS)
+    return copies
+
+
+def test_classification(benchmark, city):
+    classes = benchmark(Get_cycleway_from_OSM.classification, city['cycleways'])
+    assert all(isinstance(c, str) for c in classes)
+
+
+def test_compute_danger(benchmark, layers):
+    run(benchmark, Elaboration_on_cicleways.compute_danger, layers['cycleways'])
+
+
+def test_find_touched_lanes(benchmark, layers):
+    cycleways, = run(benchmark, Elaboration_on_cicleways.find_touched_lanes,
+                     layers['cycleways'].drop(columns='touched_lanes'))
+    assert cycleways['touched_lanes'].map(len).sum() > 0
+
+
+def test_find_closest_lanes_spatial_index(benchmark, layers):
+    run(benchmark, Elaboration_on_cicleways.find_closest_lanes_spatial_index, layers['cycleways'])
+
+
+def test_find_touched_footways(benchmark, layers):
+    footways, = run(benchmark, Elaboration_on_footways.find_touched_footways,
+                    layers['footways'].drop(columns='touched_footways'))
+    assert footways['touched_footways'].map(len).sum() > 0
+
+
+def test_find_closest_footways_spatial_index(benchmark, layers):
+    run(benchmark, Elaboration_on_footways.find_closest_footways_spatial_index, layers['footways'])
+
+
+def test_find_cycleways_touching_footways(benchmark, layers):
+    run(benchmark, Elaboration_on_footways_and_cicleways.find_cycleways_touching_footways_spatial_index,
+        layers['footways'], layers['cycleways'])
+
+
+def test_find_cycleways_close_to_footways(benchmark, layers):
+    run(benchmark, Elaboration_on_footways_and_cicleways.find_cycleways_close_to_footways_spatial_index,
+        layers['footways'], layers['cycleways'])
+
+
+def test_find_cycleways_close_to_crossing_nodes(benchmark, layers):
+    run(benchmark, Elaboration_crossing_nodes_and_cycleways.find_cycleways_close_to_crossing_ways,
+        layers['cycleways'], layers['crossing_nodes'])
+
+
+def test_find_footways_close_to_crossing_nodes(benchmark, layers):
+    run(benchmark, Elaboration_crossing_nodes_and_footways.find_footways_close_to_crossing_nodes,
+        layers['footways'], layers['crossing_nodes'])
+
+
+def test_find_footways_close_to_crossing_ways(benchmark, layers):
+    run(benchmark, Elaboration_crossing_ways_and_footways.find_footways_close_to_crossing_ways,
+        layers['footways'], layers['crossing_ways'])
+
+
+def test_bike_cross_cycleways(benchmark, layers):
+    run(benchmark, Elaboration_street_nodes.bike_cross_cycleways, layers['cycleways'], layers['street_nodes'])
+
+
+def test_foot_cross(benchmark, layers):
+    run(benchmark, Elaboration_street_nodes.foot_cross, layers['footways'], layers['street_nodes'])
+
+
+def test_junction_cross_crossing_ways(benchmark, layers):
+    run(benchmark, Elaboration_street_nodes.junction_cross_crossing_ways, layers['crossing_ways'],
+        layers['street_nodes'])
+
+
+def test_read_file(benchmark, city_files):
+    gdf = benchmark(Elaboration_on_cicleways.read_file, city_files['cycleways'])
+    assert gdf.shape[0] > 0
+
+
+def test_save_gdf(benchmark, layers, tmp_path):
+    run(benchmark, lambda gdf: Elaboration_on_cicleways.save_gdf(gdf, str(tmp_path / 'cycleways.json')),
+        layers['cycleways'])
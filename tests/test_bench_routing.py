@@ -0,0 +1,145 @@
+import osmnx as ox
+import pandas as pd
+import pytest
+
+import Attribute_cache
+import Cost_profiles
+import edgeSnapping
+import geoFiles
+import Overlay
+import Pareto
+import Partitioner
+import route_tables
+import Subgraph_builder
+import synthetic_city
+
+"""Benchmarks of the graph builders and of the routing on the synthetic cities. The junction graph is read as
+the routes of a subgraph, so that the in-memory routing of the repository (profiles, overlay, Pareto front,
+partition, snapping and attribute cache) is measured without the database"""
+
+
+@pytest.fixture(scope='session')
+def junction_graph(city):
+    """junction graph of the city, as created by createJunctionGraph.py"""
+
+    return synthetic_city.city_graph(city)
+
+
+@pytest.fixture(scope='session')
+def far_junctions(junction_graph):
+    """two junctions at opposite corners of the city"""
+
+    nodes = sorted(junction_graph.nodes, key=lambda n: junction_graph.nodes[n]['x'] + junction_graph.nodes[n]['y'])
+    return nodes[0], nodes[-1]
+
+
+def test_load_graphml(benchmark, city_files):
+    G = benchmark(ox.io.load_graphml, city_files['graphml'])
+    assert G.number_of_nodes() > 0
+
+
+def test_build_bike_subgraph(benchmark, city_files):
+    """cycleways subgraph as built by Subgraph_builder, from the graphml and the cycleways files"""
+
+    lanes = geoFiles.read_gdf(city_files['cycleways'], columns=['id', 'nodes']).to_dict('records')
+
+    def build():
+        nodes, routes = Subgraph_builder.read_street_graph(city_files['graphml'])
+        elements = Subgraph_builder.element_nodes(lanes, 'BicycleLane', 'osm_id')
+        return Subgraph_builder.build_subgraph(Subgraph_builder.BIKE, nodes, routes, elements, {})
+
+    subgraph = benchmark(build)
+    assert subgraph['contains'] and subgraph['continue']
+
+
+def test_graph_to_gdfs(benchmark, junction_graph):
+    nodes, edges = benchmark(ox.graph_to_gdfs, junction_graph)
+    assert nodes.shape[0] == junction_graph.number_of_nodes()
+
+
+def test_import_traffic(benchmark, city_files, junction_graph):
+    """join of the traffic file with the streets, as done by traffic.py"""
+
+    edges = pd.DataFrame([(u, v, data['osmid']) for u, v, data in junction_graph.edges(data=True)],
+                         columns=['node_start', 'node_end', 'id_road_section'])
+
+    def import_traffic():
+        traffic = pd.read_csv(city_files['traffic'])
+        return edges.merge(traffic, on=['node_start', 'node_end', 'id_road_section'], how='left')
+
+    merged = benchmark(import_traffic)
+    assert merged['traffic_volume'].notna().any()
+
+
+@pytest.fixture(scope='session')
+def route_table(junction_graph):
+    """the junction graph as the routes of a subgraph, read by Cost_profiles"""
+
+    rows = [route_tables.route(u, v, float(data['length']), danger=1 + k % 5)
+            for k, (u, v, data) in enumerate(junction_graph.edges(data=True))]
+    return Cost_profiles.RouteTable(rows)
+
+
+def test_profile_dijkstra(benchmark, route_table, far_junctions):
+    spec = Cost_profiles.profile('bike', routes=('BIKE_ROUTE',))
+    result = benchmark(Cost_profiles.route, route_table, spec, *far_junctions)
+    assert result['nodes'][-1] == far_junctions[1]
+
+
+@pytest.fixture(scope='session')
+def cells(route_table):
+    """cells of the community routing, as written by Partitioner"""
+
+    return Partitioner.partition(route_table, max_size=50)
+
+
+def test_partition(benchmark, route_table):
+    cells = benchmark(Partitioner.partition, route_table, max_size=50)
+    assert len(cells) == len(route_table.ids) and max(cells.values()) > 0
+
+
+def test_overlay_route(benchmark, route_table, cells, far_junctions):
+    """the same query of test_profile_dijkstra on the overlay of the cells, customized once"""
+
+    overlay = Overlay.Overlay(route_table, cells)
+    spec = Cost_profiles.profile('bike', routes=('BIKE_ROUTE',))
+    overlay.customization(spec)
+    result = benchmark(overlay.route, spec, *far_junctions)
+    assert result['nodes'][-1] == far_junctions[1]
+
+
+def test_pareto_routes(benchmark, route_table, far_junctions):
+    spec = Cost_profiles.profile('bike', routes=('BIKE_ROUTE',))
+    routes = benchmark(Pareto.pareto_routes, route_table, spec, *far_junctions, epsilon=0.1)
+    assert routes and all(route['nodes'][-1] == far_junctions[1] for route in routes)
+
+
+def test_snap(benchmark, junction_graph):
+    """snap of every junction, moved by about 10 meters, onto the nearest route"""
+
+    index = edgeSnapping.SnapIndex.from_segments(
+        (u, v, 'BIKE_ROUTE', junction_graph.nodes[u]['x'], junction_graph.nodes[u]['y'],
+         junction_graph.nodes[v]['x'], junction_graph.nodes[v]['y']) for u, v in junction_graph.edges())
+    points = [(data['x'] + 0.0001, data['y'] + 0.0001) for _, data in junction_graph.nodes(data=True)]
+    snaps = benchmark(index.snap, points, 'bike')
+    assert all(snap is not None for snap in snaps)
+
+
+def test_path_metrics(benchmark, junction_graph, route_table, far_junctions):
+    """decode and measure a path with the attribute cache, as done after each GDS query"""
+
+    internal = {node: i for i, node in enumerate(junction_graph.nodes)}
+    nodes = [[internal[node], node, data['y'], data['x'], ['BikeNode'], 0]
+             for node, data in junction_graph.nodes(data=True)]
+    edges = [[internal[u], internal[v], 'BIKE_ROUTE', data['length'], data['length'], 1, 15,
+              data['length'] * 3.6 / 15, data['length']] for u, v, data in junction_graph.edges(data=True)]
+    attributes = Attribute_cache.GraphAttributes(nodes, edges)
+    path = Cost_profiles.route(route_table, Cost_profiles.profile('bike', routes=('BIKE_ROUTE',)),
+                               *far_junctions)['nodes']
+
+    def measure():
+        ids, _ = attributes.decode([internal[node] for node in path])
+        return attributes.path_metrics(ids)
+
+    metrics = benchmark(measure)
+    assert metrics['missing'] == 0 and metrics['hops'] == len(path)
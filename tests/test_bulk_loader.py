@@ -0,0 +1,46 @@
+import geopandas as gpd
+from shapely.geometry import LineString
+
+import Bulk_loader
+
+"""Tests of the relationships generated by the bulk loader of the general graphs"""
+
+
+def lanes():
+    return [{'id': 'way/1', 'touched_lanes': ['way/2', 'way/1'], 'closest_lanes': [['way/2', 5.0], ['way/3', 8.0]]},
+            {'id': 'way/2', 'touched_lanes': ['way/1'], 'closest_lanes': []},
+            {'id': 'way/3', 'touched_lanes': None, 'closest_lanes': [['way/1', 8.0]]}]
+
+
+def test_lane_relationships():
+    relationships = Bulk_loader.Relationships()
+    Bulk_loader.lane_relationships(relationships, lanes(), {'way/1': 1, 'way/2': 2, 'way/3': 3})
+    rows = relationships.rows()
+
+    assert sorted(rows['CONTINUE_ON_LANE']) == [[1, 2, None], [2, 1, None]]
+    assert sorted(rows['CONTINUE_ON_LANE_BY_CROSSING_ROAD']) == [[1, 3, 8.0], [3, 1, 8.0]]
+
+
+def test_footway_lane_relationships():
+    """a touching cycleway is not connected by crossing the road, the close one is in both directions"""
+
+    footways = [{'id': 'way/10', 'touched_lanes': ['way/1'], 'closest_lanes': [['way/1', 2.0], ['way/2', 6.5]]}]
+    relationships = Bulk_loader.Relationships()
+    Bulk_loader.footway_lane_relationships(relationships, footways, {'way/10': 10}, {'way/1': 1, 'way/2': 2})
+    rows = relationships.rows()
+
+    assert rows['CONTINUE_ON_LANE'] == [[10, 1, None]]
+    assert rows['CONTINUE_ON_FOOTWAY'] == [[1, 10, None]]
+    assert rows['CONTINUE_ON_CLOSE_FOOTWAY_BY_CROSSING_ROAD'] == [[2, 10, 6.5]]
+    assert rows['CONTINUE_ON_CLOSE_LANE_BY_CROSSING_ROAD'] == [[10, 2, 6.5]]
+
+
+def test_records_are_the_rows_of_the_json_file():
+    gdf = gpd.GeoDataFrame({'id': ['way/1', 'way/2'], 'maxspeed': [30.0, None], 'touched_lanes': [['way/2'], []]},
+                           geometry=[LineString([(11.0, 44.0), (11.001, 44.0)]),
+                                     LineString([(11.001, 44.0), (11.001, 44.001)])], crs=4326)
+    records = Bulk_loader.records(gdf)
+
+    assert records[1]['maxspeed'] is None
+    assert records[0]['touched_lanes'] == ['way/2']
+    assert records[1]['geometry'] == str(gdf.geometry.iloc[1])
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import Cost_profiles
+import route_tables
+
+"""Tests of the routing costs computed at query time for the profiles"""
+
+
+def routes():
+    """a-b-d is short but dangerous, a-c-d long and safe; b-d is between two crossings, e is unreachable"""
+
+    rows = [route_tables.route('a', 'b', 100, danger=5),
+            route_tables.route('b', 'd', 100, danger=20, crossing=True, speed=4),
+            route_tables.route('a', 'c', 300),
+            route_tables.route('c', 'd', 300),
+            route_tables.route('d', 'e', 10, speed=4, route_type='FOOT_ROUTE')]
+    return Cost_profiles.RouteTable(rows)
+
+
+def test_profiles():
+    assert Cost_profiles.profile('wheelchair')['walking_speed'] == 3
+    assert Cost_profiles.profile('bike', beta=0.2, speed=None)['beta'] == 0.2
+    with pytest.raises(ValueError):
+        Cost_profiles.profile('rocket')
+    with pytest.raises(ValueError):
+        Cost_profiles.profile('bike', slope=3)
+    with pytest.raises(ValueError):
+        Cost_profiles.profile('bike', beta=2)
+
+
+def test_route_table_rows_by_source():
+    table = routes()
+    assert len(table) == 5
+    a = table.index['a']
+    assert sorted(table.ids[t] for t in table.targets[table.indptr[a]:table.indptr[a + 1]]) == ['b', 'c']
+
+
+def test_profiles_trade_travel_time_and_danger():
+    table = routes()
+    fast = Cost_profiles.route(table, Cost_profiles.profile('bike', beta=1), 'a', 'd')
+    safe = Cost_profiles.route(table, Cost_profiles.profile('bike', beta=0), 'a', 'd')
+    assert fast['nodes'] == ['a', 'b', 'd'] and safe['nodes'] == ['a', 'c', 'd']
+    assert fast['crossings'] == 1 and safe['crossings'] == 0
+    assert safe['distance'] == 600 and safe['danger'] == 1
+    assert safe['travel_time'] == pytest.approx(600 * 3.6 / 15)
+
+    """riding faster does not change the walked route"""
+    ebike = Cost_profiles.travel_times(table, Cost_profiles.profile('ebike'))
+    assert ebike[table.type == 'FOOT_ROUTE'].tolist() == [9]
+    assert Cost_profiles.route(table, Cost_profiles.profile('bike', beta=1, max_danger=10), 'a', 'd')['nodes'] == \
+        ['a', 'c', 'd']
+    assert Cost_profiles.route(table, Cost_profiles.profile('foot'), 'a', 'd') is None
+    assert Cost_profiles.route(table, 'bike', 'a', 'e')['nodes'][-1] == 'e'
+
+
+def test_weight_cache_is_bounded():
+    table = routes()
+    cache = Cost_profiles.WeightCache(size=2)
+    bike = cache.get(table, Cost_profiles.profile('bike'))
+    assert cache.get(table, Cost_profiles.profile('bike')) is bike
+    cache.get(table, Cost_profiles.profile('ebike'))
+    cache.get(table, Cost_profiles.profile('foot'))
+    assert len(cache) == 2
+    assert cache.get(table, Cost_profiles.profile('bike')) is not bike
+    assert np.isinf(cache.get(table, Cost_profiles.profile('foot'))[table.type == 'BIKE_ROUTE']).all()
+
+
+def test_wheelchair_avoids_steps():
+    """a-b is along steps, a-c-b is longer without steps"""
+
+    table = Cost_profiles.RouteTable([route_tables.route(source, target, distance, speed=4, route_type='FOOT_ROUTE',
+                                                         steps=steps)
+                                      for source, target, distance, steps in [('a', 'b', 20, True),
+                                                                              ('a', 'c', 30, False),
+                                                                              ('c', 'b', 30, False)]])
+    assert Cost_profiles.route(table, 'foot', 'a', 'b')['nodes'] == ['a', 'b']
+    assert Cost_profiles.route(table, 'wheelchair', 'a', 'b')['nodes'] == ['a', 'c', 'b']
+    assert Cost_profiles.route(table, Cost_profiles.profile('foot', steps=False), 'c', 'a') is None
+
+
+def test_unknown_nodes():
+    table = routes()
+    with pytest.raises(ValueError):
+        Cost_profiles.route(table, 'bike', 'a', 'z')
+    with pytest.raises(ValueError):
+        Cost_profiles.route(table, 'bike', 'z', 'a')
@@ -0,0 +1,80 @@
+import importlib.util
+import os
+import re
+
+import pytest
+
+import edgeSnapping
+
+"""Tests of the snapping of the coordinates onto the nearest edge"""
+
+
+def index():
+    """a-b is a bike route going east, b-c a foot route going north, about 80 and 110 meters long"""
+
+    return edgeSnapping.SnapIndex.from_segments([('a', 'b', 'BIKE_ROUTE', 10.0, 44.0, 10.001, 44.0),
+                                                 ('b', 'c', 'FOOT_ROUTE', 10.001, 44.0, 10.001, 44.001)])
+
+
+def test_snap_onto_the_edges_of_the_mode():
+    near_a, near_c, far = index().snap([(10.0003, 44.00005), (10.0011, 44.0008), (11, 45)], 'bike')
+    assert near_a['source'] == 'a' and near_a['target'] == 'b' and far is None
+    assert near_a['fraction'] == pytest.approx(0.3, abs=1e-3)
+    assert near_a['offset'] + near_a['remaining'] == pytest.approx(near_a['length'])
+    assert near_a['distance'] == pytest.approx(5.5, abs=0.5)
+    assert near_a['lat'] == pytest.approx(44.0) and near_a['lon'] == pytest.approx(10.0003)
+    assert near_c['fraction'] == pytest.approx(1.0)
+
+    on_foot = index().snap([(10.0011, 44.0008)], 'foot')[0]
+    assert on_foot['key'] == 1 and on_foot['fraction'] == pytest.approx(0.8, abs=1e-3)
+    with pytest.raises(ValueError):
+        index().snap([(10.0, 44.0)], 'plane')
+
+
+def test_nearest_junction_along_the_edge():
+    distance, junction = index().nearest_junction((10.0009, 44.0), ('BIKE_ROUTE', 'FOOT_ROUTE'))
+    assert junction == 'b' and distance == pytest.approx(8, abs=0.5)
+    assert index().nearest_junction((11, 45)) is None
+
+    lanes = edgeSnapping.SnapIndex([('lane', None, None, 'BicycleLane', 'LINESTRING (10 44, 10.001 44)')])
+    assert lanes.snap([(10.0005, 44.0001)])[0]['key'] == 'lane'
+    assert edgeSnapping.SnapIndex([]).snap([(10.0, 44.0)]) == [None]
+
+
+class LaneStore:
+    """transaction on BicycleLane nodes with the properties written by Bulk_loader, returning the properties
+       named in the query"""
+
+    def __init__(self, lanes):
+        self.lanes = lanes
+        self.matched = {}
+
+    def run(self, query, **parameters):
+        if 'RETURN bl.' in query:
+            names = re.findall(r'bl\.(\w+)', query.split('RETURN')[1])
+            rows = [[lane.get(name) for name in names] for lane in self.lanes]
+        else:
+            for node, name, parameter in re.findall(r'MATCH \((\w+):BicycleLane \{(\w+): \$(\w+)\}\)', query):
+                self.matched[node] = [lane for lane in self.lanes if lane.get(name) == parameters[parameter]]
+            rows = []
+        return type('Result', (), {'values': lambda result: rows})()
+
+
+def test_snapped_lanes_found_by_key():
+    folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Cycleways_and_Footways',
+                          'Routing', 'Routing_on_General_graphs', 'Routing.py')
+    spec = importlib.util.spec_from_file_location('general_routing', folder)
+    general_routing = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(general_routing)
+
+    store = LaneStore([{'osm_id': 101, 'id_num': 'cycleway/0', 'ID_E': 0, 'geometry': 'LINESTRING (10 44, 10.001 44)'},
+                       {'osm_id': 102, 'id_num': 'cycleway/1', 'ID_E': 1,
+                        'geometry': 'LINESTRING (10.001 44, 10.001 44.001)'}])
+    greeter = general_routing.App.__new__(general_routing.App)
+    greeter.get_lanes = lambda: general_routing.App._get_lanes(store)
+    source, target = greeter.snap_index().snap([(10.0003, 44.0001), (10.0011, 44.0008)])
+    assert (source['key'], target['key']) == (101, 102)
+
+    general_routing.App._routing_algorithm_dijkstra(store, source['key'], target['key'], 'cost')
+    assert [lane['id_num'] for lane in store.matched['source']] == ['cycleway/0']
+    assert [lane['id_num'] for lane in store.matched['target']] == ['cycleway/1']
@@ -0,0 +1,60 @@
+import os
+import geopandas as gpd
+from shapely.geometry import LineString
+
+import geoFiles
+
+"""Tests of the json and GeoParquet files exchanged by the scripts"""
+
+
+def footways():
+    return gpd.GeoDataFrame({'id': ['way/1', 'way/2'], 'nodes': [[1, 2], [2, 3]],
+                             'touched_lanes': [['way/10'], []],
+                             'closest_lanes': [[('way/10', 3.5), ('way/11', 7.25)], []]},
+                            geometry=[LineString([(11.0, 44.0), (11.001, 44.0)]),
+                                      LineString([(11.001, 44.0), (11.001, 44.001)])], crs=4326)
+
+
+def test_parquet_gives_the_columns_of_the_json_file(tmp_path):
+    path = str(tmp_path / 'footways.json')
+    geoFiles.save_gdf(footways(), path)
+    assert os.path.exists(geoFiles.parquet_path(path))
+
+    from_json = geoFiles.read_json(path)
+    from_parquet = geoFiles.read_gdf(path)
+    assert list(from_parquet.columns) == list(from_json.columns)
+    for column in ['id', 'nodes', 'touched_lanes', 'closest_lanes']:
+        assert from_parquet[column].tolist() == from_json[column].tolist()
+    assert from_parquet.geometry.geom_equals_exact(from_json.geometry, 1e-9).all()
+    assert from_parquet.crs == from_json.crs
+
+    assert list(geoFiles.read_gdf(path, columns=['id']).columns) == ['id', 'geometry']
+
+
+def test_json_newer_than_parquet_is_read(tmp_path):
+    path = str(tmp_path / 'footways.json')
+    geoFiles.save_gdf(footways(), path)
+    changed = footways()
+    changed['id'] = ['way/3', 'way/4']
+    changed.to_crs(epsg=4326, inplace=True)
+    geoFiles.save_gdf(changed, path, parquet=False)
+    os.utime(path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+
+    assert geoFiles.read_gdf(path)['id'].tolist() == ['way/3', 'way/4']
+
+
+def test_projected_geometries_are_persisted(tmp_path):
+    """the epsg:3035 geometries saved are read back as they are, the json file is in epsg:4326"""
+
+    path = str(tmp_path / 'footways.json')
+    projected = footways().to_crs(epsg=3035)
+    geoFiles.save_gdf(projected.copy(), path)
+
+    gdf = geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS)
+    assert gdf.crs == projected.crs
+    assert gdf.geometry.geom_equals_exact(projected.geometry, 0).all()
+    assert geoFiles.read_json(path).geometry.geom_equals_exact(footways().geometry, 1e-9).all()
+
+    os.remove(geoFiles.parquet_path(path))
+    assert geoFiles.read_gdf(path, crs=geoFiles.PROJECTED_CRS).geometry.geom_equals_exact(projected.geometry,
+                                                                                          1e-3).all()
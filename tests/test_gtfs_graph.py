@@ -0,0 +1,66 @@
+import importlib.util
+import os
+
+import queryProfiling
+
+"""Tests of the generation of the GTFS graph: every statement is run by a recorded transaction function"""
+
+
+class Summary:
+    result_available_after = 1
+    result_consumed_after = 2
+    counters = type('Counters', (), dict.fromkeys(queryProfiling.COUNTERS, 0))()
+    profile = None
+
+
+class Result:
+    def values(self):
+        return []
+
+    def consume(self):
+        return Summary()
+
+
+class Transaction:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def run(self, query, parameters=None, **kwparameters):
+        self.queries.append(query)
+        return Result()
+
+
+class Session:
+    def __init__(self):
+        self.queries = []
+
+    def write_transaction(self, transaction_function, *args):
+        return transaction_function(Transaction(self.queries), *args)
+
+    def run(self, query, parameters=None, **kwparameters):
+        raise AssertionError("statement run outside a transaction function")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def test_every_statement_is_recorded():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PublicTransport',
+                        'GTFS-basedTripExpandedGraph.py')
+    spec = importlib.util.spec_from_file_location('gtfs_graph', path)
+    gtfs_graph = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gtfs_graph)
+
+    session = Session()
+    greeter = gtfs_graph.App.__new__(gtfs_graph.App)
+    greeter.driver = type('Driver', (), {'session': lambda driver: queryProfiling.ProfiledSession(session)})()
+    queryProfiling.reset()
+    greeter.generate_GTFS_based_graph()
+    records = queryProfiling.records()
+    queryProfiling.reset()
+    assert len(records) == len(session.queries) == len(gtfs_graph.SCHEMA) + 9
+    assert all(len(record['statements']) == 1 for record in records)
+    assert records[-1]['transaction'] == 'App._insert_days' and records[-1]['kind'] == 'write'
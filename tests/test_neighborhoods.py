@@ -0,0 +1,28 @@
+from Relationships_generation.Connect_elements_to_neighborhoods import ELEMENT_LABELS, App, neighborhoods_of
+
+"""Tests of the assignment of the elements to the neighborhoods"""
+
+NEIGHBORHOODS = [(1.0, 'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))'), (2.0, 'POLYGON ((1 0, 2 0, 2 1, 1 1, 1 0))')]
+
+
+def test_elements_within_neighborhoods():
+    elements = [(10, 'POINT (0.5 0.5)'), (11, 'LINESTRING (0.5 0.5, 1.8 0.5)'), (12, None), (13, 'POINT (5 5)')]
+
+    assert neighborhoods_of(elements, NEIGHBORHOODS) == [[10, 1.0, 1.0], [11, 1.0, 2.0], [11, 2.0, 2.0]]
+
+
+def test_no_neighborhoods():
+    assert neighborhoods_of([(10, 'POINT (0.5 0.5)')], []) == []
+
+
+def test_elements_of_the_general_graph():
+    queries = []
+
+    class Transaction:
+        def run(self, query):
+            queries.append(query)
+            rows = [[1, 'LINESTRING (0 0, 1 1)']] if ':BicycleLane' in query or ':Footway' in query else []
+            return type('Result', (), {'values': lambda result: rows})()
+
+    assert App._get_elements(Transaction()) == [(1, 'LINESTRING (0 0, 1 1)')]
+    assert len(queries) == len(ELEMENT_LABELS) and all('match(p:' in query for query in queries)
@@ -0,0 +1,34 @@
+import Cost_profiles
+import Overlay
+import route_tables
+
+"""Tests of the routing on the community overlay"""
+
+
+def quadrants(table, size=6):
+    return {node: (node[0] * 2 // size, node[1] * 2 // size) for node in table.ids}
+
+
+def test_borders_and_cut_routes():
+    table = route_tables.grid(6, 3, dangers=(1, 5))
+    overlay = Overlay.Overlay(table, quadrants(table))
+    assert len(overlay.borders) == 4
+    """the nodes of the two inner sides of each quadrant, the corner is on both"""
+    assert all(len(borders) == 5 for borders in overlay.borders.values())
+    assert overlay.cut.sum() == 2 * 2 * 6
+
+
+def test_same_costs_of_the_plain_search():
+    table = route_tables.grid(6, 3, dangers=(1, 5))
+    overlay = Overlay.Overlay(table, quadrants(table))
+    for spec in [Cost_profiles.profile('bike', routes=('BIKE_ROUTE',)),
+                 Cost_profiles.profile('bike', routes=('BIKE_ROUTE',), beta=0.1)]:
+        weights = Cost_profiles.CACHE.get(table, spec)
+        for source, target in [((0, 0), (5, 5)), ((5, 0), (0, 5)), ((1, 1), (2, 2)), ((0, 1), (0, 2))]:
+            cost, _ = Cost_profiles.shortest_path(table, weights, source, target)
+            result = overlay.route(spec, source, target)
+            assert abs(result['cost'] - cost) < 1e-9
+            assert result['nodes'][0] == source and result['nodes'][-1] == target
+            assert len(result['nodes']) == len(set(result['nodes']))
+    assert len(overlay._customizations) == 2
+    assert overlay.route(Cost_profiles.profile('bike', routes=('BIKE_ROUTE',)), (0, 0), (0, 5))['communities'] >= 1
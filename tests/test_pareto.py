@@ -0,0 +1,50 @@
+import pytest
+
+import Cost_profiles
+import Pareto
+import route_tables
+
+"""Tests of the Pareto-optimal routes over travel time and danger"""
+
+
+def table():
+    """three ways from a to d: fast and dangerous through b, slow and safe through c, dominated through e"""
+
+    rows = []
+    for source, target, distance, danger, crossing in [('a', 'b', 100, 5, False), ('b', 'd', 100, 5, True),
+                                                        ('a', 'c', 300, 1, False), ('c', 'd', 300, 1, False),
+                                                        ('a', 'e', 300, 5, False), ('e', 'd', 300, 5, False)]:
+        rows.append(route_tables.route(source, target, distance, danger, crossing))
+        rows.append(route_tables.route(target, source, distance, danger, crossing))
+    return Cost_profiles.RouteTable(rows)
+
+
+def test_front_of_travel_time_and_danger():
+    routes = Pareto.pareto_routes(table(), 'bike', 'a', 'd')
+
+    assert [route['nodes'] for route in routes] == [['a', 'b', 'd'], ['a', 'c', 'd']]
+    assert [route['travel_time'] for route in routes] == [48, 144]
+    assert [route['danger'] for route in routes] == [5, 1]
+    assert [route['crossings'] for route in routes] == [1, 0]
+    assert [route['exposure'] for route in routes] == [1000, 600]
+
+
+def test_epsilon_thins_the_front():
+    assert len(Pareto.pareto_routes(table(), 'bike', 'a', 'd', epsilon=2)) == 1
+    assert len(Pareto.pareto_routes(table(), 'bike', 'a', 'd', max_labels=1)) == 1
+    assert Pareto.pareto_routes(table(), 'foot', 'a', 'd') == []
+
+
+def test_danger_weighted_by_length():
+    """a short and very dangerous route then a long and safe one"""
+
+    table = Cost_profiles.RouteTable([route_tables.route('a', 'b', 100, danger=10),
+                                      route_tables.route('b', 'c', 300, danger=2)])
+    route, = Pareto.pareto_routes(table, 'bike', 'a', 'c')
+    assert route['exposure'] == 1600 and route['distance'] == 400
+    assert route['danger'] == 4
+
+
+def test_unknown_nodes():
+    with pytest.raises(ValueError):
+        Pareto.pareto_routes(table(), 'bike', 'a', 'z')
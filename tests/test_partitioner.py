@@ -0,0 +1,58 @@
+import numpy as np
+import Cost_profiles
+import Overlay
+import Partitioner
+import route_tables
+
+"""Tests of the partition of the subgraphs in the cells of the community routing"""
+
+
+def test_cells_are_small_and_connected():
+    table = route_tables.grid(10, 5)
+    cells = Partitioner.partition(table, max_size=20, min_size=5)
+    sizes = np.bincount(list(cells.values()))
+    assert sizes.max() <= 20 and len(sizes) >= 5
+    links = Partitioner.neighbours(table)
+    positions = [cells[node] for node in table.ids]
+    assert Partitioner.connected_cells(links, positions) == Partitioner.merge_small_cells(links, positions, 0, 0)
+    assert Partitioner.partition(table, max_size=20, min_size=5) == cells
+    propagated = Partitioner.partition(table, max_size=20, method='label_propagation')
+    assert np.bincount(list(propagated.values())).max() <= 20
+
+
+def test_border_paths_are_the_overlay_costs():
+    table = route_tables.grid(6, 5)
+    overlay = Overlay.Overlay(table, Partitioner.partition(table, max_size=12))
+    weights = Cost_profiles.CACHE.get(table, Cost_profiles.profile('bike', routes=('BIKE_ROUTE',)))
+    matrices = overlay.customize(weights)
+    paths = Partitioner.border_paths(overlay, weights, processes=1)
+    assert sorted(paths) == sorted(Partitioner.border_paths(overlay, weights, processes=2))
+    for a, b, cost, nodes in paths:
+        cell = overlay.cells[table.index[a]]
+        assert abs(matrices[cell][overlay.border_index[table.index[a]], overlay.border_index[table.index[b]]] -
+                   cost) < 1e-9
+        assert nodes[0] == a and nodes[-1] == b
+        assert all(overlay.cells[table.index[node]] == cell for node in nodes)
+
+    statistics = Partitioner.statistics(overlay)
+    assert statistics['max_size'] <= 12 and statistics['border_nodes'] == len(overlay.border_index)
+    assert all(a != b for a, b, _ in Partitioner.community_routes(overlay, weights))
+
+
+def test_stored_border_costs_route_as_the_customization():
+    table = route_tables.grid(6, 5)
+    cells = Partitioner.partition(table, max_size=12)
+    spec = Cost_profiles.profile('bike', routes=('BIKE_ROUTE',))
+    computed = Overlay.Overlay(table, cells)
+    stored = Overlay.Overlay(table, cells)
+    costs = [(a, b, cost) for a, b, cost, _ in
+             Partitioner.border_paths(computed, Cost_profiles.CACHE.get(table, spec), processes=1)]
+    assert stored.stored_customization(spec, costs) is not None
+    for cell, matrix in computed.customization(spec)[1].items():
+        assert np.array_equal(stored.customization(spec)[1][cell], matrix)
+    for source, target in [((0, 0), (5, 5)), ((5, 0), (0, 5))]:
+        assert stored.route(spec, source, target) == computed.route(spec, source, target)
+
+    """costs of another partition are not used"""
+    assert Overlay.Overlay(table, {node: 0 for node in table.ids}).stored_customization(spec, costs[:1]) is None
+    assert Overlay.profile_key(spec) == Overlay.profile_key(dict(reversed(list(spec.items()))))
@@ -0,0 +1,116 @@
+import argparse
+import pytest
+
+import pipeline
+
+"""Tests of the pipeline runner on small stages that do not need neo4j or overpass"""
+
+
+@pytest.fixture
+def options(tmp_path):
+    (tmp_path / 'import').mkdir()
+    (tmp_path / 'import' / 'raw.txt').write_text('1 2 3')
+    return argparse.Namespace(import_dir=str(tmp_path / 'import'), state_dir=str(tmp_path / 'state'), force=None,
+                              lat=44.6471, lon=10.9252, dist=1000, neo4jURL='neo4j://localhost:7687',
+                              neo4juser='neo4j', neo4jpwd='secret')
+
+
+def workflow(calls):
+    def read(ctx):
+        calls.append('read')
+        with open(ctx.path('file:raw.txt')) as f:
+            return {'numbers': [int(n) for n in f.read().split()]}
+
+    def double(ctx):
+        calls.append('double')
+        return {'doubled': [2 * n for n in ctx.memory['numbers']]}
+
+    def save(ctx):
+        calls.append('save')
+        with open(ctx.path('file:doubled.txt'), 'w') as f:
+            f.write(' '.join(str(n) for n in ctx.memory['doubled']))
+
+    def other(ctx):
+        calls.append('other')
+
+    return [
+        pipeline.Stage('read', pipeline.Function(read), inputs=['file:raw.txt'], outputs=['mem:numbers']),
+        pipeline.Stage('double', pipeline.Function(double), inputs=['mem:numbers'], outputs=['mem:doubled']),
+        pipeline.Stage('save', pipeline.Function(save), inputs=['mem:doubled'], outputs=['file:doubled.txt']),
+        pipeline.Stage('other', pipeline.Function(other), outputs=['neo4j:other']),
+    ]
+
+
+def run(options, calls, targets=None):
+    return pipeline.Pipeline(workflow(calls), options).run(targets, jobs=2)
+
+
+def test_run_and_skip(options, tmp_path):
+    calls = []
+    assert run(options, calls) == {}
+    assert sorted(calls) == ['double', 'other', 'read', 'save']
+    assert (tmp_path / 'import' / 'doubled.txt').read_text() == '2 4 6'
+
+    """nothing changed, the stages keeping data in memory are not even run"""
+    calls = []
+    run(options, calls)
+    assert calls == []
+
+
+def test_changed_input_runs_the_consumers(options, tmp_path):
+    run(options, [])
+    (tmp_path / 'import' / 'raw.txt').write_text('5')
+    calls = []
+    run(options, calls)
+    assert calls == ['read', 'double', 'save']
+    assert (tmp_path / 'import' / 'doubled.txt').read_text() == '10'
+
+
+def test_changed_output_is_rebuilt(options, tmp_path):
+    run(options, [])
+    (tmp_path / 'import' / 'doubled.txt').write_text('edited')
+    calls = []
+    run(options, calls)
+    assert calls == ['read', 'double', 'save']
+
+
+def test_force_and_targets(options):
+    run(options, [])
+    options.force = ['other']
+    calls = []
+    run(options, calls, targets=['other'])
+    assert calls == ['other']
+
+
+def test_forced_stage_runs_the_dependent_stages(options):
+    calls = []
+    stages = workflow(calls) + [pipeline.Stage('count', pipeline.Function(lambda ctx: calls.append('count')),
+                                               inputs=['neo4j:other'], outputs=['neo4j:count'])]
+    pipeline.Pipeline(stages, options).run(jobs=2)
+    options.force = ['read', 'other']
+    calls.clear()
+    runner = pipeline.Pipeline(stages, options)
+    assert [step for _, step in runner.plan()] == ['run'] * 5
+    pipeline.Pipeline(stages, options).run(jobs=2)
+    assert sorted(calls) == ['count', 'double', 'other', 'read', 'save']
+
+
+def test_failure_blocks_the_dependent_stages(options):
+    def broken(ctx):
+        raise ValueError('broken')
+
+    stages = workflow([])
+    stages[1].action = pipeline.Function(broken)
+    runner = pipeline.Pipeline(stages, options)
+    failures = runner.run(jobs=2)
+    assert list(failures) == ['double']
+    assert runner.status['save'] == 'blocked'
+    assert runner.status['other'] == 'ran'
+
+
+def test_workflow_is_consistent(options):
+    options.traffic = 'traffic.csv'
+    runner = pipeline.Pipeline(pipeline.stages(options), options)
+    assert runner.select(['general_graph'])[-1] == 'general_graph'
+    assert 'subgraphs' not in runner.select(['general_graph'])
+    assert all('secret' not in ' '.join(s.action.describe(options)) for s in runner.stages.values())
@@ -0,0 +1,70 @@
+import poiIndex
+
+"""Tests of the index of the names of the points of interest"""
+
+
+def index():
+    return poiIndex.PoiIndex([[1, 'Farmacia Centrale', 'pharmacy', 10.9, 44.6],
+                              [2, 'Caffè Concerto', 'cafe', 10.91, 44.64],
+                              [3, 'Ospedale Policlinico', 'hospital', 10.95, 44.63],
+                              [4, 'Farmacia San Rocco', 'pharmacy', 10.92, 44.65],
+                              [5, None, 'bench', 10.93, 44.66]])
+
+
+def test_normalized_tokens():
+    assert poiIndex.normalize("Caffè dell'Orologio, 2") == ['caffe', 'dell', 'orologio', '2']
+    assert poiIndex.normalize(None) == []
+
+
+def test_exact_prefix_and_fuzzy_matches():
+    pois = index()
+    assert len(pois) == 4
+    assert [poi['id'] for poi in pois.search('caffe concerto')] == [2]
+    assert [poi['id'] for poi in pois.search('farm')] == [1, 4]
+    assert [poi['id'] for poi in pois.search('farmacia rocco')] == [4]
+    assert [poi['id'] for poi in pois.search('policlinco')] == [3]
+    assert pois.search('policlinco', fuzzy=False) == []
+    assert pois.search('farmacia', category='cafe') == []
+    assert pois.search('') == [] and pois.search('stazione') == []
+    best = pois.search('Ospedale', limit=1)[0]
+    assert (best['lon'], best['lat'], best['category']) == (10.95, 44.63, 'hospital')
+
+
+def test_saved_index_is_loaded_once(tmp_path):
+    path = str(tmp_path / poiIndex.INDEX_FILE)
+    assert poiIndex.get_index(path) is None
+    index().save(path)
+    loaded = poiIndex.get_index(path)
+    assert loaded is poiIndex.get_index(path)
+    assert loaded.search('rocco')[0]['id'] == 4
+    assert poiIndex.access_point([10.0, 12.0, None], [44.0, 46.0, 45.0]) == (11.0, 45.0)
+
+
+class ConfigDriver:
+    """driver answering dbms.listConfig with the folders of neo4j, counting the sessions opened"""
+
+    def __init__(self, home):
+        self.home = home
+        self.sessions = 0
+
+    def session(self):
+        self.sessions += 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def read_transaction(self, function, query):
+        return [['dbms.directories.neo4j_home', self.home], ['dbms.directories.import', 'import']]
+
+
+def test_find_asks_the_import_folder_once(tmp_path):
+    (tmp_path / 'import').mkdir()
+    index().save(str(tmp_path / 'import' / poiIndex.INDEX_FILE))
+    driver = ConfigDriver(str(tmp_path))
+    assert poiIndex.find(driver, 'rocco')[0]['id'] == 4
+    assert poiIndex.find(driver, 'concerto')[0]['id'] == 2
+    assert driver.sessions == 1
@@ -0,0 +1,63 @@
+import pytest
+
+import Raptor
+
+"""Tests of the journey planning with RAPTOR on a small GTFS feed"""
+
+
+def write_feed(folder):
+    """line 1 goes A-B-C, line 2 goes C-D and the express line 3 goes A-D on weekdays only. E is 100 meters from
+       C, line 4 leaves from E to F"""
+
+    files = {
+        'stops.txt': ['stop_id,stop_name,stop_lat,stop_lon',
+                      'A,Autostazione,44.640,10.920', 'B,Barozzi,44.640,10.930', 'C,Cialdini,44.640,10.940',
+                      'D,Duomo,44.640,10.960', 'E,Emilia,44.6409,10.940', 'F,Fiera,44.650,10.950'],
+        'trips.txt': ['route_id,service_id,trip_id', '1,all,1a', '1,all,1b', '2,all,2a', '2,all,2b',
+                      '3,weekdays,3a', '4,all,4a'],
+        'stop_times.txt': ['trip_id,arrival_time,departure_time,stop_id,stop_sequence',
+                           '1a,08:00:00,08:00:00,A,1', '1a,08:10:00,08:10:00,B,2', '1a,08:20:00,08:20:00,C,3',
+                           '1b,08:30:00,08:30:00,A,1', '1b,08:40:00,08:40:00,B,2', '1b,08:50:00,08:50:00,C,3',
+                           '2a,08:15:00,08:15:00,C,1', '2a,08:35:00,08:35:00,D,2',
+                           '2b,08:25:00,08:25:00,C,1', '2b,08:45:00,08:45:00,D,2',
+                           '3a,08:05:00,08:05:00,A,1', '3a,08:30:00,08:30:00,D,2',
+                           '4a,08:30:00,08:30:00,E,1', '4a,08:40:00,08:40:00,F,2'],
+        'calendar_dates.txt': ['service_id,date,exception_type', 'all,20240106,1', 'all,20240108,1',
+                               'weekdays,20240108,1'],
+    }
+    for name, lines in files.items():
+        (folder / name).write_text('\n'.join(lines) + '\n')
+    return Raptor.read_feed(str(folder))
+
+
+def test_routes_sorted_by_departure(tmp_path):
+    timetable = Raptor.Timetable(write_feed(tmp_path))
+    assert len(timetable.routes) == 4
+    line = timetable.routes[timetable.serving[timetable.index['A']][0][0]]
+    assert line.trip_ids == ['1a', '1b'] and line.fifo
+    assert line.earliest_trip(1, Raptor.parse_time('08:11:00')) == 1
+    assert line.earliest_trip(1, Raptor.parse_time('08:41:00')) is None
+    assert timetable.footpaths[timetable.index['C']][0][0] == timetable.index['E']
+
+
+def test_fastest_journey_for_each_number_of_transfers(tmp_path):
+    feed = write_feed(tmp_path)
+    saturday = Raptor.journeys(Raptor.Timetable(feed, '20240106'), 'A', 'D', '07:55:00')
+    assert [(journey['transfers'], Raptor.format_time(journey['arrival'])) for journey in saturday] == \
+        [(1, '08:45:00')]
+    assert [leg['trip'] for leg in saturday[0]['legs']] == ['1a', '2b']
+
+    monday = Raptor.journeys(Raptor.Timetable(feed, '2024-01-08'), 'A', 'D', '07:55:00')
+    assert [(journey['transfers'], journey['arrival']) for journey in monday] == [(0, Raptor.parse_time('08:30:00'))]
+    assert Raptor.journeys(Raptor.Timetable(feed, '20240106'), 'A', 'D', '07:55:00', max_transfers=0) == []
+
+
+def test_walking_transfer(tmp_path):
+    timetable = Raptor.Timetable(write_feed(tmp_path), '20240106')
+    journey = Raptor.journeys(timetable, 'A', 'F', '08:00:00')[0]
+    assert [leg['mode'] for leg in journey['legs']] == ['ride', 'walk', 'ride']
+    assert journey['legs'][1]['arrival'] - journey['legs'][1]['departure'] == pytest.approx(100 * 3.6 / 4, abs=2)
+    assert Raptor.format_time(journey['arrival']) == '08:40:00'
+
+    from_coordinates = Raptor.journeys(timetable, (10.9201, 44.640), 'C', '07:50:00')[0]
+    assert from_coordinates['legs'][0]['mode'] == 'walk' and from_coordinates['legs'][0]['from'] is None
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import safetyRules
+
+"""Tests of the rule tables deriving the safety attributes of cycleways and footways"""
+
+
+def test_cycleway_classes_follow_the_order_of_the_rules():
+    df = pd.DataFrame({'highway': ['path', 'cycleway', 'primary', 'residential', 'residential', 'primary', 'primary'],
+                       'cycleway': [np.nan, np.nan, 'lane', np.nan, np.nan, np.nan, np.nan],
+                       'maxspeed': [50, 50, 50, 50, np.nan, 30, np.nan]})
+
+    assert safetyRules.cycleway_classes(df).tolist() == [
+        'lontano dal traffico', 'fisicamente protetto', 'fisicamente protetto in sede stradale',
+        'vicino al traffico (V)', 'vicino al traffico (L)', 'vicino al traffico (L)', 'vicino al traffico (V)']
+
+
+def test_danger_and_speed():
+    cycleways = pd.DataFrame({'classifica': ['fisicamente protetto', None]})
+    safetyRules.cycleway_attributes(cycleways)
+    assert cycleways['classifica'].tolist() == ['fisicamente protetto', 'fisicamente protetto in sede stradale']
+    assert cycleways['pericolosità'].tolist() == [2, 3]
+    assert cycleways['speed'].tolist() == [15, 15]
+
+    footways = pd.DataFrame({'highway': ['footway', 'service', np.nan]})
+    safetyRules.footway_attributes(footways)
+    assert footways['danger'].tolist() == [1, 3, 3]
+    assert footways['speed'].tolist() == [4, 4, 4]
+
+
+def test_speed_by_class():
+    cycleways = pd.DataFrame({'classifica': ['lontano dal traffico', 'vicino al traffico (V)', None]})
+    safetyRules.cycleway_attributes(cycleways, speed={'lontano dal traffico': 20,
+                                                      'fisicamente protetto in sede stradale': 18})
+    assert cycleways['speed'].tolist() == [20, 15, 18]
+
+    footways = pd.DataFrame({'highway': ['steps', 'footway', 'service']})
+    safetyRules.footway_attributes(footways, speed_rules=[(2, {'highway': ['steps']}),
+                                                          (5, {'highway': ['footway']})])
+    assert footways['speed'].tolist() == [2, 5, 4]
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from Routing_on_General_graphs import SetWeights
+
+"""Tests of the weights of the general graph relationships"""
+
+
+def relationship(id, type, length=None, start=(None, None, None), start_crossing=None, end=(None, None, None),
+                 end_crossing=None):
+    """start and end are (length, speed, danger), the crossings 'CrossNode' or 'CrossWay'"""
+
+    return [id, type, length, *start, start_crossing == 'CrossNode', start_crossing == 'CrossWay',
+            *end, end_crossing == 'CrossNode', end_crossing == 'CrossWay']
+
+
+LANE = (100.0, 15, 2)
+FOOTWAY = (40.0, 4, 1)
+
+
+def weights(*relationships):
+    df = pd.DataFrame(list(relationships), columns=SetWeights.COLUMNS)
+    return SetWeights.compute_weights(df).set_index('id')
+
+
+def test_continue_on_lane_and_footway():
+    w = weights(relationship(1, 'CONTINUE_ON_LANE', start=LANE),
+                relationship(2, 'CONTINUE_ON_LANE', start=(200.0, 15, 4)),
+                relationship(3, 'CONTINUE_ON_FOOTWAY', start=FOOTWAY))
+
+    assert w.loc[1, 'distance'] == 100 and w.loc[1, 'danger'] == 2
+    assert w.loc[1, 'travel_time'] == pytest.approx(100 / 15000)
+    assert w.loc[1, 'cost'] == pytest.approx(0.5 * 0 + 0.5 * 1 / 5)
+    assert w.loc[2, 'cost'] == pytest.approx(0.5 * 1 + 0.5 * 3 / 5)
+    """a single footway: its travel time is both the minimum and the maximum"""
+    assert w.loc[3, 'cost'] == pytest.approx(0)
+    assert w[['travel_time_1', 'travel_time_2']].isna().all().all()
+
+
+def test_crossings_take_the_way_at_either_end():
+    w = weights(relationship(1, 'CROSS_THE_ROAD', start=LANE, end=(None, None, None), end_crossing='CrossNode'),
+                relationship(2, 'CROSS_THE_ROAD', start=(None, None, None), start_crossing='CrossNode', end=LANE),
+                relationship(3, 'CROSS_THE_ROAD', start=FOOTWAY, end=(12.0, None, None), end_crossing='CrossWay'),
+                relationship(4, 'CROSS_THE_ROAD', start=(30.0, None, None), start_crossing='CrossWay', end=LANE))
+
+    assert w.loc[[1, 2, 3, 4], 'distance'].tolist() == [105, 105, 46, 115]
+    assert (w['danger'] == SetWeights.CROSSING_DANGER).all()
+    assert w.loc[2, 'travel_time_1'] == pytest.approx(100 / 15000)
+    assert w.loc[4, 'travel_time_2'] == pytest.approx(15 / 4000)
+    assert w.loc[3, 'travel_time'] == pytest.approx(40 / 4000 + 6 / 4000)
+    """crossing nodes: the same travel time, no crossing time in the cost"""
+    assert w.loc[1, 'cost'] == pytest.approx(0.5 * 1 / 4 + 0.5)
+    """crossing ways: the footway is the slowest, the crossing of the cycleway the longest"""
+    assert w.loc[3, 'cost'] == pytest.approx(0.5 + 0 + 0 + 0.5)
+    assert w.loc[4, 'cost'] == pytest.approx(0 + 0.5 * 1 / 4 + 0.5 + 0.5)
+
+
+def test_by_crossing_road_and_records():
+    w = weights(relationship(1, 'CONTINUE_ON_LANE_BY_CROSSING_ROAD', length=20.0, start=LANE),
+                relationship(2, 'CONTINUE_ON_LANE_BY_CROSSING_ROAD', length=10.0, start=(50.0, 15, 2)))
+
+    assert w.loc[1, 'distance'] == 110 and w.loc[1, 'danger'] == SetWeights.CROSSING_ROAD_DANGER
+    assert w.loc[1, 'travel_time'] == pytest.approx(100 / 15000 + 10 / 4000)
+    assert w.loc[1, 'cost'] == pytest.approx(0.5 + 0.5 * 1 / 4 + 0.5 + 0.5)
+    assert w.loc[2, 'cost'] == pytest.approx(0.5 * 1 / 4 + 0.5)
+
+    records = SetWeights.weight_records(w.reset_index())
+    assert records[0]['id'] == 1
+    assert sorted(records[0]['weights']) == sorted(SetWeights.WEIGHTS)
+    records = SetWeights.weight_records(weights(relationship(3, 'CONTINUE_ON_LANE', start=LANE)).reset_index())
+    assert 'travel_time_1' not in records[0]['weights']
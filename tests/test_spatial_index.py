@@ -0,0 +1,53 @@
+import pytest
+import shapely
+
+import spatialIndex
+
+"""Tests of the native points and of the settings of the spatial index"""
+
+
+def test_locations_of_the_geometries():
+    points = spatialIndex.locations(['LINESTRING (11 44, 11.002 44)', 'POINT (11.5 44.5)', None,
+                                     'POLYGON ((11 44, 11.01 44, 11.01 44.01, 11 44.01, 11 44))'])
+    assert points[2] is None
+    for point, expected in zip(points[:2] + points[3:], [(11.001, 44.0), (11.5, 44.5), (11.005, 44.005)]):
+        assert point == pytest.approx(expected)
+
+
+def test_settings(monkeypatch):
+    monkeypatch.setattr(spatialIndex, '_settings', {})
+    monkeypatch.setenv('NEO4J_NATIVE_POINTS', '1')
+    monkeypatch.setenv('NEO4J_SPATIAL_BATCH_SIZE', '50')
+    assert spatialIndex.settings() == {'spatial_layer': True, 'native_points': True, 'batch_size': 50}
+
+    spatialIndex.configure(spatial_layer=False)
+    assert not spatialIndex.settings()['spatial_layer']
+    with pytest.raises(ValueError):
+        spatialIndex.configure(layer='other')
+
+
+def test_nearest_geometries_within_the_distance():
+    points = shapely.points([[0, 0], [10, 0], [100, 100]])
+    geometries = shapely.from_wkt(['LINESTRING (0 1, 10 1)', 'POINT (0 -3)', 'POINT (10 2)', 'POINT (0 4)'])
+    p, g, d = spatialIndex.nearest_geometries(points, geometries, k=2, max_distance=5)
+
+    assert p.tolist() == [0, 0, 1, 1]
+    assert g.tolist() == [0, 1, 0, 2]
+    assert d.tolist() == [1, 3, 1, 2]
+
+
+def test_nearest_pairs_in_meters():
+    pairs = spatialIndex.nearest_pairs([('poi', 11.0, 44.0)], [('lane', 'LINESTRING (11 44.0001, 11.001 44.0001)'),
+                                                              ('far', 'POINT (11.1 44)'), ('none', None)],
+                                       k=3, max_distance=500)
+
+    assert [pair[:2] for pair in pairs] == [['lane', 'poi']]
+    assert pairs[0][2] == pytest.approx(11.1, abs=0.1)
+
+
+def test_same_location_pairs_within_the_tolerance():
+    bike_crosses = [(1, 11.0, 44.0), (2, 11.001, 44.0), (3, 11.002, 44.0)]
+    foot_crosses = [(7, 11.0, 44.0000002), (8, 11.001, 44.00001), (9, 11.002, 44.0)]
+    assert spatialIndex.same_location_pairs(bike_crosses, foot_crosses) == [(1, 7), (3, 9)]
+    assert spatialIndex.same_location_pairs(bike_crosses, foot_crosses, tolerance=2) == [(1, 7), (2, 8), (3, 9)]
+    assert spatialIndex.same_location_pairs(bike_crosses, []) == []
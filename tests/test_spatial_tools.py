@@ -0,0 +1,53 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import LineString, Point
+
+import Spatial_tools
+
+"""Tests of the bulk spatial index queries used by the preprocessing"""
+
+
+def test_group_by_position_keeps_empty_groups():
+    groups = Spatial_tools.group_by_position(4, np.array([2, 0, 2]), ['a', 'b', 'c'])
+    assert groups == [['b'], [], ['a', 'c'], []]
+
+
+def test_matching_values():
+    lines = gpd.GeoDataFrame({'id': ['way/1', 'way/2', 'way/3']},
+                             geometry=[LineString([(0, 0), (10, 0)]), LineString([(10, 0), (10, 10)]),
+                                       LineString([(50, 50), (60, 50)])], crs=3035)
+    points = gpd.GeoDataFrame({'id': ['node/1', 'node/2']}, geometry=[Point(5, 1), Point(100, 100)], crs=3035)
+
+    touched = Spatial_tools.matching_values(lines, lines, 'id', ["intersects", "touches"])
+    assert sorted(touched[0]) == ['way/1', 'way/2', 'way/2']
+    assert touched[2] == ['way/3']
+
+    close = Spatial_tools.matching_values(points, lines, 'id', ["dwithin"], distance=2)
+    assert close == [['way/1'], []]
+
+
+def test_close_values_have_the_real_distance():
+    lines = gpd.GeoDataFrame({'id': ['way/1', 'way/2', 'way/3']},
+                             geometry=[LineString([(0, 0), (10, 0)]), LineString([(0, 3.5), (10, 3.5)]),
+                                       LineString([(0, 20), (10, 20)])], crs=3035)
+
+    close = Spatial_tools.close_values(lines, lines, 'id', 9)
+    assert close[0] == [('way/2', 3.5)]
+    assert close[1] == [('way/1', 3.5)]
+    assert close[2] == []
+
+
+def test_tiles_give_the_same_lists(city):
+    """the queries split in tiles and run by a pool of processes give the lists of the serial ones"""
+
+    queries = [(city['cycleways'], city['cycleways'], ["intersects", "touches"], None),
+               (city['crossing_nodes'], city['footways'], ["dwithin"], 10)]
+    serial = [Spatial_tools.matching_values(gdf, gdf_tree, 'id', p, distance=d) for gdf, gdf_tree, p, d in queries]
+    serial.append(Spatial_tools.close_values(city['footways'], city['footways'], 'id', 9))
+    Spatial_tools.configure(processes=2, tile_size=150.0, min_tiled_rows=0)
+    try:
+        tiled = [Spatial_tools.matching_values(gdf, gdf_tree, 'id', p, distance=d) for gdf, gdf_tree, p, d in queries]
+        tiled.append(Spatial_tools.close_values(city['footways'], city['footways'], 'id', 9))
+    finally:
+        Spatial_tools.configure(processes=1, tile_size=1000.0, min_tiled_rows=5000)
+    assert tiled == serial
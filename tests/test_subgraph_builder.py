@@ -0,0 +1,47 @@
+import Subgraph_builder
+
+"""Tests of the subgraphs built in memory"""
+
+
+def street(*ids):
+    return {str(n): {'x': str(10.9 + n / 1000), 'y': '44.6'} for n in ids}
+
+
+def routes(*pairs):
+    r = {}
+    for u, v in pairs:
+        r[(str(u), str(v))] = r[(str(v), str(u))] = {'length': '10.0', 'distance': 10.0, 'status': 'active'}
+    return r
+
+
+def lane(osm_id):
+    return ('BicycleLane', 'osm_id', osm_id)
+
+
+def test_labels_contains_and_road_junctions():
+    """the street nodes 1-2-3-4-5 in a line: way/1 contains 1 and 2, the crossing 3, the road junction 5"""
+
+    elements = {lane('way/1'): ['1', '2']}
+    crossings = {('CrossWay', 'id_num', 'crossway/0'): ['3']}
+    subgraph = Subgraph_builder.build_subgraph(Subgraph_builder.BIKE, street(1, 2, 3, 4, 5),
+                                               routes((1, 2), (2, 3), (3, 4), (4, 5)), elements, crossings,
+                                               road_junctions=['5', '6'])
+
+    labels = {node: labels[1] for node, (labels, _) in subgraph['nodes'].items()}
+    assert labels == {'1': 'BikeJunction', '2': 'BikeJunction', '3': 'BikeCrossing', '4': 'BikeRoad'}
+    assert sorted(subgraph['contains']) == [(lane('way/1'), '1'), (lane('way/1'), '2'),
+                                            (('CrossWay', 'id_num', 'crossway/0'), '3')]
+    assert sorted(subgraph['road_routes']) == [('4', '5', 10.0), ('5', '4', 10.0)]
+    assert len(subgraph['routes']) == 6
+
+
+def test_crossing_road_pairs_within_three_routes():
+    """way/1 and way/2 are 2 routes away, way/3 shares a node with way/1, way/4 is 4 routes away from way/1"""
+
+    elements = {lane('way/1'): ['1'], lane('way/2'): ['3'], lane('way/3'): ['1', '9'], lane('way/4'): ['5']}
+    streets = Subgraph_builder._adjacency([('1', '2'), ('2', '3'), ('3', '4'), ('4', '5')])
+
+    assert Subgraph_builder.crossing_road_pairs(elements, streets) == [
+        (lane('way/1'), lane('way/2')), (lane('way/2'), lane('way/3')), (lane('way/2'), lane('way/4'))]
+    assert (lane('way/1'), lane('way/2')) not in Subgraph_builder.crossing_road_pairs(
+        elements, streets, element_links=[(lane('way/1'), lane('way/2'))])